@@ -197,8 +197,6 @@ can inspect the source code which is well organized and documented:
  * Cache eviction policy implementations are located in ./icarus/models/cache.py
 """
 from multiprocessing import cpu_count
-from collections import deque
-import copy
 from icarus.util import Tree
 
 ############################## GENERAL SETTINGS ##############################
@@ -217,13 +215,40 @@ N_PROCESSES = cpu_count()
 
 # Format in which results are saved.
 # Result readers and writers are located in module ./icarus/results/readwrite.py
-# Currently only PICKLE is supported
+# Supported formats are PICKLE and SQLITE. SQLITE stores results in a database
+# that can be filtered without reading all results in memory
 RESULTS_FORMAT = 'PICKLE'
 
+# Directory where built topologies, their shortest paths and cache placements
+# are stored and reused by later campaigns. Comment out to disable.
+# The scenario cache is implemented in ./icarus/scenarios/artifacts.py
+# SCENARIO_CACHE_DIR = 'scenarios'
+
+# Directory where profiles of experiments run under cProfile are written,
+# together with profiles merged by topology and strategy and a report of the
+# functions taking most time. Comment out to disable profiling, which can
+# also be enabled with the --profile option of the icarus run command.
+# PROFILE_DIR = 'profiles'
+
+# If True, memory allocations of experiments are traced and the memory used at
+# the end of each phase of the simulation, the top allocation sites and the
+# number of objects by type are stored in results. It slows down simulations
+# considerably. It can also be enabled with the --memory-profile option of the
+# icarus run command.
+MEMORY_PROFILE = False
+
 # Number of times each experiment is replicated
 # This is necessary for extracting confidence interval of selected metrics
 N_REPLICATIONS = 3
 
+# If True, experiments are run with common random numbers: the workload and
+# the content placement of all experiments of a replication are seeded with
+# the same seeds, so that experiments differing only by strategy or cache
+# policy process the same sequence of requests. Differences between their
+# results then have a much lower variance, so that fewer replications are
+# needed to rank strategies.
+COMMON_RANDOM_NUMBERS = False
+
 # List of metrics to be measured in the experiments
 # The implementation of data collectors are located in ./icarus/execution/collectors.py
 # Remove collectors not needed
@@ -292,9 +317,6 @@ STRATEGIES = [
      'RAND_BERNOULLI',  # Random Bernoulli: cache randomly in caches on path
              ]
 
-# Instantiate experiment queue
-EXPERIMENT_QUEUE = deque()
-
 # Build a default experiment configuration which is going to be used by all
 # experiments of the campaign
 default = Tree()
@@ -307,16 +329,68 @@ default['cache_placement']['name'] = 'UNIFORM'
 default['content_placement']['name'] = 'UNIFORM'
 default['cache_policy']['name'] = CACHE_POLICY
 
-# Create experiments multiplexing all desired parameters
-for alpha in ALPHA:
-    for strategy in STRATEGIES:
-        for topology in TOPOLOGIES:
-            for network_cache in NETWORK_CACHE:
-                experiment = copy.deepcopy(default)
-                experiment['workload']['alpha'] = alpha
-                experiment['strategy']['name'] = strategy
-                experiment['topology']['name'] = topology
-                experiment['cache_placement']['network_cache'] = network_cache
-                experiment['desc'] = "Alpha: %s, strategy: %s, topology: %s, network cache: %s" \
-                                     % (str(alpha), strategy, topology, str(network_cache))
-                EXPERIMENT_QUEUE.append(experiment)
+# Uncomment to end the warmup phase as soon as caches reach steady state,
+# detected with the MSER-5 rule, rather than after N_WARMUP_REQUESTS requests,
+# which then becomes the maximum length of the warmup phase. Only stationary
+# workloads support it. The steady state detector is implemented in
+# ./icarus/execution/steadystate.py
+# default['warmup'] = {'batch_size': 5, 'interval': 1000}
+
+# Uncomment to end the measured phase as soon as the confidence intervals of
+# the listed metrics, computed with the method of batch means, are within
+# +/- precision of their mean, rather than after N_MEASURED_REQUESTS requests,
+# which then becomes the maximum length of the measured phase. The metrics
+# must be among DATA_COLLECTORS. Only stationary workloads support it. The
+# stopping rule is implemented in ./icarus/execution/steadystate.py
+# default['stopping'] = {'metrics': ['CACHE_HIT_RATIO', 'LATENCY'],
+#                        'precision': 0.005, 'confidence': 0.95,
+#                        'batch_size': 1000, 'min_requests': 10 ** 5}
+
+# Uncomment to partition the requests of hash-routing experiments by
+# authoritative cache and simulate partitions in parallel processes. This
+# speeds up large experiments run with PARALLEL_EXECUTION = False. It is
+# ignored by experiments whose strategy is not listed in
+# PARTITIONABLE_STRATEGIES of ./icarus/execution/partition.py
+# default['partition'] = {'n_processes': 4}
+
+# Uncomment to simulate packet-level experiments by conservative parallel
+# discrete-event simulation, with topology regions simulated by different
+# processes. This is experimental: it speeds up experiments only on topologies
+# whose links between regions have long delays compared to the interval
+# between requests. It is ignored by experiments whose strategy is not listed
+# in PDES_STRATEGIES of ./icarus/execution/pdes.py
+# default['pdes'] = {'n_processes': 4}
+
+# Uncomment to fill caches of packet-level experiments in the warmup phase with
+# the request-level equivalent of their strategy, e.g. LCE for LCE_PKT_LEVEL,
+# and simulate packets of measured flows only. This speeds up experiments with
+# long warmup phases
+# default['hybrid'] = True
+
+# Uncomment to write snapshots of the state of simulations at the end of the
+# warmup phase and every 'interval' events to files of 'directory', one per
+# experiment named after a digest of its parameters, so that simulations can
+# be restarted from them by setting the 'snapshot' attribute of an experiment
+# to the path of its snapshot, which is stored in the CHECKPOINT runtime
+# statistic of its results. Snapshots are implemented in
+# ./icarus/execution/snapshot.py
+# default['checkpoint'] = {'directory': 'checkpoints', 'interval': 10 ** 6}
+
+# Uncomment to estimate the results of experiments analytically with the Che
+# approximation rather than simulating them, e.g. to quickly check which
+# configurations of a sweep are worth simulating. Only the strategies listed
+# in ANALYTICAL_STRATEGIES of ./icarus/execution/analytical.py are supported
+# default['analytical'] = True
+
+# Create experiments multiplexing all desired parameters.
+# The queue of experiments can be any iterable of experiment trees. A grid
+# generates them lazily, so that memory used does not grow with their number
+EXPERIMENT_QUEUE = default.grid(
+    [(('workload', 'alpha'), ALPHA),
+     (('strategy', 'name'), STRATEGIES),
+     (('topology', 'name'), TOPOLOGIES),
+     (('cache_placement', 'network_cache'), NETWORK_CACHE)],
+    desc=lambda e: "Alpha: %s, strategy: %s, topology: %s, network cache: %s"
+                   % (str(e['workload']['alpha']), e['strategy']['name'],
+                      e['topology']['name'],
+                      str(e['cache_placement']['network_cache'])))
@@ -9,7 +9,8 @@ import logging
 import matplotlib.pyplot as plt
 
 from icarus.util import Settings, config_logging
-from icarus.results import plot_lines, plot_bar_chart
+from icarus.results import ResultIndex, plot_lines, plot_bar_chart, \
+                           plot_figures
 from icarus.registry import RESULTS_READER
 
 
@@ -65,7 +66,7 @@ STRATEGY_BAR_HATCH = {
 
 
 
-def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def cache_hits_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     if 'NO_CACHE' in strategies:
         strategies.remove('NO_CACHE')
@@ -85,13 +86,13 @@ def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
 
 
-def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def latency_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s A=%s' % (topology, alpha)
     desc['xlabel'] = 'Cache to population ratio'
@@ -110,8 +111,8 @@ def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, str
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'LATENCY_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
 
@@ -131,7 +132,8 @@ def run(config, results, plotdir):
     settings = Settings()
     settings.read_from(config)
     config_logging(settings.LOG_LEVEL)
-    resultset = RESULTS_READER[settings.RESULTS_FORMAT](results)
+    # Index the resultset once, rather than filtering it for each graph
+    resultset = ResultIndex(RESULTS_READER[settings.RESULTS_FORMAT](results))
     # Create dir if not existsing
     if not os.path.exists(plotdir):
         os.makedirs(plotdir)
@@ -140,29 +142,35 @@ def run(config, results, plotdir):
     cache_sizes = settings.NETWORK_CACHE
     alphas = settings.ALPHA
     strategies = settings.STRATEGIES
-    # Plot graphs
+    # Collect the graphs to plot, which are then rendered in parallel
+    figures = []
     #for topology in topologies:
         #for cache_size in cache_sizes:
             #logger.info('Plotting cache hit ratio for topology %s and cache size %s vs alpha' % (topology, str(cache_size)))
-            #plot_cache_hits_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            #figures.append(cache_hits_vs_alpha_figure(topology, cache_size, alphas, strategies))
             # logger.info('Plotting link load for topology %s vs cache size %s' % (topology, str(cache_size)))
-            # plot_link_load_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            # figures.append(link_load_vs_alpha_figure(topology, cache_size, alphas, strategies))
             #logger.info('Plotting latency for topology %s vs cache size %s' % (topology, str(cache_size)))
-            #plot_latency_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            #figures.append(latency_vs_alpha_figure(topology, cache_size, alphas, strategies))
     for strategy in strategies:
         for alpha in alphas:
             logger.info('Plotting cache hit ratio for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(cache_hits_vs_cache_size_figure(topology, alpha, cache_sizes,
+                                                           strategies))
             # logger.info('Plotting link load for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            # plot_link_load_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            # figures.append(link_load_vs_cache_size_figure(topology, alpha, cache_sizes,
+            #                                               strategies))
             logger.info('Plotting latency for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_latency_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(latency_vs_cache_size_figure(topology, alpha, cache_sizes, strategies))
     #for cache_size in cache_sizes:
         #for alpha in alphas:
             #logger.info('Plotting cache hit ratio for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            #plot_cache_hits_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            #figures.append(cache_hits_vs_topology_figure(alpha, cache_size, topologies,
+            #                                             strategies))
             # logger.info('Plotting link load for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            # plot_link_load_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            # figures.append(link_load_vs_topology_figure(alpha, cache_size, topologies,
+            #                                             strategies))
+    plot_figures(resultset, figures, plotdir)
     logger.info('Exit. Plots were saved in directory %s' % os.path.abspath(plotdir))
 
 
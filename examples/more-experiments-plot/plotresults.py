@@ -9,7 +9,8 @@ import logging
 import matplotlib.pyplot as plt
 
 from icarus.util import Settings, config_logging
-from icarus.results import plot_lines, plot_bar_chart
+from icarus.results import ResultIndex, plot_lines, plot_bar_chart, \
+                           plot_figures
 from icarus.registry import RESULTS_READER
 
 
@@ -92,11 +93,10 @@ STRATEGY_BAR_HATCH = {
     }
 
 
-def plot_cache_hits_vs_alpha(resultset, topology, cache_size, alpha_range, strategies, plotdir):
+def cache_hits_vs_alpha_figure(topology, cache_size, alpha_range, strategies):
     # if 'NO_CACHE' in strategies:
         # strategies.remove('NO_CACHE')
     desc = {}
-    print(resultset)
     desc['title'] = 'Cache hit ratio: T=%s C=%s' % (topology, cache_size)
     desc['ylabel'] = 'Cache hit ratio'
     desc['xlabel'] = 'Content distribution parameter'
@@ -112,11 +112,11 @@ def plot_cache_hits_vs_alpha(resultset, topology, cache_size, alpha_range, strat
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@C=%s.pdf'
-               % (topology, cache_size), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@C=%s.pdf' % (topology, cache_size)
+    return plot_lines, desc, filename
 
 
-def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def cache_hits_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     # if 'NO_CACHE' in strategies:
         # strategies.remove('NO_CACHE')
@@ -137,11 +137,11 @@ def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_latency_vs_alpha(resultset, topology, cache_size, alpha_range, strategies, plotdir):
+def latency_vs_alpha_figure(topology, cache_size, alpha_range, strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s C=%s' % (topology, cache_size)
     desc['xlabel'] = 'Content distribution parameter'
@@ -158,10 +158,10 @@ def plot_latency_vs_alpha(resultset, topology, cache_size, alpha_range, strategi
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@C=%s.pdf'
-               % (topology, cache_size), plotdir)
+    filename = 'LATENCY_T=%s@C=%s.pdf' % (topology, cache_size)
+    return plot_lines, desc, filename
 
-def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def latency_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s A=%s' % (topology, alpha)
     desc['xlabel'] = u'Cache to population ratio'
@@ -181,12 +181,12 @@ def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, str
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'LATENCY_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
 
-def plot_cache_hits_vs_topology(resultset, alpha, cache_size, topology_range, strategies, plotdir):
+def cache_hits_vs_topology_figure(alpha, cache_size, topology_range, strategies):
     """
     Plot bar graphs of cache hit ratio for specific values of alpha and cache
     size for various topologies.
@@ -213,10 +213,11 @@ def plot_cache_hits_vs_topology(resultset, alpha, cache_size, topology_range, st
     desc['bar_hatch'] = STRATEGY_BAR_HATCH
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_bar_chart(resultset, desc, 'CACHE_HIT_RATIO_A=%s_C=%s.pdf'
-                   % (alpha, cache_size), plotdir)
+    filename = 'CACHE_HIT_RATIO_A=%s_C=%s.pdf' % (alpha, cache_size)
+    return plot_bar_chart, desc, filename
 
-def plot_cache_hits_vs_server_processing_rate(resultset, topology, cache_size, alpha, server_rate_range, strategies, plotdir):
+def cache_hits_vs_server_processing_rate_figure(topology, cache_size, alpha, server_rate_range,
+                                                strategies):
     desc = {}
     desc['title'] = 'Cache hit ratio: T=%s C=%s A=%s' % (topology, cache_size, alpha)
     desc['xlabel'] = 'Server processing rate'
@@ -234,10 +235,11 @@ def plot_cache_hits_vs_server_processing_rate(resultset, topology, cache_size, a
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
-def plot_latency_vs_server_processing_rate(resultset, topology, cache_size, alpha, server_rate_range, strategies, plotdir):
+def latency_vs_server_processing_rate_figure(topology, cache_size, alpha, server_rate_range,
+                                             strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s C=%s A=%s' % (topology, cache_size, alpha)
     desc['xlabel'] = 'Server processing rate'
@@ -255,11 +257,11 @@ def plot_latency_vs_server_processing_rate(resultset, topology, cache_size, alph
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'LATENCY_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_percentage_of_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir):
+def percentage_of_rejection_figure(topology, alpha, cache_size, n, strategies):
     print('in plot rejected')
     desc = {}
     desc['title'] = 'Percentage of rejected packet: T=%s C=%s A=%s' % (topology, cache_size, alpha)
@@ -281,10 +283,10 @@ def plot_percentage_of_rejection(resultset, topology, alpha, cache_size, n, stra
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'TOTAL_REJECTED_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'TOTAL_REJECTED_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
-def plot_percentage_of_request_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir):
+def percentage_of_request_rejection_figure(topology, alpha, cache_size, n, strategies):
     print('in plot rejected')
     desc = {}
     desc['title'] = 'Percentage of rejected request: T=%s C=%s A=%s' % (topology, cache_size, alpha)
@@ -306,11 +308,11 @@ def plot_percentage_of_request_rejection(resultset, topology, alpha, cache_size,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'REQUEST_REJECTED_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'REQUEST_REJECTED_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_percentage_of_data_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir):
+def percentage_of_data_rejection_figure(topology, alpha, cache_size, n, strategies):
     print('in plot rejected')
     desc = {}
     desc['title'] = 'Percentage of rejected data: T=%s C=%s A=%s' % (topology, cache_size, alpha)
@@ -332,10 +334,10 @@ def plot_percentage_of_data_rejection(resultset, topology, alpha, cache_size, n,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'DATA_REJECTED_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'DATA_REJECTED_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
-def plot_cache_queue_size(resultset, topology, alpha, cache_size, n, strategies, plotdir):
+def cache_queue_size_figure(topology, alpha, cache_size, n, strategies):
     print('in plot queue size')
     desc = {}
     desc['title'] = 'Average cache queue size: T=%s C=%s A=%s' % (topology, cache_size, alpha)
@@ -357,8 +359,8 @@ def plot_cache_queue_size(resultset, topology, alpha, cache_size, n, strategies,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'QUEUE_SIZE_T=%s@C=%s@A=%s.pdf'
-               % (topology, cache_size, alpha), plotdir)
+    filename = 'QUEUE_SIZE_T=%s@C=%s@A=%s.pdf' % (topology, cache_size, alpha)
+    return plot_lines, desc, filename
 
 
 def run(config, results, plotdir):
@@ -376,7 +378,8 @@ def run(config, results, plotdir):
     settings = Settings()
     settings.read_from(config)
     config_logging(settings.LOG_LEVEL)
-    resultset = RESULTS_READER[settings.RESULTS_FORMAT](results)
+    # Index the resultset once, rather than filtering it for each graph
+    resultset = ResultIndex(RESULTS_READER[settings.RESULTS_FORMAT](results))
     # Create dir if not existsing
     if not os.path.exists(plotdir):
         os.makedirs(plotdir)
@@ -387,45 +390,55 @@ def run(config, results, plotdir):
     strategies = settings.STRATEGIES
     # server_processing_rates = settings.SERVER_PROCESSING_RATE
     print(strategies)
-    # Plot graphs
+    # Collect the graphs to plot, which are then rendered in parallel
+    figures = []
     for topology in topologies:
         for cache_size in cache_sizes:
             logger.info('Plotting cache hit ratio for topology %s and cache size %s vs alpha' % (topology, str(cache_size)))
-            plot_cache_hits_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            figures.append(cache_hits_vs_alpha_figure(topology, cache_size, alphas, strategies))
             # logger.info('Plotting link load for topology %s vs cache size %s' % (topology, str(cache_size)))
-            # plot_link_load_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            # figures.append(link_load_vs_alpha_figure(topology, cache_size, alphas, strategies))
             logger.info('Plotting latency for topology %s vs cache size %s' % (topology, str(cache_size)))
-            plot_latency_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            figures.append(latency_vs_alpha_figure(topology, cache_size, alphas, strategies))
     for topology in topologies:
         for alpha in alphas:
             logger.info('Plotting cache hit ratio for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(cache_hits_vs_cache_size_figure(topology, alpha, cache_sizes,
+                                                           strategies))
             # logger.info('Plotting link load for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            # plot_link_load_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            # figures.append(link_load_vs_cache_size_figure(topology, alpha, cache_sizes,
+            #                                               strategies))
             logger.info('Plotting latency for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_latency_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(latency_vs_cache_size_figure(topology, alpha, cache_sizes, strategies))
     """
     for topology in topologies:
         for cache_size in cache_sizes:
             for alpha in alphas:
                 # logger.info('Plotting cache hit ratio for topology %s cache size %s alpha %s vs server processing rate' % (topology, str(cache_size), str(alpha)))
-                # plot_cache_hits_vs_server_processing_rate(resultset, topology, cache_size, alpha, server_processing_rates, strategies, plotdir)
+                # figures.append(cache_hits_vs_server_processing_rate_figure(
+                #     topology, cache_size, alpha, server_processing_rates, strategies))
                 # logger.info('Plotting latency for topology %s cache size %s alpha %s vs server processing rate' % (topology, str(cache_size), str(alpha)))
-                # plot_latency_vs_server_processing_rate(resultset, topology, cache_size, alpha, server_processing_rates, strategies, plotdir)
+                # figures.append(latency_vs_server_processing_rate_figure(
+                #     topology, cache_size, alpha, server_processing_rates, strategies))
                 logger.info('Plotting the percentage of packets arriving at a busy node')
-                plot_percentage_of_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir)
-                plot_percentage_of_request_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir)
-                plot_percentage_of_data_rejection(resultset, topology, alpha, cache_size, n, strategies, plotdir)
+                figures.append(percentage_of_rejection_figure(topology, alpha, cache_size, n,
+                                                              strategies))
+                figures.append(percentage_of_request_rejection_figure(topology, alpha, cache_size,
+                                                                      n, strategies))
+                figures.append(percentage_of_data_rejection_figure(topology, alpha, cache_size, n,
+                                                                   strategies))
                 logger.info('Plotting average cache queue size')
-                plot_cache_queue_size(resultset, topology, alpha, cache_size, n, strategies, plotdir)
+                figures.append(cache_queue_size_figure(topology, alpha, cache_size, n, strategies))
     
     for cache_size in cache_sizes:
         for alpha in alphas:
             logger.info('Plotting cache hit ratio for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            plot_cache_hits_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            figures.append(cache_hits_vs_topology_figure(alpha, cache_size, topologies, strategies))
             # logger.info('Plotting link load for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            # plot_link_load_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            # figures.append(link_load_vs_topology_figure(alpha, cache_size, topologies,
+            #                                             strategies))
     """
+    plot_figures(resultset, figures, plotdir)
     logger.info('Exit. Plots were saved in directory %s' % os.path.abspath(plotdir))
 
 
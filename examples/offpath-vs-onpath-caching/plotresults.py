@@ -9,7 +9,8 @@ import logging
 import matplotlib.pyplot as plt
 
 from icarus.util import Settings, config_logging
-from icarus.results import plot_lines, plot_bar_chart
+from icarus.results import ResultIndex, plot_lines, plot_bar_chart, \
+                           plot_figures
 from icarus.registry import RESULTS_READER
 
 
@@ -92,7 +93,7 @@ STRATEGY_BAR_HATCH = {
     }
 
 
-def plot_cache_hits_vs_alpha(resultset, topology, cache_size, alpha_range, strategies, plotdir):
+def cache_hits_vs_alpha_figure(topology, cache_size, alpha_range, strategies):
     if 'NO_CACHE' in strategies:
         strategies.remove('NO_CACHE')
     desc = {}
@@ -111,11 +112,11 @@ def plot_cache_hits_vs_alpha(resultset, topology, cache_size, alpha_range, strat
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@C=%s.pdf'
-               % (topology, cache_size), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@C=%s.pdf' % (topology, cache_size)
+    return plot_lines, desc, filename
 
 
-def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def cache_hits_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     if 'NO_CACHE' in strategies:
         strategies.remove('NO_CACHE')
@@ -135,11 +136,11 @@ def plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_size_range,
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'CACHE_HIT_RATIO_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'CACHE_HIT_RATIO_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_link_load_vs_alpha(resultset, topology, cache_size, alpha_range, strategies, plotdir):
+def link_load_vs_alpha_figure(topology, cache_size, alpha_range, strategies):
     desc = {}
     desc['title'] = 'Internal link load: T=%s C=%s' % (topology, cache_size)
     desc['xlabel'] = u'Content distribution \u03b1'
@@ -156,11 +157,11 @@ def plot_link_load_vs_alpha(resultset, topology, cache_size, alpha_range, strate
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LINK_LOAD_INTERNAL_T=%s@C=%s.pdf'
-               % (topology, cache_size), plotdir)
+    filename = 'LINK_LOAD_INTERNAL_T=%s@C=%s.pdf' % (topology, cache_size)
+    return plot_lines, desc, filename
 
 
-def plot_link_load_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def link_load_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     desc['title'] = 'Internal link load: T=%s A=%s' % (topology, alpha)
     desc['xlabel'] = 'Cache to population ratio'
@@ -178,11 +179,11 @@ def plot_link_load_vs_cache_size(resultset, topology, alpha, cache_size_range, s
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LINK_LOAD_INTERNAL_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'LINK_LOAD_INTERNAL_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_latency_vs_alpha(resultset, topology, cache_size, alpha_range, strategies, plotdir):
+def latency_vs_alpha_figure(topology, cache_size, alpha_range, strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s C=%s' % (topology, cache_size)
     desc['xlabel'] = u'Content distribution \u03b1'
@@ -199,11 +200,11 @@ def plot_latency_vs_alpha(resultset, topology, cache_size, alpha_range, strategi
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@C=%s.pdf'
-               % (topology, cache_size), plotdir)
+    filename = 'LATENCY_T=%s@C=%s.pdf' % (topology, cache_size)
+    return plot_lines, desc, filename
 
 
-def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, strategies, plotdir):
+def latency_vs_cache_size_figure(topology, alpha, cache_size_range, strategies):
     desc = {}
     desc['title'] = 'Latency: T=%s A=%s' % (topology, alpha)
     desc['xlabel'] = 'Cache to population ratio'
@@ -222,11 +223,11 @@ def plot_latency_vs_cache_size(resultset, topology, alpha, cache_size_range, str
     desc['line_style'] = STRATEGY_STYLE
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_lines(resultset, desc, 'LATENCY_T=%s@A=%s.pdf'
-               % (topology, alpha), plotdir)
+    filename = 'LATENCY_T=%s@A=%s.pdf' % (topology, alpha)
+    return plot_lines, desc, filename
 
 
-def plot_cache_hits_vs_topology(resultset, alpha, cache_size, topology_range, strategies, plotdir):
+def cache_hits_vs_topology_figure(alpha, cache_size, topology_range, strategies):
     """
     Plot bar graphs of cache hit ratio for specific values of alpha and cache
     size for various topologies.
@@ -252,11 +253,11 @@ def plot_cache_hits_vs_topology(resultset, alpha, cache_size, topology_range, st
     desc['bar_hatch'] = STRATEGY_BAR_HATCH
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_bar_chart(resultset, desc, 'CACHE_HIT_RATIO_A=%s_C=%s.pdf'
-                   % (alpha, cache_size), plotdir)
+    filename = 'CACHE_HIT_RATIO_A=%s_C=%s.pdf' % (alpha, cache_size)
+    return plot_bar_chart, desc, filename
 
 
-def plot_link_load_vs_topology(resultset, alpha, cache_size, topology_range, strategies, plotdir):
+def link_load_vs_topology_figure(alpha, cache_size, topology_range, strategies):
     """
     Plot bar graphs of link load for specific values of alpha and cache
     size for various topologies.
@@ -280,8 +281,8 @@ def plot_link_load_vs_topology(resultset, alpha, cache_size, topology_range, str
     desc['bar_hatch'] = STRATEGY_BAR_HATCH
     desc['legend'] = STRATEGY_LEGEND
     desc['plotempty'] = PLOT_EMPTY_GRAPHS
-    plot_bar_chart(resultset, desc, 'LINK_LOAD_INTERNAL_A=%s_C=%s.pdf'
-                   % (alpha, cache_size), plotdir)
+    filename = 'LINK_LOAD_INTERNAL_A=%s_C=%s.pdf' % (alpha, cache_size)
+    return plot_bar_chart, desc, filename
 
 
 def run(config, results, plotdir):
@@ -299,7 +300,8 @@ def run(config, results, plotdir):
     settings = Settings()
     settings.read_from(config)
     config_logging(settings.LOG_LEVEL)
-    resultset = RESULTS_READER[settings.RESULTS_FORMAT](results)
+    # Index the resultset once, rather than filtering it for each graph
+    resultset = ResultIndex(RESULTS_READER[settings.RESULTS_FORMAT](results))
     # Create dir if not existsing
     if not os.path.exists(plotdir):
         os.makedirs(plotdir)
@@ -308,29 +310,32 @@ def run(config, results, plotdir):
     cache_sizes = settings.NETWORK_CACHE
     alphas = settings.ALPHA
     strategies = settings.STRATEGIES
-    # Plot graphs
+    # Collect the graphs to plot, which are then rendered in parallel
+    figures = []
     for topology in topologies:
         for cache_size in cache_sizes:
             logger.info('Plotting cache hit ratio for topology %s and cache size %s vs alpha' % (topology, str(cache_size)))
-            plot_cache_hits_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            figures.append(cache_hits_vs_alpha_figure(topology, cache_size, alphas, strategies))
             logger.info('Plotting link load for topology %s vs cache size %s' % (topology, str(cache_size)))
-            plot_link_load_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            figures.append(link_load_vs_alpha_figure(topology, cache_size, alphas, strategies))
             logger.info('Plotting latency for topology %s vs cache size %s' % (topology, str(cache_size)))
-            plot_latency_vs_alpha(resultset, topology, cache_size, alphas, strategies, plotdir)
+            figures.append(latency_vs_alpha_figure(topology, cache_size, alphas, strategies))
     for topology in topologies:
         for alpha in alphas:
             logger.info('Plotting cache hit ratio for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_cache_hits_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(cache_hits_vs_cache_size_figure(topology, alpha, cache_sizes,
+                                                           strategies))
             logger.info('Plotting link load for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_link_load_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(link_load_vs_cache_size_figure(topology, alpha, cache_sizes, strategies))
             logger.info('Plotting latency for topology %s and alpha %s vs cache size' % (topology, str(alpha)))
-            plot_latency_vs_cache_size(resultset, topology, alpha, cache_sizes, strategies, plotdir)
+            figures.append(latency_vs_cache_size_figure(topology, alpha, cache_sizes, strategies))
     for cache_size in cache_sizes:
         for alpha in alphas:
             logger.info('Plotting cache hit ratio for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            plot_cache_hits_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            figures.append(cache_hits_vs_topology_figure(alpha, cache_size, topologies, strategies))
             logger.info('Plotting link load for cache size %s vs alpha %s against topologies' % (str(cache_size), str(alpha)))
-            plot_link_load_vs_topology(resultset, alpha, cache_size, topologies, strategies, plotdir)
+            figures.append(link_load_vs_topology_figure(alpha, cache_size, topologies, strategies))
+    plot_figures(resultset, figures, plotdir)
     logger.info('Exit. Plots were saved in directory %s' % os.path.abspath(plotdir))
 
 
@@ -1,10 +1,10 @@
 from __future__ import absolute_import
 
+import importlib
 import sys
 if sys.version_info[:2] < (2, 7):
     m = "Python version 2.7 or later is required for Icarus (%d.%d detected)."
     raise ImportError(m % sys.version_info[:2])
-del sys
 
 
 # Import release information
@@ -15,31 +15,35 @@ __version__ = release.version
 __license__ = release.license_short
 
 
-# List of all modules (even outside Icarus) that contain classes or function
-# needed to be registered with the registry (via a register decorator)
-# This code ensures that the modules are imported and hence the decorators are
-# executed and the classes/functions registered.
-__modules_to_register = [
-     'icarus.models.cache',
-     'icarus.models.strategy',
-     'icarus.execution.collectors',
-     'icarus.results.readwrite',
-     'icarus.scenarios.topology',
-     'icarus.scenarios.contentplacement',
-     'icarus.scenarios.cacheplacement',
-     'icarus.scenarios.workload',
-                         ]
-
-for m in __modules_to_register:
-    # This try/catch is needed to support reload(icarus)
-    try:
-        exec('import %s' % m)
-        exec('del %s' % m)
-    except AttributeError:
-        pass
-del m
-
-# Imports
-from .models import *
-from .tools import *
-from .runner import run
+# Make the registry available as an attribute of this package. Registries are
+# lazy and import the modules registering components when first read, see
+# icarus.registry
+from icarus import registry  # noqa
+
+# Subpackages whose public names are exported by this package
+__exported_packages = ['icarus.models', 'icarus.tools']
+
+if sys.version_info[:2] < (3, 7):
+    # Module-level __getattr__ is not supported, import everything eagerly
+    from .models import *
+    from .tools import *
+    from .runner import run
+else:
+    def __getattr__(name):
+        """Import subpackages and exported names lazily on first access, so
+        that importing icarus does not require importing all its dependencies
+        """
+        if name == 'run':
+            return importlib.import_module('icarus.runner').run
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return importlib.import_module('icarus.' + name)
+        except ModuleNotFoundError as e:
+            if e.name != 'icarus.' + name:
+                raise
+        for package in __exported_packages:
+            module = importlib.import_module(package)
+            if hasattr(module, name):
+                return getattr(module, name)
+        raise AttributeError("module 'icarus' has no attribute '%s'" % name)
@@ -0,0 +1,9 @@
+"""Benchmarks measuring the performance of Icarus components and of reference
+experiments.
+
+Benchmarks are registered in the `BENCHMARK` registry and can be run with the
+`icarus bench` command, which writes their results to a JSON file and compares
+them against the results of a previous run, so that performance regressions
+are detected.
+"""
+from .core import *
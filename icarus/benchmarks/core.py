@@ -0,0 +1,171 @@
+"""Functions for running benchmarks and comparing their results.
+
+A benchmark is a function registered in the `BENCHMARK` registry which takes a
+*quick* argument and returns an iterable of cases. Each case is a
+(name, n_ops, setup) 3-tuple, where *setup* is a function preparing the case
+and returning a function without arguments performing *n_ops* operations.
+Only the execution of the function returned by *setup* is timed.
+"""
+from __future__ import division
+import collections
+import datetime
+import fnmatch
+import gc
+import json
+import logging
+import multiprocessing as mp
+import platform
+import timeit
+
+import numpy as np
+
+from icarus.registry import BENCHMARK
+from icarus.release import version
+
+__all__ = [
+    'machine_info',
+    'run_benchmarks',
+    'compare_benchmarks',
+    'write_benchmarks',
+    'read_benchmarks',
+]
+
+
+logger = logging.getLogger('benchmarks')
+
+
+def machine_info():
+    """Return a description of the machine and software running benchmarks
+
+    Returns
+    -------
+    info : dict
+        Description of machine and software
+    """
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': mp.cpu_count(),
+        'python': '%s %s' % (platform.python_implementation(),
+                             platform.python_version()),
+        'numpy': np.__version__,
+        'icarus': version,
+        'date': datetime.datetime.now().isoformat(),
+    }
+
+
+def run_benchmarks(patterns=None, quick=False, repeat=3):
+    """Run benchmarks
+
+    Parameters
+    ----------
+    patterns : list of str, optional
+        Shell-style patterns selecting the cases to run, matched against
+        their BENCHMARK/CASE name, e.g. CACHE_POLICY/LRU*. If not specified,
+        all cases are run
+    quick : bool, optional
+        If True, run smaller cases, e.g. for smoke tests
+    repeat : int, optional
+        The number of times each case is run. The fastest run is reported
+
+    Returns
+    -------
+    results : dict
+        Results keyed by BENCHMARK/CASE name. Each result is a dictionary
+        storing the number of operations (n_ops), the time of the fastest run
+        in seconds (seconds) and the number of operations per second
+        (ops_per_sec)
+    """
+    clock = timeit.default_timer
+    results = collections.OrderedDict()
+    for name in sorted(BENCHMARK):
+        for case, n_ops, setup in BENCHMARK[name](quick=quick):
+            key = '%s/%s' % (name, case)
+            if patterns and not any(fnmatch.fnmatchcase(key, p) for p in patterns):
+                continue
+            times = []
+            try:
+                for _ in range(repeat):
+                    func = setup()
+                    gc.collect()
+                    start = clock()
+                    func()
+                    times.append(clock() - start)
+            except Exception as e:
+                logger.warning('Benchmark %s failed | %s: %s', key,
+                               type(e).__name__, e)
+                continue
+            seconds = min(times)
+            results[key] = {
+                'n_ops': n_ops,
+                'seconds': seconds,
+                'ops_per_sec': n_ops / seconds if seconds > 0 else None,
+            }
+            logger.info('Benchmark %s | %.4f s | %.0f ops/s', key, seconds,
+                        results[key]['ops_per_sec'] or 0)
+    return results
+
+
+def compare_benchmarks(results, baseline):
+    """Compare benchmark results against a baseline
+
+    Parameters
+    ----------
+    results : dict
+        The benchmark results, as returned by `run_benchmarks`
+    baseline : dict
+        The baseline benchmark results
+
+    Returns
+    -------
+    changes : dict
+        The relative change of the time taken by each case run in both
+        results and baseline, keyed by case. A positive change means that the
+        case is slower than in the baseline
+    """
+    changes = collections.OrderedDict()
+    for key, result in results.items():
+        if key not in baseline or baseline[key]['seconds'] <= 0:
+            continue
+        changes[key] = result['seconds'] / baseline[key]['seconds'] - 1
+    return changes
+
+
+def write_benchmarks(results, path, quick=False):
+    """Write benchmark results and the description of the machine running
+    them to a JSON file
+
+    Parameters
+    ----------
+    results : dict
+        The benchmark results, as returned by `run_benchmarks`
+    path : str
+        The path of the file
+    quick : bool, optional
+        Whether benchmarks were run in quick mode
+    """
+    with open(path, 'w') as f:
+        json.dump({'machine': machine_info(), 'quick': quick,
+                   'benchmarks': results}, f, indent=4)
+
+
+def read_benchmarks(path):
+    """Read benchmark results from a JSON file written by `write_benchmarks`
+
+    Parameters
+    ----------
+    path : str
+        The path of the file
+
+    Returns
+    -------
+    results : dict
+        The benchmark results
+    machine : dict
+        The description of the machine which ran the benchmarks
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return data['benchmarks'], data['machine']
@@ -0,0 +1,186 @@
+"""Microbenchmarks of the components on the critical path of simulations.
+"""
+import functools
+import inspect
+
+import numpy as np
+
+from icarus.registry import register_benchmark, CACHE_POLICY, DATA_COLLECTOR, \
+                            TOPOLOGY_FACTORY, WORKLOAD, CACHE_PLACEMENT, \
+                            CONTENT_PLACEMENT
+from icarus.models import LinkedSet
+from icarus.tools import TruncatedZipfDist
+from icarus.execution import NetworkModel, NetworkView, CollectorProxy, \
+                             exec_experiment
+
+__all__ = [
+    'cache_policy_benchmark',
+    'linked_set_benchmark',
+    'zipf_benchmark',
+    'collector_proxy_benchmark',
+    'packet_level_benchmark',
+]
+
+
+# Seed of random draws of benchmarks, so that all runs perform the same
+# operations
+SEED = 0
+
+
+def _zipf_trace(alpha, n_contents, n_requests):
+    """Return a trace of requests for contents with Zipf-distributed
+    popularity"""
+    cdf = TruncatedZipfDist(alpha, n_contents).cdf
+    rand = np.random.RandomState(SEED).random_sample(n_requests)
+    return (np.searchsorted(cdf, rand) + 1).tolist()
+
+
+def _is_cache_policy(cls):
+    """Return True if a registered cache policy is a single cache rather than
+    a system of caches built from other caches"""
+    params = list(inspect.signature(cls).parameters)
+    return len(params) > 0 and params[0] == 'maxlen'
+
+
+def _cache_policy_case(name, size, trace):
+    kwargs = {'trace': trace} if name == 'MIN' else {}
+    cache = CACHE_POLICY[name](size, **kwargs)
+
+    def run():
+        get = cache.get
+        put = cache.put
+        for content in trace:
+            if not get(content):
+                put(content)
+    return run
+
+
+@register_benchmark('CACHE_POLICY')
+def cache_policy_benchmark(quick=False):
+    """Lookups of Zipf-distributed requests in caches of all registered cache
+    policies, inserting contents on cache misses"""
+    sizes = [100] if quick else [100, 1000, 10000]
+    alphas = [0.8] if quick else [0.6, 0.8, 1.0]
+    n_requests = 2000 if quick else 100000
+    names = sorted(name for name in CACHE_POLICY
+                   if _is_cache_policy(CACHE_POLICY[name]))
+    for size in sizes:
+        for alpha in alphas:
+            trace = _zipf_trace(alpha, 10 * size, n_requests)
+            for name in names:
+                yield ('%s/size=%d,alpha=%s' % (name, size, alpha), n_requests,
+                       functools.partial(_cache_policy_case, name, size, trace))
+
+
+def _linked_set_case(op, size):
+    keys = np.random.RandomState(SEED).permutation(size).tolist()
+    if op == 'append_top':
+        def run():
+            s = LinkedSet()
+            for k in keys:
+                s.append_top(k)
+        return run
+    s = LinkedSet(range(size))
+    if op == 'move_to_top':
+        def run():
+            for k in keys:
+                s.move_to_top(k)
+    elif op == 'pop_bottom':
+        def run():
+            for _ in keys:
+                s.pop_bottom()
+    elif op == 'remove':
+        def run():
+            for k in keys:
+                s.remove(k)
+    else:
+        raise ValueError('Unknown operation %s' % op)
+    return run
+
+
+@register_benchmark('LINKED_SET')
+def linked_set_benchmark(quick=False):
+    """Operations on a LinkedSet, each performed once on all its items"""
+    sizes = [1000] if quick else [1000, 100000]
+    for size in sizes:
+        for op in ('append_top', 'move_to_top', 'pop_bottom', 'remove'):
+            yield ('%s/size=%d' % (op, size), size,
+                   functools.partial(_linked_set_case, op, size))
+
+
+def _zipf_case(alpha, n_contents, n_samples):
+    dist = TruncatedZipfDist(alpha, n_contents, seed=SEED)
+
+    def run():
+        rv = dist.rv
+        for _ in range(n_samples):
+            rv()
+    return run
+
+
+@register_benchmark('ZIPF')
+def zipf_benchmark(quick=False):
+    """Sampling of a TruncatedZipfDist one value at a time, as done by
+    workloads"""
+    n_contents = [1000] if quick else [1000, 1000000]
+    n_samples = 2000 if quick else 100000
+    for n in n_contents:
+        yield ('rv/n=%d' % n, n_samples,
+               functools.partial(_zipf_case, 0.8, n, n_samples))
+
+
+def _collector_proxy_case(collector_names, n_sessions):
+    topology = TOPOLOGY_FACTORY['PATH'](n=5)
+    receiver = next(iter(topology.receivers()))
+    source = next(iter(topology.sources()))
+    CONTENT_PLACEMENT['UNIFORM'](topology, range(1, 101))
+    view = NetworkView(NetworkModel(topology, {'name': 'LRU'}))
+    path = view.shortest_path(receiver, source)
+    up = list(zip(path[:-1], path[1:]))
+    down = [(v, u) for u, v in reversed(up)]
+    proxy = CollectorProxy(view, [DATA_COLLECTOR[name](view)
+                                  for name in collector_names])
+
+    def run():
+        for i in range(n_sessions):
+            proxy.start_session(float(i), receiver, 1 + i % 100)
+            for u, v in up:
+                proxy.request_hop(u, v)
+                proxy.cache_miss(v)
+            proxy.server_hit(source)
+            for u, v in down:
+                proxy.content_hop(u, v)
+            proxy.end_session()
+    return run
+
+
+@register_benchmark('COLLECTOR_PROXY')
+def collector_proxy_benchmark(quick=False):
+    """Dispatch of the events of complete request-response sessions from a
+    CollectorProxy to data collectors"""
+    n_sessions = 1000 if quick else 50000
+    collectors = ['CACHE_HIT_RATIO', 'LATENCY', 'LINK_LOAD']
+    yield ('collectors=%d' % len(collectors), n_sessions,
+           functools.partial(_collector_proxy_case, collectors, n_sessions))
+
+
+def _packet_level_case(workload_name, n_requests):
+    topology = TOPOLOGY_FACTORY['PATH'](n=5)
+    workload = WORKLOAD[workload_name](topology, n_contents=1000, alpha=0.8,
+                                       n_warmup=0, n_measured=n_requests,
+                                       seed=SEED)
+    CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=50)
+    CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents)
+    return functools.partial(exec_experiment, topology, workload, {},
+                             {'name': 'LCE_PKT_LEVEL'}, {'name': 'LRU'},
+                             {'LATENCY': {}})
+
+
+@register_benchmark('PACKET_LEVEL')
+def packet_level_benchmark(quick=False):
+    """Packet-level event loop, processing requests issued on a PATH
+    topology with the LCE_PKT_LEVEL strategy"""
+    n_requests = 1000 if quick else 20000
+    yield ('LCE_PKT_LEVEL', n_requests,
+           functools.partial(_packet_level_case, 'STATIONARY_PACKET_LEVEL',
+                             n_requests))
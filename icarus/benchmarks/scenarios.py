@@ -0,0 +1,55 @@
+"""End-to-end benchmarks running reference experiments.
+
+Each case runs a complete experiment with `run_scenario`, including building
+its topology and workload, and the reported number of operations is the
+number of requests of the experiment.
+"""
+import functools
+
+from icarus.registry import register_benchmark
+from icarus.orchestration import run_scenario
+from icarus.util import Settings, Tree
+
+__all__ = ['scenario_benchmark']
+
+
+def _scenario_case(params, collectors):
+    settings = Settings()
+    settings.DATA_COLLECTORS = collectors
+
+    def run():
+        if run_scenario(settings, params, 1, 1) is None:
+            raise RuntimeError('Experiment failed')
+    return run
+
+
+def _experiment(topology, workload, strategy, n_requests):
+    params = Tree()
+    params['topology'] = topology
+    params['workload'] = {'name': workload, 'n_contents': 10000, 'alpha': 0.8,
+                          'rate': 1.0, 'n_warmup': n_requests // 4,
+                          'n_measured': n_requests - n_requests // 4,
+                          'seed': 0}
+    params['cache_placement'] = {'name': 'UNIFORM', 'network_cache': 0.01}
+    params['content_placement'] = {'name': 'UNIFORM'}
+    params['cache_policy'] = {'name': 'LRU'}
+    params['strategy'] = {'name': strategy}
+    params['netconf'] = {}
+    return params
+
+
+@register_benchmark('SCENARIO')
+def scenario_benchmark(quick=False):
+    """Reference experiments: request-level simulation on GEANT and
+    packet-level simulation with cache delay on a PATH topology"""
+    n_requests = 2000 if quick else 100000
+    params = _experiment({'name': 'GEANT'}, 'STATIONARY', 'LCE', n_requests)
+    yield ('GEANT/STATIONARY/LCE', n_requests,
+           functools.partial(_scenario_case, params,
+                             ['CACHE_HIT_RATIO', 'LATENCY', 'LINK_LOAD']))
+    params = _experiment({'name': 'PATH', 'n': 5},
+                         'STATIONARY_PACKET_LEVEL_CACHE_DELAY',
+                         'LCE_PKT_LEVEL', n_requests)
+    yield ('PATH/STATIONARY_PACKET_LEVEL_CACHE_DELAY/LCE_PKT_LEVEL', n_requests,
+           functools.partial(_scenario_case, params,
+                             ['CACHE_HIT_RATIO', 'LATENCY']))
@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from icarus.benchmarks import run_benchmarks, compare_benchmarks, \
+    write_benchmarks, read_benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_run_patterns(self):
+        results = run_benchmarks(['LINKED_SET/*', 'CACHE_POLICY/LRU/*'],
+                                 quick=True, repeat=1)
+        self.assertIn('LINKED_SET/append_top/size=1000', results)
+        self.assertIn('CACHE_POLICY/LRU/size=100,alpha=0.8', results)
+        self.assertTrue(all(k.startswith('LINKED_SET/') or
+                            k.startswith('CACHE_POLICY/LRU/') for k in results))
+        for result in results.values():
+            self.assertGreater(result['n_ops'], 0)
+            self.assertGreater(result['seconds'], 0)
+
+    def test_compare(self):
+        baseline = {'A': {'seconds': 2.0}, 'B': {'seconds': 1.0}}
+        results = {'A': {'seconds': 3.0}, 'C': {'seconds': 1.0}}
+        self.assertEqual({'A': 0.5}, compare_benchmarks(results, baseline))
+
+    def test_write_read(self):
+        path = os.path.join(self.dir, 'bench.json')
+        results = {'A': {'n_ops': 10, 'seconds': 2.0, 'ops_per_sec': 5.0}}
+        write_benchmarks(results, path)
+        read_results, machine = read_benchmarks(path)
+        self.assertEqual(results, read_results)
+        self.assertIn('python', machine)
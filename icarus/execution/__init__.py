@@ -2,4 +2,10 @@
 """
 from .network import *
 from .collectors import *
+from .steadystate import *
+from .snapshot import *
 from .engine import *
+from .partition import *
+from .pdes import *
+from .analytical import *
+from .memory import *
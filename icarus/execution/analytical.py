@@ -0,0 +1,503 @@
+"""Analytical estimation of the performance of experiments.
+
+This module estimates the results of an experiment without simulating it,
+modelling each cache with the Che approximation (see `icarus.tools.cacheperf`).
+Estimates are computed in a fraction of a second, so that they can be used to
+check configurations or prune the parameters of large sweeps of experiments
+before simulating them.
+
+Each cache receives the stream of requests for the contents that missed the
+caches preceding it on the shortest path from a receiver to the source of the
+content. Miss streams are assumed to be independent Poisson processes, whose
+rates are computed from the hit probabilities of downstream caches. As the
+hit probability of each content at each cache depends on the rates of its
+miss streams, hit probabilities are computed by fixed-point iteration, each
+iteration updating the caches one at a time from the latest hit probabilities
+of the others, which converges in at most as many iterations as the number of
+caches on the longest path under LCE. Under LCD, each content is inserted in a
+cache on a miss only if the next cache upstream has it, so that each cache is
+modelled as a q-LRU cache whose insertion probability is the hit probability
+of the upstream cache, and iterations are damped, more strongly whenever they
+stop converging. Latency and link load are then derived from the probability
+of each request being served by each node and from the delays of the paths
+used by the strategy.
+
+The results are returned in the same format as those of the data collectors,
+so that they can be stored and plotted as the results of simulations.
+"""
+from __future__ import division
+
+import collections
+import logging
+import timeit
+
+import numpy as np
+
+from icarus.execution.network import NetworkModel, NetworkView
+from icarus.tools.cacheperf import che_p_in_func
+from icarus.util import Tree, path_links
+
+__all__ = [
+    'ANALYTICAL_STRATEGIES',
+    'exec_analytical_experiment',
+]
+
+
+logger = logging.getLogger('analytical')
+
+
+# Strategies whose performance can be estimated analytically, with the routing
+# of the contents fetched from sources by hash-routing strategies
+ANALYTICAL_STRATEGIES = frozenset([
+    'LCE',
+    'LCD',
+    'EDGE',
+    'HASHROUTING',
+    'HR_SYMM',
+    'HR_ASYMM',
+    'HR_MULTICAST',
+])
+
+# Policies of the Che approximation modelling each cache policy
+_CHE_POLICIES = {
+    'LRU': 'LRU',
+    'FIFO': 'FIFO',
+    'RAND': 'RANDOM',
+}
+
+# Routing of the contents of hash-routing strategies
+_HASHROUTING = {
+    'HR_SYMM': 'SYMM',
+    'HR_ASYMM': 'ASYMM',
+    'HR_MULTICAST': 'MULTICAST',
+}
+
+# Relative tolerance of the characteristic times of caches
+_RTOL = 1e-10
+
+# Number of fixed-point iterations without decrease of the largest change of
+# hit probabilities after which updates are damped more strongly, and minimum
+# fraction of the change applied by updates
+_MAX_STALLED_ITER = 10
+_MIN_RELAXATION = 1 / 16
+
+
+def _hit_probabilities(rates, cache_size, policy, insert_prob=None):
+    """Return the hit probability of each content in a cache, given the rate
+    of requests for each content.
+
+    If *insert_prob* is specified, each content is inserted in the cache on a
+    miss with the given probability, so that an LRU cache is modelled as a
+    q-LRU cache with a value of q per content, as proposed by Martina et al.
+    for LCD.
+    """
+    from scipy.optimize import brentq
+    if insert_prob is None:
+        p_in = che_p_in_func(rates, policy)
+        insert_prob = 1
+    else:
+        def p_in(p, t):
+            e = np.exp(-p * t)
+            hit = insert_prob * (1 - e)
+            return np.divide(hit, e + hit, out=np.zeros(len(p)),
+                             where=hit > 0)
+    # Contents inserted in the cache, which all fit in it if not too many
+    inserted = rates * insert_prob > 0
+    if np.count_nonzero(inserted) <= cache_size:
+        return inserted.astype(float)
+
+    def func_t(t):
+        return np.sum(p_in(rates, t)) - cache_size
+
+    # The hit probability of each content is not greater than its rate times
+    # the characteristic time, so the root is not lower than lo
+    lo = cache_size / np.sum(rates)
+    hi = 2 * lo
+    while func_t(hi) < 0:
+        lo, hi = hi, 2 * hi
+    return p_in(rates, brentq(func_t, lo, hi, rtol=_RTOL))
+
+
+class _Estimate(object):
+    """Accumulator of the expected measurements of the requests served by
+    each node along given paths"""
+
+    def __init__(self, view):
+        self.view = view
+        self.cache_hits = collections.defaultdict(float)
+        self.server_hits = collections.defaultdict(float)
+        self.latency = 0.0
+        self.req_count = collections.defaultdict(float)
+        self.cont_count = collections.defaultdict(float)
+
+    def path_delay(self, path):
+        """Return the sum of the delays of the links of a path"""
+        return sum(self.view.link_delay(u, v) for u, v in path_links(path))
+
+    def add(self, prob, serving_node, request_path, content_path,
+            off_path=()):
+        """Add the requests served by a node with a given probability
+
+        Parameters
+        ----------
+        prob : float
+            The probability of a request being served by the node
+        serving_node : any hashable type
+            The node serving the requests
+        request_path : list
+            The path of the requests
+        content_path : list
+            The path of the contents delivered to receivers
+        off_path : list, optional
+            The paths of copies of the contents not delivered to receivers
+        """
+        if prob <= 0:
+            return
+        if self.view.has_cache(serving_node):
+            self.cache_hits[serving_node] += prob
+        else:
+            self.server_hits[serving_node] += prob
+        self.latency += prob * (self.path_delay(request_path) +
+                                self.path_delay(content_path))
+        for link in path_links(request_path):
+            self.req_count[link] += prob
+        for path in (content_path,) + tuple(off_path):
+            for link in path_links(path):
+                self.cont_count[link] += prob
+
+    def results(self, collectors, rate):
+        """Return the results of the data collectors
+
+        Parameters
+        ----------
+        collectors : dict
+            The collectors definition
+        rate : float
+            The rate of requests per second
+
+        Returns
+        -------
+        results : Tree
+            The estimated results of each collector
+        """
+        results = Tree()
+        if 'CACHE_HIT_RATIO' in collectors:
+            hit_ratio = Tree({'MEAN': sum(self.cache_hits.values())})
+            if collectors['CACHE_HIT_RATIO'].get('per_node', True):
+                hit_ratio['PER_NODE_CACHE_HIT_RATIO'] = dict(self.cache_hits)
+                hit_ratio['PER_NODE_SERVER_HIT_RATIO'] = dict(self.server_hits)
+            results['CACHE_HIT_RATIO'] = hit_ratio
+        if 'LATENCY' in collectors:
+            results['LATENCY'] = Tree({'MEAN': self.latency})
+        if 'LINK_LOAD' in collectors:
+            params = collectors['LINK_LOAD']
+            req_size = params.get('req_size', 150)
+            content_size = params.get('content_size', 1500)
+            links = set(self.req_count).union(self.cont_count)
+            link_loads = {link: rate * (req_size * self.req_count[link] +
+                                        content_size * self.cont_count[link])
+                          for link in links}
+            loads = {'internal': {}, 'external': {}}
+            for link, load in link_loads.items():
+                loads[self.view.link_type(*link)][link] = load
+            results['LINK_LOAD'] = Tree({
+                'MEAN_INTERNAL': _mean(loads['internal']),
+                'MEAN_EXTERNAL': _mean(loads['external']),
+                'PER_LINK_INTERNAL': loads['internal'],
+                'PER_LINK_EXTERNAL': loads['external']})
+        return results
+
+
+def _mean(values):
+    """Return the mean of the values of a dictionary, or 0 if empty"""
+    return sum(values.values()) / len(values) if len(values) > 0 else 0
+
+
+def _on_path_model(view, pdf, receivers, sources, strategy, policy, max_iter,
+                   tol):
+    """Estimate the measurements of on-path strategies
+
+    Returns
+    -------
+    estimate : _Estimate
+        The estimated measurements
+    n_iter : int
+        The number of fixed-point iterations
+    delta : float
+        The maximum change of the hit probability of any content at any cache
+        in the last iteration
+    """
+    cache_size = view.cache_nodes(size=True)
+    lcd = strategy == 'LCD'
+    # Caches looked up by the requests of each receiver for the contents of
+    # each source, in order
+    paths = []
+    # Requests traversing each cache, as tuples of contents requested, rates
+    # of the requests for them, caches looked up before and, under LCD, the
+    # next cache upstream
+    requests = collections.defaultdict(list)
+    for receiver, weight in receivers.items():
+        for source, contents in sources.items():
+            path = view.shortest_path(receiver, source)
+            caches = [v for v in path[1:] if view.has_cache(v)]
+            if strategy == 'EDGE':
+                caches = caches[:1]
+            paths.append((receiver, weight, path, contents, caches))
+            rates = weight * pdf[contents]
+            for i, v in enumerate(caches):
+                upstream = caches[i + 1] \
+                    if lcd and i + 1 < len(caches) else None
+                requests[v].append((contents, rates, caches[:i], upstream))
+    # Hit probabilities are updated in place one cache at a time, which
+    # converges in fewer iterations than updating all caches from the previous
+    # iteration. Under LCD, caches traversed by most requests, on which the
+    # insertions of downstream caches depend, are updated first, while
+    # otherwise caches are updated after all caches downstream of them
+    if lcd:
+        order = sorted(cache_size, key=lambda v: len(requests[v]),
+                       reverse=True)
+    else:
+        order = sorted(cache_size, key=lambda v: max(
+            [len(downstream) for _, _, downstream, _ in requests[v]] or [0]))
+    hit = {v: np.zeros(len(pdf)) for v in cache_size}
+    # Under LCD, the hit probabilities of caches and of their upstream caches
+    # depend on each other and undamped iterations may oscillate. Updates are
+    # then damped, more strongly whenever iterations stop converging
+    relaxation = 0.5 if lcd else 1
+    min_delta = float('inf')
+    n_stalled = 0
+    for n_iter in range(1, max_iter + 1):
+        delta = 0
+        for v in order:
+            rates = np.zeros(len(pdf))
+            # Rates of the requests for which the upstream node has the
+            # content, so that LCD inserts it on a miss
+            insert_rates = np.zeros(len(pdf))
+            for contents, miss_rate, downstream, upstream in requests[v]:
+                for u in downstream:
+                    miss_rate = miss_rate * (1 - hit[u][contents])
+                rates[contents] += miss_rate
+                if upstream is not None:
+                    insert_rates[contents] += miss_rate * hit[upstream][contents]
+                else:
+                    insert_rates[contents] += miss_rate
+            if lcd:
+                q = np.divide(insert_rates, rates, out=np.zeros(len(pdf)),
+                              where=rates > 0)
+                new_hit = _hit_probabilities(rates, cache_size[v], policy, q)
+            else:
+                new_hit = _hit_probabilities(rates, cache_size[v], policy)
+            step = new_hit - hit[v]
+            delta = max(delta, np.max(np.abs(step)))
+            hit[v] = hit[v] + relaxation * step
+        if delta <= tol:
+            break
+        if delta < min_delta:
+            min_delta, n_stalled = delta, 0
+        else:
+            n_stalled += 1
+            if n_stalled == _MAX_STALLED_ITER:
+                relaxation = max(relaxation / 2, _MIN_RELAXATION)
+                min_delta, n_stalled = delta, 0
+    estimate = _Estimate(view)
+    for receiver, weight, path, contents, caches in paths:
+        miss_prob = weight * pdf[contents]
+        for v in caches + [path[-1]]:
+            if v in hit:
+                serve_prob = miss_prob * hit[v][contents]
+                miss_prob = miss_prob - serve_prob
+            else:
+                serve_prob = miss_prob
+            request_path = path[:path.index(v) + 1]
+            content_path = list(reversed(view.shortest_path(receiver, v)))
+            estimate.add(np.sum(serve_prob), v, request_path, content_path)
+    return estimate, n_iter, delta
+
+
+def _hashrouting_model(view, pdf, receivers, sources, routing, policy):
+    """Estimate the measurements of hash-routing strategies
+
+    Returns
+    -------
+    estimate : _Estimate
+        The estimated measurements
+    """
+    cache_size = view.cache_nodes(size=True)
+    cache_nodes = view.cache_nodes()
+    # Contents of each source, keyed by authoritative cache. Contents are
+    # assigned to caches as by BaseHashrouting.authoritative_cache
+    groups = collections.defaultdict(dict)
+    for source, contents in sources.items():
+        authoritative = np.array([hash(int(k) + 1) % len(cache_nodes)
+                                  for k in contents])
+        for i, cache in enumerate(cache_nodes):
+            group = contents[authoritative == i]
+            if len(group) > 0:
+                groups[cache][source] = group
+    estimate = _Estimate(view)
+    for cache, cache_groups in groups.items():
+        rates = np.zeros(len(pdf))
+        insert_prob = np.zeros(len(pdf))
+        for source, contents in cache_groups.items():
+            rates[contents] = pdf[contents]
+            # With asymmetric routing, contents are inserted only if the cache
+            # is on the path from the source to the receiver
+            insert_prob[contents] = sum(
+                weight for receiver, weight in receivers.items()
+                if routing != 'ASYMM' or
+                cache in view.shortest_path(source, receiver))
+        hit = _hit_probabilities(rates, cache_size[cache], policy,
+                                 insert_prob if routing == 'ASYMM' else None)
+        for source, contents in cache_groups.items():
+            hit_prob = np.sum(pdf[contents] * hit[contents])
+            miss_prob = np.sum(pdf[contents]) - hit_prob
+            for receiver, weight in receivers.items():
+                to_cache = view.shortest_path(receiver, cache)
+                from_cache = view.shortest_path(cache, receiver)
+                estimate.add(weight * hit_prob, cache, to_cache, from_cache)
+                request_path = to_cache + view.shortest_path(cache, source)[1:]
+                recv_path = view.shortest_path(source, receiver)
+                off_path = ()
+                if routing == 'SYMM' or cache in recv_path:
+                    content_path = \
+                        view.shortest_path(source, cache) + from_cache[1:]
+                elif routing == 'ASYMM':
+                    content_path = recv_path
+                else:
+                    # Contents are multicast to the cache and the receiver
+                    # from the node where their paths fork
+                    cache_path = view.shortest_path(source, cache)
+                    for i in range(1, min(len(cache_path), len(recv_path))):
+                        if cache_path[i] != recv_path[i]:
+                            fork_node = cache_path[i - 1]
+                            break
+                    else:
+                        fork_node = cache
+                    content_path = \
+                        view.shortest_path(source, fork_node) + \
+                        view.shortest_path(fork_node, receiver)[1:]
+                    off_path = (view.shortest_path(fork_node, cache),)
+                estimate.add(weight * miss_prob, source, request_path,
+                             content_path, off_path)
+    return estimate
+
+
+def exec_analytical_experiment(topology, workload, netconf, strategy,
+                               cache_policy, collectors, runtime=None,
+                               max_iter=200, tol=1e-4):
+    """Estimate the results of an experiment analytically, without simulating
+    it.
+
+    The hit probability of each content at each cache is computed with the Che
+    approximation of its cache policy, applied to the stream of requests
+    missing the caches on the path from each receiver to each source, and the
+    results of data collectors are derived from the probability of each
+    request being served by each node.
+
+    Parameters
+    ----------
+    topology : Topology
+        The FNSS Topology object modelling the network topology on which
+        experiments are run.
+    workload : StationaryWorkload
+        The workload, whose requests must be drawn independently from a Zipf
+        distribution (*zipf* attribute), by *receivers* at a given *rate*
+    netconf : dict
+        Dictionary of attributes to inizialize the network model
+    strategy : tree
+        Strategy definition. The strategy must be among ANALYTICAL_STRATEGIES
+    cache_policy : tree
+        Cache policy definition. Only LRU, FIFO and RAND are supported, and
+        only LRU by the LCD and HR_ASYMM strategies
+    collectors: dict
+        The collectors to be used, keyed by name. Only CACHE_HIT_RATIO,
+        LATENCY and LINK_LOAD are supported
+    runtime : dict, optional
+        If provided, runtime statistics are stored in it, as by
+        `exec_experiment`. MEASURED is the time taken by the model, EVENTS is
+        zero and ITERATIONS is the number of fixed-point iterations
+    max_iter : int, optional
+        The maximum number of fixed-point iterations
+    tol : float, optional
+        The maximum change of the hit probability of any content at any cache
+        between the last two iterations
+
+    Returns
+    -------
+    results : Tree
+        A tree with the estimated results of all collectors. The convergence
+        of the model is reported under the ANALYTICAL key: CONVERGED is
+        whether the change of hit probabilities in the last iteration (DELTA)
+        is within *tol* and ITERATIONS is the number of iterations. A warning
+        is logged if the model did not converge in *max_iter* iterations
+    """
+    name = strategy['name']
+    if name not in ANALYTICAL_STRATEGIES:
+        raise ValueError('The performance of strategy %s cannot be estimated '
+                         'analytically' % name)
+    routing = strategy.get('routing') \
+        if name == 'HASHROUTING' else _HASHROUTING.get(name)
+    if name == 'HASHROUTING' and routing not in _HASHROUTING.values():
+        raise ValueError('Routing %s not supported' % routing)
+    if cache_policy['name'] not in _CHE_POLICIES or \
+            (cache_policy['name'] != 'LRU' and
+             (name == 'LCD' or routing == 'ASYMM')):
+        raise ValueError('The performance of cache policy %s cannot be '
+                         'estimated analytically with strategy %s'
+                         % (cache_policy['name'], name))
+    for collector, params in collectors.items():
+        if collector not in ('CACHE_HIT_RATIO', 'LATENCY', 'LINK_LOAD') or \
+                params.get('off_path_hits') or params.get('content_hits') or \
+                params.get('cdf'):
+            raise ValueError('The results of collector %s with parameters %s '
+                             'cannot be estimated analytically'
+                             % (collector, dict(params)))
+    if not all(hasattr(workload, attr)
+               for attr in ('zipf', 'receivers', 'rate', 'contents')):
+        raise ValueError('Workload %s is not supported by the analytical '
+                         'model' % type(workload).__name__)
+    clock = timeit.default_timer
+    t_start = clock()
+    model = NetworkModel(topology, cache_policy, **netconf)
+    view = NetworkView(model)
+    t_model = clock()
+    # Content k is requested with probability pdf[k - 1]
+    pdf = workload.zipf.pdf
+    if getattr(workload, 'beta', 0) != 0:
+        receivers = dict(zip(workload.receivers, workload.receiver_dist.pdf))
+    else:
+        receivers = {v: 1 / len(workload.receivers)
+                     for v in workload.receivers}
+    sources = collections.defaultdict(list)
+    for k in workload.contents:
+        sources[view.content_source(k)].append(k - 1)
+    sources = {v: np.array(contents) for v, contents in sources.items()}
+    policy = _CHE_POLICIES[cache_policy['name']]
+    if routing is None:
+        estimate, n_iter, delta = _on_path_model(view, pdf, receivers,
+                                                 sources, name, policy,
+                                                 max_iter, tol)
+    else:
+        estimate = _hashrouting_model(view, pdf, receivers, sources, routing,
+                                      policy)
+        n_iter, delta = 1, 0.0
+    converged = bool(delta <= tol)
+    if not converged:
+        logger.warning('Hit probabilities did not converge in %d iterations, '
+                       'their largest change in the last iteration is %g',
+                       n_iter, delta)
+    results = estimate.results(collectors, workload.rate)
+    results['ANALYTICAL'] = Tree({'CONVERGED': converged,
+                                  'ITERATIONS': n_iter,
+                                  'DELTA': float(delta)})
+    t_end = clock()
+    if runtime is not None:
+        runtime['NETWORK_MODEL'] = t_model - t_start
+        runtime['WARMUP'] = 0.0
+        runtime['MEASURED'] = t_end - t_model
+        runtime['EVENTS'] = 0
+        runtime['PEAK_EVENT_QUEUE'] = 0
+        runtime['PEAK_CACHE_QUEUE'] = 0
+        runtime['PEAK_LIVE_FLOWS'] = 0
+        runtime['ITERATIONS'] = n_iter
+    return results
@@ -8,11 +8,15 @@ latency, path stretch and link load.
 
 To create a new data collector, it is sufficient to create a new class
 inheriting from the `DataCollector` class and override all required methods.
+Data collectors whose measurements can be combined, e.g. because they are sums
+or counts, may also implement the `merge` method, which is required to run
+experiments partitioned across processes.
 """
 from __future__ import division
 import collections
+import math
+
 import numpy as np
-from matplotlib import pyplot as plt
 
 from icarus.registry import register_data_collector
 from icarus.tools import cdf
@@ -20,6 +24,7 @@ from icarus.util import Tree, inheritdoc
 
 
 __all__ = [
+    'LATENCY_FOLD_SIZE',
     'DataCollector',
     'CollectorProxy',
     'CacheHitRatioCollector',
@@ -31,6 +36,11 @@ __all__ = [
            ]
 
 
+# Number of session latencies buffered by a latency collector before they are
+# folded into exact partial sums
+LATENCY_FOLD_SIZE = 4096
+
+
 class DataCollector(object):
     """Object collecting notifications about simulation events and measuring
     relevant metrics.
@@ -306,6 +316,19 @@ class DataCollector(object):
         """
         pass
 
+    def merge(self, collector):
+        """Add to the measurements of this collector those of another
+        collector of the same type, with the same parameters, which observed a
+        disjoint set of sessions of the same experiment.
+
+        Parameters
+        ----------
+        collector : DataCollector
+            The collector whose measurements are added
+        """
+        raise NotImplementedError('Collector %s does not support merging'
+                                  % type(self).__name__)
+
 
 # Note: The implementation of CollectorProxy could be improved to avoid having
 # to rewrite almost identical methods, for example by playing with __dict__
@@ -500,6 +523,44 @@ class LinkLoadCollector(DataCollector):
                      'PER_LINK_INTERNAL': link_loads_int,
                      'PER_LINK_EXTERNAL': link_loads_ext})
 
+    @inheritdoc(DataCollector)
+    def merge(self, collector):
+        for link, count in collector.req_count.items():
+            self.req_count[link] += count
+        for link, count in collector.cont_count.items():
+            self.cont_count[link] += count
+        if collector.t_start >= 0:
+            if self.t_start < 0:
+                self.t_start, self.t_end = collector.t_start, collector.t_end
+            else:
+                self.t_start = min(self.t_start, collector.t_start)
+                self.t_end = max(self.t_end, collector.t_end)
+
+
+def _fold_partials(partials, values):
+    """Replace a list of non-overlapping partial sums by partial sums adding up
+    exactly to them and to a list of numbers, without rounding errors.
+
+    Each `math.fsum` pass removes the correctly rounded sum of the remaining
+    numbers, leaving its rounding error, until no error is left. This usually
+    takes two passes.
+
+    Parameters
+    ----------
+    partials : list
+        The partial sums, updated in place
+    values : list
+        The numbers to add, emptied in place
+    """
+    values.extend(partials)
+    del partials[:]
+    total = math.fsum(values)
+    while total:
+        partials.append(total)
+        values.append(-total)
+        total = math.fsum(values)
+    del values[:]
+
 
 @register_data_collector('LATENCY')
 class LatencyCollector(DataCollector):
@@ -521,7 +582,11 @@ class LatencyCollector(DataCollector):
         self.view = view
         self.req_latency = 0.0
         self.sess_count = 0
-        self.latency = 0.0
+        # Session latencies not yet folded into the exact partial sums of the
+        # latencies of previous sessions, so that the mean latency does not
+        # depend on the order in which sessions end
+        self.latency_values = []
+        self.latency_partials = []
         if cdf:
             self.latency_data = collections.deque()
 
@@ -574,7 +639,7 @@ class LatencyCollector(DataCollector):
             return
         if self.cdf:
             self.latency_data.append(self.sess_latency)
-        self.latency += self.sess_latency
+        self._add_latency(self.sess_latency)
     
     @inheritdoc(DataCollector)
     def end_flow_session(self, flow, success=True):
@@ -582,18 +647,33 @@ class LatencyCollector(DataCollector):
             return
         if self.cdf:
             self.latency_data.append(self.sess_latency_flow[flow])
-        self.latency += self.sess_latency_flow[flow]
+        self._add_latency(self.sess_latency_flow[flow])
         del self.sess_latency_flow[flow]
 
     @inheritdoc(DataCollector)
     def end_flow_session_cache_delay(self, flow, success=True):
         if not success:
             return
+        latency = self.sess_latency_flow[flow] + self.cache_delay_penalty_flow[flow]
         if self.cdf:
-            self.latency_data.append(self.sess_latency_flow[flow] + self.cache_delay_penalty_flow[flow])
-        self.latency += (self.sess_latency_flow[flow] + self.cache_delay_penalty_flow[flow])
+            self.latency_data.append(latency)
+        self._add_latency(latency)
         del self.sess_latency_flow[flow], self.cache_delay_penalty_flow[flow]
 
+    def _add_latency(self, latency):
+        """Add the latency of a session to the sum of session latencies"""
+        values = self.latency_values
+        values.append(latency)
+        if len(values) >= LATENCY_FOLD_SIZE:
+            _fold_partials(self.latency_partials, values)
+
+    @property
+    def latency(self):
+        """The sum of the latencies of all successful sessions, correctly
+        rounded
+        """
+        return math.fsum(self.latency_partials + self.latency_values)
+
     @inheritdoc(DataCollector)
     def results(self):
         results = Tree({'MEAN': self.latency / self.sess_count})
@@ -601,6 +681,15 @@ class LatencyCollector(DataCollector):
             results['CDF'] = cdf(self.latency_data)
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, collector):
+        self.sess_count += collector.sess_count
+        self.latency_values.extend(collector.latency_partials)
+        self.latency_values.extend(collector.latency_values)
+        _fold_partials(self.latency_partials, self.latency_values)
+        if self.cdf:
+            self.latency_data.extend(collector.latency_data)
+
 
 @register_data_collector('CACHE_HIT_RATIO')
 class CacheHitRatioCollector(DataCollector):
@@ -636,10 +725,13 @@ class CacheHitRatioCollector(DataCollector):
             self.per_node_cache_hits = collections.defaultdict(int)
             self.per_node_server_hits = collections.defaultdict(int)
         if content_hits:
+            # Hits are counted in lists indexed by the position of each
+            # content in self.contents, so that results are returned as arrays
             self.curr_cont = None
-            self.cont_cache_hits = collections.defaultdict(int)
-            self.cont_serv_hits = collections.defaultdict(int)
-            
+            self.contents = []
+            self.cont_index = {}
+            self.cont_cache_hits = []
+            self.cont_serv_hits = []
             self.curr_cont_flow = {}
 
     @inheritdoc(DataCollector)
@@ -649,7 +741,7 @@ class CacheHitRatioCollector(DataCollector):
             source = self.view.content_source(content)
             self.curr_path = self.view.shortest_path(receiver, source)
         if self.cont_hits:
-            self.curr_cont = content
+            self.curr_cont = self._content_index(content)
     
     @inheritdoc(DataCollector)
     def start_flow_session(self, timestamp, receiver, content, flow):
@@ -658,7 +750,18 @@ class CacheHitRatioCollector(DataCollector):
             source = self.view.content_source(content)
             self.curr_path_flow[flow] = self.view.shortest_path(receiver, source)
         if self.cont_hits:
-            self.curr_cont_flow[flow] = content
+            self.curr_cont_flow[flow] = self._content_index(content)
+
+    def _content_index(self, content):
+        """Return the index of a content in the lists of per-content hits,
+        adding it if not there"""
+        i = self.cont_index.get(content)
+        if i is None:
+            i = self.cont_index[content] = len(self.contents)
+            self.contents.append(content)
+            self.cont_cache_hits.append(0)
+            self.cont_serv_hits.append(0)
+        return i
 
     @inheritdoc(DataCollector)
     def cache_hit(self, node):
@@ -712,22 +815,37 @@ class CacheHitRatioCollector(DataCollector):
             results['MEAN_OFF_PATH'] = self.off_path_hit_count / n_sess
             results['MEAN_ON_PATH'] = results['MEAN'] - results['MEAN_OFF_PATH']
         if self.cont_hits:
-            cont_set = set(list(self.cont_cache_hits.keys()) + list(self.cont_serv_hits.keys()))
-            cont_hits = {i: (
-                                self.cont_cache_hits[i] /
-                                (self.cont_cache_hits[i] + self.cont_serv_hits[i])
-                            )
-                         for i in cont_set}
-            results['PER_CONTENT'] = cont_hits
+            # Only contents with at least one hit
+            results['PER_CONTENT'] = {
+                content: cache_hits / (cache_hits + serv_hits)
+                for content, cache_hits, serv_hits
+                in zip(self.contents, self.cont_cache_hits, self.cont_serv_hits)
+                if cache_hits + serv_hits > 0}
         if self.per_node:
-            for v in self.per_node_cache_hits:
-                self.per_node_cache_hits[v] /= n_sess
-            for v in self.per_node_server_hits:
-                self.per_node_server_hits[v] /= n_sess
-            results['PER_NODE_CACHE_HIT_RATIO'] = self.per_node_cache_hits
-            results['PER_NODE_SERVER_HIT_RATIO'] = self.per_node_server_hits
+            results['PER_NODE_CACHE_HIT_RATIO'] = {
+                v: hits / n_sess for v, hits in self.per_node_cache_hits.items()}
+            results['PER_NODE_SERVER_HIT_RATIO'] = {
+                v: hits / n_sess for v, hits in self.per_node_server_hits.items()}
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, collector):
+        self.sess_count += collector.sess_count
+        self.cache_hits += collector.cache_hits
+        self.serv_hits += collector.serv_hits
+        if self.off_path_hits:
+            self.off_path_hit_count += collector.off_path_hit_count
+        if self.per_node:
+            for v, hits in collector.per_node_cache_hits.items():
+                self.per_node_cache_hits[v] += hits
+            for v, hits in collector.per_node_server_hits.items():
+                self.per_node_server_hits[v] += hits
+        if self.cont_hits:
+            for i, content in enumerate(collector.contents):
+                j = self._content_index(content)
+                self.cont_cache_hits[j] += collector.cont_cache_hits[i]
+                self.cont_serv_hits[j] += collector.cont_serv_hits[i]
+
 
 @register_data_collector('PATH_STRETCH')
 class PathStretchCollector(DataCollector):
@@ -750,9 +868,12 @@ class PathStretchCollector(DataCollector):
         self.req_path_len = collections.defaultdict(int)
         self.cont_path_len = collections.defaultdict(int)
         self.sess_count = 0
-        self.mean_req_stretch = 0.0
-        self.mean_cont_stretch = 0.0
-        self.mean_stretch = 0.0
+        # Sums of path lengths keyed by shortest path length, which are exact,
+        # so that sums of stretches do not depend on the order of sessions,
+        # e.g. when merging partitions
+        self.req_len_sums = collections.defaultdict(int)
+        self.cont_len_sums = collections.defaultdict(int)
+        self.len_sums = collections.defaultdict(int)
         if self.cdf:
             self.req_stretch_data = collections.deque()
             self.cont_stretch_data = collections.deque()
@@ -780,28 +901,50 @@ class PathStretchCollector(DataCollector):
             return
         req_sp_len = len(self.view.shortest_path(self.receiver, self.source))
         cont_sp_len = len(self.view.shortest_path(self.source, self.receiver))
-        req_stretch = self.req_path_len / req_sp_len
-        cont_stretch = self.cont_path_len / cont_sp_len
-        stretch = (self.req_path_len + self.cont_path_len) / (req_sp_len + cont_sp_len)
-        self.mean_req_stretch += req_stretch
-        self.mean_cont_stretch += cont_stretch
-        self.mean_stretch += stretch
+        self.req_len_sums[req_sp_len] += self.req_path_len
+        self.cont_len_sums[cont_sp_len] += self.cont_path_len
+        path_len = self.req_path_len + self.cont_path_len
+        self.len_sums[req_sp_len + cont_sp_len] += path_len
         if self.cdf:
+            req_stretch = self.req_path_len / req_sp_len
+            cont_stretch = self.cont_path_len / cont_sp_len
+            stretch = (self.req_path_len + self.cont_path_len) / \
+                      (req_sp_len + cont_sp_len)
             self.req_stretch_data.append(req_stretch)
             self.cont_stretch_data.append(cont_stretch)
             self.stretch_data.append(stretch)
 
+    @staticmethod
+    def _stretch_sum(len_sums):
+        """Return the sum of the stretches whose path lengths are summed by
+        shortest path length in len_sums"""
+        return math.fsum(n / sp_len for sp_len, n in len_sums.items())
+
     @inheritdoc(DataCollector)
     def results(self):
-        results = Tree({'MEAN': self.mean_stretch / self.sess_count,
-                        'MEAN_REQUEST': self.mean_req_stretch / self.sess_count,
-                        'MEAN_CONTENT': self.mean_cont_stretch / self.sess_count})
+        n_sess = self.sess_count
+        results = Tree({'MEAN': self._stretch_sum(self.len_sums) / n_sess,
+                        'MEAN_REQUEST': self._stretch_sum(self.req_len_sums) / n_sess,
+                        'MEAN_CONTENT': self._stretch_sum(self.cont_len_sums) / n_sess})
         if self.cdf:
             results['CDF'] = cdf(self.stretch_data)
             results['CDF_REQUEST'] = cdf(self.req_stretch_data)
             results['CDF_CONTENT'] = cdf(self.cont_stretch_data)
         return results
 
+    @inheritdoc(DataCollector)
+    def merge(self, collector):
+        self.sess_count += collector.sess_count
+        for sums, partition_sums in ((self.req_len_sums, collector.req_len_sums),
+                                     (self.cont_len_sums, collector.cont_len_sums),
+                                     (self.len_sums, collector.len_sums)):
+            for sp_len, n in partition_sums.items():
+                sums[sp_len] += n
+        if self.cdf:
+            self.req_stretch_data.extend(collector.req_stretch_data)
+            self.cont_stretch_data.extend(collector.cont_stretch_data)
+            self.stretch_data.extend(collector.stretch_data)
+
 
 @register_data_collector('DUMMY')
 class DummyCollector(DataCollector):
@@ -5,14 +5,45 @@ experiments needs to be run, instantiates all the required classes and executes
 the experiment by iterating through the event provided by an event generator
 and providing them to a strategy instance.
 """
-from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy
+import itertools
+import timeit
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, CollectorProxy, \
+                             WarmupDetector, StoppingRule, write_snapshot, \
+                             read_snapshot, restore_snapshot
 from icarus.registry import DATA_COLLECTOR, STRATEGY
+from icarus.util import Tree
 
 
 __all__ = ['exec_experiment']
 
 
-def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors):
+# Number of events processed between two samples of the size of cache queues
+CACHE_QUEUE_SAMPLE_INTERVAL = 64
+
+
+class _HybridStrategy(object):
+    """Strategy processing request-level events with a request-level strategy
+    and the events of flows with a packet-level strategy"""
+
+    def __init__(self, request_strategy, packet_strategy):
+        self.request_strategy = request_strategy
+        self.packet_strategy = packet_strategy
+
+    def process_event(self, time, **event):
+        if 'pkt_type' not in event:
+            self.request_strategy.process_event(time, **event)
+            return
+        # All requests of the warmup phase are issued before the first flow of
+        # the measured phase, so that events are processed by the packet-level
+        # strategy from now on
+        self.process_event = self.packet_strategy.process_event
+        self.packet_strategy.process_event(time, **event)
+
+
+def exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors,
+                    runtime=None, memory=None, warmup=None, stopping=None,
+                    hybrid=False, snapshot=None, checkpoint=None):
     """Execute the simulation of a specific scenario.
 
     Parameters
@@ -37,12 +68,67 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
         The collectors to be used. It is a dictionary in which keys are the
         names of collectors to use and values are dictionaries of attributes
         for the collector they refer to.
+    runtime : dict, optional
+        If provided, runtime statistics of the simulation are stored in it.
+        These are the time spent building the network model, including the
+        computation of shortest paths (NETWORK_MODEL), in the warmup phase
+        (WARMUP) and in the measured phase (MEASURED), in seconds, the number
+        of events processed (EVENTS) and the maximum number of events in the
+        event queue (PEAK_EVENT_QUEUE), of events in all cache queues
+        (PEAK_CACHE_QUEUE) and of live flows (PEAK_LIVE_FLOWS). The size of
+        cache queues is sampled every CACHE_QUEUE_SAMPLE_INTERVAL events.
+        Queues are not sampled in request-level experiments, which do not
+        use them.
+    memory : MemoryProfiler, optional
+        If provided, memory usage is recorded at the end of the setup of the
+        network model (SETUP), of the warmup phase (WARMUP) and of the
+        measured phase (MEASURED)
+    warmup : dict, optional
+        If provided, the warmup phase is ended as soon as caches reach steady
+        state, detected by a `WarmupDetector` initialized with the attributes
+        of this dictionary, rather than after the *n_warmup* requests of the
+        workload, which is then the maximum length of the warmup phase. The
+        workload must implement the `end_warmup` method. The number of
+        requests of the warmup phase (N_REQUESTS) and whether steady state was
+        detected (STEADY_STATE) are stored in the results under the WARMUP key
+    stopping : dict, optional
+        If provided, the measured phase is ended as soon as the mean of the
+        metrics measured by data collectors is estimated with the requested
+        precision, checked by a `StoppingRule` initialized with the attributes
+        of this dictionary, rather than after the *n_measured* requests of the
+        workload, which is then the maximum length of the measured phase.
+        Requests issued before the end of the measured phase are completed.
+        The workload must implement the `stop` method. The results of the
+        stopping rule are stored in the results under the STOPPING key
+    hybrid : bool, optional
+        If True, the requests of the warmup phase of a packet-level experiment
+        are processed by the request-level equivalent of its strategy, which
+        fills caches without simulating the packets of each flow, while flows
+        of the measured phase are simulated by the packet-level strategy. The
+        strategy must declare its request-level equivalent and the workload
+        must implement the `enable_request_level_warmup` method
+    snapshot : str, optional
+        The path of a snapshot written by a previous simulation of the same
+        scenario, e.g. with the *checkpoint* argument, from which the
+        simulation is started. The workload must implement the `set_state`
+        method. Data collectors are restored from the snapshot if it was
+        taken in the measured phase, in which case *collectors* must be the
+        same as those of the simulation which took it. The state of the
+        warmup detector and of the stopping rule is not restored
+    checkpoint : dict, optional
+        If provided, snapshots of the simulation are written to the file
+        whose path is the *path* attribute of this dictionary, each
+        overwriting the previous one: a snapshot is written at the end of the
+        warmup phase and, if the *interval* attribute is provided, every
+        *interval* events. The workload must implement the `get_state` method
 
     Returns
     -------
     results : Tree
         A tree with the aggregated simulation results from all collectors
     """
+    clock = timeit.default_timer
+    t_start = clock()
     model = NetworkModel(topology, cache_policy, **netconf)
     view = NetworkView(model)
     controller = NetworkController(model)
@@ -50,8 +136,23 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     workload.view = view
     workload.controller = controller
 
-    collectors_inst = [DATA_COLLECTOR[name](view, **params)
-                       for name, params in collectors.items()]
+    restored = None
+    if snapshot is not None:
+        if not hasattr(workload, 'set_state'):
+            raise ValueError('Workload %s does not support snapshots'
+                             % type(workload).__name__)
+        restored = read_snapshot(snapshot)
+
+    if restored is not None and restored['collectors'] is not None:
+        if set(restored['collectors']) != set(collectors):
+            raise ValueError('Snapshot %s was taken with different data '
+                             'collectors' % snapshot)
+        collectors_inst = [restored['collectors'][name] for name in collectors]
+        for c in collectors_inst:
+            c.view = view
+    else:
+        collectors_inst = [DATA_COLLECTOR[name](view, **params)
+                           for name, params in collectors.items()]
     collector = CollectorProxy(view, collectors_inst)
     controller.attach_collector(collector)
 
@@ -59,6 +160,127 @@ def exec_experiment(topology, workload, netconf, strategy, cache_policy, collect
     strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
     strategy_inst = STRATEGY[strategy_name](view, controller, **strategy_args)
 
-    for time, event in workload:
-        strategy_inst.process_event(time, **event)
-    return collector.results()
+    if hybrid:
+        request_level = STRATEGY[strategy_name].request_level
+        if request_level is None:
+            raise ValueError('Strategy %s has no request-level equivalent'
+                             % strategy_name)
+        if not hasattr(workload, 'enable_request_level_warmup'):
+            raise ValueError('Workload %s does not support hybrid experiments'
+                             % type(workload).__name__)
+        workload.enable_request_level_warmup()
+        strategy_inst = _HybridStrategy(
+                STRATEGY[request_level](view, controller, **strategy_args),
+                strategy_inst)
+
+    detector = None
+    if warmup is not None:
+        if not hasattr(workload, 'end_warmup'):
+            raise ValueError('Workload %s does not support adaptive warmup'
+                             % type(workload).__name__)
+        detector = WarmupDetector(view, **warmup)
+        controller.attach_warmup_collector(detector)
+
+    rule = None
+    if stopping is not None:
+        if not hasattr(workload, 'stop'):
+            raise ValueError('Workload %s does not support sequential stopping'
+                             % type(workload).__name__)
+        rule = StoppingRule({name: c for name, c in zip(collectors, collectors_inst)},
+                            **stopping)
+
+    checkpoint_path = None
+    checkpoint_interval = None
+    if checkpoint is not None:
+        if not hasattr(workload, 'get_state'):
+            raise ValueError('Workload %s does not support snapshots'
+                             % type(workload).__name__)
+        checkpoint_path = checkpoint['path']
+        checkpoint_interval = checkpoint.get('interval')
+
+    events = workload
+    if restored is not None:
+        restore_snapshot(restored, model, controller, workload)
+        events = itertools.chain(restored['pending'], workload)
+
+    if runtime is None:
+        runtime = {}
+    if memory is not None:
+        memory.snapshot('SETUP')
+    t_warmup = clock()
+    t_measured = None
+    n_events = 0
+    event_queue = model.eventQ
+    cache_queue = model.cacheQ
+    peak_event_queue = 0
+    peak_cache_queue = 0
+    in_warmup = detector is not None
+    in_measured = rule is not None
+    events = iter(events)
+    first_event = next(events, None)
+    if first_event is not None:
+        events = itertools.chain([first_event], events)
+    if detector is None and rule is None and checkpoint is None and \
+            not hybrid and first_event is not None and \
+            'pkt_type' not in first_event[1]:
+        # Events of request-level workloads do not use the event and cache
+        # queues, so that they are only counted
+        for time, event in events:
+            if event.get('log', True):
+                if memory is not None:
+                    memory.snapshot('WARMUP')
+                t_measured = clock()
+                strategy_inst.process_event(time, **event)
+                n_events += 1
+                break
+            strategy_inst.process_event(time, **event)
+            n_events += 1
+        for n_events, (time, event) in enumerate(events, n_events + 1):
+            strategy_inst.process_event(time, **event)
+    else:
+        for time, event in events:
+            if t_measured is None and event.get('log', True):
+                if checkpoint_path is not None and n_events > 0:
+                    write_snapshot(checkpoint_path, model, controller, workload,
+                                   pending=[(time, event)])
+                if memory is not None:
+                    memory.snapshot('WARMUP')
+                t_measured = clock()
+            strategy_inst.process_event(time, **event)
+            n_events += 1
+            if checkpoint_interval and n_events % checkpoint_interval == 0:
+                write_snapshot(checkpoint_path, model, controller, workload,
+                               dict(zip(collectors, collectors_inst))
+                               if t_measured is not None else None)
+            if in_warmup and detector.steady:
+                workload.end_warmup()
+                in_warmup = False
+            if in_measured and \
+                    rule.check(workload.n_requests - workload.warmup_length):
+                workload.stop()
+                in_measured = False
+            if len(event_queue) > peak_event_queue:
+                peak_event_queue = len(event_queue)
+            if cache_queue and n_events % CACHE_QUEUE_SAMPLE_INTERVAL == 0:
+                peak_cache_queue = max(peak_cache_queue,
+                                       sum(len(q) for q in cache_queue.values()))
+    t_end = clock()
+    if t_measured is None:
+        t_measured = t_end
+    if memory is not None:
+        memory.snapshot('MEASURED')
+    runtime['NETWORK_MODEL'] = t_warmup - t_start
+    runtime['WARMUP'] = t_measured - t_warmup
+    runtime['MEASURED'] = t_end - t_measured
+    runtime['EVENTS'] = n_events
+    runtime['PEAK_EVENT_QUEUE'] = peak_event_queue
+    runtime['PEAK_CACHE_QUEUE'] = peak_cache_queue
+    runtime['PEAK_LIVE_FLOWS'] = controller.peak_live_flows
+    results = collector.results()
+    if detector is not None:
+        controller.detach_warmup_collector()
+        results['WARMUP'] = Tree({'N_REQUESTS': workload.warmup_length,
+                                  'STEADY_STATE': detector.steady})
+    if rule is not None:
+        results['STOPPING'] = rule.results()
+    return results
@@ -0,0 +1,203 @@
+"""Memory instrumentation of experiments.
+
+This module provides a profiler recording, with `tracemalloc`, the memory
+allocated by an experiment at the end of each of its phases, the sites where
+most of it was allocated and the number of live objects by type.
+
+Tracing allocations slows down the simulation considerably, so it is enabled
+only on request, and the runtime statistics of profiled experiments are not
+representative of normal runs.
+"""
+import collections
+import gc
+import tracemalloc
+
+from icarus.util import Tree
+
+__all__ = [
+    'MemoryProfiler',
+    'RssMeter',
+    'reset_peak_rss',
+    'peak_rss',
+    'current_rss',
+]
+
+
+def reset_peak_rss():
+    """Reset the peak resident set size of this process to its current size,
+    so that `peak_rss` returns the peak since then
+
+    This is only supported on Linux, by writing to /proc/self/clear_refs.
+
+    Returns
+    -------
+    reset : bool
+        *True* if the peak resident set size was reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except (IOError, OSError):
+        return False
+    return True
+
+
+def peak_rss():
+    """Return the peak resident set size of this process in bytes since it
+    started or since the last call to `reset_peak_rss`
+
+    This is only supported on Linux, where it is read from /proc/self/status.
+
+    Returns
+    -------
+    peak_rss : int
+        The peak resident set size or *None* if it cannot be measured on this
+        platform
+    """
+    return _proc_status('VmHWM')
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes
+
+    It is read from /proc/self/status on Linux and measured with psutil,
+    if installed, elsewhere.
+
+    Returns
+    -------
+    rss : int
+        The resident set size or *None* if it cannot be measured on this
+        platform
+    """
+    rss = _proc_status('VmRSS')
+    if rss is not None:
+        return rss
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _proc_status(field):
+    """Return a size in bytes reported in /proc/self/status, or *None* if
+    not available"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+class RssMeter(object):
+    """Meter of the peak resident set size of this process over intervals of
+    time, e.g. phases of an experiment
+
+    Where the peak resident set size cannot be reset, i.e. outside Linux,
+    the resident set size at the end of each interval is reported instead.
+    """
+
+    def __init__(self):
+        """Constructor, starting the first interval
+        """
+        self.restart()
+
+    def restart(self):
+        """Start a new interval
+        """
+        self._peak = reset_peak_rss()
+
+    def peak(self):
+        """Return the peak resident set size of this process in bytes since
+        the interval started, or its current size if peaks cannot be reset
+
+        Returns
+        -------
+        rss : int
+            The resident set size or *None* if it cannot be measured
+        """
+        return peak_rss() if self._peak else current_rss()
+
+
+class MemoryProfiler(object):
+    """Profiler recording memory usage at the end of phases of an experiment
+    """
+
+    def __init__(self, n_sites=10, n_types=10):
+        """Constructor
+
+        Parameters
+        ----------
+        n_sites : int, optional
+            The number of allocation sites reported for each phase
+        n_types : int, optional
+            The number of object types reported for each phase
+        """
+        self.n_sites = n_sites
+        self.n_types = n_types
+        self.phases = Tree()
+        self.rss = None
+
+    def start(self):
+        """Start tracing memory allocations
+        """
+        gc.collect()
+        self.rss = RssMeter()
+        tracemalloc.start()
+
+    def stop(self):
+        """Stop tracing memory allocations
+        """
+        tracemalloc.stop()
+
+    def snapshot(self, phase):
+        """Record memory usage at the end of a phase and start a new phase
+
+        The following statistics are recorded: the size of memory allocated at
+        the end of the phase (TRACED) and the peak size during the phase
+        (TRACED_PEAK), the peak resident set size of the process during the
+        phase (PEAK_RSS, see `RssMeter`), the sites where most of the memory allocated at
+        the end of the phase was allocated (TOP_SITES), as a list of
+        (site, size, count) tuples, and the types with most live objects
+        (OBJECTS), as a list of (type, count) tuples. Sizes are in bytes.
+
+        Parameters
+        ----------
+        phase : str
+            The name of the phase
+        """
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>')))
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        stats = snapshot.statistics('lineno')[:self.n_sites]
+        sites = [('%s:%d' % (s.traceback[0].filename, s.traceback[0].lineno),
+                  s.size, s.count) for s in stats]
+        objects = collections.Counter(type(o).__name__ for o in gc.get_objects())
+        self.phases[phase] = Tree({
+            'TRACED': traced,
+            'TRACED_PEAK': traced_peak,
+            'PEAK_RSS': self.rss.peak(),
+            'TOP_SITES': sites,
+            'OBJECTS': objects.most_common(self.n_types),
+            })
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self.rss.restart()
+
+    def results(self):
+        """Return the statistics recorded for each phase
+
+        Returns
+        -------
+        results : Tree
+            Statistics keyed by phase
+        """
+        return self.phases
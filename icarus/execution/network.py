@@ -14,15 +14,22 @@ of all relevant events.
 """
 import logging
 
+import numpy as np
 import networkx as nx
 import fnss
 import math
 import heapq
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
 from icarus.registry import CACHE_POLICY
 from icarus.util import iround, path_links
 
 __all__ = [
+    'PathTable',
     'NetworkModel',
     'NetworkView',
     'NetworkController'
@@ -57,6 +64,279 @@ def symmetrify_paths(shortest_paths):
     return shortest_paths
 
 
+class PathTable(object):
+    """All-pairs shortest paths stored in flat NumPy arrays.
+
+    All paths are stored back to back in a single array of node indices and
+    are located through an array of offsets, one per (source, destination)
+    pair. A next-hop matrix is also stored. Since the whole table consists of
+    a few contiguous buffers, it can be built once by a parent process and
+    shared with worker processes, either copy-on-write after a fork or through
+    shared memory blocks (see `share`). Differently from a dict of lists,
+    reading it does not update reference counts on the shared pages, so these
+    are never copied by workers.
+
+    The table is read-only and exposes the same read interface of the dict of
+    dicts returned by `symmetrify_paths`, i.e. ``table[u][v]`` returns the
+    list of nodes of the path from `u` to `v`. Paths are materialized
+    lazily and memoized by the rows returned by ``table[u]``, so that the
+    memoized paths are released with the rows, e.g. with the network model
+    holding them, rather than accumulating in a table reused by many
+    experiments.
+    """
+
+    _ARRAYS = ('offsets', 'path_nodes', 'next_hop')
+
+    def __init__(self, nodes, offsets, path_nodes, next_hop):
+        """Constructor
+
+        Parameters
+        ----------
+        nodes : list
+            Labels of the nodes. The position of a node in the list is the
+            index used to refer to it in the arrays
+        offsets : array of int
+            Array of *n* x *n* + 1 elements, where *n* is the number of nodes.
+            The path from node `i` to node `j` is stored in
+            ``path_nodes[offsets[i*n + j]:offsets[i*n + j + 1]]``
+        path_nodes : array of int
+            Node indices of all paths, stored back to back
+        next_hop : array of int
+            *n* x *n* matrix storing the index of the node following `i` on the
+            path from `i` to `j`, or -1 if `i` == `j` or there is no path
+        """
+        self.nodes = list(nodes)
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+        self.offsets = offsets
+        self.path_nodes = path_nodes
+        self.next_hop = next_hop
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def from_paths(cls, shortest_paths):
+        """Build a path table from a dict of dicts of paths
+
+        Parameters
+        ----------
+        shortest_paths : dict of dict
+            All pairs shortest paths
+
+        Returns
+        -------
+        table : PathTable
+            The path table
+        """
+        nodes = list(shortest_paths)
+        index = {v: i for i, v in enumerate(nodes)}
+        n = len(nodes)
+        lengths = np.zeros(n * n, dtype=np.int64)
+        next_hop = np.empty((n, n), dtype=np.int32)
+        next_hop.fill(-1)
+        path_nodes = []
+        for i, u in enumerate(nodes):
+            paths = shortest_paths[u]
+            for j, v in enumerate(nodes):
+                if v not in paths:
+                    continue
+                path = [index[w] for w in paths[v]]
+                lengths[i * n + j] = len(path)
+                if len(path) > 1:
+                    next_hop[i, j] = path[1]
+                path_nodes.extend(path)
+        offsets = np.zeros(n * n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(nodes, offsets, np.array(path_nodes, dtype=np.int32), next_hop)
+
+    @classmethod
+    def from_topology(cls, topology):
+        """Compute the symmetric all-pairs shortest paths of a topology and
+        store them in a path table
+
+        Parameters
+        ----------
+        topology : Topology
+            The topology
+
+        Returns
+        -------
+        table : PathTable
+            The path table
+        """
+        return cls.from_paths(symmetrify_paths(dict(nx.all_pairs_dijkstra_path(topology))))
+
+    def path(self, u, v):
+        """Return the shortest path from `u` to `v`
+
+        Parameters
+        ----------
+        u : any hashable type
+            Origin node
+        v : any hashable type
+            Destination node
+
+        Returns
+        -------
+        path : list
+            List of nodes (including `u` and `v`) of the path
+        """
+        n = len(self.nodes)
+        k = self.index[u] * n + self.index[v]
+        start, end = self.offsets[k], self.offsets[k + 1]
+        if start == end:
+            raise KeyError(v)
+        nodes = self.nodes
+        return [nodes[i] for i in self.path_nodes[start:end].tolist()]
+
+    def share(self):
+        """Move the arrays of the table to shared memory blocks.
+
+        After this call, pickling the table only serializes the names of the
+        blocks and unpickling it in another process attaches to them instead
+        of copying the arrays. The process calling this method owns the blocks
+        and must call `release` when the table is no longer needed.
+
+        Returns
+        -------
+        table : PathTable
+            This table
+        """
+        if shared_memory is None:
+            raise ValueError('Shared memory is not supported by this '
+                             'version of Python')
+        if self._shm is not None:
+            return self
+        self._shm = []
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+            shared[...] = array
+            setattr(self, name, shared)
+            self._shm.append(shm)
+        self._owner = True
+        return self
+
+    def release(self):
+        """Detach from the shared memory blocks of the table, if any, and
+        destroy them if this process owns them.
+
+        The table cannot be used after this call.
+        """
+        if self._shm is None:
+            return
+        for name in self._ARRAYS:
+            setattr(self, name, None)
+        for shm in self._shm:
+            shm.close()
+            if self._owner:
+                shm.unlink()
+        self._shm = None
+
+    def __getstate__(self):
+        state = {'nodes': self.nodes}
+        if self._shm is not None:
+            state['shm'] = [(shm.name, getattr(self, name).shape,
+                             getattr(self, name).dtype.str)
+                            for name, shm in zip(self._ARRAYS, self._shm)]
+        else:
+            state.update((name, getattr(self, name)) for name in self._ARRAYS)
+        return state
+
+    def __setstate__(self, state):
+        arrays = {}
+        shms = None
+        if 'shm' in state:
+            shms = []
+            for name, (shm_name, shape, dtype) in zip(self._ARRAYS, state['shm']):
+                shm = shared_memory.SharedMemory(name=shm_name)
+                arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                shms.append(shm)
+        else:
+            arrays = {name: state[name] for name in self._ARRAYS}
+        self.__init__(state['nodes'], **arrays)
+        self._shm = shms
+
+    def __getitem__(self, u):
+        if u not in self.index:
+            raise KeyError(u)
+        return _PathTableRow(self, u)
+
+    def __contains__(self, u):
+        return u in self.index
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def keys(self):
+        return list(self.nodes)
+
+    def values(self):
+        return [self[u] for u in self.nodes]
+
+    def items(self):
+        return [(u, self[u]) for u in self.nodes]
+
+    def get(self, u, default=None):
+        return self[u] if u in self.index else default
+
+
+class _PathTableRow(object):
+    """Read-only view of the paths originating from a node of a `PathTable`,
+    memoizing the paths read.
+    """
+
+    def __init__(self, table, source):
+        self.table = table
+        self.source = source
+        self._paths = {}
+
+    def _lengths(self):
+        """Return the lengths of the paths to all nodes of the table"""
+        n = len(self.table.nodes)
+        k = self.table.index[self.source] * n
+        return np.diff(self.table.offsets[k:k + n + 1])
+
+    def __getitem__(self, v):
+        try:
+            return self._paths[v]
+        except KeyError:
+            path = self._paths[v] = self.table.path(self.source, v)
+            return path
+
+    def __contains__(self, v):
+        if v in self._paths:
+            return True
+        table = self.table
+        if v not in table.index:
+            return False
+        n = len(table.nodes)
+        k = table.index[self.source] * n + table.index[v]
+        return table.offsets[k] != table.offsets[k + 1]
+
+    def __iter__(self):
+        nodes = self.table.nodes
+        return (nodes[i] for i in np.flatnonzero(self._lengths()).tolist())
+
+    def __len__(self):
+        return int(np.count_nonzero(self._lengths()))
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[v] for v in self]
+
+    def items(self):
+        return [(v, self[v]) for v in self]
+
+    def get(self, v, default=None):
+        return self[v] if v in self else default
+
+
 class NetworkView(object):
     """Network view
 
@@ -481,6 +761,11 @@ class NetworkView(object):
         return self.model.ProbCache_x[flow]
 
 
+# Attributes of the network model which are part of its state only if nodes or
+# links were removed
+_STATIC_STATE = ('topology', 'shortest_path')
+
+
 class NetworkModel(object):
     """Models the internal state of the network.
 
@@ -499,7 +784,7 @@ class NetworkModel(object):
             cache policy descriptor. It has the name attribute which identify
             the cache policy name and keyworded arguments specific to the
             policy
-        shortest_path : dict of dict, optional
+        shortest_path : dict of dict or PathTable, optional
             The all-pair shortest paths of the network
         """
 
@@ -599,6 +884,42 @@ class NetworkModel(object):
         # x: the number of nodes that in cache_size
         self.ProbCache_x = {}
 
+    def get_state(self):
+        """Return the state of the network model, i.e. the content and
+        internal state of all caches, the event queue, the cache queues, the
+        state of flows in progress and of removed nodes and links.
+
+        The topology and the shortest paths are only part of the state if
+        nodes or links were removed, as they are otherwise not modified by
+        simulations and are the same in all models built from the same
+        topology.
+
+        The state refers to the objects of the network model rather than
+        copies, so that it must be serialized, e.g. by `write_snapshot`, to be
+        restored after the simulation continues.
+
+        Returns
+        -------
+        state : dict
+            The state of the network model, keyed by attribute
+        """
+        failed = bool(self.removed_nodes or self.removed_links)
+        return {k: v for k, v in vars(self).items()
+                if failed or k not in _STATIC_STATE}
+
+    def set_state(self, state):
+        """Restore a state returned by `get_state`.
+
+        Parameters
+        ----------
+        state : dict
+            The state of the network model
+        """
+        missing = set(vars(self)) - set(state) - set(_STATIC_STATE)
+        if missing:
+            raise ValueError('The state of the network model does not include '
+                             'attributes %s' % ', '.join(sorted(missing)))
+        self.__dict__.update(state)
 
 
 class NetworkController(object):
@@ -620,6 +941,13 @@ class NetworkController(object):
         self.session = None
         self.model = model
         self.collector = None
+        # Collector notified of the outcome of requests which are not logged,
+        # used to detect the end of the warmup phase
+        self.warmup_collector = None
+        # Number of flows started and not yet ended and its maximum value,
+        # used by packet-level strategies only
+        self.n_live_flows = 0
+        self.peak_live_flows = 0
 
     def add_event(self, event):
         """ Add an event to the eventQ
@@ -659,6 +987,21 @@ class NetworkController(object):
         """Detach the data collector."""
         self.collector = None
 
+    def attach_warmup_collector(self, collector):
+        """Attach a collector to which cache and server hits of sessions and
+        flows which are not logged will be reported.
+
+        Parameters
+        ----------
+        collector : DataCollector
+            The warmup collector
+        """
+        self.warmup_collector = collector
+
+    def detach_warmup_collector(self):
+        """Detach the warmup collector."""
+        self.warmup_collector = None
+
     def start_session(self, timestamp, receiver, content, log):
         """Instruct the controller to start a new session (i.e. the retrieval
         of a content).
@@ -698,6 +1041,9 @@ class NetworkController(object):
             *True* if this session needs to be reported to the collector,
             *False* otherwise
         """
+        self.n_live_flows += 1
+        if self.n_live_flows > self.peak_live_flows:
+            self.peak_live_flows = self.n_live_flows
         if self.collector is not None and log:
             self.collector.start_flow_session(timestamp, receiver, content, flow)
 
@@ -878,6 +1224,8 @@ class NetworkController(object):
             if cache_hit:
                 if self.session['log']:
                     self.collector.cache_hit(node)
+                elif self.warmup_collector is not None:
+                    self.warmup_collector.cache_hit(node)
             else:
                 if self.session['log']:
                     self.collector.cache_miss(node)
@@ -886,6 +1234,8 @@ class NetworkController(object):
         if name == 'source' and self.session['content'] in props['contents']:
             if self.collector is not None and self.session['log']:
                 self.collector.server_hit(node)
+            elif self.warmup_collector is not None and not self.session['log']:
+                self.warmup_collector.server_hit(node)
             return True
         else:
             return False
@@ -908,6 +1258,8 @@ class NetworkController(object):
             if cache_hit:
                 if log:
                     self.collector.cache_hit_flow(node, content, flow)
+                elif self.warmup_collector is not None:
+                    self.warmup_collector.cache_hit_flow(node, content, flow)
             else:
                 if log:
                     self.collector.cache_miss_flow(node, content, flow)
@@ -916,6 +1268,8 @@ class NetworkController(object):
         if name == 'source' and content in props['contents']:
             if self.collector is not None and log:
                 self.collector.server_hit_flow(node, content, flow)
+            elif self.warmup_collector is not None and not log:
+                self.warmup_collector.server_hit_flow(node, content, flow)
             return True
         else:
             return False
@@ -1052,6 +1406,7 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
+        self.n_live_flows -= 1
         if self.collector is not None and log:
             self.collector.end_flow_session(flow, success)
 
@@ -1063,6 +1418,7 @@ class NetworkController(object):
         success : bool, optional
             *True* if the session was completed successfully, *False* otherwise
         """
+        self.n_live_flows -= 1
         if self.collector is not None and log:
             self.collector.end_flow_session_cache_delay(flow, success)
 
@@ -1277,6 +1633,8 @@ class NetworkController(object):
         if cache_hit:
             if self.session['log']:
                 self.collector.cache_hit(node)
+            elif self.warmup_collector is not None:
+                self.warmup_collector.cache_hit(node)
         else:
             if self.session['log']:
                 self.collector.cache_miss(node)
@@ -0,0 +1,243 @@
+"""Partitioned execution of hash-routing experiments.
+
+With hash-routing strategies, each content is cached only by its authoritative
+cache, so that the state of each cache only depends on the requests for the
+contents it is authoritative for. The requests of an experiment can then be
+partitioned by authoritative cache and the partitions simulated independently
+by parallel processes, whose measurements are then merged.
+
+The processes simulating the partitions are forked once the network model is
+built, so that they share it, and the process running the experiment then
+iterates over the workload once, streaming the requests of each partition to
+its process in chunks of at most PARTITION_CHUNK requests. Results are the
+same as those of a serial execution of the experiment, except for random draws
+of cache policies, e.g. RAND, since collectors merge their measurements
+exactly, e.g. the latencies of sessions are summed without rounding errors
+both by partitions and by serial executions.
+
+Processes cannot be forked on Windows or within daemonic processes, e.g. the
+worker processes of a multiprocessing pool, in which case partitioned
+experiments with more than one partition fail. The orchestrator of a parallel
+campaign therefore runs partitioned experiments in its own process.
+"""
+import multiprocessing as mp
+import timeit
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, \
+                             CollectorProxy, DataCollector
+from icarus.registry import DATA_COLLECTOR, STRATEGY
+from icarus.util import can_fork
+
+__all__ = [
+    'PARTITIONABLE_STRATEGIES',
+    'PARTITION_CHUNK',
+    'exec_partitioned_experiment',
+]
+
+
+# Strategies caching each content only in its authoritative cache
+PARTITIONABLE_STRATEGIES = frozenset([
+    'HASHROUTING',
+    'HR_SYMM',
+    'HR_ASYMM',
+    'HR_MULTICAST',
+    'HR_HYBRID_AM',
+    'HR_HYBRID_SM',
+])
+
+# Maximum number of requests sent at once to the process simulating a
+# partition, which bounds the requests held in memory by the process running
+# the experiment to this many per partition
+PARTITION_CHUNK = 1024
+
+
+def _receive_events(conn):
+    """Iterate over the (time, event) tuples of a partition, received in
+    chunks from the process running the experiment until a *None* chunk"""
+    chunk = conn.recv()
+    while chunk is not None:
+        for item in chunk:
+            yield item
+        chunk = conn.recv()
+
+
+def _serve(model, strategy, collectors, conn):
+    """Simulate a partition in a forked process, receiving its requests from
+    the process running the experiment and sending back its output"""
+    conn.send(_simulate_partition(model, _receive_events(conn), strategy,
+                                  collectors))
+    conn.close()
+
+
+def _simulate_partition(model, events, strategy, collectors):
+    """Simulate the requests of a partition of an experiment
+
+    Parameters
+    ----------
+    model : NetworkModel
+        The network model
+    events : iterable
+        The (time, event) tuples of the partition
+    strategy : dict
+        The strategy definition
+    collectors : dict
+        The collectors definition
+
+    Returns
+    -------
+    collectors : list
+        The data collectors of the partition, detached from the network view
+    stats : dict
+        Runtime statistics of the partition
+    """
+    clock = timeit.default_timer
+    view = NetworkView(model)
+    controller = NetworkController(model)
+    collectors_inst = [DATA_COLLECTOR[name](view, **params)
+                       for name, params in collectors.items()]
+    controller.attach_collector(CollectorProxy(view, collectors_inst))
+    strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
+    strategy_inst = STRATEGY[strategy['name']](view, controller, **strategy_args)
+    n_events = 0
+    t_warmup = clock()
+    t_measured = None
+    for time, event in events:
+        if t_measured is None and event.get('log', True):
+            t_measured = clock()
+        strategy_inst.process_event(time, **event)
+        n_events += 1
+    t_end = clock()
+    if t_measured is None:
+        t_measured = t_end
+    for c in collectors_inst:
+        c.view = None
+    return collectors_inst, {'WARMUP': t_measured - t_warmup,
+                             'MEASURED': t_end - t_measured,
+                             'EVENTS': n_events}
+
+
+def exec_partitioned_experiment(topology, workload, netconf, strategy,
+                                cache_policy, collectors, n_processes=None,
+                                runtime=None):
+    """Execute the simulation of a hash-routing scenario partitioning its
+    requests by authoritative cache across parallel processes.
+
+    Parameters
+    ----------
+    topology : Topology
+        The FNSS Topology object modelling the network topology on which
+        experiments are run.
+    workload : iterable
+        An iterable object whose elements are (time, event) tuples
+    netconf : dict
+        Dictionary of attributes to inizialize the network model
+    strategy : tree
+        Strategy definition. The strategy must be among
+        PARTITIONABLE_STRATEGIES
+    cache_policy : tree
+        Cache policy definition
+    collectors: dict
+        The collectors to be used, keyed by name. All collectors must
+        implement the `merge` method
+    n_processes : int, optional
+        The number of parallel processes, which is also the number of
+        partitions if there are at least as many caches. By default, the
+        number of CPUs
+    runtime : dict, optional
+        If provided, runtime statistics of the simulation are stored in it,
+        as by `exec_experiment`. WARMUP and MEASURED are the longest times
+        taken by a partition, including the time spent waiting for its
+        requests, EVENTS is the number of events of all partitions and
+        PARTITIONS the number of partitions
+
+    Returns
+    -------
+    results : Tree
+        A tree with the aggregated simulation results from all collectors
+
+    Raises
+    ------
+    ValueError
+        If the strategy cannot be partitioned, if a collector does not support
+        merging or if there are several partitions and this process cannot
+        fork processes, e.g. because it is daemonic
+    """
+    if strategy['name'] not in PARTITIONABLE_STRATEGIES:
+        raise ValueError('Strategy %s cannot be partitioned by authoritative '
+                         'cache' % strategy['name'])
+    for name in collectors:
+        if DATA_COLLECTOR[name].merge is DataCollector.merge:
+            raise ValueError('Collector %s does not support merging' % name)
+    clock = timeit.default_timer
+    t_start = clock()
+    model = NetworkModel(topology, cache_policy, **netconf)
+    view = NetworkView(model)
+    cache_nodes = view.cache_nodes()
+    if n_processes is None:
+        n_processes = mp.cpu_count()
+    n_partitions = max(1, min(n_processes, len(cache_nodes)))
+    if n_partitions > 1 and not can_fork():
+        raise ValueError('Experiments with %d partitions require forking '
+                         'processes, which is not possible in this process'
+                         % n_partitions)
+    t_simulation = clock()
+    if n_partitions == 1:
+        outputs = [_simulate_partition(model, workload, strategy, collectors)]
+    else:
+        # Contents are assigned to caches in the order of cache_nodes by
+        # hashing, so that consecutive caches are assigned to different
+        # partitions to spread the most popular contents
+        partitions = {v: i % n_partitions for i, v in enumerate(cache_nodes)}
+        strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
+        authoritative_cache = STRATEGY[strategy['name']](
+            view, NetworkController(model), **strategy_args
+        ).authoritative_cache
+        ctx = mp.get_context('fork')
+        conns = []
+        workers = []
+        try:
+            for _ in range(n_partitions):
+                conn, child_conn = ctx.Pipe()
+                worker = ctx.Process(target=_serve, args=(model, strategy,
+                                                          collectors,
+                                                          child_conn))
+                worker.daemon = True
+                worker.start()
+                child_conn.close()
+                conns.append(conn)
+                workers.append(worker)
+            chunks = [[] for _ in range(n_partitions)]
+            for time, event in workload:
+                i = partitions[authoritative_cache(event['content'])]
+                chunks[i].append((time, event))
+                if len(chunks[i]) == PARTITION_CHUNK:
+                    conns[i].send(chunks[i])
+                    chunks[i] = []
+            for conn, chunk in zip(conns, chunks):
+                if chunk:
+                    conn.send(chunk)
+                conn.send(None)
+            outputs = [conn.recv() for conn in conns]
+        finally:
+            for conn in conns:
+                conn.close()
+            for worker in workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+    collectors_inst = outputs[0][0]
+    for partition_collectors, _ in outputs[1:]:
+        for c, partition_c in zip(collectors_inst, partition_collectors):
+            c.merge(partition_c)
+    for c in collectors_inst:
+        c.view = view
+    if runtime is not None:
+        runtime['NETWORK_MODEL'] = t_simulation - t_start
+        runtime['WARMUP'] = max(stats['WARMUP'] for _, stats in outputs)
+        runtime['MEASURED'] = max(stats['MEASURED'] for _, stats in outputs)
+        runtime['EVENTS'] = sum(stats['EVENTS'] for _, stats in outputs)
+        runtime['PEAK_EVENT_QUEUE'] = 0
+        runtime['PEAK_CACHE_QUEUE'] = 0
+        runtime['PEAK_LIVE_FLOWS'] = 0
+        runtime['PARTITIONS'] = n_partitions
+    return CollectorProxy(view, collectors_inst).results()
@@ -0,0 +1,421 @@
+"""Conservative parallel discrete-event simulation of packet-level experiments.
+
+The nodes of the topology are partitioned into regions, e.g. clusters of
+routers computed by `compute_clusters`, each simulated by a logical process
+owning the caches of its nodes and the events occurring at them. Packets
+crossing a link between two regions are sent as messages to the logical
+process of the region of their next hop.
+
+Logical processes are synchronized by time windows. The lookahead of the
+simulation is the minimum delay of the links between regions, so that a packet
+sent at time t is received by another region not earlier than t plus the
+lookahead. All events occurring within the lookahead of the earliest pending
+event can then be processed by all logical processes in parallel, without
+waiting for messages from each other. At the end of each window, logical
+processes exchange the packets crossing regions and send the notifications of
+their events to the coordinating process, which replays them to the data
+collectors in timestamp order.
+
+Events are ordered by time and, at the same time, requests starting new
+flows before packets, as by the serial engine, which is the reference
+implementation. Each flow has a single packet in flight, so that ties between
+packets occurring at the same time are broken by the flow they belong to and
+the number of events of the flow processed before them, which are carried
+along with the packets crossing regions. The events occurring at each node and
+the notifications of collectors are therefore processed in the same order
+whatever the regions, and results are the same as those of a serial execution
+of the experiment, except for random draws of strategies and cache policies,
+e.g. PROB_CACHE_PKT_LEVEL and RAND, which are only statistically equivalent.
+
+Only packet-level strategies whose state is either the state of the node
+processing an event or the state of the flow to which the event belongs,
+moved along with the packets of the flow, are supported. Strategies modelling
+the delay of cache queues are not supported.
+
+Logical processes are run by processes forked from the coordinating process,
+which is not possible on Windows or within daemonic processes, e.g. the worker
+processes of a multiprocessing pool, in which case experiments with more than
+one logical process fail. The orchestrator of a parallel campaign therefore
+runs these experiments in its own process.
+"""
+import heapq
+import multiprocessing as mp
+import operator
+import timeit
+
+from icarus.execution import NetworkModel, NetworkView, NetworkController, \
+                             CollectorProxy
+from icarus.registry import DATA_COLLECTOR, STRATEGY
+from icarus.util import can_fork
+
+__all__ = [
+    'PDES_STRATEGIES',
+    'partition_topology',
+    'exec_pdes_experiment',
+]
+
+
+# Packet-level strategies supported by the parallel engine
+PDES_STRATEGIES = frozenset([
+    'LCE_PKT_LEVEL',
+    'LCD_PKT_LEVEL',
+    'PROB_CACHE_PKT_LEVEL',
+])
+
+# Attributes of the network model storing the state of flows, keyed by flow,
+# which is moved to the logical process receiving the packets of a flow
+_FLOW_STATE = (
+    'lcd_pkt_level_copied_flag',
+    'ProbCache_c',
+    'ProbCache_N',
+    'ProbCache_x',
+    'track_busy_node',
+)
+
+# Kinds of events. Requests starting new flows are processed before packets
+# occurring at the same time, as by the serial engine
+_ARRIVAL = 0
+_PACKET = 1
+
+# Maximum number of new flows started in a single window
+MAX_WINDOW_ARRIVALS = 10000
+
+
+def partition_topology(topology, n_partitions):
+    """Partition the nodes of a topology into regions simulated by different
+    logical processes.
+
+    Routers are clustered with `compute_clusters`, so as to minimize the
+    intra-cluster latency, and every other node is assigned to the region of
+    one of its neighbors.
+
+    Parameters
+    ----------
+    topology : Topology
+        The topology
+    n_partitions : int
+        The maximum number of regions
+
+    Returns
+    -------
+    partitions : list of sets
+        The nodes of each region
+    """
+    from icarus.scenarios.algorithms import compute_clusters
+    routers = [v for v in topology.nodes()
+               if topology.node[v]['stack'][0] == 'router']
+    n_partitions = min(n_partitions, len(routers))
+    if n_partitions <= 1:
+        return [set(topology.nodes())]
+    clusters = [c for c in compute_clusters(topology, n_partitions,
+                                            nbunch=routers, n_processes=1)
+                if c]
+    owner = {v: i for i, cluster in enumerate(clusters) for v in cluster}
+    unassigned = [v for v in topology.nodes() if v not in owner]
+    while unassigned:
+        remaining = []
+        for v in unassigned:
+            neighbors = [u for u in topology.adj[v] if u in owner]
+            if neighbors:
+                owner[v] = owner[neighbors[0]]
+                clusters[owner[v]].add(v)
+            else:
+                remaining.append(v)
+        if len(remaining) == len(unassigned):
+            raise ValueError('The topology has more than one connected '
+                             'component')
+        unassigned = remaining
+    return clusters
+
+
+class _NotificationLog(object):
+    """Collector recording the notifications of the events processed by a
+    logical process, to be replayed by the coordinating process"""
+
+    def __init__(self):
+        self.key = None
+        self.records = []
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.records.append((self.key, name, args, kwargs))
+        return record
+
+
+class _LogicalProcessController(NetworkController):
+    """Network controller scheduling the events of a logical process"""
+
+    def __init__(self, model, process):
+        super(_LogicalProcessController, self).__init__(model)
+        self.process = process
+
+    def add_event(self, event):
+        self.process.schedule(event)
+
+
+class _LogicalProcess(object):
+    """Logical process simulating the events occurring at the nodes of a
+    region"""
+
+    def __init__(self, index, model, strategy, owner):
+        self.index = index
+        self.model = model
+        self.owner = owner
+        self.controller = _LogicalProcessController(model, self)
+        self.log = _NotificationLog()
+        self.controller.attach_collector(self.log)
+        strategy_args = {k: v for k, v in strategy.items() if k != 'name'}
+        self.strategy = STRATEGY[strategy['name']](NetworkView(model),
+                                                   self.controller,
+                                                   **strategy_args)
+        self.queue = []
+        # Number of events of the flow of the event being processed, including
+        # it, which precede the events it schedules
+        self.hops = 0
+        self.outbox = []
+        self.n_events = 0
+
+    def push(self, time, kind, hops, event):
+        """Schedule an event after *hops* events of its flow, ordered by the
+        key identifying it globally"""
+        heapq.heappush(self.queue, (time, kind, event['flow'], hops, event))
+
+    def schedule(self, event):
+        """Schedule an event generated by the strategy, either locally or by
+        sending it to the logical process owning its node"""
+        time = event.pop('t_event')
+        dest = self.owner[event['node']]
+        if dest == self.index:
+            self.push(time, _PACKET, self.hops, event)
+        else:
+            self.outbox.append((dest, time, self.hops, event))
+
+    def receive(self, messages):
+        """Receive new flows and packets sent by other logical processes"""
+        for time, kind, hops, event, state in messages:
+            for attr, value in state.items():
+                getattr(self.model, attr)[event['flow']] = value
+            self.push(time, kind, hops, event)
+
+    def run(self, window_end):
+        """Process all events occurring before the end of a window
+
+        Returns
+        -------
+        outbox : list
+            The (destination, message) pairs of the packets sent to other
+            logical processes
+        records : list
+            The notifications of the events processed, in the order of the
+            keys of the events
+        next_time : float
+            The time of the earliest pending event, if any
+        """
+        queue = self.queue
+        log = self.log
+        process_event = self.strategy.process_event
+        while queue and queue[0][0] < window_end:
+            time, kind, flow, hops, event = heapq.heappop(queue)
+            log.key = (time, kind, flow, hops)
+            self.hops = hops + 1
+            process_event(time, **event)
+            self.n_events += 1
+        outbox = [(dest, (time, _PACKET, hops, event,
+                          self.pop_flow_state(event['flow'])))
+                  for dest, time, hops, event in self.outbox]
+        self.outbox = []
+        records = log.records
+        log.records = []
+        return outbox, records, queue[0][0] if queue else None
+
+    def pop_flow_state(self, flow):
+        """Remove the state of a flow whose packet is sent to another logical
+        process"""
+        state = {}
+        for attr in _FLOW_STATE:
+            flows = getattr(self.model, attr)
+            if flow in flows:
+                state[attr] = flows.pop(flow)
+        return state
+
+
+def _serve(process, conn):
+    """Run a logical process in a forked process, receiving windows and
+    messages from the coordinating process"""
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        window_end, messages = job
+        process.receive(messages)
+        conn.send(process.run(window_end))
+    conn.send(process.n_events)
+    conn.close()
+
+
+def exec_pdes_experiment(topology, workload, netconf, strategy, cache_policy,
+                         collectors, n_processes=None, partitions=None,
+                         runtime=None):
+    """Execute the simulation of a packet-level scenario by conservative
+    parallel discrete-event simulation.
+
+    Parameters
+    ----------
+    topology : Topology
+        The FNSS Topology object modelling the network topology on which
+        experiments are run.
+    workload : iterable
+        The workload of the experiment. It must implement the `flows` method,
+        iterating over the requests starting new flows only
+    netconf : dict
+        Dictionary of attributes to inizialize the network model
+    strategy : tree
+        Strategy definition. The strategy must be among PDES_STRATEGIES
+    cache_policy : tree
+        Cache policy definition
+    collectors: dict
+        The collectors to be used, keyed by name
+    n_processes : int, optional
+        The number of logical processes, each run by a different forked
+        process if more than one. By default, the number of CPUs. Ignored if
+        *partitions* is provided
+    partitions : list of sets, optional
+        The nodes of the region simulated by each logical process. By default,
+        regions are computed by `partition_topology`
+    runtime : dict, optional
+        If provided, runtime statistics of the simulation are stored in it,
+        as by `exec_experiment`, except for the peak sizes of queues. Also,
+        PARTITIONS is the number of logical processes, LOOKAHEAD the lookahead
+        and WINDOWS the number of time windows simulated
+
+    Returns
+    -------
+    results : Tree
+        A tree with the aggregated simulation results from all collectors
+
+    Raises
+    ------
+    ValueError
+        If the strategy or the workload are not supported, if the partitions
+        are invalid or if there are several logical processes and this
+        process cannot fork processes, e.g. because it is daemonic
+    """
+    if strategy['name'] not in PDES_STRATEGIES:
+        raise ValueError('Strategy %s is not supported by the parallel engine'
+                         % strategy['name'])
+    if not hasattr(workload, 'flows'):
+        raise ValueError('The workload must implement the flows method')
+    clock = timeit.default_timer
+    t_start = clock()
+    model = NetworkModel(topology, cache_policy, **netconf)
+    view = NetworkView(model)
+    if partitions is None:
+        if n_processes is None:
+            n_processes = mp.cpu_count()
+        partitions = partition_topology(topology, n_processes)
+    owner = {v: i for i, part in enumerate(partitions) for v in part}
+    if set(owner) != set(topology.nodes()) or \
+            sum(len(part) for part in partitions) != len(owner):
+        raise ValueError('Each node must belong to exactly one partition')
+    n_partitions = len(partitions)
+    lookahead = min([delay for (u, v), delay in model.link_delay.items()
+                     if owner[u] != owner[v]] or [float('inf')])
+    if lookahead <= 0:
+        raise ValueError('Links between partitions must have positive delay')
+    collectors_inst = [DATA_COLLECTOR[name](view, **params)
+                       for name, params in collectors.items()]
+    collector = CollectorProxy(view, collectors_inst)
+    parallel = n_partitions > 1
+    if parallel and not can_fork():
+        raise ValueError('Experiments with %d logical processes require '
+                         'forking processes, which is not possible in this '
+                         'process' % n_partitions)
+    processes = [_LogicalProcess(i, model, strategy, owner)
+                 for i in range(n_partitions)]
+    if parallel:
+        ctx = mp.get_context('fork')
+        conns = []
+        workers = []
+        for process in processes:
+            conn, child_conn = ctx.Pipe()
+            worker = ctx.Process(target=_serve, args=(process, child_conn))
+            worker.daemon = True
+            worker.start()
+            child_conn.close()
+            conns.append(conn)
+            workers.append(worker)
+    t_simulation = clock()
+    t_measured = None
+    arrivals = workload.flows()
+    next_arrival = next(arrivals, None)
+    inboxes = [[] for _ in processes]
+    next_times = [None] * n_partitions
+    n_windows = 0
+    try:
+        while True:
+            times = [t for t in next_times if t is not None]
+            times.extend(message[0] for inbox in inboxes for message in inbox)
+            if next_arrival is not None:
+                times.append(next_arrival[0])
+            if not times:
+                break
+            window_end = min(times) + lookahead
+            n_arrivals = 0
+            while next_arrival is not None and next_arrival[0] < window_end:
+                if n_arrivals == MAX_WINDOW_ARRIVALS:
+                    window_end = next_arrival[0]
+                    break
+                time, event = next_arrival
+                if t_measured is None and event['log']:
+                    t_measured = clock()
+                inboxes[owner[event['node']]].append((time, _ARRIVAL, 0, event,
+                                                      {}))
+                n_arrivals += 1
+                next_arrival = next(arrivals, None)
+            if parallel:
+                for conn, inbox in zip(conns, inboxes):
+                    conn.send((window_end, inbox))
+                outputs = [conn.recv() for conn in conns]
+            else:
+                outputs = []
+                for process, inbox in zip(processes, inboxes):
+                    process.receive(inbox)
+                    outputs.append(process.run(window_end))
+            inboxes = [[] for _ in processes]
+            logs = []
+            for i, (outbox, records, next_time) in enumerate(outputs):
+                next_times[i] = next_time
+                for dest, message in outbox:
+                    inboxes[dest].append(message)
+                logs.append(records)
+            for _, name, args, kwargs in heapq.merge(*logs,
+                                                     key=operator.itemgetter(0)):
+                getattr(collector, name)(*args, **kwargs)
+            n_windows += 1
+        if parallel:
+            for conn in conns:
+                conn.send(None)
+            n_events = sum(conn.recv() for conn in conns)
+        else:
+            n_events = sum(process.n_events for process in processes)
+    finally:
+        if parallel:
+            for worker in workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+    t_end = clock()
+    if t_measured is None:
+        t_measured = t_end
+    if runtime is not None:
+        runtime['NETWORK_MODEL'] = t_simulation - t_start
+        runtime['WARMUP'] = t_measured - t_simulation
+        runtime['MEASURED'] = t_end - t_measured
+        runtime['EVENTS'] = n_events
+        runtime['PARTITIONS'] = n_partitions
+        runtime['LOOKAHEAD'] = lookahead
+        runtime['WINDOWS'] = n_windows
+    return collector.results()
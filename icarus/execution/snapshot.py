@@ -0,0 +1,125 @@
+"""Snapshots of the state of simulations.
+
+A snapshot stores the state of an experiment at a point of its simulation,
+i.e. the state of its network model, including the content and internal state
+of caches, pending events and cache queues, of its workload, of the global
+random number generator used by strategies and cache policies and, if the
+measured phase has started, of its data collectors. An experiment can then be
+simulated again from that point, as by the `snapshot` argument of
+`exec_experiment`.
+
+Snapshots taken at the end of the warmup phase allow filling caches once and
+running multiple variants of the measured phase of an experiment, e.g. with
+different data collectors or cache queue sizes. Snapshots taken periodically
+allow restarting long simulations from their last checkpoint.
+
+Snapshots are pickled and compressed with gzip. The topology and shortest
+paths are normally not stored, so that snapshots must be restored in a network
+model built from the same topology, cache placement and content placement.
+"""
+import gzip
+import random
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+__all__ = [
+    'write_snapshot',
+    'read_snapshot',
+    'restore_snapshot',
+]
+
+
+# Version of the format of snapshots, incremented whenever the format changes
+SNAPSHOT_VERSION = 2
+
+
+def write_snapshot(path, model, controller, workload, collectors=None,
+                   pending=()):
+    """Write a snapshot of the state of a simulation to a file
+
+    Parameters
+    ----------
+    path : str
+        The path of the file
+    model : NetworkModel
+        The network model
+    controller : NetworkController
+        The network controller
+    workload : iterable
+        The workload being iterated over. It must implement the `get_state`
+        method
+    collectors : dict, optional
+        The instances of the data collectors, keyed by name, if their state
+        must be stored as well
+    pending : list, optional
+        The (time, event) tuples generated by the workload but not processed
+        yet, which are processed first when the snapshot is restored
+    """
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'model': model.get_state(),
+        'live_flows': (controller.n_live_flows, controller.peak_live_flows),
+        'workload': workload.get_state(),
+        'random': random.getstate(),
+        'collectors': collectors,
+        'pending': list(pending),
+    }
+    # Collectors are detached from the network view, which is not part of
+    # the snapshot
+    views = {name: c.view for name, c in (collectors or {}).items()}
+    try:
+        for c in (collectors or {}).values():
+            c.view = None
+        with gzip.open(path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for name, view in views.items():
+            collectors[name].view = view
+
+
+def read_snapshot(path):
+    """Read a snapshot written by `write_snapshot`
+
+    Parameters
+    ----------
+    path : str
+        The path of the file
+
+    Returns
+    -------
+    snapshot : dict
+        The snapshot
+    """
+    with gzip.open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError('Snapshot %s has an unsupported format' % path)
+    return snapshot
+
+
+def restore_snapshot(snapshot, model, controller, workload):
+    """Restore the state of a simulation from a snapshot, so that the next
+    iteration over the workload resumes from the point at which the snapshot
+    was taken.
+
+    The data collectors and the pending events stored in the snapshot, under
+    the *collectors* and *pending* keys, are not restored by this function.
+
+    Parameters
+    ----------
+    snapshot : dict
+        The snapshot, as returned by `read_snapshot`. Its objects are restored
+        rather than copied, so a snapshot can be restored only once
+    model : NetworkModel
+        The network model
+    controller : NetworkController
+        The network controller
+    workload : iterable
+        The workload. It must implement the `set_state` method
+    """
+    model.set_state(snapshot['model'])
+    controller.n_live_flows, controller.peak_live_flows = snapshot['live_flows']
+    workload.set_state(snapshot['workload'])
+    random.setstate(snapshot['random'])
@@ -0,0 +1,317 @@
+"""Detection of the steady state of simulations and of the accuracy of their
+results.
+
+This module provides a collector observing the requests of the warmup phase of
+an experiment which detects when caches reach steady state, so that the
+warmup phase can be ended as soon as measurements are not biased by the
+initial state of caches rather than after a fixed number of requests.
+
+The collector is notified of the outcome of each request issued during the
+warmup phase by the network controller, to which it is attached as warmup
+collector, and the simulation engine ends the warmup phase of the workload
+as soon as the collector reports steady state.
+
+Similarly, this module provides a stopping rule observing the results of data
+collectors during the measured phase, so that the measured phase can be ended
+as soon as the confidence intervals of the measured metrics are narrow enough
+rather than after a fixed number of requests.
+"""
+from __future__ import division
+
+import numpy as np
+
+from icarus.execution.collectors import DataCollector
+from icarus.tools import means_confidence_interval
+from icarus.util import Tree, inheritdoc
+
+__all__ = [
+    'mser',
+    'WarmupDetector',
+    'StoppingRule',
+]
+
+
+# Minimum number of batches after the truncation point of the MSER rule
+MSER_MIN_TAIL = 10
+
+# Minimum number of batches from which confidence intervals are computed by the
+# stopping rule
+MIN_BATCHES = 10
+
+# Functions returning the cumulative (sum, count) pair of the samples of a
+# metric measured by a data collector so far, keyed by name of the collector
+_METRIC_COUNTERS = {
+    'CACHE_HIT_RATIO': lambda c: (c.cache_hits, c.cache_hits + c.serv_hits),
+    'LATENCY': lambda c: (c.latency, c.sess_count),
+}
+
+
+def mser(series, batch_size=5, min_tail=MSER_MIN_TAIL):
+    """Return the truncation point of a series according to the Marginal
+    Standard Error Rule (MSER).
+
+    The series is split in batches of *batch_size* observations and the
+    truncation point is the number of initial batches whose removal minimizes
+    the marginal standard error of the mean of the remaining batch means. With
+    the default batch size of 5, this is the MSER-5 rule.
+
+    Parameters
+    ----------
+    series : array-like
+        The series of observations
+    batch_size : int, optional
+        The number of observations per batch
+    min_tail : int, optional
+        The minimum number of batches kept after truncation
+
+    Returns
+    -------
+    truncation : int
+        The number of initial observations to remove, or *None* if the series
+        has no more than *min_tail* batches
+
+    References
+    ----------
+    K. P. White, M. J. Cobb, S. C. Spratt, A comparison of five steady-state
+    truncation heuristics for simulation, Proc. of the Winter Simulation
+    Conference, 2000
+    """
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    series = np.asarray(series, dtype=float)
+    n_batches = len(series) // batch_size
+    if n_batches <= min_tail:
+        return None
+    batches = series[:n_batches * batch_size].reshape(n_batches, batch_size).mean(axis=1)
+    return _mser_batches(batches, min_tail) * batch_size
+
+
+def _mser_batches(batches, min_tail):
+    """Return the number of initial batch means minimizing the MSER statistic,
+    keeping at least *min_tail* batches"""
+    n = len(batches)
+    # Sums of the batch means and of their squares from each batch to the end
+    tail_sum = np.cumsum(batches[::-1])[::-1]
+    tail_sq_sum = np.cumsum(batches[::-1] ** 2)[::-1]
+    k = np.arange(n, 0, -1, dtype=float)
+    stat = (tail_sq_sum - tail_sum ** 2 / k) / k ** 2
+    return int(np.argmin(stat[:n - min_tail + 1]))
+
+
+class WarmupDetector(DataCollector):
+    """Collector detecting the steady state of caches from the series of
+    outcomes, hit or miss, of the requests of the warmup phase.
+
+    Every *interval* requests, the MSER rule is applied to the series of
+    outcomes observed so far. Caches are deemed in steady state as soon as the
+    truncation point falls in the first half of the series, i.e. the series
+    is long enough for its initial transient to be identified, and it is the
+    same as the truncation point found *interval* requests earlier. The
+    latter condition prevents a hit ratio still slowly increasing, whose trend
+    is hidden by the variance of short series, from being deemed stationary.
+    """
+
+    def __init__(self, view, batch_size=5, interval=1000, min_requests=0,
+                 **params):
+        """Constructor
+
+        Parameters
+        ----------
+        view : NetworkView
+            An instance of the network view
+        batch_size : int, optional
+            The number of requests per batch of the MSER rule
+        interval : int, optional
+            The number of requests between two applications of the rule
+        min_requests : int, optional
+            The minimum number of requests of the warmup phase
+        """
+        super(WarmupDetector, self).__init__(view, **params)
+        if batch_size < 1 or interval < 1:
+            raise ValueError('batch_size and interval must be positive')
+        self.batch_size = batch_size
+        self.interval = interval
+        self.min_requests = max(min_requests, interval)
+        self.batches = []
+        self.batch_hits = 0
+        self.n_samples = 0
+        self.steady = False
+        self.truncation = None
+        self.last_truncation = None
+
+    def sample(self, hit):
+        """Record the outcome of a request
+
+        Parameters
+        ----------
+        hit : bool
+            *True* if the request was served by a cache, *False* otherwise
+        """
+        self.n_samples += 1
+        self.batch_hits += hit
+        if self.n_samples % self.batch_size == 0:
+            self.batches.append(self.batch_hits / self.batch_size)
+            self.batch_hits = 0
+        if self.n_samples % self.interval == 0 and \
+                self.n_samples >= self.min_requests and \
+                len(self.batches) > 2 * MSER_MIN_TAIL:
+            n_batches = len(self.batches)
+            d = _mser_batches(np.asarray(self.batches), MSER_MIN_TAIL)
+            if d <= n_batches // 2 and d == self.last_truncation:
+                self.steady = True
+                self.truncation = d * self.batch_size
+            self.last_truncation = d
+
+    @inheritdoc(DataCollector)
+    def cache_hit(self, node):
+        self.sample(True)
+
+    @inheritdoc(DataCollector)
+    def cache_hit_flow(self, node, content, flow):
+        self.sample(True)
+
+    @inheritdoc(DataCollector)
+    def server_hit(self, node):
+        self.sample(False)
+
+    @inheritdoc(DataCollector)
+    def server_hit_flow(self, node, content, flow):
+        self.sample(False)
+
+    @inheritdoc(DataCollector)
+    def results(self):
+        return Tree({'STEADY_STATE': self.steady, 'N_SAMPLES': self.n_samples,
+                     'TRUNCATION': self.truncation})
+
+
+class StoppingRule(object):
+    """Sequential stopping rule ending the measured phase of an experiment as
+    soon as the mean of the metrics measured by data collectors is estimated
+    with the requested relative precision.
+
+    The measured requests are split in batches of *batch_size* requests and
+    the mean of each metric over each batch is computed from the results of
+    the data collector measuring it. The confidence interval of each metric is
+    computed from its batch means, which, for batches long enough, are
+    approximately independent and normally distributed. The measured phase
+    can be stopped as soon as the half-width of the confidence intervals of
+    all metrics is not greater than *precision* times their mean.
+
+    Currently supported metrics are the cache hit ratio (CACHE_HIT_RATIO) and
+    the mean latency (LATENCY).
+    """
+
+    def __init__(self, collectors, metrics=('CACHE_HIT_RATIO',), precision=0.01,
+                 confidence=0.95, batch_size=1000, min_requests=10000,
+                 max_requests=None):
+        """Constructor
+
+        Parameters
+        ----------
+        collectors : dict
+            The instances of the data collectors of the experiment, keyed by
+            name
+        metrics : list of str, optional
+            The names of the metrics whose precision is checked. The data
+            collector measuring each metric must be among *collectors*
+        precision : float, optional
+            The maximum ratio between the half-width of the confidence interval
+            and the mean of each metric
+        confidence : float, optional
+            The confidence level of the confidence intervals
+        batch_size : int, optional
+            The number of measured requests per batch
+        min_requests : int, optional
+            The minimum number of measured requests
+        max_requests : int, optional
+            The maximum number of measured requests, if any. In any case, no
+            more requests than those of the measured phase of the workload are
+            measured
+        """
+        if isinstance(metrics, str):
+            metrics = [metrics]
+        if len(metrics) == 0:
+            raise ValueError('At least one metric must be specified')
+        for metric in metrics:
+            if metric not in _METRIC_COUNTERS:
+                raise ValueError('Metric %s is not supported by the stopping '
+                                 'rule' % metric)
+            if metric not in collectors:
+                raise ValueError('Metric %s is not measured by any data '
+                                 'collector' % metric)
+        if precision <= 0:
+            raise ValueError('precision must be positive')
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+        self.collectors = {m: collectors[m] for m in metrics}
+        self.metrics = list(metrics)
+        self.precision = precision
+        self.confidence = confidence
+        self.batch_size = batch_size
+        self.min_requests = max(min_requests, MIN_BATCHES * batch_size)
+        self.max_requests = max_requests
+        self.batches = {m: [] for m in self.metrics}
+        self.counters = {m: (0, 0) for m in self.metrics}
+        self.half_widths = {m: None for m in self.metrics}
+        self.n_requests = 0
+        self.converged = False
+
+    def check(self, n_requests):
+        """Check whether the measured phase can be stopped
+
+        Parameters
+        ----------
+        n_requests : int
+            The number of measured requests issued so far
+
+        Returns
+        -------
+        stop : bool
+            *True* if the measured phase can be stopped, *False* otherwise
+        """
+        if n_requests < self.n_requests + self.batch_size:
+            return False
+        self.n_requests = n_requests
+        for metric in self.metrics:
+            total, count = _METRIC_COUNTERS[metric](self.collectors[metric])
+            last_total, last_count = self.counters[metric]
+            if count > last_count:
+                self.batches[metric].append((total - last_total) /
+                                            (count - last_count))
+            self.counters[metric] = (total, count)
+        if self.max_requests is not None and n_requests >= self.max_requests:
+            self._update_half_widths()
+            return True
+        if n_requests < self.min_requests:
+            return False
+        self._update_half_widths()
+        self.converged = all(w is not None and w <= self.precision
+                             for w in self.half_widths.values())
+        return self.converged
+
+    def _update_half_widths(self):
+        """Update the relative half-widths of the confidence intervals of all
+        metrics"""
+        for metric, batches in self.batches.items():
+            if len(batches) < MIN_BATCHES:
+                continue
+            mean, err = means_confidence_interval(batches, self.confidence)
+            if mean != 0:
+                self.half_widths[metric] = float(err / abs(mean))
+            else:
+                self.half_widths[metric] = 0.0 if err == 0 else None
+
+    def results(self):
+        """Return the number of measured requests when the rule was last
+        checked (N_REQUESTS), whether the requested precision was reached
+        (CONVERGED) and the relative half-width of the confidence interval of
+        each metric (HALF_WIDTH)
+
+        Returns
+        -------
+        results : Tree
+            The results of the stopping rule
+        """
+        return Tree({'N_REQUESTS': self.n_requests,
+                     'CONVERGED': self.converged,
+                     'HALF_WIDTH': dict(self.half_widths)})
@@ -0,0 +1,71 @@
+import unittest
+
+import icarus.execution as analytical
+from icarus.registry import TOPOLOGY_FACTORY, WORKLOAD, CACHE_PLACEMENT, \
+                            CONTENT_PLACEMENT
+
+
+class TestExecAnalyticalExperiment(unittest.TestCase):
+
+    collectors = {'CACHE_HIT_RATIO': {}, 'LATENCY': {}, 'LINK_LOAD': {}}
+
+    def run_experiment(self, strategy, cache_policy='LRU', simulate=False,
+                       collectors=None, runtime=None, **kwargs):
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        workload = WORKLOAD['STATIONARY'](topology, n_contents=500, alpha=0.8,
+                                          rate=10, n_warmup=10000,
+                                          n_measured=20000, seed=1)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=200)
+        CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+        args = (topology, workload, {}, {'name': strategy},
+                {'name': cache_policy}, collectors or self.collectors)
+        if simulate:
+            return analytical.exec_experiment(*args)
+        return analytical.exec_analytical_experiment(*args, runtime=runtime,
+                                                     **kwargs)
+
+    def test_same_as_simulation(self):
+        for strategy in ('LCE', 'HR_SYMM'):
+            runtime = {}
+            estimate = self.run_experiment(strategy, runtime=runtime)
+            results = self.run_experiment(strategy, simulate=True)
+            self.assertEqual(0, runtime['EVENTS'])
+            self.assertGreaterEqual(runtime['ITERATIONS'], 1)
+            # Miss streams are assumed to be independent reference streams,
+            # which overestimates the hit ratio of caches of LCE paths
+            self.assertAlmostEqual(results['CACHE_HIT_RATIO']['MEAN'],
+                                   estimate['CACHE_HIT_RATIO']['MEAN'],
+                                   delta=0.06)
+            self.assertAlmostEqual(1, estimate['LATENCY']['MEAN'] /
+                                   results['LATENCY']['MEAN'], delta=0.1)
+            for key in ('MEAN_INTERNAL', 'MEAN_EXTERNAL'):
+                self.assertAlmostEqual(1, estimate['LINK_LOAD'][key] /
+                                       results['LINK_LOAD'][key], delta=0.15)
+            hit_ratio = estimate['CACHE_HIT_RATIO']
+            self.assertAlmostEqual(1, sum(hit_ratio['PER_NODE_CACHE_HIT_RATIO'].values()) +
+                                   sum(hit_ratio['PER_NODE_SERVER_HIT_RATIO'].values()))
+
+    def test_lcd(self):
+        lce = self.run_experiment('LCE')
+        lcd = self.run_experiment('LCD')
+        self.assertGreater(lcd['CACHE_HIT_RATIO']['MEAN'],
+                           lce['CACHE_HIT_RATIO']['MEAN'])
+        for results in (lce, lcd):
+            self.assertTrue(results['ANALYTICAL']['CONVERGED'])
+            self.assertLessEqual(results['ANALYTICAL']['DELTA'], 1e-4)
+        # Caches are updated from the latest hit probabilities of the others
+        self.assertLessEqual(lce['ANALYTICAL']['ITERATIONS'], 4)
+
+    def test_not_converged(self):
+        with self.assertLogs('analytical', level='WARNING'):
+            results = self.run_experiment('LCD', max_iter=2)
+        self.assertFalse(results['ANALYTICAL']['CONVERGED'])
+        self.assertEqual(2, results['ANALYTICAL']['ITERATIONS'])
+        self.assertGreater(results['ANALYTICAL']['DELTA'], 1e-4)
+
+    def test_not_supported(self):
+        self.assertRaises(ValueError, self.run_experiment, 'PROB_CACHE')
+        self.assertRaises(ValueError, self.run_experiment, 'LCD', 'FIFO')
+        self.assertRaises(ValueError, self.run_experiment, 'LCE', 'PERFECT_LFU')
+        self.assertRaises(ValueError, self.run_experiment, 'LCE',
+                          collectors={'PATH_STRETCH': {}})
@@ -1,4 +1,5 @@
 from __future__ import division
+import math
 import unittest
 
 import icarus.execution as collectors
@@ -129,6 +130,31 @@ class TestLatencyCollector(unittest.TestCase):
         res = c.results()
         self.assertEqual((10 + 20 + 2 * (2 + 4)) / 2, res['MEAN'])
 
+    def test_exact(self):
+        n = collectors.LATENCY_FOLD_SIZE + 10
+        latencies = [1e16, 1.0] + [0.1] * n + [-1e16]
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: v})()
+        c = collectors.LatencyCollector(view)
+        for i, latency in enumerate(latencies):
+            c.start_session(float(i), 1, 'CONTENT')
+            c.request_hop(1, latency)
+            c.end_session()
+        self.assertEqual(math.fsum(latencies) / len(latencies), c.results()['MEAN'])
+
+    def test_merge_exact(self):
+        latencies = [0.1] * 10 + [1e16, 1.0, -1e16]
+        view = type('MockNetworkView', (), {'link_delay': lambda s, u, v: v})()
+        c = collectors.LatencyCollector(view)
+        other = collectors.LatencyCollector(view)
+        for i, latency in enumerate(latencies):
+            collector = c if i % 2 else other
+            collector.start_session(float(i), 1, 'CONTENT')
+            collector.request_hop(1, latency)
+            collector.end_session()
+        c.merge(other)
+        self.assertEqual(len(latencies), c.sess_count)
+        self.assertEqual(math.fsum(latencies) / len(latencies), c.results()['MEAN'])
+
     def test_main_path(self):
 
         link_delay = {(1, 2): 2, (2, 3): 10,
@@ -236,3 +262,51 @@ class TestCacheHitRatioCollector(unittest.TestCase):
 
         res = c.results()
         self.assertEqual({1: 0.5, 2: 0.25}, res['PER_CONTENT'])
+
+
+class TestMerge(unittest.TestCase):
+
+    def test_link_load(self):
+        view = type('MockNetworkView', (), {'link_type': lambda s, u, v: 'internal'})()
+        c1 = collectors.LinkLoadCollector(view)
+        c1.start_session(3.0, 1, 4)
+        c1.request_hop(1, 2)
+        c1.end_session()
+        c2 = collectors.LinkLoadCollector(view)
+        c2.start_session(2.0, 1, 5)
+        c2.request_hop(1, 2)
+        c2.content_hop(2, 1)
+        c2.end_session()
+        c2.start_session(5.0, 1, 5)
+        c2.end_session()
+        c1.merge(c2)
+        self.assertEqual(2.0, c1.t_start)
+        self.assertEqual(5.0, c1.t_end)
+        self.assertEqual(2, c1.req_count[(1, 2)])
+        self.assertEqual(1, c1.cont_count[(2, 1)])
+
+    def test_cache_hit_ratio(self):
+        view = type('MockNetworkView', (), {})()
+        c1 = collectors.CacheHitRatioCollector(view, content_hits=True)
+        c1.start_session(3.0, 1, 'A')
+        c1.cache_hit(1)
+        c1.end_session()
+        c2 = collectors.CacheHitRatioCollector(view, content_hits=True)
+        c2.start_session(4.0, 1, 'B')
+        c2.server_hit(2)
+        c2.end_session()
+        c2.start_session(5.0, 1, 'A')
+        c2.server_hit(2)
+        c2.end_session()
+        c1.merge(c2)
+        res = c1.results()
+        self.assertAlmostEqual(1 / 3, res['MEAN'])
+        self.assertEqual(0.5, res['PER_CONTENT']['A'])
+        self.assertEqual(0.0, res['PER_CONTENT']['B'])
+        self.assertAlmostEqual(1 / 3, res['PER_NODE_CACHE_HIT_RATIO'][1])
+        self.assertAlmostEqual(2 / 3, res['PER_NODE_SERVER_HIT_RATIO'][2])
+
+    def test_not_supported(self):
+        c = collectors.DummyCollector(None)
+        self.assertRaises(NotImplementedError, c.merge,
+                          collectors.DummyCollector(None))
@@ -1,4 +1,5 @@
 from __future__ import division
+import pickle
 import unittest
 
 import networkx as nx
@@ -42,6 +43,72 @@ class TestSymmetrifyPaths(unittest.TestCase):
         self.assertEqual(list(path[2][3]), list(reversed(path[3][2])))
 
 
+class TestPathTable(unittest.TestCase):
+
+    def setUp(self):
+        self.topology = fnss.ring_topology(8)
+        self.topology.add_edge(0, 4)
+        self.topology.add_node(8)
+        self.paths = network.symmetrify_paths(
+                        dict(nx.all_pairs_dijkstra_path(self.topology)))
+        self.table = network.PathTable.from_paths(self.paths)
+
+    def assert_same_paths(self, table):
+        self.assertEqual(set(self.paths), set(table))
+        for u in self.paths:
+            self.assertEqual(set(self.paths[u]), set(table[u]))
+            for v in self.paths[u]:
+                self.assertEqual(self.paths[u][v], table[u][v])
+
+    def test_paths(self):
+        self.assert_same_paths(self.table)
+
+    def test_from_topology(self):
+        self.assert_same_paths(network.PathTable.from_topology(self.topology))
+
+    def test_no_path(self):
+        self.assertNotIn(8, self.table[0])
+        self.assertRaises(KeyError, self.table[0].__getitem__, 8)
+        self.assertRaises(KeyError, self.table.__getitem__, 9)
+
+    def test_rows_not_memoized_by_table(self):
+        row = self.table[0]
+        self.assertEqual(self.paths[0][5], row[5])
+        self.assertIsNot(row, self.table[0])
+        self.assertEqual({5}, set(row._paths))
+        self.assertEqual(len(self.paths[0]), len(self.table[0]))
+        self.assertEqual({}, self.table[0]._paths)
+
+    def test_next_hop(self):
+        index = self.table.index
+        for u in self.paths:
+            for v, path in self.paths[u].items():
+                expected = index[path[1]] if len(path) > 1 else -1
+                self.assertEqual(expected, self.table.next_hop[index[u], index[v]])
+
+    def test_pickle(self):
+        self.assert_same_paths(pickle.loads(pickle.dumps(self.table)))
+
+    @unittest.skipIf(network.shared_memory is None, 'Requires shared memory')
+    def test_shared_memory(self):
+        self.table.share()
+        try:
+            table = pickle.loads(pickle.dumps(self.table))
+            self.assert_same_paths(table)
+            table.release()
+        finally:
+            self.table.release()
+
+    def test_network_model(self):
+        topology = IcnTopology(self.topology)
+        for v in topology.nodes():
+            fnss.add_stack(topology, v, 'router', {'cache_size': 1})
+        model = network.NetworkModel(topology, cache_policy={'name': 'FIFO'},
+                                     shortest_path=self.table)
+        view = network.NetworkView(model)
+        self.assertEqual(self.paths[1][5], view.shortest_path(1, 5))
+
+
 class TestNetworkMVC(unittest.TestCase):
 
     @classmethod
@@ -0,0 +1,103 @@
+import multiprocessing as mp
+import unittest
+
+import icarus.execution as partition
+import icarus.execution.partition as partition_module
+from icarus.registry import TOPOLOGY_FACTORY, WORKLOAD, CACHE_PLACEMENT, \
+                            CONTENT_PLACEMENT, DATA_COLLECTOR
+from icarus.util import can_fork
+
+
+def run_partitioned(strategy, n_processes):
+    """Run a partitioned experiment, e.g. in a worker process"""
+    test = TestExecPartitionedExperiment()
+    return test.run_experiment(strategy, n_processes)
+
+
+class TestExecPartitionedExperiment(unittest.TestCase):
+
+    collectors = {'CACHE_HIT_RATIO': {}, 'LATENCY': {}, 'LINK_LOAD': {}}
+
+    integer_delays = True
+
+    def scenario(self):
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        if not self.integer_delays:
+            for _, _, data in topology.edges(data=True):
+                data['delay'] = data['delay'] * 1.1 + 0.37
+        workload = WORKLOAD['STATIONARY'](topology, n_contents=500, alpha=0.8,
+                                          n_warmup=1000, n_measured=2000,
+                                          seed=1)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=50)
+        CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+        return topology, workload
+
+    def run_experiment(self, strategy, n_processes=None):
+        topology, workload = self.scenario()
+        args = (topology, workload, {}, {'name': strategy}, {'name': 'LRU'},
+                self.collectors)
+        if n_processes is None:
+            return partition.exec_experiment(*args)
+        runtime = {}
+        results = partition.exec_partitioned_experiment(*args,
+                                                        n_processes=n_processes,
+                                                        runtime=runtime)
+        self.assertEqual(3000, runtime['EVENTS'])
+        return results
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_same_as_serial(self):
+        for strategy in ('HR_SYMM', 'HR_MULTICAST'):
+            serial = self.run_experiment(strategy)
+            partitioned = self.run_experiment(strategy, n_processes=3)
+            self.assertEqual(serial['CACHE_HIT_RATIO'],
+                             partitioned['CACHE_HIT_RATIO'])
+            self.assertEqual(serial['LINK_LOAD'], partitioned['LINK_LOAD'])
+            self.assertEqual(serial['LATENCY']['MEAN'],
+                             partitioned['LATENCY']['MEAN'])
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_same_as_serial_all_collectors(self):
+        self.collectors = {name: {} for name, collector in DATA_COLLECTOR.items()
+                           if collector.merge is not partition.DataCollector.merge}
+        self.assertIn('PATH_STRETCH', self.collectors)
+        serial = self.run_experiment('HR_SYMM')
+        for n_processes in (2, 3):
+            partitioned = self.run_experiment('HR_SYMM', n_processes)
+            for name in self.collectors:
+                self.assertEqual(serial[name], partitioned[name])
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_same_as_serial_non_integer_delays(self):
+        self.integer_delays = False
+        self.collectors = {'LATENCY': {}, 'PATH_STRETCH': {}}
+        serial = self.run_experiment('HR_SYMM')
+        chunk = partition_module.PARTITION_CHUNK
+        partition_module.PARTITION_CHUNK = 64
+        try:
+            partitioned = self.run_experiment('HR_SYMM', n_processes=3)
+        finally:
+            partition_module.PARTITION_CHUNK = chunk
+        self.assertNotEqual(round(serial['LATENCY']['MEAN']),
+                            serial['LATENCY']['MEAN'])
+        self.assertEqual(serial['LATENCY'], partitioned['LATENCY'])
+        self.assertEqual(serial['PATH_STRETCH'], partitioned['PATH_STRETCH'])
+
+    def test_single_partition(self):
+        serial = self.run_experiment('HR_ASYMM')
+        partitioned = self.run_experiment('HR_ASYMM', n_processes=1)
+        self.assertEqual(serial['CACHE_HIT_RATIO'],
+                         partitioned['CACHE_HIT_RATIO'])
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_daemonic_process(self):
+        pool = mp.get_context('fork').Pool(1)
+        try:
+            self.assertRaises(ValueError, pool.apply, run_partitioned,
+                              ('HR_SYMM', 2))
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_not_partitionable(self):
+        self.assertRaises(ValueError, self.run_experiment, 'LCE', 2)
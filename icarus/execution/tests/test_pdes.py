@@ -0,0 +1,144 @@
+import multiprocessing as mp
+import unittest
+
+import icarus.execution as pdes
+from icarus.registry import TOPOLOGY_FACTORY, WORKLOAD, CACHE_PLACEMENT, \
+                            CONTENT_PLACEMENT
+from icarus.util import can_fork
+
+
+class SimultaneousFlows(object):
+    """Workload starting the flows of another workload in bursts at integer
+    times, so that, with integer link delays, packets of different flows
+    occur at the same node at the same time"""
+
+    def __init__(self, workload, burst):
+        self.workload = workload
+        self.burst = burst
+
+    def flows(self):
+        for i, (_, event) in enumerate(self.workload.flows()):
+            yield float(i // self.burst), event
+
+
+def run_pdes(strategy, n_processes):
+    """Run a PDES experiment, e.g. in a worker process"""
+    test = TestExecPdesExperiment()
+    return test.run_experiment(strategy, n_processes)
+
+
+class TestExecPdesExperiment(unittest.TestCase):
+
+    collectors = {'CACHE_HIT_RATIO': {}, 'LATENCY': {}, 'LINK_LOAD': {}}
+
+    def scenario(self, workload='STATIONARY_PACKET_LEVEL'):
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        workload = WORKLOAD[workload](topology, n_contents=500, alpha=0.8,
+                                      rate=10, n_warmup=500, n_measured=1500,
+                                      seed=1)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=50)
+        CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+        return topology, workload
+
+    def run_experiment(self, strategy, n_processes=None, partitions=None,
+                       workload='STATIONARY_PACKET_LEVEL', runtime=None):
+        topology, workload = self.scenario(workload)
+        args = (topology, workload, {}, {'name': strategy}, {'name': 'LRU'},
+                self.collectors)
+        if n_processes is None and partitions is None:
+            return pdes.exec_experiment(*args, runtime=runtime)
+        return pdes.exec_pdes_experiment(*args, n_processes=n_processes,
+                                         partitions=partitions,
+                                         runtime=runtime)
+
+    def assert_same_results(self, serial, parallel):
+        self.assertEqual(serial['CACHE_HIT_RATIO'], parallel['CACHE_HIT_RATIO'])
+        self.assertEqual(serial['LINK_LOAD'], parallel['LINK_LOAD'])
+        self.assertEqual(serial['LATENCY'], parallel['LATENCY'])
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_same_as_serial(self):
+        for strategy in ('LCE_PKT_LEVEL', 'LCD_PKT_LEVEL'):
+            serial_runtime = {}
+            serial = self.run_experiment(strategy, runtime=serial_runtime)
+            for n_processes in (1, 3):
+                runtime = {}
+                parallel = self.run_experiment(strategy, n_processes,
+                                               runtime=runtime)
+                self.assert_same_results(serial, parallel)
+                self.assertEqual(serial_runtime['EVENTS'], runtime['EVENTS'])
+                self.assertEqual(n_processes, runtime['PARTITIONS'])
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_same_as_serial_path_topology(self):
+        # Each node of a path is a region, so that each packet is a message
+        topology = TOPOLOGY_FACTORY['PATH'](5, delay=1)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=20)
+        partitions = [{v} for v in topology.nodes()]
+        results = []
+        for parts in (None, partitions):
+            workload = WORKLOAD['STATIONARY_PACKET_LEVEL'](
+                topology, n_contents=50, alpha=1.0, rate=0.5, n_warmup=200,
+                n_measured=500, seed=1)
+            CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+            args = (topology, workload, {}, {'name': 'LCD_PKT_LEVEL'},
+                    {'name': 'LRU'}, self.collectors)
+            if parts is None:
+                results.append(pdes.exec_experiment(*args))
+            else:
+                runtime = {}
+                results.append(pdes.exec_pdes_experiment(*args,
+                                                         partitions=parts,
+                                                         runtime=runtime))
+                self.assertEqual(1, runtime['LOOKAHEAD'])
+        self.assert_same_results(*results)
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_simultaneous_events(self):
+        # Packets occurring at the same node at the same time, whether they
+        # cross regions or not, are processed in the same order whatever the
+        # regions and their order
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=50)
+        regions = pdes.partition_topology(topology, 3)
+        results = []
+        for partitions in ([set(topology.nodes())], regions, regions[::-1],
+                           pdes.partition_topology(topology, 5)):
+            workload = WORKLOAD['STATIONARY_PACKET_LEVEL'](
+                topology, n_contents=50, alpha=1.0, rate=0.5, n_warmup=200,
+                n_measured=1000, seed=1)
+            CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+            results.append(pdes.exec_pdes_experiment(
+                topology, SimultaneousFlows(workload, 8), {},
+                {'name': 'LCE_PKT_LEVEL'}, {'name': 'LRU'}, self.collectors,
+                partitions=partitions))
+        self.assertGreater(results[0]['CACHE_HIT_RATIO']['MEAN'], 0)
+        for result in results[1:]:
+            self.assert_same_results(results[0], result)
+
+    def test_partition_topology(self):
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        partitions = pdes.partition_topology(topology, 4)
+        self.assertLessEqual(len(partitions), 4)
+        self.assertEqual(set(topology.nodes()), set.union(*partitions))
+        self.assertEqual(topology.number_of_nodes(),
+                         sum(len(p) for p in partitions))
+        self.assertEqual([set(topology.nodes())],
+                         pdes.partition_topology(topology, 1))
+
+    @unittest.skipUnless(can_fork(), 'Processes cannot be forked')
+    def test_daemonic_process(self):
+        pool = mp.get_context('fork').Pool(1)
+        try:
+            self.assertRaises(ValueError, pool.apply, run_pdes,
+                              ('LCE_PKT_LEVEL', 2))
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_not_supported(self):
+        self.assertRaises(ValueError, self.run_experiment, 'LCE_PL_CD', 2)
+        self.assertRaises(ValueError, self.run_experiment, 'LCE_PKT_LEVEL', 2,
+                          workload='STATIONARY')
+        self.assertRaises(ValueError, self.run_experiment, 'LCE_PKT_LEVEL',
+                          partitions=[{0, 1}])
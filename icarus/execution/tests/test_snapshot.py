@@ -0,0 +1,83 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import icarus.execution as snapshot
+from icarus.registry import TOPOLOGY_FACTORY, WORKLOAD, CACHE_PLACEMENT, \
+                            CONTENT_PLACEMENT
+
+
+class _Trace(list):
+    """Workload not supporting snapshots"""
+
+
+class TestSnapshot(unittest.TestCase):
+
+    collectors = {'CACHE_HIT_RATIO': {}, 'LATENCY': {}, 'LINK_LOAD': {}}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'experiment.snap')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_experiment(self, workload, strategy, cache_policy='LRU',
+                       collectors=None, **kwargs):
+        random.seed(1)
+        topology = TOPOLOGY_FACTORY['GEANT']()
+        workload = WORKLOAD[workload](topology, n_contents=200, alpha=0.8,
+                                      rate=10, n_warmup=500, n_measured=1000,
+                                      seed=1)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=30)
+        CONTENT_PLACEMENT['UNIFORM'](topology, workload.contents, seed=1)
+        return snapshot.exec_experiment(topology, workload, {},
+                                        {'name': strategy},
+                                        {'name': cache_policy},
+                                        collectors or self.collectors,
+                                        **kwargs)
+
+    def assert_same_results(self, expected, actual):
+        for name in self.collectors:
+            self.assertEqual(expected[name], actual[name])
+
+    def test_warm_start(self):
+        for workload, strategy in (('STATIONARY', 'LCE'),
+                                   ('STATIONARY_PACKET_LEVEL', 'LCD_PKT_LEVEL')):
+            expected = self.run_experiment(workload, strategy,
+                                           checkpoint={'path': self.path})
+            actual = self.run_experiment(workload, strategy,
+                                         snapshot=self.path)
+            self.assert_same_results(expected, actual)
+            # Snapshots of the warmup phase can be restored with different
+            # data collectors
+            results = self.run_experiment(workload, strategy,
+                                          collectors={'LATENCY': {}},
+                                          snapshot=self.path)
+            self.assertEqual(expected['LATENCY'], results['LATENCY'])
+
+    def test_restart(self):
+        # Random draws of the RAND cache policy are restored as well
+        expected = self.run_experiment('STATIONARY_PACKET_LEVEL_CACHE_DELAY',
+                                       'LCE_PL_CD', 'RAND')
+        self.run_experiment('STATIONARY_PACKET_LEVEL_CACHE_DELAY',
+                            'LCE_PL_CD', 'RAND',
+                            checkpoint={'path': self.path, 'interval': 5000})
+        actual = self.run_experiment('STATIONARY_PACKET_LEVEL_CACHE_DELAY',
+                                     'LCE_PL_CD', 'RAND', snapshot=self.path)
+        self.assert_same_results(expected, actual)
+        self.assertRaises(ValueError, self.run_experiment,
+                          'STATIONARY_PACKET_LEVEL_CACHE_DELAY', 'LCE_PL_CD',
+                          'RAND', collectors={'LATENCY': {}},
+                          snapshot=self.path)
+
+    def test_not_supported(self):
+        topology = TOPOLOGY_FACTORY['PATH'](3)
+        CACHE_PLACEMENT['UNIFORM'](topology, cache_budget=2)
+        CONTENT_PLACEMENT['UNIFORM'](topology, range(1, 4), seed=1)
+        workload = _Trace([(1.0, {'receiver': 0, 'content': 1, 'log': True})])
+        self.assertRaises(ValueError, snapshot.exec_experiment, topology,
+                          workload, {}, {'name': 'LCE'}, {'name': 'LRU'},
+                          self.collectors, checkpoint={'path': self.path})
@@ -0,0 +1,98 @@
+import random
+import unittest
+
+import icarus.execution as steadystate
+
+
+class TestMser(unittest.TestCase):
+
+    def test_transient(self):
+        random.seed(1)
+        series = [0.0] * 200 + [1 + random.gauss(0, 0.1) for _ in range(800)]
+        self.assertEqual(200, steadystate.mser(series))
+
+    def test_stationary(self):
+        random.seed(1)
+        series = [random.gauss(0, 1) for _ in range(1000)]
+        self.assertLessEqual(steadystate.mser(series), 500)
+
+    def test_short(self):
+        self.assertIsNone(steadystate.mser([1, 2, 3], batch_size=1, min_tail=5))
+        self.assertRaises(ValueError, steadystate.mser, [1, 2, 3], 0)
+
+
+class TestWarmupDetector(unittest.TestCase):
+
+    def test_steady_state(self):
+        random.seed(1)
+        detector = steadystate.WarmupDetector(None, interval=500)
+        # Hit ratio increasing while caches are filled, then stationary
+        for i in range(5000):
+            detector.sample(random.random() < min(i / 1000, 0.5))
+            if detector.steady:
+                break
+        self.assertTrue(detector.steady)
+        self.assertGreater(detector.n_samples, 1000)
+        self.assertLess(detector.n_samples, 5000)
+        self.assertGreater(detector.truncation, 0)
+
+    def test_min_requests(self):
+        detector = steadystate.WarmupDetector(None, interval=100,
+                                              min_requests=1000)
+        for _ in range(1099):
+            detector.cache_hit(1)
+        self.assertFalse(detector.steady)
+        detector.server_hit(2)
+        self.assertTrue(detector.steady)
+        self.assertEqual(1100, detector.n_samples)
+
+
+class _HitRatioCollector(object):
+
+    def __init__(self):
+        self.cache_hits = 0
+        self.serv_hits = 0
+
+
+class TestStoppingRule(unittest.TestCase):
+
+    def test_converged(self):
+        random.seed(1)
+        collector = _HitRatioCollector()
+        rule = steadystate.StoppingRule({'CACHE_HIT_RATIO': collector},
+                                        precision=0.02, batch_size=100,
+                                        min_requests=0)
+        for i in range(1, 100001):
+            if random.random() < 0.5:
+                collector.cache_hits += 1
+            else:
+                collector.serv_hits += 1
+            if rule.check(i):
+                break
+        self.assertTrue(rule.converged)
+        self.assertGreaterEqual(rule.n_requests, 1000)
+        self.assertLess(rule.n_requests, 100000)
+        results = rule.results()
+        self.assertLessEqual(results['HALF_WIDTH']['CACHE_HIT_RATIO'], 0.02)
+        self.assertEqual(rule.n_requests, results['N_REQUESTS'])
+
+    def test_max_requests(self):
+        random.seed(1)
+        collector = _HitRatioCollector()
+        rule = steadystate.StoppingRule({'CACHE_HIT_RATIO': collector},
+                                        precision=0.0001, batch_size=10,
+                                        max_requests=500)
+        for i in range(1, 1001):
+            collector.cache_hits += random.random() < 0.5
+            collector.serv_hits += 1
+            if rule.check(i):
+                break
+        self.assertEqual(500, rule.n_requests)
+        self.assertFalse(rule.converged)
+
+    def test_invalid_metric(self):
+        collectors = {'CACHE_HIT_RATIO': _HitRatioCollector()}
+        self.assertRaises(ValueError, steadystate.StoppingRule, collectors,
+                          ['LATENCY'])
+        self.assertRaises(ValueError, steadystate.StoppingRule, collectors,
+                          ['LINK_LOAD'])
@@ -7,11 +7,15 @@ configuration file.
 
 Usage:
 
-  icarus run -r RESULTS [-c CONFIG_OVERRIDE] [-v] config
-  icarus results print [--json] RESULTS
-  icarus results merge -o OUTPUT INPUT_1 ... INPUT_N
+  icarus run -r RESULTS [-c CONFIG_OVERRIDE] [-p PROFILE_DIR] [-m] [-v] config
+  icarus results print [--json | --runtime | --memory] RESULTS
+  icarus results merge -o OUTPUT [-f FORMAT] [--deduplicate] INPUT_1 ... INPUT_N
+  icarus results convert [-f FORMAT] INPUT OUTPUT
+  icarus bench [-o OUTPUT] [-b BASELINE] [-t THRESHOLD] [-q] [PATTERN ...]
 
 """
+import sys
+
 import click
 
 import icarus
@@ -20,8 +24,10 @@ import icarus
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
 
-read = icarus.registry.RESULTS_READER['PICKLE']
-write = icarus.registry.RESULTS_WRITER['PICKLE']
+def read(path):
+    """Read a results file of any supported format"""
+    fmt = icarus.results.results_format(path)
+    return icarus.registry.RESULTS_READER[fmt](path)
 
 
 @click.group(context_settings=CONTEXT_SETTINGS)
@@ -35,11 +41,56 @@ def main():
               help='The file on which results will be saved')
 @click.option('--config-override', '-c', multiple=True,
               help='Override specific key=value parameter of configuration file')
+@click.option('--profile', '-p', 'profile_dir',
+              help='Profile experiments and write profiles and a report of '
+                   'hot functions to this directory')
+@click.option('--memory-profile', '-m', is_flag=True,
+              help='Trace memory allocations and store memory statistics of '
+                   'each phase of experiments in results')
 @click.argument('config', nargs=1, required=True)
-def run(results, config_override, config):
+def run(results, config_override, profile_dir, memory_profile, config):
     """Run a set of simulations."""
     config_override = dict(c.split("=") for c in config_override) or None
-    icarus.run(config, results, config_override)
+    icarus.run(config, results, config_override, profile_dir, memory_profile)
+
+
+@main.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--output', '-o', help='The file on which results are saved')
+@click.option('--baseline', '-b',
+              help='A results file of a previous run to compare results with')
+@click.option('--threshold', '-t', default=0.1, show_default=True,
+              help='Relative slowdown from the baseline reported as regression')
+@click.option('--repeat', '-r', default=3, show_default=True,
+              help='Number of runs of each case, of which the fastest is kept')
+@click.option('--quick', '-q', is_flag=True, help='Run smaller cases')
+@click.argument('patterns', nargs=-1)
+def bench(output, baseline, threshold, repeat, quick, patterns):
+    """Run benchmarks, optionally only cases matching PATTERNS, e.g.
+    'CACHE_POLICY/LRU/*', and compare them with a baseline."""
+    icarus.util.config_logging('WARNING')
+    results = icarus.benchmarks.run_benchmarks(patterns, quick, repeat)
+    if output:
+        icarus.benchmarks.write_benchmarks(results, output, quick)
+    changes = {}
+    if baseline:
+        baseline, _ = icarus.benchmarks.read_benchmarks(baseline)
+        changes = icarus.benchmarks.compare_benchmarks(results, baseline)
+    width = max([len(k) for k in results] + [4])
+    print('%-*s %12s %14s %10s' % (width, 'CASE', 'TIME (s)', 'OPS/S', 'CHANGE'))
+    regressions = []
+    for key, result in results.items():
+        change = ''
+        if key in changes:
+            change = '%+.1f%%' % (100 * changes[key])
+            if changes[key] > threshold:
+                regressions.append(key)
+                change += ' !'
+        print('%-*s %12.4f %14.0f %10s' % (width, key, result['seconds'],
+                                           result['ops_per_sec'] or 0, change))
+    if regressions:
+        print('%d regression(s) above %.0f%% of the baseline'
+              % (len(regressions), 100 * threshold))
+        sys.exit(1)
 
 
 @main.group(context_settings=CONTEXT_SETTINGS)
@@ -50,19 +101,44 @@ def results():
 
 @results.command('merge', context_settings=CONTEXT_SETTINGS)
 @click.option('--output', '-o', nargs=1, required=True, help='The output file')
+@click.option('--format', '-f', 'fmt', default='SQLITE', show_default=True,
+              help='The format of the output file')
+@click.option('--deduplicate', '-d', is_flag=True,
+              help='Discard experiments with the same parameters and '
+                   'replication as an experiment already merged')
 @click.argument('inputs', nargs=-1, required=True)
-def merge_results(output, inputs):
+def merge_results(output, fmt, deduplicate, inputs):
     """Merge multiple results files into one."""
-    write(sum((read(i) for i in inputs[1:]), read(inputs[0])), output)
+    n_duplicates = icarus.results.merge_results(inputs, output, fmt, deduplicate)
+    if n_duplicates > 0:
+        print('Discarded %d duplicate experiments' % n_duplicates)
+
+
+@results.command('convert', context_settings=CONTEXT_SETTINGS)
+@click.option('--format', '-f', 'fmt', default='SQLITE', show_default=True,
+              help='The format of the output file')
+@click.argument('input')
+@click.argument('output')
+def convert_results(fmt, input, output):
+    """Convert a results file to another format."""
+    icarus.registry.RESULTS_WRITER[fmt](read(input), output)
 
 
 @results.command('print', context_settings=CONTEXT_SETTINGS)
 @click.option('--json', '-j', is_flag=True, help='Print results in JSON format')
+@click.option('--runtime', '-t', is_flag=True,
+              help='Print a summary of the runtime statistics of experiments')
+@click.option('--memory', '-m', is_flag=True,
+              help='Print a summary of the memory statistics of experiments')
 @click.argument('path')
-def print_results(json, path):
+def print_results(json, runtime, memory, path):
     """Print content of a results file."""
     rs = read(path)
-    if json:
+    if runtime:
+        print(rs.runtime_summary())
+    elif memory:
+        print(rs.memory_summary())
+    elif json:
         print(rs.json(indent=4))
     else:
         print(rs.prettyprint())
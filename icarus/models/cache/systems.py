@@ -229,10 +229,18 @@ class ArrayCache(object):
                 raise ValueError("weights must sum up to 1")
             if len(weights) != self._n_caches:
                 raise ValueError("weights must have as many elements as nr of caches")
-            randvar = DiscreteDist(weights)
-            self.select_cache = lambda: self._caches[randvar.rv() - 1]
+            self._randvar = DiscreteDist(weights)
+            self.select_cache = self._select_weighted
         else:
-            self.select_cache = lambda: random.choice(self._caches)
+            self.select_cache = self._select_uniform
+
+    # Cache selection functions are methods rather than lambdas so that caches
+    # can be pickled, e.g. in snapshots of the network model
+    def _select_weighted(self):
+        return self._caches[self._randvar.rv() - 1]
+
+    def _select_uniform(self):
+        return random.choice(self._caches)
 
     def __len__(self):
         return self._len
@@ -336,7 +344,12 @@ class ShardedCache(Cache):
         self._maxlen = maxlen
         self._node = [CACHE_POLICY[policy](self._node_maxlen[i], **policy_attr)
                       for i in range(nodes)]
-        self.f_map = f_map if f_map is not None else lambda k: hash(k) % nodes
+        self.f_map = f_map if f_map is not None else self._hash_map
+
+    def _hash_map(self, k):
+        """Default mapping of contents to nodes, which, differently from a
+        lambda, can be pickled"""
+        return hash(k) % len(self._node)
 
     @inheritdoc(Cache)
     def __len__(self):
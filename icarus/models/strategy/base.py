@@ -16,6 +16,11 @@ class Strategy(object):
 
     __metaclass__ = abc.ABCMeta
 
+    # Name of the request-level strategy caching contents as this strategy
+    # does, if this is a packet-level strategy. It is used to fill caches in
+    # the warmup phase of hybrid experiments
+    request_level = None
+
     def __init__(self, view, controller, **kwargs):
         """Constructor
 
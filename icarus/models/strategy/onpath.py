@@ -129,6 +129,8 @@ class LeaveCopyEverywherePacketLevel(Strategy):
     path between serving node and receiver.
     """
 
+    request_level = 'LCE'
+
     @inheritdoc(Strategy)
     def __init__(self, view, controller, **kwargs):
         super(LeaveCopyEverywherePacketLevel, self).__init__(view, controller)
@@ -516,6 +518,8 @@ class LeaveCopyDownPacketLevel (Strategy):
               Available: http://cs-people.bu.edu/nlaout/analysis_PEVA.pdf
         """
 
+    request_level = 'LCD'
+
     @inheritdoc(Strategy)
     def __init__(self, view, controller, **kwargs):
         super(LeaveCopyDownPacketLevel, self).__init__(view, controller)
@@ -903,6 +907,8 @@ class ProbCachePacketLevel(Strategy):
           Available: http://doi.ieeecomputersociety.org/10.1109/TPDS.2013.304
     """
 
+    request_level = 'PROB_CACHE'
+
     @inheritdoc(Strategy)
     def __init__(self, view, controller, t_tw=10):
         super(ProbCachePacketLevel, self).__init__(view, controller)
@@ -6,26 +6,257 @@ user-provided settings.
 from __future__ import division
 import time
 import collections
+import cProfile
+import functools
+import hashlib
+import os
+import pstats
+import re
 import multiprocessing as mp
 import logging
-import copy
 import sys
 import signal
+import threading
 import traceback
-
-from icarus.execution import exec_experiment
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
+import numpy as np
+
+from icarus.execution import exec_experiment, exec_partitioned_experiment, \
+                              PARTITIONABLE_STRATEGIES, exec_pdes_experiment, \
+                              PDES_STRATEGIES, exec_analytical_experiment, \
+                              PathTable, \
+                              MemoryProfiler, RssMeter
 from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT, CONTENT_PLACEMENT, \
                             CACHE_POLICY, WORKLOAD, DATA_COLLECTOR, STRATEGY
-from icarus.results import ResultSet
-from icarus.util import SequenceNumber, timestr
+from icarus.results import ResultSet, RUNTIME_KEY
+from icarus.scenarios import ScenarioCache
+from icarus.util import Settings, SequenceNumber, Tree, TreeGrid, LabeledArray, \
+                        timestr
 
 
-__all__ = ['Orchestrator', 'run_scenario']
+__all__ = ['Orchestrator', 'run_scenario', 'aggregate_profiles']
 
 
 logger = logging.getLogger('orchestration')
 
 
+# Arrays of results of at least this size in bytes are moved by worker
+# processes to shared memory blocks rather than being pickled through the pipe
+# of the pool
+SHARED_ARRAY_MIN_SIZE = 2**16
+
+# Subtrees of results with at least this number of values, all integers or all
+# floats, e.g. per-content metrics, are sent by worker processes as labeled
+# arrays, which are pickled as two arrays rather than item by item, and
+# converted back to trees by the parent process
+PACKED_TREE_MIN_SIZE = 2**10
+
+# Settings and path tables shared by all experiments run by this process.
+# Path tables are keyed by the string returned by _topology_key. They are
+# populated by _init_worker.
+_settings = None
+_path_tables = {}
+
+
+def _topology_key(spec):
+    """Return a string uniquely identifying a topology specification"""
+    return repr(sorted(spec.items()))
+
+
+def _scenario_cache(settings):
+    """Return the scenario artifact cache set in the settings, if any"""
+    if 'SCENARIO_CACHE_DIR' in settings and settings.SCENARIO_CACHE_DIR:
+        return ScenarioCache(settings.SCENARIO_CACHE_DIR)
+    return None
+
+
+def _profile_dir(settings):
+    """Return the directory where experiment profiles are written, if
+    profiling is enabled in the settings"""
+    if 'PROFILE_DIR' in settings and settings.PROFILE_DIR:
+        return settings.PROFILE_DIR
+    return None
+
+
+def _memory_profile(settings):
+    """Return True if memory profiling is enabled in the settings"""
+    return 'MEMORY_PROFILE' in settings and bool(settings.MEMORY_PROFILE)
+
+
+def _common_random_numbers(settings):
+    """Return True if experiments are run with common random numbers"""
+    return 'COMMON_RANDOM_NUMBERS' in settings and \
+           bool(settings.COMMON_RANDOM_NUMBERS)
+
+
+def _crn_seed(component, replication):
+    """Return the seed of the random draws of a component of all experiments
+    of a replication run with common random numbers"""
+    digest = hashlib.sha1(repr((component, replication)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big')
+
+
+def _experiment_digest(params, replication):
+    """Return a hexadecimal digest of the parameters of an experiment and of
+    the index of its replication, independent of the order in which parameters
+    were inserted and of the parameters of its snapshots and description"""
+    paths = sorted((repr(path), repr(value)) for path, value
+                   in Tree(params).paths().items()
+                   if path[0] not in ('checkpoint', 'snapshot', 'desc'))
+    return hashlib.sha1(repr((paths, replication)).encode('utf-8')).hexdigest()
+
+
+def _init_worker(settings, path_tables):
+    """Initialize a process running experiments
+
+    Parameters
+    ----------
+    settings : Settings
+        The simulator settings
+    path_tables : dict
+        Path tables shared by the experiments, keyed by topology
+    """
+    global _settings
+    _settings = settings
+    _path_tables.clear()
+    _path_tables.update(path_tables)
+
+
+class _SharedArray(object):
+    """Handle of an array moved to a shared memory block.
+
+    The block is created by the process creating the handle and destroyed by
+    the process loading the array. Blocks are registered with the resource
+    tracker of the orchestrator, shared by its workers, which destroys the
+    blocks never loaded, e.g. those of jobs in flight when the pool is
+    terminated, when the orchestrator exits.
+    """
+
+    def __init__(self, array):
+        shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        try:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+        self.name = shm.name
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        shm.close()
+
+    def load(self):
+        """Return a copy of the array and destroy the shared memory block"""
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            return np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _map_arrays(value, func):
+    """Return a value in which all arrays and shared array handles, including
+    those nested in trees, tuples, lists and labeled arrays, are replaced by
+    the value returned by func. Trees are modified in place.
+    """
+    if isinstance(value, (np.ndarray, _SharedArray)):
+        return func(value)
+    if isinstance(value, Tree):
+        for k, v in list(value.items()):
+            value[k] = _map_arrays(v, func)
+        return value
+    if isinstance(value, LabeledArray):
+        # Bypass the constructor, which would convert handles to arrays
+        mapped = LabeledArray.__new__(LabeledArray)
+        mapped.labels = func(value.labels)
+        mapped.data = func(value.data)
+        mapped._index = None
+        return mapped
+    if isinstance(value, (tuple, list)):
+        return type(value)(_map_arrays(v, func) for v in value)
+    return value
+
+
+def _share_array(array):
+    """Return a shared memory handle of a large array or the array itself if
+    it is small or cannot be shared"""
+    if not isinstance(array, np.ndarray) or array.dtype.hasobject \
+            or array.nbytes < SHARED_ARRAY_MIN_SIZE:
+        return array
+    try:
+        return _SharedArray(array)
+    except OSError:
+        return array
+
+
+def _load_array(array):
+    """Return the array of a shared memory handle"""
+    return array.load() if isinstance(array, _SharedArray) else array
+
+
+def _discard_array(array):
+    """Destroy the shared memory block of a handle not loaded"""
+    if isinstance(array, _SharedArray):
+        try:
+            shm = shared_memory.SharedMemory(name=array.name)
+        except FileNotFoundError:
+            return None
+        shm.close()
+        shm.unlink()
+        return None
+    return array
+
+
+def _pack_trees(tree):
+    """Replace in place the large subtrees of a tree whose values are all
+    integers or all floats by labeled arrays"""
+    for k, v in list(tree.items()):
+        if not isinstance(v, Tree):
+            continue
+        if len(v) >= PACKED_TREE_MIN_SIZE and \
+                {type(x) for x in v.values()} in ({int}, {float}):
+            try:
+                tree[k] = LabeledArray.from_dict(v)
+            except ValueError:
+                # Keys cannot be labels, e.g. tuples of different lengths
+                pass
+        else:
+            _pack_trees(v)
+    return tree
+
+
+def _unpack_trees(tree):
+    """Replace in place the labeled arrays of a tree by trees"""
+    for k, v in list(tree.items()):
+        if isinstance(v, LabeledArray):
+            tree[k] = v.dict()
+        elif isinstance(v, Tree):
+            _unpack_trees(v)
+    return tree
+
+
+def _run_job(params, curr_exp, n_exp, replication):
+    """Run an experiment scheduled on a worker process with the settings
+    received by the worker when initialized.
+
+    Large subtrees of results are packed as labeled arrays and large arrays
+    are moved to shared memory, so that only their handles are pickled and
+    sent to the parent process, which unpacks them."""
+    args = run_scenario(_settings, params, curr_exp, n_exp, replication)
+    if args:
+        params, results, duration = args
+        results = _pack_trees(results)
+        if shared_memory is not None:
+            results = _map_arrays(results, _share_array)
+        args = (params, results, duration)
+    return args
+
+
 class Orchestrator(object):
     """Orchestrator.
 
@@ -52,15 +283,15 @@ class Orchestrator(object):
         self.n_fail = 0
         self.summary_freq = summary_freq
         self._stop = False
-        if self.settings.PARALLEL_EXECUTION:
-            self.pool = mp.Pool(settings.N_PROCESSES)
+        self.pool = None
+        self.path_tables = {}
 
     def stop(self):
         """Stop the execution of the orchestrator
         """
         logger.info('Orchestrator is stopping')
         self._stop = True
-        if self.settings.PARALLEL_EXECUTION:
+        if self.pool is not None:
             self.pool.terminate()
             self.pool.join()
 
@@ -69,66 +300,217 @@ class Orchestrator(object):
 
         This call is blocking, whether multiple processes are used or not. This
         methods returns only after all experiments are executed.
+
+        Experiments are read lazily from the `EXPERIMENT_QUEUE` setting, which
+        can be any iterable, e.g. a list, a generator or a `TreeGrid`, and
+        at most a few experiments per process are scheduled at any time, so
+        that memory used does not grow with the number of experiments.
+
+        With parallel execution, partitioned and PDES experiments, which fork
+        their own processes, are run by the process of the orchestrator after
+        the other experiments, since the worker processes of the pool cannot
+        fork processes.
         """
-        # Create queue of experiment configurations
-        queue = collections.deque(self.settings.EXPERIMENT_QUEUE)
-        # Calculate number of experiments and number of processes
-        self.n_exp = len(queue) * self.settings.N_REPLICATIONS
-        self.n_proc = self.settings.N_PROCESSES \
-                      if self.settings.PARALLEL_EXECUTION \
-                      else 1
-        logger.info('Starting simulations: %d experiments, %d process(es)'
-                    % (self.n_exp, self.n_proc))
+        queue = self.settings.EXPERIMENT_QUEUE
+        # Calculate number of experiments and number of processes. The number
+        # of experiments is unknown if the queue is not sized, e.g. generators
+        if hasattr(queue, '__len__'):
+            self.n_exp = len(queue) * self.settings.N_REPLICATIONS
+        else:
+            self.n_exp = None
+        if self.settings.PARALLEL_EXECUTION:
+            self.n_proc = self.settings.N_PROCESSES
+        else:
+            self.n_proc = 1
+        n_exp = self.n_exp if self.n_exp is not None else '?'
+        logger.info('Starting simulations: %s experiments, %d process(es)'
+                    % (n_exp, self.n_proc))
+        # Build path tables before forking so that they are shared by workers.
+        # The topologies of a TreeGrid are derived from its axes, while other
+        # queues are iterated twice, which is not possible for iterators
+        if iter(queue) is not queue:
+            self.path_tables = self.build_path_tables(queue)
+        # Settings are sent once to each worker rather than with each job.
+        # The experiment queue is not needed by workers and may not be
+        # picklable
+        worker_settings = Settings()
+        for name in self.settings:
+            if name != 'EXPERIMENT_QUEUE':
+                worker_settings.set(name, self.settings.get(name))
 
         if self.settings.PARALLEL_EXECUTION:
+            if self.path_tables and mp.get_start_method() != 'fork':
+                # Workers do not inherit the memory of this process, so move
+                # tables to shared memory rather than copying them to each
+                # worker
+                for table in self.path_tables.values():
+                    try:
+                        table.share()
+                    except (ValueError, OSError):
+                        break
+            if shared_memory is not None:
+                # Workers must register the shared memory blocks of their
+                # results with the resource tracker of this process, which
+                # outlives them, rather than starting their own trackers
+                resource_tracker.ensure_running()
+            self.pool = mp.Pool(self.settings.N_PROCESSES,
+                                initializer=_init_worker,
+                                initargs=(worker_settings, self.path_tables))
+            # Each scheduled job holds a slot until its callback is called.
+            # Limiting the number of slots bounds the number of experiments
+            # stored at any time by this process
+            n_slots = 2 * self.n_proc
+            self._slots = threading.Semaphore(n_slots)
             # Starting from Python 3.2, multiprocessing.Pool.apply_async
             # accepts a new error_callback argument that is a callable for
             # returning a message when uncaught errors are thrown.
             # The following lines ensure compatibility with Python < 3.2
-            callbacks = {"callback": self.experiment_callback}
+            callbacks = {"callback": self._job_callback}
             if sys.version_info > (3, 2):
-                callbacks["error_callback"] = self.error_callback
-            # This job queue is used only to keep track of which jobs have
-            # finished and which are still running. Currently this information
-            # is used only to handle keyboard interrupts correctly
-            job_queue = collections.deque()
-            # Schedule experiments from the queue
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    job_queue.append(self.pool.apply_async(run_scenario,
-                            args=(self.settings, experiment,
-                                  self.seq.assign(), self.n_exp),
-                            **callbacks))
-            self.pool.close()
-            # This solution is probably not optimal, but at least makes
-            # KeyboardInterrupt work fine, which is crucial if launching the
-            # simulation remotely via screen.
-            # What happens here is that we keep waiting for possible
-            # KeyboardInterrupts till the last process terminates successfully.
-            # We may have to wait up to 5 seconds after the last process
-            # terminates before exiting, which is really negligible
+                callbacks["error_callback"] = self._job_error_callback
+            # Waiting on the semaphore with a timeout, rather than blocking,
+            # makes KeyboardInterrupt work fine, which is crucial if launching
+            # the simulation remotely via screen.
+            # Partitioned and PDES experiments fork their own processes,
+            # which daemonic workers cannot do, so they are run by this
+            # process after all other experiments
+            forking = []
             try:
-                while job_queue:
-                    job = job_queue.popleft()
-                    while not job.ready():
-                        time.sleep(5)
+                for experiment in queue:
+                    for replication in range(self.settings.N_REPLICATIONS):
+                        if _forks_processes(experiment):
+                            forking.append((experiment, self.seq.assign(),
+                                            replication))
+                            continue
+                        while not self._slots.acquire(timeout=1):
+                            pass
+                        self.pool.apply_async(
+                            _run_job,
+                            args=(experiment, self.seq.assign(), n_exp,
+                                  replication),
+                            **callbacks)
+                self.pool.close()
+                # Wait for all scheduled jobs to complete
+                for _ in range(n_slots):
+                    while not self._slots.acquire(timeout=1):
+                        pass
             except KeyboardInterrupt:
                 self.pool.terminate()
+                forking = []
+            except Exception:
+                # e.g. an error raised while generating experiments
+                self.pool.terminate()
+                self.pool.join()
+                raise
             self.pool.join()
+            if forking and not self._stop:
+                _init_worker(worker_settings, self.path_tables)
+                for experiment, seq, replication in forking:
+                    self.experiment_callback(run_scenario(
+                        self.settings, experiment, seq, n_exp, replication))
+                    if self._stop:
+                        break
+                _path_tables.clear()
 
         else:  # Single-process execution
-            while queue:
-                experiment = queue.popleft()
-                for _ in range(self.settings.N_REPLICATIONS):
-                    self.experiment_callback(run_scenario(self.settings,
-                                            experiment, self.seq.assign(),
-                                            self.n_exp))
+            _init_worker(worker_settings, self.path_tables)
+            for experiment in queue:
+                for replication in range(self.settings.N_REPLICATIONS):
+                    self.experiment_callback(run_scenario(
+                        self.settings, experiment, self.seq.assign(), n_exp,
+                        replication))
                     if self._stop:
                         self.stop()
+            _path_tables.clear()
+        for table in self.path_tables.values():
+            table.release()
+        self.path_tables = {}
 
-        logger.info('END | Planned: %d, Completed: %d, Succeeded: %d, Failed: %d',
-                    self.n_exp, self.n_fail + self.n_success, self.n_success, self.n_fail)
+        logger.info('END | Planned: %s, Completed: %d, Succeeded: %d, Failed: %d',
+                    n_exp, self.n_fail + self.n_success, self.n_success, self.n_fail)
+
+    def build_path_tables(self, experiments):
+        """Build the path tables of the topologies used by more than one
+        experiment.
+
+        Each of these topologies is built once by this process and its
+        all-pairs shortest paths are stored in a `PathTable`, which is then
+        shared by all experiments using it instead of being recomputed by each.
+
+        Parameters
+        ----------
+        experiments : iterable
+            The experiment configurations
+
+        Returns
+        -------
+        path_tables : dict
+            Path tables keyed by topology
+        """
+        count = collections.Counter()
+        specs = {}
+        # The topologies of grids are derived from their axes rather than
+        # generating all experiments
+        if isinstance(experiments, TreeGrid):
+            topologies = experiments.subtrees(('topology',))
+        else:
+            topologies = ((experiment['topology'], 1)
+                          for experiment in experiments)
+        for spec, n_experiments in topologies:
+            if not spec:
+                continue
+            key = _topology_key(spec)
+            count[key] += n_experiments * self.settings.N_REPLICATIONS
+            specs[key] = spec
+        scenario_cache = _scenario_cache(self.settings)
+        path_tables = {}
+        for key, n_uses in count.items():
+            if n_uses < 2:
+                continue
+            spec = dict(specs[key])
+            name = spec.pop('name', None)
+            if name not in TOPOLOGY_FACTORY:
+                continue
+            try:
+                if scenario_cache is not None:
+                    _, path_tables[key] = scenario_cache.topology(specs[key])
+                else:
+                    topology = TOPOLOGY_FACTORY[name](**spec)
+                    path_tables[key] = PathTable.from_topology(topology)
+            except Exception:
+                # Let experiments compute their own paths and report the error
+                logger.warning('Could not build path table of topology %s',
+                               name)
+                continue
+            logger.info('Built path table of topology %s shared by %d '
+                        'experiments', name, n_uses)
+        return path_tables
+
+    def _job_callback(self, args):
+        """Callback method called when a job scheduled on the pool completes
+        """
+        try:
+            if args:
+                params, results, duration = args
+                try:
+                    results = _map_arrays(results, _load_array)
+                except Exception:
+                    # Destroy the blocks of the arrays not loaded yet, since
+                    # trees are mapped in place
+                    _map_arrays(results, _discard_array)
+                    raise
+                args = (params, _unpack_trees(results), duration)
+            self.experiment_callback(args)
+        finally:
+            self._slots.release()
+
+    def _job_error_callback(self, msg):
+        """Callback method called when a job scheduled on the pool fails
+        """
+        try:
+            self.error_callback(msg)
+        finally:
+            self._slots.release()
 
     def error_callback(self, msg):
         """Callback method called in case of error in Python > 3.2
@@ -161,6 +543,10 @@ class Orchestrator(object):
         self.results.add(params, results)
         self.exp_durations.append(duration)
         if self.n_success % self.summary_freq == 0:
+            if self.n_exp is None:
+                logger.info('SUMMARY | Completed: %d, Failed: %d',
+                            self.n_success, self.n_fail)
+                return
             # Number of experiments scheduled to be executed
             n_scheduled = self.n_exp - (self.n_fail + self.n_success)
             # Compute ETA
@@ -172,7 +558,29 @@ class Orchestrator(object):
                         self.n_success, self.n_fail, n_scheduled, eta)
 
 
-def run_scenario(settings, params, curr_exp, n_exp):
+def _forks_processes(params):
+    """Return True if an experiment is simulated by processes forked by the
+    process running it, i.e. if it is partitioned or simulated by PDES
+
+    Parameters
+    ----------
+    params : Tree
+        Tree of experiment parameters
+
+    Returns
+    -------
+    forks_processes : bool
+        True if the experiment forks processes, False otherwise
+    """
+    if params.get('analytical'):
+        return False
+    strategy = params.get('strategy') or {}
+    name = strategy.get('name')
+    return ('partition' in params and name in PARTITIONABLE_STRATEGIES) or \
+           ('pdes' in params and name in PDES_STRATEGIES)
+
+
+def run_scenario(settings, params, curr_exp, n_exp, replication=0):
     """Run a single scenario experiment
 
     Parameters
@@ -183,8 +591,10 @@ def run_scenario(settings, params, curr_exp, n_exp):
         experiment parameters tree
     curr_exp : int
         sequence number of the experiment
-    n_exp : int
-        Number of scheduled experiments
+    n_exp : int or str
+        Number of scheduled experiments, or '?' if unknown
+    replication : int, optional
+        The index of the replication of the experiment
 
     Returns
     -------
@@ -194,26 +604,113 @@ def run_scenario(settings, params, curr_exp, n_exp):
         is a dictionary which stores the results. The third element is an
         integer expressing the wall-clock duration of the experiment (in
         seconds)
+
+    Notes
+    -----
+    Runtime statistics of the experiment are stored in the results under the
+    reserved key RUNTIME. These are the time in seconds spent building the
+    topology (TOPOLOGY), the workload (WORKLOAD), placing caches
+    (CACHE_PLACEMENT) and contents (CONTENT_PLACEMENT) and running the
+    experiment (see `exec_experiment`), the total duration (TOTAL), the number
+    of events processed per second of simulation (EVENTS_PER_SEC) and the
+    peak resident set size in bytes of the process running the experiment
+    while running it (PEAK_RSS). Where the peak resident set size cannot be
+    reset, i.e. outside Linux, the resident set size at the end of the
+    experiment is reported instead (see `RssMeter`).
+
+    If the PROFILE_DIR setting is set, the simulation is run under cProfile
+    and its profile is written to that directory in a file named after the
+    sequence number of the experiment. The path of the file is stored in the
+    runtime statistics under the PROFILE key. Timings of profiled experiments
+    include the overhead of the profiler.
+
+    If the MEMORY_PROFILE setting is True, memory allocations are traced and
+    memory usage at the end of each phase of the simulation (see
+    `MemoryProfiler.snapshot`) is stored in the runtime statistics under the
+    MEMORY key.
+
+    If the COMMON_RANDOM_NUMBERS setting is True, the workload and the content
+    placement are seeded, unless their specification sets a seed, with seeds
+    only depending on the index of the replication. All experiments of a
+    replication with the same workload then process the same sequence of
+    requests, whatever their strategy and cache policy, so that the variance
+    of the differences between their results is reduced. The index of the
+    replication is stored in the runtime statistics under the REPLICATION key.
+
+    If the experiment has a *partition* attribute and its strategy is among
+    PARTITIONABLE_STRATEGIES, its requests are partitioned by authoritative
+    cache and simulated by parallel processes (see
+    `exec_partitioned_experiment`), which is passed the attributes of the
+    partition specification, e.g. *n_processes*. Experiments with other
+    strategies ignore it.
+
+    Similarly, if the experiment has a *pdes* attribute and its strategy is
+    among PDES_STRATEGIES, it is simulated by conservative parallel
+    discrete-event simulation (see `exec_pdes_experiment`), which is passed
+    the attributes of the pdes specification, e.g. *n_processes*.
+
+    If the experiment has a true *hybrid* attribute, the caches of a
+    packet-level experiment are filled in the warmup phase by the request-level
+    equivalent of its strategy (see `exec_experiment`). Experiments whose
+    strategy has no request-level equivalent ignore it.
+
+    If the experiment has a *snapshot* attribute, its simulation is started
+    from the snapshot stored at that path and, if it has a *checkpoint*
+    attribute, snapshots of its simulation are written as specified by it
+    (see `exec_experiment`). If the checkpoint specification has a *directory*
+    attribute rather than a *path*, snapshots are written to a file of that
+    directory named after a digest of the parameters of the experiment and of
+    the index of its replication, so that experiments sharing the
+    specification write to different files. Its path is stored in the runtime
+    statistics under the CHECKPOINT key. These are not supported by
+    partitioned and parallel discrete-event simulations.
+
+    If the experiment has a true *analytical* attribute, its results are
+    estimated analytically rather than simulated (see
+    `exec_analytical_experiment`), which is supported only by the strategies
+    among ANALYTICAL_STRATEGIES.
     """
+    memory = MemoryProfiler() if _memory_profile(settings) else None
     try:
         start_time = time.time()
+        runtime = Tree()
+        rss = RssMeter()
+        if memory is not None:
+            memory.start()
         proc_name = mp.current_process().name
         logger = logging.getLogger('runner-%s' % proc_name)
 
         # Get list of metrics required
         metrics = settings.DATA_COLLECTORS
 
-        # Copy parameters so that they can be manipulated
-        tree = copy.deepcopy(params)
+        # Copy the first level of parameters so that the specifications of
+        # each component can be manipulated without deep copying all of them
+        tree = Tree({k: Tree(v) if isinstance(v, Tree) else v
+                     for k, v in params.items()})
+        runtime['REPLICATION'] = replication
+        if _common_random_numbers(settings):
+            for component in ('workload', 'content_placement'):
+                if component in tree and 'seed' not in tree[component]:
+                    tree[component]['seed'] = _crn_seed(component, replication)
 
         # Set topology
+        topology_key = _topology_key(tree['topology'])
+        path_table = _path_tables.get(topology_key)
+        scenario_cache = _scenario_cache(settings)
         topology_spec = tree['topology']
         topology_name = topology_spec.pop('name')
         if topology_name not in TOPOLOGY_FACTORY:
             logger.error('No topology factory implementation for %s was found.'
                          % topology_name)
             return None
-        topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+        if scenario_cache is not None:
+            topology, cached_path_table = scenario_cache.topology(params['topology'])
+            if path_table is None:
+                path_table = cached_path_table
+        else:
+            topology = TOPOLOGY_FACTORY[topology_name](**topology_spec)
+        phase_start = time.time()
+        runtime['TOPOLOGY'] = phase_start - start_time
 
         workload_spec = tree['workload']
         workload_name = workload_spec.pop('name')
@@ -222,6 +719,8 @@ def run_scenario(settings, params, curr_exp, n_exp):
                          % workload_name)
             return None
         workload = WORKLOAD[workload_name](topology, **workload_spec)
+        runtime['WORKLOAD'] = time.time() - phase_start
+        phase_start = time.time()
 
         # Assign caches to nodes
         if 'cache_placement' in tree:
@@ -235,7 +734,14 @@ def run_scenario(settings, params, curr_exp, n_exp):
             # Cache budget is the cumulative number of cache entries across
             # the whole network
             cachepl_spec['cache_budget'] = workload.n_contents * network_cache
-            CACHE_PLACEMENT[cachepl_name](topology, **cachepl_spec)
+            if scenario_cache is not None:
+                cachepl_spec['name'] = cachepl_name
+                topology = scenario_cache.cache_placement(params['topology'],
+                                                          cachepl_spec, topology)
+            else:
+                CACHE_PLACEMENT[cachepl_name](topology, **cachepl_spec)
+        runtime['CACHE_PLACEMENT'] = time.time() - phase_start
+        phase_start = time.time()
 
         # Assign contents to sources
         # If there are many contents, after doing this, performing operations
@@ -248,6 +754,7 @@ def run_scenario(settings, params, curr_exp, n_exp):
                          % contpl_name)
             return None
         CONTENT_PLACEMENT[contpl_name](topology, workload.contents, **contpl_spec)
+        runtime['CONTENT_PLACEMENT'] = time.time() - phase_start
 
         # caching and routing strategy definition
         strategy = tree['strategy']
@@ -264,10 +771,34 @@ def run_scenario(settings, params, curr_exp, n_exp):
         # Configuration parameters of network model
         netconf = tree['netconf']
 
+        # Parameters of adaptive warmup, if enabled
+        warmup = tree['warmup'] if 'warmup' in tree else None
+        # Parameters of sequential stopping, if enabled
+        stopping = tree['stopping'] if 'stopping' in tree else None
+        # Whether caches are filled by the request-level equivalent of
+        # packet-level strategies in the warmup phase
+        hybrid = 'hybrid' in tree and tree['hybrid'] and \
+                 STRATEGY[strategy['name']].request_level is not None
+        # Snapshot from which the simulation is started and parameters of
+        # snapshots taken during the simulation, if any
+        snapshot = tree['snapshot'] if 'snapshot' in tree else None
+        checkpoint = tree['checkpoint'] if 'checkpoint' in tree else None
+        if checkpoint is not None and 'directory' in checkpoint:
+            # Each experiment writes its snapshots to its own file
+            checkpoint = dict(checkpoint)
+            directory = checkpoint.pop('directory')
+            os.makedirs(directory, exist_ok=True)
+            checkpoint['path'] = os.path.join(directory, 'experiment-%s.snap'
+                                              % _experiment_digest(params,
+                                                                   replication))
+            runtime['CHECKPOINT'] = checkpoint['path']
+        if path_table is not None and 'shortest_path' not in netconf:
+            netconf['shortest_path'] = path_table
+
         # Text description of the scenario run to print on screen
         scenario = tree['desc'] if 'desc' in tree else "Description N/A"
 
-        logger.info('Experiment %d/%d | Preparing scenario: %s', curr_exp, n_exp, scenario)
+        logger.info('Experiment %d/%s | Preparing scenario: %s', curr_exp, n_exp, scenario)
 
         if any(m not in DATA_COLLECTOR for m in metrics):
             logger.error('There are no implementations for at least one data collector specified')
@@ -275,19 +806,136 @@ def run_scenario(settings, params, curr_exp, n_exp):
 
         collectors = {m: {} for m in metrics}
 
-        logger.info('Experiment %d/%d | Start simulation', curr_exp, n_exp)
-        results = exec_experiment(topology, workload, netconf, strategy, cache_policy, collectors)
+        if 'analytical' in tree and tree['analytical']:
+            if warmup is not None or stopping is not None or hybrid or \
+                    snapshot is not None or checkpoint is not None:
+                logger.error('Adaptive warmup, sequential stopping, hybrid '
+                             'experiments and snapshots are not supported by '
+                             'analytical experiments')
+                return None
+            simulate = functools.partial(exec_analytical_experiment, topology,
+                                         workload, netconf, strategy,
+                                         cache_policy, collectors,
+                                         runtime=runtime)
+        elif 'partition' in tree and \
+                strategy['name'] in PARTITIONABLE_STRATEGIES:
+            if warmup is not None or stopping is not None or \
+                    snapshot is not None or checkpoint is not None:
+                logger.error('Adaptive warmup, sequential stopping and '
+                             'snapshots are not supported by partitioned '
+                             'experiments')
+                return None
+            simulate = functools.partial(exec_partitioned_experiment, topology,
+                                         workload, netconf, strategy,
+                                         cache_policy, collectors,
+                                         runtime=runtime, **tree['partition'])
+        elif 'pdes' in tree and strategy['name'] in PDES_STRATEGIES:
+            if warmup is not None or stopping is not None or hybrid or \
+                    snapshot is not None or checkpoint is not None:
+                logger.error('Adaptive warmup, sequential stopping, hybrid '
+                             'experiments and snapshots are not supported by '
+                             'parallel discrete-event simulation')
+                return None
+            simulate = functools.partial(exec_pdes_experiment, topology,
+                                         workload, netconf, strategy,
+                                         cache_policy, collectors,
+                                         runtime=runtime, **tree['pdes'])
+        else:
+            simulate = functools.partial(exec_experiment, topology, workload,
+                                         netconf, strategy, cache_policy,
+                                         collectors, runtime, memory, warmup,
+                                         stopping, hybrid, snapshot,
+                                         checkpoint)
+
+        logger.info('Experiment %d/%s | Start simulation', curr_exp, n_exp)
+        profile_dir = _profile_dir(settings)
+        if profile_dir is not None:
+            profiler = cProfile.Profile()
+            results = profiler.runcall(simulate)
+            if not os.path.isdir(profile_dir):
+                os.makedirs(profile_dir, exist_ok=True)
+            profile_path = os.path.join(profile_dir,
+                                        'experiment-%d.pstats' % curr_exp)
+            profiler.dump_stats(profile_path)
+            runtime['PROFILE'] = profile_path
+        else:
+            results = simulate()
 
         duration = time.time() - start_time
-        logger.info('Experiment %d/%d | End simulation | Duration %s.',
+        simulation_time = runtime['WARMUP'] + runtime['MEASURED']
+        runtime['TOTAL'] = duration
+        if simulation_time > 0:
+            runtime['EVENTS_PER_SEC'] = runtime['EVENTS'] / simulation_time
+        else:
+            runtime['EVENTS_PER_SEC'] = 0.0
+        runtime['PEAK_RSS'] = rss.peak()
+        if memory is not None:
+            runtime['MEMORY'] = memory.results()
+            # The memory profiler restarts the meter at the end of each phase
+            peaks = [runtime['PEAK_RSS']] + [phase['PEAK_RSS'] for phase
+                                             in runtime['MEMORY'].values()]
+            peaks = [peak for peak in peaks if peak is not None]
+            runtime['PEAK_RSS'] = max(peaks) if peaks else None
+        results[RUNTIME_KEY] = runtime
+        logger.info('Experiment %d/%s | End simulation | Duration %s.',
                     curr_exp, n_exp, timestr(duration, True))
         return (params, results, duration)
     except KeyboardInterrupt:
         logger.error('Received keyboard interrupt. Terminating')
         sys.exit(-signal.SIGINT)
     except Exception as e:
-        err_type = str(type(e)).split("'")[1].split(".")[1]
-        err_message = e.message
-        logger.error('Experiment %d/%d | Failed | %s: %s\n%s',
+        err_type = type(e).__name__
+        err_message = str(e)
+        logger.error('Experiment %d/%s | Failed | %s: %s\n%s',
                      curr_exp, n_exp, err_type, err_message,
                      traceback.format_exc())
+    finally:
+        if memory is not None:
+            memory.stop()
+
+
+def aggregate_profiles(resultset, profile_dir, n_functions=30):
+    """Merge the profiles of experiments with the same topology and strategy
+    and write a report of the functions in which most time was spent.
+
+    Merged profiles are written to *profile_dir* in files named
+    aggregate-<TOPOLOGY>-<STRATEGY>.pstats, which can be inspected with the
+    `pstats` module or any tool reading cProfile output. The report is
+    written to file report.txt in the same directory.
+
+    Parameters
+    ----------
+    resultset : ResultSet
+        The results of experiments run with profiling enabled
+    profile_dir : str
+        The directory where profiles of experiments were written
+    n_functions : int, optional
+        The number of functions reported for each topology and strategy,
+        sorted by decreasing time spent in the function itself
+
+    Returns
+    -------
+    report_path : str
+        The path of the report file
+    """
+    groups = collections.OrderedDict()
+    for params, results in resultset:
+        if RUNTIME_KEY not in results or 'PROFILE' not in results[RUNTIME_KEY]:
+            continue
+        path = results[RUNTIME_KEY]['PROFILE']
+        if not os.path.isfile(path):
+            logger.warning('Profile %s not found', path)
+            continue
+        key = (params['topology']['name'], params['strategy']['name'])
+        groups.setdefault(key, []).append(path)
+    report_path = os.path.join(profile_dir, 'report.txt')
+    with open(report_path, 'w') as f:
+        for (topology, strategy), paths in groups.items():
+            stats = pstats.Stats(*paths, stream=f)
+            name = re.sub(r'[^\w.-]', '_', '%s-%s' % (topology, strategy))
+            stats.dump_stats(os.path.join(profile_dir,
+                                          'aggregate-%s.pstats' % name))
+            f.write('TOPOLOGY: %s, STRATEGY: %s, EXPERIMENTS: %d\n'
+                    % (topology, strategy, len(paths)))
+            stats.strip_dirs().sort_stats('tottime').print_stats(n_functions)
+    return report_path
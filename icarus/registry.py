@@ -1,31 +1,114 @@
-"""Registry keeping track of all registered pluggable components"""
+"""Registry keeping track of all registered pluggable components
+
+Registries are lazy: the modules implementing the components of a registry
+are imported only when a component is first looked up in it, so that
+importing Icarus does not require importing all its components and their
+dependencies.
+"""
+import importlib
+
+
+class Registry(dict):
+    """Dictionary of components keyed by ID, which imports the modules
+    registering them when first read.
+
+    Components are normally added to a registry by a decorator returned by
+    `register_decorator`, when the module implementing them is imported.
+    Additional modules, even outside Icarus, can be added to the *modules*
+    list of a registry to have them imported when the registry is read.
+    """
+
+    def __init__(self, *modules):
+        """Constructor
+
+        Parameters
+        ----------
+        *modules : str
+            Names of the modules registering components in this registry
+        """
+        super(Registry, self).__init__()
+        self.modules = list(modules)
+        self._loaded = set()
+
+    def load(self):
+        """Import all modules registering components in this registry, if not
+        already imported
+        """
+        for module in self.modules:
+            if module not in self._loaded:
+                # Mark the module as loaded before importing it, so that
+                # reading the registry while the module is being imported
+                # does not cause a recursive import
+                self._loaded.add(module)
+                try:
+                    importlib.import_module(module)
+                except Exception:
+                    self._loaded.discard(module)
+                    raise
+
+    def __getitem__(self, name):
+        if not dict.__contains__(self, name):
+            self.load()
+        return dict.__getitem__(self, name)
+
+    def __contains__(self, name):
+        if not dict.__contains__(self, name):
+            self.load()
+        return dict.__contains__(self, name)
+
+    def __iter__(self):
+        self.load()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.load()
+        return dict.__len__(self)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def keys(self):
+        self.load()
+        return dict.keys(self)
+
+    def values(self):
+        self.load()
+        return dict.values(self)
+
+    def items(self):
+        self.load()
+        return dict.items(self)
+
 
 # Dictionary storying all cache policy implementations keyed by ID
-CACHE_POLICY = {}
+CACHE_POLICY = Registry('icarus.models.cache')
 
 # Dictionary storying all strategy implementations keyed by ID
-STRATEGY = {}
+STRATEGY = Registry('icarus.models.strategy')
 
 # Dictionary storying all network topologies keyed by ID
-TOPOLOGY_FACTORY = {}
+TOPOLOGY_FACTORY = Registry('icarus.scenarios.topology')
 
 # Dictionary storying all cache placement functions keyed by ID
-CACHE_PLACEMENT = {}
+CACHE_PLACEMENT = Registry('icarus.scenarios.cacheplacement')
 
 # Dictionary storying all content placement functions keyed by ID
-CONTENT_PLACEMENT = {}
+CONTENT_PLACEMENT = Registry('icarus.scenarios.contentplacement')
 
 # Dictionary storying all workload generators keyed by ID
-WORKLOAD = {}
+WORKLOAD = Registry('icarus.scenarios.workload')
 
 # Dictionary storying all data collector classes keyed by ID
-DATA_COLLECTOR = {}
+DATA_COLLECTOR = Registry('icarus.execution.collectors')
 
 # Dictionary storying all results reader functions keyed by ID
-RESULTS_READER = {}
+RESULTS_READER = Registry('icarus.results.readwrite')
 
 # Dictionary storying all results writer functions keyed by ID
-RESULTS_WRITER = {}
+RESULTS_WRITER = Registry('icarus.results.readwrite')
+
+# Dictionary storying all benchmarks keyed by ID
+BENCHMARK = Registry('icarus.benchmarks.micro', 'icarus.benchmarks.scenarios')
 
 
 def register_decorator(register):
@@ -67,3 +150,4 @@ register_workload = register_decorator(WORKLOAD)
 register_data_collector = register_decorator(DATA_COLLECTOR)
 register_results_reader = register_decorator(RESULTS_READER)
 register_results_writer = register_decorator(RESULTS_WRITER)
+register_benchmark = register_decorator(BENCHMARK)
@@ -1,5 +1,6 @@
 """This package contains the code in charge of processing experiment results.
 """
 from .readwrite import *
+from .index import *
 from .plot import *
 from .visualize import *
@@ -0,0 +1,231 @@
+"""Index of resultsets by parameter values.
+
+Plot functions draw each point of a graph out of the experiments matching a
+condition on their parameters. Filtering a resultset for each point reads all
+its experiments every time, so that the time needed to draw a graph grows
+with the product of the number of points and the number of experiments.
+
+A *ResultIndex* reads a resultset once and maps the values of each parameter
+to the experiments having them. Experiments matching a condition are then
+selected by intersecting precomputed masks and means and confidence
+intervals of all points of a graph are computed with a single vectorized
+operation.
+"""
+from __future__ import division
+import numbers
+import collections
+
+import numpy as np
+
+from icarus.util import Tree
+from icarus.tools import means_confidence_intervals
+
+
+__all__ = ['ResultIndex']
+
+
+def _indexable(value):
+    """Return True if a parameter value can be matched by hashing it, i.e. if
+    it is equal only to values with the same hash
+    """
+    if value is None or isinstance(value, (str, numbers.Number)):
+        return True
+    if isinstance(value, tuple):
+        return all(_indexable(v) for v in value)
+    return False
+
+
+class _Column(object):
+    """Values of a parameter across all experiments of an index"""
+
+    def __init__(self, values):
+        self.values = values
+        # Map each indexable value to the mask of experiments having it
+        rows = collections.defaultdict(list)
+        # Experiments whose value must be compared with each queried value,
+        # e.g. AnyValue objects
+        self.unindexed = []
+        for i, v in enumerate(values):
+            if _indexable(v):
+                rows[v].append(i)
+            else:
+                self.unindexed.append(i)
+        self.masks = {}
+        for v, i in rows.items():
+            mask = np.zeros(len(values), dtype=bool)
+            mask[i] = True
+            self.masks[v] = mask
+
+    def match(self, value):
+        """Return the mask of experiments whose value is equal to the given
+        one
+        """
+        if not _indexable(value):
+            return np.array([v == value for v in self.values], dtype=bool)
+        mask = self.masks.get(value)
+        if mask is None:
+            mask = np.zeros(len(self.values), dtype=bool)
+        else:
+            mask = mask.copy()
+        for i in self.unindexed:
+            mask[i] = self.values[i] == value
+        return mask
+
+
+class ResultIndex(object):
+    """Index of the experiments of a resultset by parameter values.
+
+    An index can be passed to plot functions in place of the resultset it
+    indexes. Parameters and metrics are indexed when first queried, so
+    building an index only reads the resultset.
+    """
+
+    def __init__(self, resultset):
+        """Constructor
+
+        Parameters
+        ----------
+        resultset : ResultSet
+            The resultset to index
+        """
+        self.attr = resultset.attr
+        self._parameters = []
+        self._results = []
+        for parameters, results in resultset:
+            self._parameters.append(parameters)
+            self._results.append(results)
+        # Map parameter paths to _Column objects
+        self._columns = {}
+        # Map metric paths to (values, present) tuples, where values is an
+        # array of values of the metric and present is the mask of
+        # experiments having the metric
+        self._metrics = {}
+
+    def __len__(self):
+        return len(self._parameters)
+
+    def __iter__(self):
+        return zip(self._parameters, self._results)
+
+    def __getitem__(self, i):
+        return self._parameters[i], self._results[i]
+
+    def _column(self, path):
+        column = self._columns.get(path)
+        if column is None:
+            column = _Column([p.getval(path) for p in self._parameters])
+            self._columns[path] = column
+        return column
+
+    def _metric(self, path):
+        metric = self._metrics.get(path)
+        if metric is None:
+            raw = [r.getval(path) for r in self._results]
+            present = np.array([v is not None for v in raw], dtype=bool)
+            try:
+                values = np.array([v if v is not None else np.nan for v in raw],
+                                  dtype=float)
+            except (TypeError, ValueError):
+                values = None
+            metric = (values, present)
+            self._metrics[path] = metric
+        return metric
+
+    def select(self, condition):
+        """Return the mask of experiments matching a condition
+
+        Parameters
+        ----------
+        condition : dict
+            Dictionary listing all parameters and values to be matched, with
+            the same semantics as *ResultSet.filter*
+
+        Returns
+        -------
+        mask : array of bool
+            Array whose i-th element is True if the i-th experiment matches
+            the condition
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for path, value in Tree(condition).paths().items():
+            mask &= self._column(path).match(value)
+        return mask
+
+    def filter(self, condition):
+        """Return subset of results matching specific conditions
+
+        Parameters
+        ----------
+        condition : dict
+            Dictionary listing all parameters and values to be matched in the
+            results set
+
+        Returns
+        -------
+        filtered_results : list
+            List of 2-tuples of filtered results, where the first element is a
+            tree of all experiment parameters and the second value is
+            a tree with experiment results.
+        """
+        return [(self._parameters[i], self._results[i])
+                for i in np.flatnonzero(self.select(condition))]
+
+    def values(self, metric, condition):
+        """Return all values of a metric in experiments matching a condition
+
+        Parameters
+        ----------
+        metric : tuple
+            The path of the metric in the results tree
+        condition : dict
+            The condition that experiments must match
+
+        Returns
+        -------
+        values : list
+            The values of the metric, in the order of experiments, excluding
+            experiments where the metric is not available
+        """
+        return [self._results[i].getval(metric)
+                for i in np.flatnonzero(self.select(condition))
+                if self._results[i].getval(metric) is not None]
+
+    def means_confidence_intervals(self, metrics, conditions, confidence=0.95):
+        """Compute mean and confidence interval of metrics over the
+        experiments matching conditions.
+
+        Parameters
+        ----------
+        metrics : list of tuples
+            The paths of the metrics in the results tree
+        conditions : list of dicts
+            The conditions that experiments must match. The i-th mean is
+            computed over values of the i-th metric in experiments matching
+            the i-th condition
+        confidence : float, optional
+            The confidence level
+
+        Returns
+        -------
+        means : array
+            The means of the metrics, NaN if no experiment matches
+        errs : array
+            The confidence intervals of the metrics, NaN if no experiment
+            matches
+        """
+        if len(metrics) != len(conditions):
+            raise ValueError('metrics and conditions must have the same length')
+        means = np.empty(len(metrics))
+        errs = np.empty(len(metrics))
+        points = collections.defaultdict(list)
+        for i, metric in enumerate(metrics):
+            points[tuple(metric)].append(i)
+        for metric, idx in points.items():
+            values, present = self._metric(metric)
+            if values is None:
+                raise ValueError('Metric %s is not numeric' % str(metric))
+            groups = np.array([self.select(conditions[i]) & present
+                               for i in idx], dtype=bool)
+            means[idx], errs[idx] = means_confidence_intervals(
+                    values, groups.reshape(len(idx), len(self)), confidence)
+        return means, errs
@@ -4,31 +4,17 @@
 from __future__ import division
 import os
 import collections
+import multiprocessing as mp
 
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
 
 from icarus.util import Tree, step_cdf
-from icarus.tools import means_confidence_interval
+from icarus.results.index import ResultIndex
 
 
-__all__ = ['plot_lines', 'plot_bar_chart', 'plot_cdf']
+__all__ = ['plot_lines', 'plot_bar_chart', 'plot_cdf', 'plot_figures']
 
 
-# These lines prevent insertion of Type 3 fonts in figures
-# Publishers don't want them. However, in some case these commands block the
-# embedding of fonts raising complaints for example from EDAS
-# plt.rcParams['ps.useafm'] = True
-# plt.rcParams['pdf.use14corefonts'] = True
-
-# If True text is interpreted as LaTeX, e.g. underscore are interpreted as
-# subscript. If False, text is interpreted literally
-plt.rcParams['text.usetex'] = False
-
-# Aspect ratio of the output figures
-plt.rcParams['figure.figsize'] = 8, 5
-
 # Size of font in legends
 LEGEND_SIZE = 14
 
@@ -41,6 +27,44 @@ BW_COLOR_CATALOGUE = ['k', '0.2', '0.3', '0.4', '0.5', '0.6', '0.7', '0.8', '0.9
 # Catalogue of possible hatch styles (for bar charts)
 HATCH_CATALOGUE = [None, '/', '\\', '\\\\', '//', '+', 'x', '*', 'o', '.', '|', '-', 'O']
 
+# Whether pyplot has already been configured by _pyplot
+_pyplot_configured = False
+
+
+def _pyplot():
+    """Return the matplotlib pyplot module, importing and configuring it on
+    first use.
+
+    Pyplot is imported here rather than at the top of the module because it
+    is slow to import and it is not needed unless plots are drawn.
+    """
+    global _pyplot_configured
+    import matplotlib.pyplot as plt
+    if not _pyplot_configured:
+        # These lines prevent insertion of Type 3 fonts in figures
+        # Publishers don't want them. However, in some case these commands
+        # block the embedding of fonts raising complaints for example from EDAS
+        # plt.rcParams['ps.useafm'] = True
+        # plt.rcParams['pdf.use14corefonts'] = True
+
+        # If True text is interpreted as LaTeX, e.g. underscore are
+        # interpreted as subscript. If False, text is interpreted literally
+        plt.rcParams['text.usetex'] = False
+
+        # Aspect ratio of the output figures
+        plt.rcParams['figure.figsize'] = 8, 5
+        _pyplot_configured = True
+    return plt
+
+
+def _index(resultset):
+    """Return an index of a resultset, or the resultset itself if it is
+    already an index
+    """
+    if isinstance(resultset, ResultIndex):
+        return resultset
+    return ResultIndex(resultset)
+
 
 def plot_lines(resultset, desc, filename, plotdir):
     """Plot a graph with characteristics described in the plot descriptor out
@@ -48,8 +72,9 @@ def plot_lines(resultset, desc, filename, plotdir):
 
     Parameters
     ----------
-    rs : ResultSet
-        Result set
+    resultset : ResultSet or ResultIndex
+        Result set or an index of it. If multiple graphs are plotted out of the
+        same resultset, passing an index avoids indexing it for each graph
     desc : dict
         The plot descriptor (more info below)
     filename : str
@@ -144,6 +169,8 @@ def plot_lines(resultset, desc, filename, plotdir):
         The limits of the y axis. If not specified, they're automatically
         selected by Matplotlib
     """
+    from matplotlib.ticker import ScalarFormatter
+    plt = _pyplot()
     fig = plt.figure()
     _, ax1 = plt.subplots()
     if 'title' in desc:
@@ -161,11 +188,11 @@ def plot_lines(resultset, desc, filename, plotdir):
     xvals = sorted(desc['xvals'])
     if 'xticks' in desc:
         ax1.set_xticks(desc['xticks'])
-        ax1.get_xaxis().set_major_formatter(matplotlib.ticker.ScalarFormatter())
+        ax1.get_xaxis().set_major_formatter(ScalarFormatter())
         ax1.set_xticklabels([str(xtick) for xtick in desc['xticks']])
     if 'yticks' in desc:
         ax1.set_yticks(desc['yticks'])
-        ax1.get_yaxis().set_major_formatter(matplotlib.ticker.ScalarFormatter())
+        ax1.get_yaxis().set_major_formatter(ScalarFormatter())
         ax1.set_yticklabels([str(ytick) for ytick in desc['yticks']])
     ymetrics = desc['ymetrics']
     ycondnames = desc['ycondnames'] if 'ycondnames' in desc else None
@@ -175,25 +202,31 @@ def plot_lines(resultset, desc, filename, plotdir):
             raise ValueError('ymetrics, ycondnames and ycondvals must have the same length')
         # yvals is basically the list of values that differentiate each line
         # it is used for legends and styles mainly
-        yvals = ycondvals if len(set(ymetrics)) == 1 else zip(ymetrics, ycondvals)
+        yvals = ycondvals if len(set(ymetrics)) == 1 else list(zip(ymetrics, ycondvals))
     else:
         yvals = ymetrics
     plot_args = desc.get('plot_args', {})
     plot_empty = desc.get('plotempty', True)
     empty = True
+    # Compute the values of all points of all lines at once
+    metrics = []
+    conditions = []
     for i in range(len(yvals)):
-        means = np.zeros(len(xvals))
-        err = np.zeros(len(xvals))
         for j in range(len(xvals)):
             condition = Tree(desc['filter'])
             condition.setval(desc['xparam'], xvals[j])
             if ycondnames is not None:
                 condition.setval(ycondnames[i], ycondvals[i])
-            data = [v.getval(ymetrics[i])
-                    for _, v in resultset.filter(condition)
-                    if v.getval(ymetrics[i]) is not None]
-            confidence = desc['confidence'] if 'confidence' in desc else 0.95
-            means[j], err[j] = means_confidence_interval(data, confidence)
+            metrics.append(ymetrics[i])
+            conditions.append(condition)
+    confidence = desc['confidence'] if 'confidence' in desc else 0.95
+    all_means, all_err = _index(resultset).means_confidence_intervals(
+        metrics, conditions, confidence)
+    all_means = all_means.reshape(len(yvals), len(xvals))
+    all_err = all_err.reshape(len(yvals), len(xvals))
+    for i in range(len(yvals)):
+        means = all_means[i]
+        err = all_err[i]
         yerr = None if 'errorbar' in desc and not desc['errorbar'] or all(err == 0) else err
         fmt = desc['line_style'][yvals[i]] if 'line_style' in desc \
               and yvals[i] in desc['line_style'] else '-'
@@ -230,8 +263,9 @@ def plot_bar_chart(resultset, desc, filename, plotdir):
 
     Parameters
     ----------
-    rs : ResultSet
-        Result set
+    resultset : ResultSet or ResultIndex
+        Result set or an index of it. If multiple graphs are plotted out of the
+        same resultset, passing an index avoids indexing it for each graph
     desc : dict
         The plot descriptor (more info below)
     filename : str
@@ -331,9 +365,10 @@ def plot_bar_chart(resultset, desc, filename, plotdir):
         The upper limit of the y axis. If not specified, it is automatically
         selected by Matplotlib
     """
+    plt = _pyplot()
     fig = plt.figure()
     _, ax1 = plt.subplots()
-    plt.grid(b=True, which='major', color='k', axis='y', linestyle=':')
+    plt.grid(True, which='major', color='k', axis='y', linestyle=':')
     if 'title' in desc:
         plt.title(desc['title'])
     # Set axis below bars
@@ -354,7 +389,7 @@ def plot_bar_chart(resultset, desc, filename, plotdir):
             raise ValueError('ymetrics, ycondnames and ycondvals must have the same length')
         # yvals is basically the list of values that differentiate each bar
         # it is used for legends and styles mainly
-        yvals = ycondvals if len(set(ymetrics)) == 1 else zip(ymetrics, ycondvals)
+        yvals = ycondvals if len(set(ymetrics)) == 1 else list(zip(ymetrics, ycondvals))
     else:
         yvals = ymetrics
     placement = desc['placement'] if 'placement' in desc else 'grouped'
@@ -392,31 +427,39 @@ def plot_bar_chart(resultset, desc, filename, plotdir):
         hatch = dict((y, HATCH_CATALOGUE[yvals.index(y)]) for y in yvals)
     else:
         hatch = collections.defaultdict(lambda: None)
+    # Compute the values of all bars at once
+    metrics = []
+    conditions = []
+    for i in range(len(desc['xvals'])):
+        for j in range(len(yvals)):
+            condition = Tree(desc['filter'])
+            condition.setval(desc['xparam'], desc['xvals'][i])
+            if ycondnames is not None:
+                condition.setval(ycondnames[j], ycondvals[j])
+            metrics.append(ymetrics[j])
+            conditions.append(condition)
+    confidence = desc['confidence'] if 'confidence' in desc else 0.95
+    all_means, all_err = _index(resultset).means_confidence_intervals(
+        metrics, conditions, confidence)
+    all_means = all_means.reshape(len(desc['xvals']), len(yvals))
+    all_err = all_err.reshape(len(desc['xvals']), len(yvals))
     # Plot bars
     left = border  # left-most point of the bar about to draw
     for i in range(len(desc['xvals'])):
-        l = 0
+        j = 0
         for x in placement:
             bottom = 0  # Bottom point of a bar. It is alway 0 if stacked is False
             for y in range(x):
-                condition = Tree(desc['filter'])
-                condition.setval(desc['xparam'], desc['xvals'][i])
-                if ycondnames is not None:
-                    condition.setval(ycondnames[l], ycondvals[l])
-                data = [v.getval(ymetrics[l])
-                        for _, v in resultset.filter(condition)
-                        if v.getval(ymetrics[l]) is not None]
-                confidence = desc['confidence'] if 'confidence' in desc else 0.95
-                meanval, err = means_confidence_interval(data, confidence)
+                meanval, err = all_means[i, j], all_err[i, j]
                 yerr = None if 'errorbar' in desc and not desc['errorbar'] else err
                 if not np.isnan(meanval):
                     empty = False
-                elem[yvals[l]] = plt.bar(left, meanval, width,
-                                         color=color[yvals[l]],
+                elem[yvals[j]] = plt.bar(left, meanval, width,
+                                         color=color[yvals[j]],
                                          yerr=yerr, bottom=bottom, ecolor='k',
-                                         hatch=hatch[yvals[l]], label=yvals[l])
+                                         hatch=hatch[yvals[j]], label=yvals[j])
                 bottom += meanval
-                l += 1
+                j += 1
             left += width
         left += separation
     if empty and not plot_empty:
@@ -448,8 +491,9 @@ def plot_cdf(resultset, desc, filename, plotdir):
 
     Parameters
     ----------
-    rs : ResultSet
-        Result set
+    resultset : ResultSet or ResultIndex
+        Result set or an index of it. If multiple graphs are plotted out of the
+        same resultset, passing an index avoids indexing it for each graph
     desc : dict
         The plot descriptor (more info below)
     filename : str
@@ -535,6 +579,7 @@ def plot_cdf(resultset, desc, filename, plotdir):
      * plotempty : bool, optional
          If *True*, plot and save graph even if empty. Default is *True*
     """
+    plt = _pyplot()
     fig = plt.figure()
     if 'title' in desc:
         plt.title(desc['title'])
@@ -557,9 +602,10 @@ def plot_cdf(resultset, desc, filename, plotdir):
             raise ValueError('ymetrics, ycondnames and ycondvals must have the same length')
         # yvals is basically the list of values that differentiate each line
         # it is used for legends and styles mainly
-        yvals = ycondvals if len(set(ymetrics)) == 1 else zip(ymetrics, ycondvals)
+        yvals = ycondvals if len(set(ymetrics)) == 1 else list(zip(ymetrics, ycondvals))
     else:
         yvals = ymetrics
+    index = _index(resultset)
     x_min = np.infty
     x_max = -np.infty
     empty = True
@@ -567,9 +613,7 @@ def plot_cdf(resultset, desc, filename, plotdir):
         condition = Tree(desc['filter'])
         if ycondnames is not None:
             condition.setval(ycondnames[i], ycondvals[i])
-        data = [v.getval(ymetrics[i])
-                for _, v in resultset.filter(condition)
-                if v.getval(ymetrics[i]) is not None]
+        data = index.values(ymetrics[i], condition)
         # If there are more than 1 CDFs in the resultset, take the first one
         if data:
             x_cdf, y_cdf = data[0]
@@ -600,3 +644,53 @@ def plot_cdf(resultset, desc, filename, plotdir):
     plt.legend(legend, prop={'size': LEGEND_SIZE}, loc=desc['legend_loc'])
     plt.savefig(os.path.join(plotdir, filename), bbox_inches='tight')
     plt.close(fig)
+
+
+# Index of the resultset used by plot_figures workers
+_plot_index = None
+
+
+def _init_plot_worker(index):
+    global _plot_index
+    _plot_index = index
+
+
+def _plot_figure(plot_function, desc, filename, plotdir):
+    plot_function(_plot_index, desc, filename, plotdir)
+
+
+def plot_figures(resultset, figures, plotdir, n_processes=None):
+    """Plot several graphs out of the same resultset in parallel.
+
+    The resultset is indexed once and the index is passed to a pool of
+    processes, each plotting a share of the graphs.
+
+    Parameters
+    ----------
+    resultset : ResultSet or ResultIndex
+        Result set or an index of it
+    figures : iterable of tuples
+        The graphs to plot. Each graph is a (plot_function, desc, filename)
+        tuple, where plot_function is a plot function of this module, e.g.
+        *plot_lines*, and desc and filename are the arguments passed to it
+    plotdir : str
+        The directory in which the plots will be saved.
+    n_processes : int, optional
+        The number of processes used to plot graphs. If not specified, it is
+        equal to the number of CPUs. If 1, graphs are plotted by this process
+    """
+    index = _index(resultset)
+    if n_processes == 1:
+        for plot_function, desc, filename in figures:
+            plot_function(index, desc, filename, plotdir)
+        return
+    pool = mp.Pool(n_processes, initializer=_init_plot_worker,
+                   initargs=(index,))
+    try:
+        jobs = [pool.apply_async(_plot_figure, (plot_function, desc, filename, plotdir))
+                for plot_function, desc, filename in figures]
+        for job in jobs:
+            job.get()
+    finally:
+        pool.close()
+        pool.join()
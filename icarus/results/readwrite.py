@@ -2,21 +2,50 @@
 """
 import collections
 import copy
+import hashlib
 import json
+import logging
+import numbers
+import os
+import sqlite3
+import tempfile
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
 from icarus.util import Tree
-from icarus.registry import register_results_reader, register_results_writer
+from icarus.registry import register_results_reader, register_results_writer, \
+    RESULTS_READER, RESULTS_WRITER
 
 
 __all__ = [
+    'RUNTIME_KEY',
     'ResultSet',
+    'SqliteResultSet',
+    'results_format',
+    'merge_results',
     'write_results_pickle',
-    'read_results_pickle'
+    'read_results_pickle',
+    'write_results_sqlite',
+    'read_results_sqlite'
            ]
 
+
+logger = logging.getLogger('results')
+
+# Key of results storing runtime statistics of experiments rather than metrics
+# measured by data collectors
+RUNTIME_KEY = 'RUNTIME'
+
+# Runtime statistics summarized by ResultSet.runtime_summary, with the
+# functions used to aggregate counters across experiments
+_RUNTIME_PHASES = ['TOPOLOGY', 'WORKLOAD', 'CACHE_PLACEMENT',
+                   'CONTENT_PLACEMENT', 'NETWORK_MODEL', 'WARMUP', 'MEASURED']
+_RUNTIME_COUNTERS = [('EVENTS', sum), ('PEAK_EVENT_QUEUE', max),
+                     ('PEAK_CACHE_QUEUE', max), ('PEAK_LIVE_FLOWS', max),
+                     ('PEAK_RSS', max)]
+
+
 class ResultSet(object):
     """This class can be used to store results from different experiments,
     accessed and filtered.
@@ -185,6 +214,91 @@ class ResultSet(object):
             output += "\n"
         return output
 
+    def runtime_summary(self):
+        """Return a human-readable summary of the runtime statistics of all
+        experiments of the resultset.
+
+        Return
+        ------
+        summary : str
+            Summary of runtime statistics, reporting for each phase of the
+            experiments the total and mean time spent in it and its share of
+            the total time
+        """
+        runtimes = [results[RUNTIME_KEY] for _, results in self
+                    if RUNTIME_KEY in results]
+        if not runtimes:
+            return "No runtime statistics available\n"
+        total = sum(r.get('TOTAL', 0) for r in runtimes)
+        n = len(runtimes)
+        output = "RUNTIME SUMMARY OF {} EXPERIMENTS:\n".format(n)
+        output += "  {:<20}{:>12}{:>12}{:>8}\n".format(
+            'PHASE', 'TOTAL (s)', 'MEAN (s)', 'SHARE')
+        for phase in _RUNTIME_PHASES + ['TOTAL']:
+            t = sum(r.get(phase, 0) for r in runtimes)
+            share = 100 * t / total if total > 0 else 0
+            output += "  {:<20}{:>12.3f}{:>12.3f}{:>7.1f}%\n".format(
+                    phase, t, t / n, share)
+        for counter, aggregate in _RUNTIME_COUNTERS:
+            values = [r[counter] for r in runtimes if r.get(counter) is not None]
+            if not values:
+                continue
+            name = 'TOTAL_' + counter if aggregate is sum else counter
+            output += "   * {}: {}\n".format(name, aggregate(values))
+        # Overall rate of events processed while simulating
+        events = sum(r.get('EVENTS', 0) for r in runtimes)
+        seconds = sum(r.get('WARMUP', 0) + r.get('MEASURED', 0) for r in runtimes)
+        if seconds > 0:
+            output += "   * EVENTS_PER_SEC: {:.1f}\n".format(events / seconds)
+        return output
+
+    def memory_summary(self):
+        """Return a human-readable summary of the memory statistics of all
+        experiments of the resultset which were run with memory profiling
+        enabled.
+
+        Return
+        ------
+        summary : str
+            Summary of memory statistics, reporting for each phase of the
+            experiments the maximum memory allocated and peak resident set
+            size across experiments, and the top allocation sites and object
+            types of the experiment with the largest allocation peak
+        """
+        memories = [(params, results[RUNTIME_KEY]['MEMORY']) for params, results
+                    in self if RUNTIME_KEY in results
+                    and 'MEMORY' in results[RUNTIME_KEY]]
+        if not memories:
+            return "No memory statistics available\n"
+        output = "MEMORY SUMMARY OF {} EXPERIMENTS:\n".format(len(memories))
+        output += "  {:<12}{:>16}{:>16}{:>16}\n".format(
+                'PHASE', 'MAX TRACED', 'MAX TRACED PEAK', 'PEAK RSS')
+        phases = [phase for phase in ('SETUP', 'WARMUP', 'MEASURED')
+                  if any(phase in memory for _, memory in memories)]
+        for phase in phases:
+            stats = [memory[phase] for _, memory in memories if phase in memory]
+            rss = [s['PEAK_RSS'] for s in stats if s['PEAK_RSS'] is not None]
+            output += "  {:<12}{:>16}{:>16}{:>16}\n".format(
+                    phase, max(s['TRACED'] for s in stats),
+                    max(s['TRACED_PEAK'] for s in stats),
+                    max(rss) if rss else 'N/A')
+        params, memory = max(memories, key=lambda m: max(
+                s['TRACED_PEAK'] for s in m[1].values()))
+        output += "\nEXPERIMENT WITH LARGEST ALLOCATION PEAK:\n"
+        for path, value in Tree(params).paths().items():
+            output += "   * {}: {}\n".format(' -> '.join(map(str, path)), value)
+        for phase in phases:
+            if phase not in memory:
+                continue
+            output += "  {}\n    TOP ALLOCATION SITES:\n".format(phase)
+            for site, size, count in memory[phase]['TOP_SITES']:
+                output += "     * {}: {} bytes in {} blocks\n".format(
+                    site, size, count)
+            output += "    OBJECTS:\n"
+            for obj_type, count in memory[phase]['OBJECTS']:
+                output += "     * {}: {}\n".format(obj_type, count)
+        return output
+
     def filter(self, condition):
         """Return subset of results matching specific conditions
 
@@ -211,6 +325,478 @@ class ResultSet(object):
         return filtered_resultset
 
 
+# Header of SQLite database files, used to recognize them
+_SQLITE_HEADER = b'SQLite format 3\x00'
+
+# Maximum number of experiments fetched by a single SQL query
+_SQLITE_BATCH = 500
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attr (id INTEGER PRIMARY KEY, value BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS columns (name TEXT PRIMARY KEY, kind TEXT NOT NULL,
+                                    path BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS experiments (id INTEGER PRIMARY KEY,
+                                        parameters BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS metrics (experiment INTEGER NOT NULL,
+                                    path BLOB NOT NULL, value BLOB NOT NULL,
+                                    PRIMARY KEY (experiment, path));
+"""
+
+
+def _sql_value(value):
+    """Return a value converted to a type that SQLite stores natively in a
+    column or *None* if the value cannot be stored in a column
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        value = int(value)
+        return value if -2**63 <= value < 2**63 else None
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return None
+
+
+class _DeferredMetric(object):
+    """Placeholder of a metric stored in a SQLite results database that is
+    loaded when first accessed
+    """
+
+    __slots__ = ['resultset', 'experiment', 'path']
+
+    def __init__(self, resultset, experiment, path):
+        self.resultset = resultset
+        self.experiment = experiment
+        self.path = path
+
+    def load(self):
+        row = self.resultset._conn.execute(
+                'SELECT value FROM metrics WHERE experiment = ? AND path = ?',
+                (self.experiment, self.path)).fetchone()
+        return pickle.loads(row[0])
+
+
+class _LazyTree(Tree):
+    """Tree whose values may be placeholders of metrics stored in a SQLite
+    results database. Placeholders are replaced by the actual values when
+    these are first accessed.
+    """
+
+    def __getitem__(self, k):
+        v = super(_LazyTree, self).__getitem__(k)
+        if isinstance(v, _DeferredMetric):
+            v = v.load()
+            self[k] = v
+            v = super(_LazyTree, self).__getitem__(k)
+        return v
+
+    def get(self, k, default=None):
+        return self[k] if k in self else default
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def __eq__(self, other):
+        self.items()
+        if isinstance(other, _LazyTree):
+            other.items()
+        return super(_LazyTree, self).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+
+class SqliteResultSet(ResultSet):
+    """Resultset stored in a SQLite database.
+
+    Differently from a *ResultSet*, whose experiments are all kept in memory
+    and pickled as a whole, experiments are stored in a database file and read
+    only when accessed, so that resultsets larger than the available memory
+    can be processed.
+
+    Each experiment is stored in a row of a table. Each scalar parameter, i.e.
+    each numeric or string leaf of the parameters tree, is additionally stored
+    in an indexed column, named after its path, so that filtering the
+    resultset only reads the matching experiments. Scalar metrics, i.e. the
+    numeric or string values of the results tree whose path has length up to
+    two (normally collector and metric names), are stored in a column each.
+    All other metrics, e.g. per-node or per-content metrics, are pickled in a
+    separate table and only loaded when they are accessed.
+
+    Note that numpy scalars in the results tree are read back as Python
+    scalars.
+    """
+
+    def __init__(self, path, attr=None):
+        """Constructor
+
+        Parameters
+        ----------
+        path : str
+            The path of the database file. It is created if it does not exist
+        attr : dict, optional
+            Dictionary of common attributes to all experiments. If the
+            database already exists, it must be equal to its attributes.
+        """
+        self.path = path
+        self._open()
+        row = self._conn.execute('SELECT value FROM attr').fetchone()
+        if row is None:
+            self.attr = attr if attr is not None else {}
+            self._conn.execute('INSERT INTO attr VALUES (0, ?)',
+                               (pickle.dumps(self.attr),))
+            self._conn.commit()
+        else:
+            self.attr = pickle.loads(row[0])
+            if attr is not None and attr != self.attr:
+                raise ValueError('The database %s stores results with '
+                                 'different global attributes' % path)
+        # Ids of the experiments in the resultset or None if the resultset
+        # includes all experiments of the database
+        self._ids = None
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(_SQLITE_SCHEMA)
+        # Map (kind, path) tuples to the names of the columns storing them
+        self._columns = {(kind, pickle.loads(path)): name for name, kind, path
+                         in self._conn.execute('SELECT * FROM columns')}
+
+    def __getstate__(self):
+        return {'path': self.path, 'attr': self.attr, '_ids': self._ids}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        if self._ids is not None:
+            return len(self._ids)
+        return self._conn.execute('SELECT COUNT(*) FROM experiments').fetchone()[0]
+
+    def _experiment_ids(self):
+        if self._ids is not None:
+            return self._ids
+        return [i for i, in self._conn.execute('SELECT id FROM experiments '
+                                               'ORDER BY id')]
+
+    def _read(self, ids):
+        """Return the experiments with given ids, in the same order"""
+        result_columns = [(path, name) for (kind, path), name
+                          in self._columns.items() if kind == 'result']
+        query = 'SELECT %s FROM experiments WHERE id IN (%%s)' % \
+                ', '.join(['id', 'parameters'] +
+                          [name for _, name in result_columns])
+        experiments = {}
+        for i in range(0, len(ids), _SQLITE_BATCH):
+            batch = ids[i:i + _SQLITE_BATCH]
+            marks = ', '.join('?' * len(batch))
+            for row in self._conn.execute(query % marks, batch):
+                results = _LazyTree()
+                for (path, _), value in zip(result_columns, row[2:]):
+                    if value is not None:
+                        self._set(results, path, value)
+                experiments[row[0]] = [pickle.loads(row[1]), results]
+            query_metrics = 'SELECT experiment, path FROM metrics ' \
+                            'WHERE experiment IN (%s)' % marks
+            for experiment, path in self._conn.execute(query_metrics, batch):
+                self._set(experiments[experiment][1], pickle.loads(path),
+                          _DeferredMetric(self, experiment, path))
+        return [tuple(experiments[i]) for i in ids]
+
+    @staticmethod
+    def _set(tree, path, value):
+        for k in path[:-1]:
+            if k not in tree:
+                dict.__setitem__(tree, k, _LazyTree())
+            tree = dict.__getitem__(tree, k)
+        dict.__setitem__(tree, path[-1], value)
+
+    def __iter__(self):
+        ids = self._experiment_ids()
+        for i in range(0, len(ids), _SQLITE_BATCH):
+            for experiment in self._read(ids[i:i + _SQLITE_BATCH]):
+                yield experiment
+
+    def __getitem__(self, i):
+        return self._read([self._experiment_ids()[i]])[0]
+
+    def __add__(self, resultset):
+        """Merges two resultsets.
+
+        Parameters
+        ----------
+        resultset : ResultSet
+            The result set to merge
+
+        Returns
+        -------
+        resultset : ResultSet
+            An in-memory resultset containing results from this resultset and
+            the one passed as argument
+        """
+        if self.attr != resultset.attr:
+            raise ValueError('The resultsets cannot be merged because '
+                             'they have different global attributes')
+        rs = ResultSet(copy.deepcopy(self.attr))
+        for i in iter(self):
+            rs.add(*i)
+        for i in iter(resultset):
+            rs.add(*i)
+        return rs
+
+    def _column(self, kind, path):
+        """Return the name of the column storing a parameter or a metric,
+        adding the column if it does not exist
+        """
+        name = self._columns.get((kind, path))
+        if name is None:
+            name = 'c%d' % len(self._columns)
+            self._conn.execute('ALTER TABLE experiments ADD COLUMN %s' % name)
+            if kind == 'parameter':
+                self._conn.execute('CREATE INDEX experiments_%s ON '
+                                   'experiments (%s)' % (name, name))
+            self._conn.execute('INSERT INTO columns VALUES (?, ?, ?)',
+                               (name, kind, pickle.dumps(path)))
+            self._columns[(kind, path)] = name
+        return name
+
+    def add(self, parameters, results):
+        """Add a result to the result set.
+
+        The result is not guaranteed to be written to the database file until
+        the *flush* or *close* methods are called.
+
+        Parameters
+        ----------
+        parameters : Tree
+            Tree of experiment parameters
+        results : Tree
+            Tree of experiment results
+        """
+        if self._ids is not None:
+            raise ValueError('Cannot add results to a filtered resultset')
+        if not isinstance(parameters, Tree):
+            parameters = Tree(parameters)
+        if not isinstance(results, Tree):
+            results = Tree(results)
+        columns = {}
+        for path, value in parameters.paths().items():
+            value = _sql_value(value)
+            if value is not None:
+                columns[self._column('parameter', path)] = value
+        metrics = []
+        for collector, data in results.items():
+            items = data.items() if isinstance(data, Tree) else [(None, data)]
+            for metric, value in items:
+                path = (collector,) if metric is None else (collector, metric)
+                sql_value = _sql_value(value)
+                if sql_value is not None:
+                    columns[self._column('result', path)] = sql_value
+                else:
+                    metrics.append((path, value))
+        names = ['parameters'] + list(columns)
+        cursor = self._conn.execute(
+                'INSERT INTO experiments (%s) VALUES (%s)'
+                % (', '.join(names), ', '.join('?' * len(names))),
+                [pickle.dumps(parameters)] + list(columns.values()))
+        self._conn.executemany('INSERT INTO metrics VALUES (?, ?, ?)',
+                               [(cursor.lastrowid, pickle.dumps(path),
+                                 pickle.dumps(value)) for path, value in metrics])
+
+    def flush(self):
+        """Write all added results to the database file"""
+        self._conn.commit()
+
+    def close(self):
+        """Write all added results to the database file and close it"""
+        self._conn.commit()
+        self._conn.close()
+
+    def dump(self):
+        """Dump all results in a list
+
+        Returns
+        -------
+        results : list
+            A list of 2-value tuples where the first value is the dictionary
+            of experiment parameters and the second value is the dictionary
+            of experiment results.
+        """
+        return list(self)
+
+    def filter(self, condition):
+        """Return subset of results matching specific conditions
+
+        Only experiments whose indexed parameters match the condition are read
+        from the database.
+
+        Parameters
+        ----------
+        condition : dict
+            Dictionary listing all parameters and values to be matched in the
+            results set. Each parameter, i.e., each key of the dictionary must
+            be an iterable object containing the path in the parameters tree
+            to the required parameter
+
+        Returns
+        -------
+        filtered_results : SqliteResultSet
+            Resultset including only experiments matching the condition
+        """
+        condition = Tree(condition)
+        clauses = []
+        values = []
+        for path, value in condition.paths().items():
+            name = self._columns.get(('parameter', path))
+            value = _sql_value(value)
+            if name is not None and value is not None:
+                # Parameters that cannot be stored in a column, e.g.
+                # AnyValue objects, are NULL and matched after unpickling
+                clauses.append('(%s = ? OR %s IS NULL)' % (name, name))
+                values.append(value)
+        query = 'SELECT id, parameters FROM experiments'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY id'
+        view_ids = set(self._ids) if self._ids is not None else None
+        ids = [i for i, parameters in self._conn.execute(query, values)
+               if (view_ids is None or i in view_ids)
+               and pickle.loads(parameters).match(condition)]
+        # The filtered resultset shares the database connection of this one
+        filtered_resultset = object.__new__(SqliteResultSet)
+        filtered_resultset.__dict__.update(self.__dict__)
+        filtered_resultset._ids = ids
+        return filtered_resultset
+
+
+def results_format(path):
+    """Return the format of a results file
+
+    Parameters
+    ----------
+    path : str
+        The path of the results file
+
+    Returns
+    -------
+    format : str
+        The format of the file, which is a key of the *RESULTS_READER*
+        registry
+    """
+    with open(path, 'rb') as f:
+        header = f.read(len(_SQLITE_HEADER))
+    return 'SQLITE' if header == _SQLITE_HEADER else 'PICKLE'
+
+
+def _experiment_digest(parameters, results):
+    """Return a digest of the parameters and the replication of an
+    experiment, independent of the order in which parameters were inserted,
+    or *None* if its replication is unknown, e.g. in results files written
+    before replications were recorded
+    """
+    runtime = results.get(RUNTIME_KEY)
+    replication = runtime.get('REPLICATION') if runtime else None
+    if replication is None:
+        return None
+    paths = sorted((repr(path), repr(value)) for path, value
+                   in Tree(parameters).paths().items())
+    return hashlib.sha1(repr((paths, replication)).encode('utf-8')).digest()
+
+
+def merge_results(inputs, output, fmt='SQLITE', deduplicate=False):
+    """Merge results files into one.
+
+    Inputs are read one at a time and their experiments are added to the
+    output as they are read, so that merging takes time linear in the total
+    number of experiments. If the output format is SQLITE, experiments are
+    written to the output file after reading each input, so that only one
+    input at a time is kept in memory. Other formats can only be written at
+    once, so that all experiments are kept in memory until the end.
+
+    Parameters
+    ----------
+    inputs : list
+        The paths of the results files to merge, of any supported format
+    output : str
+        The path of the merged results file. If it exists, it is overwritten
+    fmt : str, optional
+        The format of the output file
+    deduplicate : bool, optional
+        If True, experiments whose parameters and replication, i.e. the
+        REPLICATION runtime statistic, are equal to those of an experiment
+        already merged are discarded. Experiments whose replication is unknown
+        are always kept, since different replications of an experiment have
+        the same parameters, and a warning is logged
+
+    Returns
+    -------
+    n_duplicates : int
+        The number of experiments discarded because duplicated
+    """
+    if not inputs:
+        raise ValueError('No results files to merge')
+    seen = set()
+    n_duplicates = 0
+    n_unknown = 0
+    merged = None
+    # The output is written to a temporary file replacing it at the end, so
+    # that an output which is also an input is read before being overwritten
+    # and no truncated output is left on error
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)),
+                                    suffix='.tmp')
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        try:
+            for path in inputs:
+                resultset = RESULTS_READER[results_format(path)](path)
+                if merged is None:
+                    if fmt == 'SQLITE':
+                        merged = SqliteResultSet(tmp_path, resultset.attr)
+                    else:
+                        merged = ResultSet(resultset.attr)
+                elif resultset.attr != merged.attr:
+                    raise ValueError('The results in %s cannot be merged '
+                                     'because they have different global '
+                                     'attributes' % path)
+                for parameters, results in resultset:
+                    if deduplicate:
+                        digest = _experiment_digest(parameters, results)
+                        if digest is None:
+                            n_unknown += 1
+                        elif digest in seen:
+                            n_duplicates += 1
+                            continue
+                        else:
+                            seen.add(digest)
+                    merged.add(parameters, results)
+                if isinstance(resultset, SqliteResultSet):
+                    resultset.close()
+                if fmt == 'SQLITE':
+                    merged.flush()
+        finally:
+            if fmt == 'SQLITE' and merged is not None:
+                merged.close()
+        if fmt != 'SQLITE':
+            RESULTS_WRITER[fmt](merged, tmp_path)
+        os.replace(tmp_path, output)
+        if n_unknown > 0:
+            logger.warning('%d experiments were not deduplicated because '
+                           'their replication is unknown', n_unknown)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return n_duplicates
+
+
 @register_results_writer('PICKLE')
 def write_results_pickle(results, path):
     """Write a resultset to a pickle file
@@ -242,3 +828,41 @@ def read_results_pickle(path):
     """
     with open(path, 'rb') as pickle_file:
         return pickle.load(pickle_file)
+
+
+@register_results_writer('SQLITE')
+def write_results_sqlite(results, path):
+    """Write a resultset to a SQLite database
+
+    Parameters
+    ----------
+    results : ResultSet
+        The set of results
+    path : str
+        The path of the file to which write. If it exists, it is overwritten
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    resultset = SqliteResultSet(path, results.attr)
+    for parameters, res in results:
+        resultset.add(parameters, res)
+    resultset.close()
+
+
+@register_results_reader('SQLITE')
+def read_results_sqlite(path):
+    """Reads a resultset from a SQLite database.
+
+    Parameters
+    ----------
+    path : str
+        The file path from which results are read
+
+    Returns
+    -------
+    results : SqliteResultSet
+        The read result set
+    """
+    if not os.path.isfile(path):
+        raise ValueError('File %s does not exist' % path)
+    return SqliteResultSet(path)
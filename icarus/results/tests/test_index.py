@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from icarus.results import ResultSet, ResultIndex
+from icarus.util import AnyValue
+
+
+class TestResultIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rs = ResultSet()
+        cls.rs.add({'alpha': 1, 'beta': {'name': 'A'}}, {'m': {'MEAN': 1.0}})
+        cls.rs.add({'alpha': 1, 'beta': {'name': 'A'}}, {'m': {'MEAN': 3.0}})
+        cls.rs.add({'alpha': 2, 'beta': {'name': 'A'}}, {'m': {'MEAN': 5.0}})
+        cls.rs.add({'alpha': AnyValue(), 'beta': {'name': 'B'}}, {'m': {'MEAN': 7.0}})
+        cls.rs.add({'alpha': 2, 'beta': {'name': 'B'}}, {'n': {'MEAN': 9.0}})
+        cls.index = ResultIndex(cls.rs)
+
+    def test_filter_same_as_resultset(self):
+        for condition in [{'alpha': 1}, {'alpha': 2}, {'alpha': 3},
+                          {'beta': {'name': 'B'}}, {'gamma': 1},
+                          {'alpha': 2, 'beta': {'name': 'A'}},
+                          {'alpha': AnyValue()}]:
+            self.assertEqual(list(self.rs.filter(condition)),
+                             self.index.filter(condition))
+
+    def test_values(self):
+        self.assertEqual([1.0, 3.0, 7.0],
+                         self.index.values(('m', 'MEAN'), {'alpha': 1}))
+
+    def test_means_confidence_intervals(self):
+        means, errs = self.index.means_confidence_intervals(
+                [('m', 'MEAN'), ('m', 'MEAN'), ('n', 'MEAN'), ('n', 'MEAN')],
+                [{'alpha': 1, 'beta': {'name': 'A'}}, {'alpha': 2},
+                 {'alpha': 2}, {'alpha': 1}])
+        self.assertEqual(2.0, means[0])
+        self.assertEqual(6.0, means[1])
+        self.assertEqual(9.0, means[2])
+        self.assertEqual(0.0, errs[2])
+        self.assertTrue(np.isnan(means[3]))
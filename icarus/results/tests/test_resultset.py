@@ -1,6 +1,13 @@
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 
-from icarus.results import ResultSet
+from icarus.results import ResultSet, SqliteResultSet, results_format, \
+    merge_results, read_results_pickle, write_results_pickle, \
+    read_results_sqlite, write_results_sqlite, RUNTIME_KEY
+from icarus.util import AnyValue, Tree
 
 class TestResultSet(unittest.TestCase):
 
@@ -54,3 +61,161 @@ class TestResultSet(unittest.TestCase):
         rs.add(a, b)
         rs.add(b, a)
         self.assertEqual([[a, b], [b, a]], eval(rs.json()))
+
+    def test_runtime_summary(self):
+        self.assertIn('No runtime', self.rs.runtime_summary())
+        rs = ResultSet()
+        for i in range(1, 3):
+            rs.add(self.cond_a, Tree({'RUNTIME': {'WARMUP': i, 'MEASURED': i,
+                                                  'TOTAL': 2 * i, 'EVENTS': 10 * i,
+                                                  'PEAK_LIVE_FLOWS': i,
+                                                  'PEAK_RSS': None}}))
+        summary = rs.runtime_summary()
+        self.assertIn('2 EXPERIMENTS', summary)
+        self.assertIn('TOTAL_EVENTS: 30', summary)
+        self.assertIn('EVENTS_PER_SEC: 5.0', summary)
+        self.assertIn('PEAK_LIVE_FLOWS: 2', summary)
+        self.assertNotIn('PEAK_RSS', summary)
+
+
+class TestSqliteResultSet(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'results.db')
+        self.rs = SqliteResultSet(self.path, {'version': 1})
+        self.cond_a = {'alpha': 1, 'beta': {'name': 'A'}}
+        self.cond_b = {'alpha': 2, 'beta': {'name': 'A'}}
+        self.cond_c = {'alpha': AnyValue(), 'beta': {'name': 'B'}}
+        self.metric = {'C': {'MEAN': 0.5, 'PER_NODE': {1: 0.1, 2: 0.2}}}
+        self.rs.add(self.cond_a, self.metric)
+        self.rs.add(self.cond_b, self.metric)
+        self.rs.add(self.cond_c, {'C': {'MEAN': 0.6}})
+
+    def tearDown(self):
+        self.rs.close()
+        shutil.rmtree(self.dir)
+
+    def test_len(self):
+        self.assertEqual(3, len(self.rs))
+
+    def test_getitem(self):
+        cond, metric = self.rs[1]
+        self.assertEqual(self.cond_b, cond)
+        self.assertEqual(self.metric, metric)
+        self.assertEqual(0.2, metric.getval(['C', 'PER_NODE', 2]))
+
+    def test_filter_match(self):
+        self.assertEqual(2, len(self.rs.filter({'alpha': 1})))
+        self.assertEqual(2, len(self.rs.filter({'beta': {'name': 'A'}})))
+        self.assertEqual(1, len(self.rs.filter({'alpha': 2, 'beta': {'name': 'A'}})))
+        self.assertEqual(0, len(self.rs.filter({'alpha': 3, 'beta': {'name': 'A'}})))
+        self.assertEqual(0, len(self.rs.filter({'gamma': 1})))
+        filtered_rs = self.rs.filter({'alpha': 2}).filter({'beta': {'name': 'B'}})
+        self.assertEqual(1, len(filtered_rs))
+        self.assertEqual(0.6, filtered_rs[0][1].getval(['C', 'MEAN']))
+
+    def test_read(self):
+        self.rs.flush()
+        rs = read_results_sqlite(self.path)
+        self.assertEqual({'version': 1}, rs.attr)
+        self.assertEqual([r for _, r in self.rs], [r for _, r in rs])
+        rs.close()
+        self.assertRaises(ValueError, SqliteResultSet, self.path, {'version': 2})
+
+    def test_pickle(self):
+        self.rs.flush()
+        rs = pickle.loads(pickle.dumps(self.rs.filter({'alpha': 1})))
+        self.assertEqual(2, len(rs))
+        self.assertEqual(self.metric, rs[0][1])
+        rs.close()
+
+    def test_convert(self):
+        pickle_path = os.path.join(self.dir, 'results.pickle')
+        sqlite_path = os.path.join(self.dir, 'converted.db')
+        rs = ResultSet({'version': 1})
+        rs.add({'alpha': 1, 'beta': 'b'}, self.metric)
+        write_results_pickle(rs, pickle_path)
+        write_results_sqlite(rs, sqlite_path)
+        self.assertEqual('PICKLE', results_format(pickle_path))
+        self.assertEqual('SQLITE', results_format(sqlite_path))
+        converted = read_results_sqlite(sqlite_path)
+        self.assertEqual(rs.attr, converted.attr)
+        self.assertEqual(rs.dump(), converted.dump())
+        converted.close()
+
+
+class TestMergeResults(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.inputs = []
+        for i in range(3):
+            rs = ResultSet({'version': 1})
+            rs.add({'alpha': i}, {'m': i, RUNTIME_KEY: {'REPLICATION': 0}})
+            rs.add({'alpha': 0}, {'m': 0, RUNTIME_KEY: {'REPLICATION': 0}})
+            path = os.path.join(self.dir, 'results-%d.pickle' % i)
+            write_results_pickle(rs, path)
+            self.inputs.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_merge(self):
+        output = os.path.join(self.dir, 'merged.pickle')
+        self.assertEqual(0, merge_results(self.inputs, output, 'PICKLE'))
+        rs = read_results_pickle(output)
+        self.assertEqual({'version': 1}, rs.attr)
+        self.assertEqual([0, 0, 1, 0, 2, 0], [r['m'] for _, r in rs])
+
+    def test_merge_deduplicate_sqlite(self):
+        output = os.path.join(self.dir, 'merged.db')
+        self.assertEqual(3, merge_results(self.inputs, output, 'SQLITE',
+                                          deduplicate=True))
+        rs = read_results_sqlite(output)
+        self.assertEqual([0, 1, 2], [r['m'] for _, r in rs])
+        rs.close()
+
+    def test_merge_deduplicate_replications(self):
+        rs = ResultSet({'version': 1})
+        for replication in (0, 1, 1):
+            rs.add({'alpha': 0}, Tree({'m': 0, RUNTIME_KEY: {'REPLICATION': replication}}))
+        path = os.path.join(self.dir, 'replications.pickle')
+        write_results_pickle(rs, path)
+        output = os.path.join(self.dir, 'merged.pickle')
+        self.assertEqual(1, merge_results([path], output, 'PICKLE',
+                                          deduplicate=True))
+        rs = read_results_pickle(output)
+        self.assertEqual([0, 1], [r[RUNTIME_KEY]['REPLICATION'] for _, r in rs])
+
+    def test_merge_deduplicate_unknown_replication(self):
+        rs = ResultSet({'version': 1})
+        rs.add({'alpha': 0}, {'m': 0})
+        rs.add({'alpha': 0}, {'m': 1})
+        path = os.path.join(self.dir, 'legacy.pickle')
+        write_results_pickle(rs, path)
+        output = os.path.join(self.dir, 'merged.db')
+        with self.assertLogs('results', 'WARNING'):
+            self.assertEqual(0, merge_results([path], output, deduplicate=True))
+        rs = read_results_sqlite(output)
+        self.assertEqual([0, 1], [r['m'] for _, r in rs])
+        rs.close()
+
+    def test_merge_different_attr(self):
+        rs = ResultSet({'version': 2})
+        path = os.path.join(self.dir, 'other.pickle')
+        write_results_pickle(rs, path)
+        output = os.path.join(self.dir, 'merged.pickle')
+        self.assertRaises(ValueError, merge_results, self.inputs + [path],
+                          output, 'PICKLE')
+        self.assertFalse(os.path.exists(output))
+        self.assertEqual(4, len(os.listdir(self.dir)))
+
+    def test_merge_into_input_sqlite(self):
+        output = os.path.join(self.dir, 'merged.db')
+        merge_results(self.inputs[:1], output, 'SQLITE')
+        merge_results(self.inputs[1:] + [output], output, 'SQLITE')
+        rs = read_results_sqlite(output)
+        self.assertEqual([1, 0, 2, 0, 0, 0], [r['m'] for _, r in rs])
+        rs.close()
+        self.assertEqual(4, len(os.listdir(self.dir)))
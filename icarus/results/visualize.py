@@ -3,8 +3,6 @@ from __future__ import division
 import os
 
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import networkx as nx
 
 
@@ -62,6 +60,7 @@ def draw_stack_deployment(topology, filename, plotdir):
     filename : string
         The name of the image file to save
     """
+    import matplotlib.pyplot as plt
     stack = stack_map(topology)
     node_color = [COLORMAP[stack[v]] for v in topology.nodes_iter()]
     plt.figure()
@@ -89,6 +88,8 @@ def draw_network_load(topology, result, filename, plotdir):
     filename : string
         The name of the image file to save
     """
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
     stack = stack_map(topology)
     node_color = [COLORMAP[stack[v]] for v in topology.nodes_iter()]
     node_min = 50
@@ -10,7 +10,7 @@ import multiprocessing as mp
 
 from icarus.util import Settings, config_logging
 from icarus.registry import RESULTS_WRITER
-from icarus.orchestration import Orchestrator
+from icarus.orchestration import Orchestrator, aggregate_profiles
 
 
 __all__ = ['run', 'handler']
@@ -76,7 +76,8 @@ def _validate_settings(settings, freeze=True):
         settings.freeze()
 
 
-def run(config_file, output, config_override):
+def run(config_file, output, config_override, profile_dir=None,
+        memory_profile=False):
     """
     Run function. It starts the simulator.
     experiments
@@ -89,6 +90,12 @@ def run(config_file, output, config_override):
         The file name where results will be saved
     config_override : dict, optional
         Configuration parameters overriding parameters in the file
+    profile_dir : str, optional
+        If specified, experiments are profiled and their profiles are written
+        to this directory, overriding the PROFILE_DIR setting
+    memory_profile : bool, optional
+        If True, memory allocations of experiments are traced, overriding the
+        MEMORY_PROFILE setting
     """
     # Read settings from file and save them in icarus.conf.settings
     settings = Settings()
@@ -100,6 +107,10 @@ def run(config_file, output, config_override):
             except NameError:
                 pass
             settings.set(k, v)
+    if profile_dir:
+        settings.PROFILE_DIR = profile_dir
+    if memory_profile:
+        settings.MEMORY_PROFILE = True
     # Config logger
     config_logging(settings.LOG_LEVEL if 'LOG_LEVEL' in settings else 'INFO')
     # Validate settings
@@ -114,3 +125,6 @@ def run(config_file, output, config_override):
     results = orch.results
     RESULTS_WRITER[settings.RESULTS_FORMAT](results, output)
     logger.info('Saved results to file %s' % os.path.abspath(output))
+    if 'PROFILE_DIR' in settings and settings.PROFILE_DIR:
+        report = aggregate_profiles(results, settings.PROFILE_DIR)
+        logger.info('Saved profiling report to file %s' % os.path.abspath(report))
@@ -5,3 +5,4 @@ from .cacheplacement import *
 from .contentplacement import *
 from .topology import *
 from .workload import *
+from .artifacts import *
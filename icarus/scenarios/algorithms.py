@@ -1,12 +1,12 @@
 """Various algorithms used for optimal cache placement."""
-import random
+import multiprocessing as mp
 
 import numpy as np
 import networkx as nx
 
 import fnss
 
-from icarus.util import path_links
+from icarus.util import path_links, n_fork_processes
 
 
 __all__ = [
@@ -18,9 +18,25 @@ __all__ = [
            ]
 
 
-def pam(distances, k, n_iter=10):
+# Number of candidate medoids whose swaps are evaluated at once by `pam`
+_PAM_CHUNK = 256
+
+# Arguments of the restarts of `pam` executed by forked processes, set by the
+# parent process before forking them
+_pam_job = None
+
+
+def pam(distances, k, n_iter=10, seed=0, n_processes=None):
     """Compute k-medoids using the PAM algorithm
 
+    The first repetition is initialized by the greedy BUILD step of PAM and
+    the others by random medoids. Each repetition then improves its medoids
+    with the SWAP step of FasterPAM [1]_. The cost change of swapping a
+    candidate point with each medoid is computed for all medoids at once from
+    the distances of each point to its nearest and second nearest medoids,
+    and a swap is applied as soon as it reduces the cost. Repetitions are
+    executed by parallel processes, where processes can be forked.
+
     Parameters
     ----------
     distances : 2-d NumPy array
@@ -31,6 +47,15 @@ def pam(distances, k, n_iter=10):
         Number of iterations to repeat. Each repetition is executed using a
         different initial random assignment. Repetiting the experiment allow
         to reach different local optima, possibly achieving a best solution.
+    seed : int, optional
+        The seed from which the seeds of the initial random assignments of
+        repetitions are derived, so that results do not depend on the number
+        of processes
+    n_processes : int, optional
+        The number of parallel processes. By default, the number of CPUs. If
+        processes cannot be forked, e.g. within daemonic processes,
+        repetitions are executed by the calling process and, if several
+        processes were requested, a warning is logged
 
     Return
     ------
@@ -42,72 +67,135 @@ def pam(distances, k, n_iter=10):
     cost : float
         Cost of the solution
 
-    Notes
-    -----
-    Implementation based on:
-    https://github.com/salspaugh/machine_learning/blob/master/clustering/kmedoids.py
+    References
+    ----------
+    .. [1] E. Schubert, P. J. Rousseeuw, Fast and eager k-medoids clustering:
+           O(k) runtime improvement of the PAM, CLARA, and CLARANS algorithms,
+           Information Systems, 101, 2021
     """
-    def assign_points_to_clusters(medoids, distances):
-        """Return a 1-d array having for at each index the medoid the element
-        belongs to.
-
-        E.g. if point i is mapped to medoid j, clusters[i] = j
-        """
-        distances_to_medoids = distances[:, medoids]
-        clusters = medoids[np.argmin(distances_to_medoids, axis=1)]
-        clusters[medoids] = medoids
-        return clusters
-
-    def compute_new_medoid(cluster, distances):
-        mask = np.ones(distances.shape)
-        mask[np.ix_(cluster, cluster)] = 0.
-        cluster_distances = np.ma.masked_array(data=distances, mask=mask, fill_value=10e9)
-        costs = cluster_distances.sum(axis=1)
-        return costs.argmin(axis=0, fill_value=np.inf)
-
-    def clusters(distances, k):
-        m = distances.shape[0]  # number of points
-        if k > m:
-            raise ValueError("k is greater than the number of points")
-
-        if hasattr(np.random, 'choice'):
-            curr_medoids = np.random.choice(np.arange(m, dtype=int), k, replace=False)
+    global _pam_job
+    distances = np.asarray(distances, dtype=float)
+    m = distances.shape[0]  # number of points
+    if k > m:
+        raise ValueError("k is greater than the number of points")
+    n_iter = max(1, n_iter)
+    n_processes = n_fork_processes(n_processes, n_iter)
+    _pam_job = (distances, k, seed)
+    try:
+        if n_processes == 1:
+            solutions = [_pam_restart(i) for i in range(n_iter)]
         else:
-            # This is only if I use NumPy < 1.7
-            curr_medoids = np.asarray(random.sample(np.arange(m, dtype=int), k))
-
-        old_medoids = np.empty(k)
-        new_medoids = np.empty(k)
-
-        # Set a negative value to ensure execution of while loop
-        old_medoids[0] = -1
-
-        # Until the medoids stop updating, do the following:
-        while not np.all(old_medoids == curr_medoids):
-            # Assign each point to cluster with closest medoid
-            clusters = assign_points_to_clusters(curr_medoids, distances)
-
-            # Update cluster medoids to be lowest cost point.
-            for curr_medoid in curr_medoids:
-                cluster = np.where(clusters == curr_medoid)[0]
-                new_medoids[curr_medoids == curr_medoid] = compute_new_medoid(cluster, distances)
-
-            old_medoids[:] = curr_medoids[:]
-            curr_medoids[:] = new_medoids[:]
-            cost = np.sum(distances[np.arange(m), clusters])
-        return clusters, curr_medoids, cost
-
-    min_cost = np.inf
-    opt_clusters = None
-    opt_medoids = None
-
-    for _ in range(n_iter):
-        curr_clusters, curr_medoids, curr_cost = clusters(distances, k)
-        if curr_cost < min_cost:
-            min_cost = curr_cost
-            opt_clusters = curr_clusters
-            opt_medoids = curr_medoids
-    return opt_clusters, opt_medoids, min_cost
+            pool = mp.get_context('fork').Pool(n_processes)
+            try:
+                solutions = pool.map(_pam_restart, range(n_iter))
+            finally:
+                pool.terminate()
+                pool.join()
+    finally:
+        _pam_job = None
+    # The first repetition with the minimum cost is returned
+    return min(solutions, key=lambda s: s[2])
+
+
+def _pam_restart(index):
+    """Execute a repetition of `pam`"""
+    distances, k, seed = _pam_job
+    m = distances.shape[0]
+    if index == 0:
+        medoids = _pam_build(distances, k)
+    else:
+        rng = np.random.RandomState([seed, index])
+        medoids = rng.choice(np.arange(m, dtype=int), k, replace=False)
+    medoids = _pam_swap(distances, medoids)
+    nearest, dist_nearest, _ = _nearest_medoids(distances, medoids)
+    clusters = medoids[nearest]
+    clusters[medoids] = medoids
+    return clusters, medoids, np.sum(distances[np.arange(m), clusters])
+
+
+def _nearest_medoids(distances, medoids):
+    """Return the index in medoids of the nearest medoid of each point and
+    the distances of each point to its nearest and second nearest medoids
+    """
+    m = distances.shape[0]
+    to_medoids = distances[:, medoids]
+    if len(medoids) == 1:
+        return np.zeros(m, dtype=int), to_medoids[:, 0], np.full(m, np.inf)
+    order = np.argpartition(to_medoids, 1, axis=1)
+    points = np.arange(m)
+    nearest = to_medoids[points, order[:, 0]]
+    second_nearest = to_medoids[points, order[:, 1]]
+    return order[:, 0], nearest, second_nearest
+
+
+def _pam_build(distances, k):
+    """Select k initial medoids with the greedy BUILD step of PAM"""
+    m = distances.shape[0]
+    medoids = [int(np.argmin(distances.sum(axis=0)))]
+    dist_nearest = distances[:, medoids[0]].copy()
+    for _ in range(1, k):
+        best_gain, best = -1, None
+        for start in range(0, m, _PAM_CHUNK):
+            block = distances[:, start:start + _PAM_CHUNK]
+            gains = np.maximum(dist_nearest[:, np.newaxis] - block, 0).sum(axis=0)
+            gains[[v - start for v in medoids if start <= v < start + _PAM_CHUNK]] = -1
+            c = int(np.argmax(gains))
+            if gains[c] > best_gain:
+                best_gain, best = gains[c], start + c
+        medoids.append(best)
+        np.minimum(dist_nearest, distances[:, best], out=dist_nearest)
+    return np.asarray(medoids, dtype=int)
+
+
+def _pam_swap(distances, medoids):
+    """Improve medoids with the eager SWAP step of FasterPAM"""
+    m = distances.shape[0]
+    k = len(medoids)
+    medoids = np.array(medoids, dtype=int)
+    if k == 1:
+        return np.array([np.argmin(distances.sum(axis=0))])
+    if k == m:
+        return medoids
+    nearest, dist_nearest, dist_second = _nearest_medoids(distances, medoids)
+    is_medoid = np.zeros(m, dtype=bool)
+    is_medoid[medoids] = True
+    # Tolerance on cost reductions, avoiding swaps due to rounding errors
+    tol = 1e-12 * max(1.0, np.abs(distances).max())
+    n_blocks = -(-m // _PAM_CHUNK)
+    block_index = 0
+    # Swaps are searched cyclically over blocks of candidates, until no block
+    # of a full cycle improves the cost
+    unimproved = 0
+    while unimproved < n_blocks:
+        start = block_index * _PAM_CHUNK
+        block = distances[:, start:start + _PAM_CHUNK]
+        assignment = np.zeros((k, m))
+        assignment[nearest, np.arange(m)] = 1
+        # Cost increase of removing each medoid, assigning its points to their
+        # second nearest medoid
+        removal_loss = assignment.dot(dist_second - dist_nearest)
+        closer = block < dist_nearest[:, np.newaxis]
+        # Points closer to the candidate than to their nearest medoid move to
+        # the candidate, whichever medoid is removed
+        shared = np.where(closer, block - dist_nearest[:, np.newaxis], 0).sum(axis=0)
+        # The other points of the removed medoid move to the nearer of the
+        # candidate and their second nearest medoid
+        own = np.where(closer, (dist_nearest - dist_second)[:, np.newaxis],
+                       np.minimum(block - dist_second[:, np.newaxis], 0))
+        delta = assignment.dot(own) + removal_loss[:, np.newaxis] + shared
+        delta[:, is_medoid[start:start + _PAM_CHUNK]] = np.inf
+        i, c = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[i, c] < -tol:
+            is_medoid[medoids[i]] = False
+            is_medoid[start + c] = True
+            medoids[i] = start + c
+            nearest, dist_nearest, dist_second = _nearest_medoids(distances,
+                                                                  medoids)
+            unimproved = 0
+        else:
+            unimproved += 1
+            block_index = (block_index + 1) % n_blocks
+    return medoids
 
 
 def extract_cluster_level_topology(topology):
@@ -200,7 +288,8 @@ def deploy_clusters(topology, clusters, assign_src_rcv=True):
         topology.node[v]['cluster'] = topology.node[next_node]['cluster']
 
 
-def compute_clusters(topology, k, distance='delay', nbunch=None, n_iter=10):
+def compute_clusters(topology, k, distance='delay', nbunch=None, n_iter=10,
+                     seed=0, n_processes=None):
     """Cluster nodes of a topologies as to minimize the intra-cluster latency.
 
     This function assumes that every link is labelled with latencies and
@@ -217,6 +306,11 @@ def compute_clusters(topology, k, distance='delay', nbunch=None, n_iter=10):
         If None, hop count is used instead
     n_iter : int, optional
         The number of iterations
+    seed : int, optional
+        The seed of the random initial medoids of iterations (see `pam`), so
+        that clusters are the same for the same seed
+    n_processes : int, optional
+        The number of parallel processes executing iterations (see `pam`)
 
     Return
     ------
@@ -255,7 +349,8 @@ def compute_clusters(topology, k, distance='delay', nbunch=None, n_iter=10):
             else:
                 distances[u][v] = distances[v][u] = len(edges)
     clusters = [set() for _ in range(k)]
-    medoid_assignment = pam(distances, k=k, n_iter=n_iter)[0]
+    medoid_assignment = pam(distances, k=k, n_iter=n_iter, seed=seed,
+                            n_processes=n_processes)[0]
     if any(medoid_assignment >= n):
         raise ValueError('Something is wrong with k-medoids algorithm. '
                          'I got an assignment to a medoid that does not exist')
@@ -267,7 +362,7 @@ def compute_clusters(topology, k, distance='delay', nbunch=None, n_iter=10):
     return clusters
 
 
-def compute_p_median(distances, p, n_iter=20):
+def compute_p_median(distances, p, n_iter=20, seed=0, n_processes=None):
     """Compute p-median solution using the Adjusted Vertex Substitution (AVS)
     algorithm.
 
@@ -277,6 +372,13 @@ def compute_p_median(distances, p, n_iter=20):
         Distance between nodes
     p : int
         Number of facilities
+    n_iter : int, optional
+        The number of iterations (see `pam`)
+    seed : int, optional
+        The seed of the random initial facilities of iterations (see `pam`),
+        so that the solution is the same for the same seed
+    n_processes : int, optional
+        The number of parallel processes executing iterations (see `pam`)
 
     Return
     ------
@@ -293,7 +395,8 @@ def compute_p_median(distances, p, n_iter=20):
     for i, v in enumerate(nodes):
         for j, u in enumerate(nodes):
             distances_matrix[i][j] = distances[u][v]
-    mappings, medians, cost = pam(distances_matrix, p, n_iter=n_iter)
+    mappings, medians, cost = pam(distances_matrix, p, n_iter=n_iter,
+                                  seed=seed, n_processes=n_processes)
     facilities = set(nodes_map[v] for v in medians)
     allocation = {}
     for i, j in enumerate(mappings):
@@ -0,0 +1,254 @@
+"""On-disk cache of built scenario artifacts.
+
+Building some scenarios is expensive, e.g. parsing RocketFuel topologies or
+computing optimized cache placements, and the same scenarios are normally
+built again by every campaign. This module provides a cache storing built
+topologies, their all-pairs shortest paths and cache placements in a
+directory, so that they are built only once.
+
+Each artifact is stored in a separate pickle file named after a hash of the
+specification of the scenario and of the source code of the modules of the
+package implementing the topology factory or cache placement that built it,
+so that artifacts built by a different version of the code are never reused,
+even if the code is edited between releases.
+
+Scenarios built using random draws, i.e. by topology factories or cache
+placements accepting a *seed* argument whose specification does not set it,
+are never stored, so that each experiment makes its own draw.
+"""
+import os
+import glob
+import hashlib
+import inspect
+import logging
+import pickle
+import tempfile
+
+from icarus.registry import TOPOLOGY_FACTORY, CACHE_PLACEMENT
+from icarus.execution import PathTable
+
+__all__ = ['ScenarioCache']
+
+
+logger = logging.getLogger('orchestration')
+
+
+# Version of the format of artifact files. Bump it when changing the content of
+# artifacts, so that files written in the previous format are not read
+ARTIFACT_FORMAT = 1
+
+
+def _canonical(spec):
+    """Return a representation of a specification independent of the order in
+    which its keys were inserted
+    """
+    if isinstance(spec, dict):
+        return sorted((k, _canonical(v)) for k, v in spec.items())
+    if isinstance(spec, (list, tuple)):
+        return [_canonical(v) for v in spec]
+    if isinstance(spec, (set, frozenset)):
+        return sorted(_canonical(v) for v in spec)
+    return spec
+
+
+# Digests of the source code of packages, keyed by directory
+_source_digests = {}
+
+
+def _source_digest(func):
+    """Return a digest of the source code of the modules of the package
+    implementing a function
+    """
+    directory = os.path.dirname(os.path.abspath(inspect.getsourcefile(func)))
+    if directory not in _source_digests:
+        digest = hashlib.sha1()
+        for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _source_digests[directory] = digest.hexdigest()
+    return _source_digests[directory]
+
+
+def _draws_randomly(func, spec):
+    """Return True if a scenario component is built using random draws not
+    determined by its specification
+    """
+    try:
+        parameters = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+    return 'seed' in parameters and spec.get('seed') is None
+
+
+class ScenarioCache(object):
+    """Directory of scenario artifacts keyed by their specification
+    """
+
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory where artifacts are stored. It is created if it does
+            not exist
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, kind, *specs, **kwargs):
+        """Return the key of an artifact
+
+        Parameters
+        ----------
+        kind : str
+            The kind of artifact
+        *specs : dicts
+            The specifications from which the artifact is built
+        code : list of callables, optional
+            The functions building the artifact, the source code of whose
+            packages determines the key as well
+
+        Returns
+        -------
+        key : str
+            The key of the artifact
+        """
+        code = [_source_digest(func) for func in kwargs.get('code', ())]
+        desc = repr((kind, ARTIFACT_FORMAT, code,
+                     [_canonical(spec) for spec in specs]))
+        return '%s-%s' % (kind, hashlib.sha1(desc.encode('utf-8')).hexdigest())
+
+    def path(self, key):
+        """Return the path of the file storing an artifact
+
+        Parameters
+        ----------
+        key : str
+            The key of the artifact
+
+        Returns
+        -------
+        path : str
+            The path of the artifact file
+        """
+        return os.path.join(self.directory, key + '.pickle')
+
+    def load(self, key):
+        """Load an artifact
+
+        Parameters
+        ----------
+        key : str
+            The key of the artifact
+
+        Returns
+        -------
+        artifact : object
+            The artifact or *None* if the cache does not store a valid artifact
+            for the key
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                stored_key, artifact = pickle.load(f)
+        except Exception:
+            logger.warning('Could not read scenario artifact %s', path)
+            return None
+        return artifact if stored_key == key else None
+
+    def store(self, key, artifact):
+        """Store an artifact
+
+        The artifact is written to a temporary file which is then atomically
+        renamed, so that processes concurrently storing or loading the same
+        artifact never see a partially written file.
+
+        Parameters
+        ----------
+        key : str
+            The key of the artifact
+        artifact : object
+            The artifact. It must be picklable
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((key, artifact), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def topology(self, spec):
+        """Return a topology and its path table, building and storing them if
+        they are not in the cache
+
+        Parameters
+        ----------
+        spec : dict
+            The topology specification, including the name of the topology
+            factory
+
+        Returns
+        -------
+        topology : Topology
+            The topology
+        path_table : PathTable
+            The all-pairs shortest paths of the topology
+        """
+        args = dict(spec)
+        factory = TOPOLOGY_FACTORY[args.pop('name')]
+        if _draws_randomly(factory, args):
+            topology = factory(**args)
+            return topology, PathTable.from_topology(topology)
+        key = self.key('topology', spec, code=[factory])
+        artifact = self.load(key)
+        if artifact is None:
+            topology = factory(**args)
+            artifact = (topology, PathTable.from_topology(topology))
+            self.store(key, artifact)
+        return artifact
+
+    def cache_placement(self, topology_spec, placement_spec, topology):
+        """Return a topology with caches deployed according to a cache
+        placement, applying it and storing the result if it is not in the cache
+
+        Parameters
+        ----------
+        topology_spec : dict
+            The topology specification, including the name of the topology
+            factory
+        placement_spec : dict
+            The cache placement specification, including the name of the cache
+            placement and the cache budget
+        topology : Topology
+            The topology built according to *topology_spec*, onto which caches
+            are deployed if the placement is not in the cache
+
+        Returns
+        -------
+        topology : Topology
+            The topology with caches deployed
+        """
+        args = dict(placement_spec)
+        placement = CACHE_PLACEMENT[args.pop('name')]
+        factory = TOPOLOGY_FACTORY[topology_spec['name']]
+        # Placements of randomly drawn topologies are not stored either, since
+        # they apply to a single draw
+        if _draws_randomly(placement, args) or \
+                _draws_randomly(factory, topology_spec):
+            placement(topology, **args)
+            return topology
+        key = self.key('cache_placement', topology_spec, placement_spec,
+                       code=[factory, placement])
+        placed_topology = self.load(key)
+        if placed_topology is None:
+            placement(topology, **args)
+            self.store(key, topology)
+            placed_topology = topology
+        return placed_topology
@@ -217,7 +217,8 @@ def optimal_median_cache_placement(topology, cache_budget, n_cache_nodes,
                     d[v][u] = d[u][v]
                 else:
                     d[v][u] = distances[v][u] + (hit_ratio * source_dist)
-        allocation, caches, _ = compute_p_median(distances, n_cache_nodes)
+        allocation, caches, _ = compute_p_median(distances, n_cache_nodes,
+                                                 n_processes=1)
         cache_assignment = {v: allocation[list(topology.adj[v].keys())[0]]
                             for v in topology.receivers()}
 
@@ -328,7 +329,8 @@ def clustered_hashrouting_cache_placement(topology, cache_budget, n_clusters,
         clusters = [set([v]) for v in icr_candidates]
     else:
         clusters = compute_clusters(topology, n_clusters, distance=distance,
-                                    nbunch=icr_candidates, n_iter=100)
+                                    nbunch=icr_candidates, n_iter=100,
+                                    n_processes=1)
     deploy_clusters(topology, clusters, assign_src_rcv=True)
     if policy == 'node_const':
         # Each node is assigned the same amount of caching space
@@ -1,6 +1,7 @@
 import unittest
 
 import networkx as nx
+import numpy as np
 import fnss
 
 import icarus.scenarios as algorithms
@@ -31,6 +32,16 @@ class TestClustering(unittest.TestCase):
         expected_clusters = [set([0, 1]), set([2, 3]), set([4, 5])]
         self.assertEqual(expected_clusters, clusters)
 
+    def test_clusters_seed(self):
+        t = algorithms.IcnTopology(fnss.ring_topology(12))
+        fnss.set_delays_constant(t, 1, 'ms')
+        for seed in (0, 1):
+            clusters = [algorithms.compute_clusters(t, 4, n_iter=4, seed=seed,
+                                                    n_processes=n_processes)
+                        for n_processes in (1, 2)]
+            self.assertEqual(clusters[0], clusters[1])
+            self.assertEqual(set(t.nodes()), set.union(*clusters[0]))
+
     def test_deploy_clusters(self):
         t = algorithms.IcnTopology(fnss.line_topology(6))
         t.graph['icr_candidates'] = set(t.nodes())
@@ -59,6 +70,43 @@ class TestClustering(unittest.TestCase):
         self.assertEqual(1, ct.number_of_nodes())
 
 
+class TestPam(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        points = np.random.RandomState(1).random_sample((60, 2))
+        cls.distances = np.sqrt(((points[:, np.newaxis] - points) ** 2).sum(axis=2))
+
+    def cost(self, medoids):
+        return self.distances[:, list(medoids)].min(axis=1).sum()
+
+    def test_local_optimum(self):
+        clusters, medoids, cost = algorithms.pam(self.distances, 4, n_iter=2,
+                                                 n_processes=1)
+        self.assertAlmostEqual(self.cost(medoids), cost)
+        self.assertEqual(set(medoids), set(clusters))
+        # No swap of a medoid with another point reduces the cost
+        for i in range(len(medoids)):
+            for v in set(range(len(self.distances))) - set(medoids):
+                swapped = list(medoids)
+                swapped[i] = v
+                self.assertGreaterEqual(self.cost(swapped), cost - 1e-9)
+
+    def test_restarts_deterministic(self):
+        serial = algorithms.pam(self.distances, 5, n_iter=4, n_processes=1)
+        parallel = algorithms.pam(self.distances, 5, n_iter=4, n_processes=2)
+        np.testing.assert_array_equal(serial[0], parallel[0])
+        self.assertEqual(serial[2], parallel[2])
+
+    def test_extreme_k(self):
+        _, medoids, _ = algorithms.pam(self.distances, 1, n_processes=1)
+        self.assertEqual(np.argmin(self.distances.sum(axis=0)), medoids[0])
+        clusters, _, cost = algorithms.pam(self.distances, 60, n_processes=1)
+        np.testing.assert_array_equal(np.arange(60), clusters)
+        self.assertEqual(0, cost)
+        self.assertRaises(ValueError, algorithms.pam, self.distances, 61)
+
+
 class TestPMedian(unittest.TestCase):
 
     def test_p_median(self):
@@ -75,9 +123,13 @@ class TestPMedian(unittest.TestCase):
         fnss.set_weights_constant(t, 2, [("C", "D")])
         distances = dict(nx.all_pairs_dijkstra_path_length(t, weight='weight'))
         allocation, facilities, cost = algorithms.compute_p_median(distances, 2)
-        self.assertDictEqual({"A": "B", "B": "B", "C": "B", "D": "E", "E": "E", "F": "E", }, allocation)
+        self.assertDictEqual({"A": "B", "B": "B", "C": "B",
+                              "D": "E", "E": "E", "F": "E", }, allocation)
         self.assertSetEqual(set("BE"), facilities)
         self.assertEqual(4, cost)
+        self.assertEqual((allocation, facilities, cost),
+                         algorithms.compute_p_median(distances, 2, seed=1,
+                                                     n_processes=1))
 
     def test_p_median_unsorted(self):
         """
@@ -94,7 +146,8 @@ class TestPMedian(unittest.TestCase):
         fnss.set_weights_constant(t, 2, [("B", "E")])
         distances = dict(nx.all_pairs_dijkstra_path_length(t, weight='weight'))
         allocation, facilities, cost = algorithms.compute_p_median(distances, 2)
-        self.assertDictEqual({"A": "C", "B": "C", "C": "C", "D": "D", "E": "D", "F": "D", }, allocation)
+        self.assertDictEqual({"A": "C", "B": "C", "C": "C",
+                              "D": "D", "E": "D", "F": "D", }, allocation)
         self.assertSetEqual(set("CD"), facilities)
         self.assertEqual(4, cost)
 
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from icarus.registry import TOPOLOGY_FACTORY
+from icarus.scenarios import ScenarioCache
+from icarus.util import Tree
+
+
+class TestScenarioCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ScenarioCache(self.dir)
+        self.spec = Tree({'name': 'PATH', 'n': 5, 'delay': 2})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_key(self):
+        other = Tree({'delay': 2, 'n': 5, 'name': 'PATH'})
+        self.assertEqual(self.cache.key('topology', self.spec),
+                         self.cache.key('topology', other))
+        other['n'] = 6
+        self.assertNotEqual(self.cache.key('topology', self.spec),
+                            self.cache.key('topology', other))
+        self.assertNotEqual(self.cache.key('topology', self.spec),
+                            self.cache.key('cache_placement', self.spec))
+
+    def test_load_store(self):
+        key = self.cache.key('test', {'a': 1})
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, [1, 2, 3])
+        self.assertEqual([1, 2, 3], self.cache.load(key))
+        self.assertEqual([key + '.pickle'], os.listdir(self.dir))
+
+    def test_corrupted(self):
+        key = self.cache.key('test', {'a': 1})
+        with open(self.cache.path(key), 'wb') as f:
+            f.write(b'corrupted')
+        self.assertIsNone(self.cache.load(key))
+
+    def test_topology(self):
+        built = []
+        factory = TOPOLOGY_FACTORY['PATH']
+
+        def counting_factory(**kwargs):
+            built.append(kwargs)
+            return factory(**kwargs)
+        TOPOLOGY_FACTORY['PATH'] = counting_factory
+        try:
+            topology, path_table = self.cache.topology(self.spec)
+            cached_topology, cached_path_table = self.cache.topology(self.spec)
+        finally:
+            TOPOLOGY_FACTORY['PATH'] = factory
+        self.assertEqual(1, len(built))
+        self.assertEqual(set(topology.edges()), set(cached_topology.edges()))
+        self.assertEqual(path_table[0][4], cached_path_table[0][4])
+
+    def test_cache_placement(self):
+        topology, _ = self.cache.topology(self.spec)
+        placement = {'name': 'UNIFORM', 'cache_budget': 30}
+        placed = self.cache.cache_placement(self.spec, placement, topology)
+        fresh, _ = self.cache.topology(self.spec)
+        cached = self.cache.cache_placement(self.spec, placement, fresh)
+        self.assertIsNot(fresh, cached)
+        self.assertEqual(placed.cache_nodes(), cached.cache_nodes())
+
+    def test_key_code(self):
+        factory = TOPOLOGY_FACTORY['PATH']
+        self.assertEqual(self.cache.key('topology', self.spec, code=[factory]),
+                         self.cache.key('topology', self.spec, code=[factory]))
+        self.assertNotEqual(self.cache.key('topology', self.spec, code=[factory]),
+                            self.cache.key('topology', self.spec,
+                                           code=[self.test_key_code]))
+
+    def test_random_cache_placement_not_stored(self):
+        topology, _ = self.cache.topology(self.spec)
+        n_artifacts = len(os.listdir(self.dir))
+        placement = {'name': 'RANDOM', 'cache_budget': 30,
+                     'n_cache_nodes': len(topology.graph['icr_candidates'])}
+        self.cache.cache_placement(self.spec, placement, topology)
+        self.assertEqual(n_artifacts, len(os.listdir(self.dir)))
+        placement['seed'] = 1
+        self.cache.cache_placement(self.spec, placement, topology)
+        self.assertEqual(n_artifacts + 1, len(os.listdir(self.dir)))
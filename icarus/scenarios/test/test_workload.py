@@ -1,3 +1,4 @@
+import random
 import unittest
 
 import icarus.scenarios as workload
@@ -75,3 +76,72 @@ class TestYCBS(unittest.TestCase):
             self.assertIn('op', event)
             self.assertIn('item', event)
             self.assertIn('log', event)
+
+
+class TestStationary(unittest.TestCase):
+
+    def setUp(self):
+        self.topology = workload.topology_path(4)
+
+    def test_end_warmup(self):
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=100,
+                                         n_measured=5, seed=1)
+        logs = []
+        for _, event in wl:
+            logs.append(event['log'])
+            if len(logs) == 3:
+                wl.end_warmup()
+        self.assertEqual([False] * 3 + [True] * 5, logs)
+        self.assertEqual(3, wl.warmup_length)
+
+    def test_end_warmup_after_warmup(self):
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=2,
+                                         n_measured=3, seed=1)
+        logs = []
+        for _, event in wl:
+            logs.append(event['log'])
+            if event['log']:
+                wl.end_warmup()
+        self.assertEqual([False, False, True, True, True], logs)
+        self.assertEqual(2, wl.warmup_length)
+
+    def test_seed(self):
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=10,
+                                         n_measured=10, seed=1)
+        events = list(wl)
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=10,
+                                         n_measured=10, seed=1)
+        # Random draws of other components do not change requests
+        other_events = []
+        for event in wl:
+            random.random()
+            other_events.append(event)
+        self.assertEqual(events, other_events)
+
+    def test_stop(self):
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=2,
+                                         n_measured=10, seed=1)
+        n_events = 0
+        for _, event in wl:
+            n_events += 1
+            if n_events == 5:
+                wl.stop()
+        self.assertEqual(5, n_events)
+
+    def test_resume(self):
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=5,
+                                         n_measured=10, seed=1)
+        events = list(wl)
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=5,
+                                         n_measured=10, seed=1)
+        resumed = []
+        for event in wl:
+            resumed.append(event)
+            if len(resumed) == 7:
+                state = wl.get_state()
+                break
+        wl = workload.StationaryWorkload(self.topology, 10, 0.8, n_warmup=5,
+                                         n_measured=10, seed=2)
+        wl.set_state(state)
+        resumed.extend(wl)
+        self.assertEqual(events, resumed)
@@ -16,6 +16,27 @@ following attributes:
 
 Each workload must expose the `contents` attribute which is an iterable of
 all content identifiers. This is needed for content placement.
+
+Workloads may also implement an `end_warmup` method, ending the warmup phase
+before *n_warmup* requests are generated. This is required to run experiments
+with adaptive warmup, which is ended by the simulation engine as soon as
+caches reach steady state. Similarly, workloads may implement a `stop` method,
+ending the measured phase before *n_measured* requests are generated, which
+is required to run experiments stopped as soon as results are accurate enough.
+Packet-level workloads may implement an `enable_request_level_warmup` method,
+making them issue the requests of the warmup phase as request-level events.
+This is required to run hybrid experiments, whose caches are filled in the
+warmup phase by request-level strategies.
+
+Stationary workloads also implement `get_state` and `set_state` methods,
+returning the state of an iteration over the workload and resuming a new
+iteration from it. This is required to start experiments from snapshots.
+
+Stationary workloads draw requests from their own random number generator,
+seeded with their *seed* parameter, so that the sequence of requests of a
+workload only depends on its parameters and seed, and not on random draws of
+strategies, cache policies or placements. This is required to compare
+strategies with common random numbers.
 """
 import random
 import csv
@@ -35,6 +56,72 @@ __all__ = [
         'StationaryPacketLevelWorkloadWithCacheDelay'
            ]
 
+
+def _end_warmup(workload):
+    """End the warmup phase of a workload being iterated over, if not already
+    ended.
+
+    Workloads supporting this keep the number of requests generated so far
+    in the *n_requests* attribute, the number of requests of the warmup phase
+    in the *warmup_length* attribute and the total number of requests to
+    generate in the *max_requests* attribute.
+    """
+    if workload.n_requests < workload.warmup_length:
+        workload.warmup_length = workload.n_requests
+        workload.max_requests = workload.n_requests + workload.n_measured
+
+
+def _stop(workload):
+    """Stop generating requests from a workload being iterated over.
+
+    Workloads supporting this keep the number of requests generated so far
+    in the *n_requests* attribute and the total number of requests to
+    generate in the *max_requests* attribute.
+    """
+    workload.max_requests = min(workload.max_requests, workload.n_requests)
+
+
+def _get_state(workload):
+    """Return the state of the iteration over a workload.
+
+    Workloads supporting this keep, besides the attributes required by
+    `_end_warmup`, their random number generator in the *rng* attribute and
+    the time of their next request, or of their last request if the next one
+    is not drawn yet, in the *time* attribute.
+    """
+    return {'n_requests': workload.n_requests,
+            'warmup_length': workload.warmup_length,
+            'max_requests': workload.max_requests,
+            'time': workload.time,
+            'rng': workload.rng.getstate()}
+
+
+def _start(workload):
+    """Start a new iteration over a workload or resume the iteration whose
+    state was set by `set_state`.
+
+    Returns
+    -------
+    state : dict
+        The state from which iteration is resumed, or *None* if iteration
+        is started from the first request
+    """
+    state = workload.state
+    workload.state = None
+    if state is None:
+        workload.n_requests = 0
+        workload.warmup_length = workload.n_warmup
+        workload.max_requests = workload.n_warmup + workload.n_measured
+        workload.time = 0.0
+    else:
+        workload.n_requests = state['n_requests']
+        workload.warmup_length = state['warmup_length']
+        workload.max_requests = state['max_requests']
+        workload.time = state['time']
+        workload.rng.setstate(state['rng'])
+    return state
+
+
 @register_workload('STATIONARY_PACKET_LEVEL')
 class StationaryPacketLevelWorkload(object):
     """This function generates events on the fly, i.e. instead of creating an
@@ -85,13 +172,13 @@ class StationaryPacketLevelWorkload(object):
         dictionary of event attributes.
     """
     def __init__(self, topology, n_contents, alpha, beta=0, rate=1.0,
-                    n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None, **kwargs):
+                 n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None, **kwargs):
         if alpha < 0:
             raise ValueError('alpha must be positive')
         if beta < 0:
             raise ValueError('beta must be positive')
         self.receivers = [v for v in topology.nodes()
-                     if topology.node[v]['stack'][0] == 'receiver']
+                          if topology.node[v]['stack'][0] == 'receiver']
         self.zipf = TruncatedZipfDist(alpha, n_contents)
         self.n_contents = n_contents
         self.contents = list(range(1, n_contents + 1))
@@ -99,10 +186,15 @@ class StationaryPacketLevelWorkload(object):
         self.rate = rate
         self.n_warmup = n_warmup
         self.n_measured = n_measured
+        # Requests are drawn from self.rng, but strategies and cache
+        # policies, e.g. PROB_CACHE and RAND, draw from the global generator
         random.seed(seed)
+        self.rng = random.Random(seed)
+        self.state = None
         self.view = None
         self.controller = None
         self.beta = beta
+        self.request_level_warmup = False
         # print('Stationary-pkr-level, enter init')
         if beta != 0:
             degree = nx.degree(self.topology)
@@ -110,12 +202,17 @@ class StationaryPacketLevelWorkload(object):
             self.receiver_dist = TruncatedZipfDist(beta, len(self.receivers))
 
     def __iter__(self):
-        flow_counter = 0
-        t_next_flow = 0.0
+        # The time of the next flow is drawn as soon as the previous flow is
+        # started, so that iteration can be resumed after any event
+        state = _start(self)
+        if state is None:
+            self.time = self.rng.expovariate(self.rate)
+        else:
+            self.contents = list(state['contents'])
+        t_next_flow = self.time
         # print('Stationary-pkt-level, enter iter')
-        while ( (flow_counter < self.n_warmup + self.n_measured) or len(self.view.eventQ())>0 ):
+        while (self.n_requests < self.max_requests) or len(self.view.eventQ()) > 0:
             # print('Stationary-pkt-level, enter iter while')
-            t_next_flow += (random.expovariate(self.rate))
             event = self.view.peek_next_event()
             # print('enter outer while, flow_counter:', flow_counter)
             while (event is not None) and (event['t_event'] < t_next_flow):
@@ -126,23 +223,109 @@ class StationaryPacketLevelWorkload(object):
                 event = self.view.peek_next_event()
                 # print('flow_counter:', flow_counter, 't_event', t_event, 'event:', event)
 
-            if flow_counter >= (self.n_warmup + self.n_measured):
-                continue
-            if self.beta == 0:
-                receiver = random.choice(self.receivers)
+            t_flow = t_next_flow
+            if self.n_requests < self.max_requests:
+                event = self._new_flow()
+                if self.request_level_warmup and not event['log']:
+                    event = {'receiver': event['receiver'],
+                             'content': event['content'], 'log': False}
             else:
-                receiver = self.receivers[self.receiver_dist.rv() - 1]
-            content = int(self.zipf.rv())
-            if flow_counter % 1000 == 0:
-                random.shuffle(self.contents)
-            content = self.contents.index(content) + 1
-            log = (flow_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'node': receiver, 'flow': flow_counter, 'pkt_type': 'Request', 'log': log}
-            # print('flow counter: ', flow_counter, 't_next_flow', t_next_flow, 'event:', event)
-            yield (t_next_flow, event)
-            flow_counter += 1
+                event = None
+            t_next_flow += (self.rng.expovariate(self.rate))
+            self.time = t_next_flow
+            if event is not None:
+                # print('flow counter: ', flow_counter, 't_next_flow', t_next_flow, 'event:', event)
+                yield (t_flow, event)
         return
 
+    def _new_flow(self):
+        """Return the event of the request starting the next flow"""
+        if self.beta == 0:
+            receiver = self.rng.choice(self.receivers)
+        else:
+            receiver = self.receivers[self.receiver_dist.rv(self.rng) - 1]
+        content = int(self.zipf.rv(self.rng))
+        if self.n_requests % 1000 == 0:
+            self.rng.shuffle(self.contents)
+        content = self.contents.index(content) + 1
+        log = (self.n_requests >= self.warmup_length)
+        event = {'receiver': receiver, 'content': content, 'node': receiver, 'flow': self.n_requests, 'pkt_type': 'Request', 'log': log}
+        self.n_requests += 1
+        return event
+
+    def flows(self):
+        """Iterate over the requests starting new flows only, without
+        processing the events of flows in progress.
+
+        The requests are the same, and are issued at the same times, as those
+        generated when iterating over the workload. This is used by simulation
+        engines managing the events of flows themselves.
+
+        Returns
+        -------
+        flows : iterator
+            Iterator of (time, event) 2-tuples of the requests starting new
+            flows
+        """
+        self.n_requests = 0
+        self.warmup_length = self.n_warmup
+        self.max_requests = self.n_warmup + self.n_measured
+        t_next_flow = 0.0
+        while self.n_requests < self.max_requests:
+            t_next_flow += self.rng.expovariate(self.rate)
+            yield (t_next_flow, self._new_flow())
+
+    def end_warmup(self):
+        """End the warmup phase, so that the requests following those already
+        generated are logged, followed by *n_measured* logged requests.
+
+        Flows of requests of the warmup phase which are still in progress are
+        not logged.
+        """
+        _end_warmup(self)
+
+    def enable_request_level_warmup(self):
+        """Issue the requests of the warmup phase as request-level events,
+        i.e. without *node*, *flow* and *pkt_type* attributes, so that they
+        can be processed by request-level strategies. Requests of the measured
+        phase start flows as usual.
+        """
+        self.request_level_warmup = True
+
+    def stop(self):
+        """Stop generating requests. Events of flows still in progress keep
+        being generated until all flows are completed.
+        """
+        _stop(self)
+
+    def get_state(self):
+        """Return the state of the iteration over the workload, from which a
+        new iteration can be resumed by `set_state`. The state can be taken
+        after any event generated by the workload has been processed.
+
+        Events of flows in progress are not part of this state but of the
+        state of the network model, which must be restored as well.
+
+        Returns
+        -------
+        state : dict
+            The state of the iteration
+        """
+        state = _get_state(self)
+        state['contents'] = list(self.contents)
+        return state
+
+    def set_state(self, state):
+        """Make the next iteration over the workload resume from a state
+        returned by `get_state`.
+
+        Parameters
+        ----------
+        state : dict
+            The state of the iteration
+        """
+        self.state = state
+
 @register_workload('STATIONARY_PACKET_LEVEL_CACHE_DELAY')
 class StationaryPacketLevelWorkloadWithCacheDelay(object):
     """This function generates events on the fly, i.e. instead of creating an
@@ -193,14 +376,15 @@ class StationaryPacketLevelWorkloadWithCacheDelay(object):
         dictionary of event attributes.
     """
     def __init__(self, topology, n_contents, alpha, # server_processing_rate,
-                    beta=0, rate=1.0, n_warmup=10 ** 5, n_measured=4 * 10 ** 5, read_delay_penalty=100,
-                    write_delay_penalty=100, cache_queue_size=10, seed=None, **kwargs):
+                 beta=0, rate=1.0, n_warmup=10 ** 5, n_measured=4 * 10 ** 5,
+                 read_delay_penalty=100, write_delay_penalty=100,
+                 cache_queue_size=10, seed=None, **kwargs):
         if alpha < 0:
             raise ValueError('alpha must be positive')
         if beta < 0:
             raise ValueError('beta must be positive')
         self.receivers = [v for v in topology.nodes()
-                     if topology.node[v]['stack'][0] == 'receiver']
+                          if topology.node[v]['stack'][0] == 'receiver']
         self.zipf = TruncatedZipfDist(alpha, n_contents)
         self.n_contents = n_contents
         self.contents = list(range(1, n_contents + 1))
@@ -208,7 +392,11 @@ class StationaryPacketLevelWorkloadWithCacheDelay(object):
         self.rate = rate
         self.n_warmup = n_warmup
         self.n_measured = n_measured
+        # Requests are drawn from self.rng, but strategies and cache
+        # policies, e.g. PROB_CACHE and RAND, draw from the global generator
         random.seed(seed)
+        self.rng = random.Random(seed)
+        self.state = None
         self.view = None
         self.controller = None
         self.beta = beta
@@ -226,12 +414,14 @@ class StationaryPacketLevelWorkloadWithCacheDelay(object):
         self.controller.set_read_delay_penalty(self.read_delay_penalty)
         self.controller.set_write_delay_penalty(self.write_delay_penalty)
         self.controller.set_cache_queue_size(self.cache_queue_size)
-        flow_counter = 0    
-        t_next_flow = 0.0
+        # The time of the next flow is drawn as soon as the previous flow is
+        # started, so that iteration can be resumed after any event
+        if _start(self) is None:
+            self.time = self.rng.expovariate(self.rate)
+        t_next_flow = self.time
         # print('Stationary-pkt-level, enter iter')
-        while ( (flow_counter < self.n_warmup + self.n_measured) or len(self.view.eventQ())>0 ):
+        while (self.n_requests < self.max_requests) or len(self.view.eventQ()) > 0:
             # print('Stationary-pkt-level, enter iter while')
-            t_next_flow += (random.expovariate(self.rate))
             # print('flow counter:', flow_counter, ', t_next_flow:', t_next_flow)
             event1 = self.view.peek_next_event()
             event2 = self.view.peek_next_cache_event()
@@ -277,23 +467,68 @@ class StationaryPacketLevelWorkloadWithCacheDelay(object):
                         event2 = self.view.peek_next_cache_event()
                 # print('flow_counter:', flow_counter, 't_event', t_event, 'event:', event)
 
-            if flow_counter >= (self.n_warmup + self.n_measured):
-                continue
-            if self.beta == 0:
-                receiver = random.choice(self.receivers)
-            else:
-                receiver = self.receivers[self.receiver_dist.rv() - 1]
-            content = int(self.zipf.rv())
-            # if flow_counter % 1000 == 0:
-              #   random.shuffle(self.contents)
-            # content = self.contents.index(content) + 1
-            log = (flow_counter >= self.n_warmup)
-            event = {'receiver': receiver, 'content': content, 'node': receiver, 'flow': flow_counter, 'pkt_type': 'Request', 'log': log}
-            # print('flow counter: ', flow_counter, 't_next_flow', t_next_flow, 'event:', event)
-            yield (t_next_flow, event)
-            flow_counter += 1
+            t_flow = t_next_flow
+            event = None
+            if self.n_requests < self.max_requests:
+                if self.beta == 0:
+                    receiver = self.rng.choice(self.receivers)
+                else:
+                    receiver = self.receivers[self.receiver_dist.rv(self.rng) - 1]
+                content = int(self.zipf.rv(self.rng))
+                # if flow_counter % 1000 == 0:
+                  #   random.shuffle(self.contents)
+                # content = self.contents.index(content) + 1
+                log = (self.n_requests >= self.warmup_length)
+                event = {'receiver': receiver, 'content': content, 'node': receiver, 'flow': self.n_requests, 'pkt_type': 'Request', 'log': log}
+                self.n_requests += 1
+            t_next_flow += (self.rng.expovariate(self.rate))
+            self.time = t_next_flow
+            if event is not None:
+                # print('flow counter: ', flow_counter, 't_next_flow', t_next_flow, 'event:', event)
+                yield (t_flow, event)
         return
 
+    def end_warmup(self):
+        """End the warmup phase, so that the requests following those already
+        generated are logged, followed by *n_measured* logged requests.
+
+        Flows of requests of the warmup phase which are still in progress are
+        not logged.
+        """
+        _end_warmup(self)
+
+    def stop(self):
+        """Stop generating requests. Events of flows still in progress keep
+        being generated until all flows are completed.
+        """
+        _stop(self)
+
+    def get_state(self):
+        """Return the state of the iteration over the workload, from which a
+        new iteration can be resumed by `set_state`. The state can be taken
+        after any event generated by the workload has been processed.
+
+        Events of flows in progress are not part of this state but of the
+        state of the network model, which must be restored as well.
+
+        Returns
+        -------
+        state : dict
+            The state of the iteration
+        """
+        return _get_state(self)
+
+    def set_state(self, state):
+        """Make the next iteration over the workload resume from a state
+        returned by `get_state`.
+
+        Parameters
+        ----------
+        state : dict
+            The state of the iteration
+        """
+        self.state = state
+
 @register_workload('STATIONARY')
 class StationaryWorkload(object):
     """This function generates events on the fly, i.e. instead of creating an
@@ -344,14 +579,14 @@ class StationaryWorkload(object):
         dictionary of event attributes.
     """
     def __init__(self, topology, n_contents, alpha, beta=0, rate=1.0,
-                    n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None, **kwargs):
+                 n_warmup=10 ** 5, n_measured=4 * 10 ** 5, seed=None, **kwargs):
         # print('Stationary, enter init')
         if alpha < 0:
             raise ValueError('alpha must be positive')
         if beta < 0:
             raise ValueError('beta must be positive')
         self.receivers = [v for v in topology.nodes()
-                     if topology.node[v]['stack'][0] == 'receiver']
+                          if topology.node[v]['stack'][0] == 'receiver']
         self.zipf = TruncatedZipfDist(alpha, n_contents)
         self.n_contents = n_contents
         self.contents = range(1, n_contents + 1)
@@ -359,7 +594,11 @@ class StationaryWorkload(object):
         self.rate = rate
         self.n_warmup = n_warmup
         self.n_measured = n_measured
+        # Requests are drawn from self.rng, but strategies and cache
+        # policies, e.g. PROB_CACHE and RAND, draw from the global generator
         random.seed(seed)
+        self.rng = random.Random(seed)
+        self.state = None
         self.beta = beta
         if beta != 0:
             degree = nx.degree(self.topology)
@@ -368,22 +607,61 @@ class StationaryWorkload(object):
 
     def __iter__(self):
         # print('Stationary, enter iter')
-        req_counter = 0
-        t_event = 0.0
-        while req_counter < self.n_warmup + self.n_measured:
+        _start(self)
+        t_event = self.time
+        while self.n_requests < self.max_requests:
             # print('Stationary, enter iter while')
-            t_event += (random.expovariate(self.rate))
+            t_event += (self.rng.expovariate(self.rate))
             if self.beta == 0:
-                receiver = random.choice(self.receivers)
+                receiver = self.rng.choice(self.receivers)
             else:
-                receiver = self.receivers[self.receiver_dist.rv() - 1]
-            content = int(self.zipf.rv())
-            log = (req_counter >= self.n_warmup)
+                receiver = self.receivers[self.receiver_dist.rv(self.rng) - 1]
+            content = int(self.zipf.rv(self.rng))
+            log = (self.n_requests >= self.warmup_length)
             event = {'receiver': receiver, 'content': content, 'log': log}
+            self.n_requests += 1
+            self.time = t_event
             yield (t_event, event)
-            req_counter += 1
         return
 
+    def end_warmup(self):
+        """End the warmup phase, so that the requests following those already
+        generated are logged, followed by *n_measured* logged requests.
+
+        This method is called while iterating over the workload, e.g. by the
+        simulation engine when caches reached steady state.
+        """
+        _end_warmup(self)
+
+    def stop(self):
+        """Stop generating requests, so that iteration over the workload
+        ends after the requests already generated.
+        """
+        _stop(self)
+
+    def get_state(self):
+        """Return the state of the iteration over the workload, from which a
+        new iteration can be resumed by `set_state`. The state can be taken
+        after any request generated by the workload has been processed.
+
+        Returns
+        -------
+        state : dict
+            The state of the iteration
+        """
+        return _get_state(self)
+
+    def set_state(self, state):
+        """Make the next iteration over the workload resume from a state
+        returned by `get_state`.
+
+        Parameters
+        ----------
+        state : dict
+            The state of the iteration
+        """
+        self.state = state
+
 
 @register_workload('GLOBETRAFF')
 class GlobetraffWorkload(object):
@@ -425,7 +703,7 @@ class GlobetraffWorkload(object):
         if beta < 0:
             raise ValueError('beta must be positive')
         self.receivers = [v for v in topology.nodes()
-                     if topology.node[v]['stack'][0] == 'receiver']
+                          if topology.node[v]['stack'][0] == 'receiver']
         self.n_contents = 0
         with open(contents_file, 'r') as f:
             reader = csv.reader(f, delimiter='\t')
@@ -599,8 +877,11 @@ class YCSBWorkload(object):
         elif workload in ("D", "E"):
             raise NotImplementedError("Workloads D and E not yet implemented")
         self.workload = workload
+        # Requests are drawn from self.rng, but strategies and cache
+        # policies, e.g. PROB_CACHE and RAND, draw from the global generator
         if seed is not None:
             random.seed(seed)
+        self.rng = random.Random(seed)
         self.zipf = TruncatedZipfDist(alpha, n_contents)
         self.n_warmup = n_warmup
         self.n_measured = n_measured
@@ -609,13 +890,13 @@ class YCSBWorkload(object):
         """Return an iterator over the workload"""
         req_counter = 0
         while req_counter < self.n_warmup + self.n_measured:
-            rand = random.random()
+            rand = self.rng.random()
             op = {
                   "A": "READ" if rand < 0.5 else "UPDATE",
                   "B": "READ" if rand < 0.95 else "UPDATE",
                   "C": "READ"
                   }[self.workload]
-            item = int(self.zipf.rv())
+            item = int(self.zipf.rv(self.rng))
             log = (req_counter >= self.n_warmup)
             event = {'op': op, 'item': item, 'log': log}
             yield event
@@ -0,0 +1,293 @@
+import multiprocessing as mp
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+import numpy as np
+
+import icarus.orchestration as orchestration
+from icarus.results import ResultSet
+from icarus.util import Settings, Tree, LabeledArray
+
+
+@unittest.skipIf(orchestration.shared_memory is None,
+                 'Shared memory not supported')
+class TestSharedArrays(unittest.TestCase):
+
+    def test_share_and_load(self):
+        large = np.arange(orchestration.SHARED_ARRAY_MIN_SIZE, dtype=float)
+        small = np.arange(3)
+        results = Tree({'A': {'CDF': (large, small)},
+                        'B': {'PER_CONTENT': LabeledArray(np.arange(len(large)), large)}})
+        shared = orchestration._map_arrays(results, orchestration._share_array)
+        x, y = shared['A']['CDF']
+        self.assertIsInstance(x, orchestration._SharedArray)
+        self.assertIs(small, y)
+        self.assertIsInstance(shared['B']['PER_CONTENT'].data,
+                              orchestration._SharedArray)
+        loaded = orchestration._map_arrays(shared, orchestration._load_array)
+        x, y = loaded['A']['CDF']
+        np.testing.assert_array_equal(large, x)
+        np.testing.assert_array_equal(small, y)
+        self.assertEqual(large[10], loaded['B']['PER_CONTENT'][10])
+
+    def test_discard(self):
+        large = np.arange(orchestration.SHARED_ARRAY_MIN_SIZE, dtype=float)
+        shared = orchestration._share_array(large)
+        self.assertIsNone(orchestration._discard_array(shared))
+        self.assertRaises(FileNotFoundError,
+                          orchestration.shared_memory.SharedMemory,
+                          name=shared.name)
+
+    @unittest.skipIf('fork' not in mp.get_all_start_methods(),
+                     'Requires forking processes')
+    def test_share_from_worker(self):
+        orchestration.resource_tracker.ensure_running()
+        large = np.arange(orchestration.SHARED_ARRAY_MIN_SIZE, dtype=float)
+        pool = mp.get_context('fork').Pool(1)
+        try:
+            shared = pool.apply(orchestration._share_array, (large,))
+        finally:
+            pool.close()
+            pool.join()
+        # The block outlives the worker which created it
+        np.testing.assert_array_equal(large, shared.load())
+
+
+class TestPackedTrees(unittest.TestCase):
+
+    def test_pack_and_unpack(self):
+        n = orchestration.PACKED_TREE_MIN_SIZE
+        per_content = {i: i / n for i in range(n)}
+        per_link = {(i, i + 1): float(i) for i in range(n)}
+        small = {1: 0.5}
+        mixed = dict(per_content, x='a')
+        results = Tree({'A': {'PER_CONTENT': per_content, 'PER_NODE': small},
+                        'B': {'PER_LINK': per_link, 'MIXED': mixed}})
+        packed = orchestration._pack_trees(Tree(results))
+        self.assertIsInstance(packed['A']['PER_CONTENT'], LabeledArray)
+        self.assertIsInstance(packed['B']['PER_LINK'], LabeledArray)
+        self.assertIsInstance(packed['A']['PER_NODE'], Tree)
+        self.assertIsInstance(packed['B']['MIXED'], Tree)
+        unpacked = orchestration._unpack_trees(pickle.loads(pickle.dumps(packed)))
+        self.assertEqual(results, unpacked)
+        self.assertIsInstance(unpacked['A']['PER_CONTENT'], Tree)
+        self.assertIsInstance(unpacked['B']['PER_LINK'], Tree)
+
+
+class TestRunScenario(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = Settings()
+        self.settings.DATA_COLLECTORS = ['CACHE_HIT_RATIO']
+        self.params = Tree()
+        self.params['topology'] = {'name': 'PATH', 'n': 4}
+        self.params['workload'] = {'name': 'STATIONARY', 'n_contents': 20,
+                                   'n_warmup': 50, 'n_measured': 100,
+                                   'alpha': 0.8, 'rate': 1.0, 'seed': 1}
+        self.params['cache_placement'] = {'name': 'UNIFORM', 'network_cache': 0.2}
+        self.params['content_placement'] = {'name': 'UNIFORM'}
+        self.params['cache_policy'] = {'name': 'LRU'}
+        self.params['strategy'] = {'name': 'LCE'}
+        self.params['netconf'] = {}
+
+    def test_runtime(self):
+        _, results, duration = orchestration.run_scenario(self.settings,
+                                                          self.params, 1, 1)
+        runtime = results[orchestration.RUNTIME_KEY]
+        for phase in ('TOPOLOGY', 'WORKLOAD', 'CACHE_PLACEMENT',
+                      'CONTENT_PLACEMENT', 'NETWORK_MODEL', 'WARMUP', 'MEASURED'):
+            self.assertGreaterEqual(runtime[phase], 0)
+            self.assertLessEqual(runtime[phase], duration)
+        self.assertEqual(duration, runtime['TOTAL'])
+        self.assertEqual(150, runtime['EVENTS'])
+        self.assertGreater(runtime['EVENTS_PER_SEC'], 0)
+        self.assertNotIn('PROFILE', runtime)
+        self.assertIn('CACHE_HIT_RATIO', results)
+
+    def test_profile(self):
+        profile_dir = tempfile.mkdtemp()
+        try:
+            self.settings.PROFILE_DIR = profile_dir
+            rs = ResultSet()
+            for i in range(1, 3):
+                params, results, _ = orchestration.run_scenario(self.settings,
+                                                                self.params, i, 2)
+                self.assertEqual(os.path.join(profile_dir, 'experiment-%d.pstats' % i),
+                                 results[orchestration.RUNTIME_KEY]['PROFILE'])
+                rs.add(params, results)
+            report = orchestration.aggregate_profiles(rs, profile_dir)
+            with open(report) as f:
+                self.assertIn('EXPERIMENTS: 2', f.read())
+            self.assertTrue(os.path.isfile(os.path.join(profile_dir,
+                                                        'aggregate-PATH-LCE.pstats')))
+        finally:
+            shutil.rmtree(profile_dir)
+
+    def test_memory_profile(self):
+        self.settings.MEMORY_PROFILE = True
+        params, results, _ = orchestration.run_scenario(self.settings,
+                                                        self.params, 1, 1)
+        self.assertFalse(tracemalloc.is_tracing())
+        memory = results[orchestration.RUNTIME_KEY]['MEMORY']
+        self.assertEqual({'SETUP', 'WARMUP', 'MEASURED'}, set(memory.keys()))
+        for phase in memory.values():
+            self.assertGreater(phase['TRACED'], 0)
+            self.assertGreaterEqual(phase['TRACED_PEAK'], phase['TRACED'])
+            if phase['PEAK_RSS'] is not None:
+                self.assertLessEqual(phase['PEAK_RSS'],
+                                     results[orchestration.RUNTIME_KEY]['PEAK_RSS'])
+            self.assertGreater(len(phase['TOP_SITES']), 0)
+            self.assertGreater(len(phase['OBJECTS']), 0)
+        rs = ResultSet()
+        rs.add(params, results)
+        self.assertIn('MEMORY SUMMARY OF 1 EXPERIMENTS', rs.memory_summary())
+
+    def test_adaptive_warmup(self):
+        self.params['workload']['n_warmup'] = 10000
+        self.params['warmup'] = {'interval': 100}
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        warmup = results['WARMUP']
+        self.assertTrue(warmup['STEADY_STATE'])
+        self.assertLess(warmup['N_REQUESTS'], 10000)
+        self.assertEqual(warmup['N_REQUESTS'] + 100,
+                         results[orchestration.RUNTIME_KEY]['EVENTS'])
+
+    def test_common_random_numbers(self):
+        self.settings.COMMON_RANDOM_NUMBERS = True
+        del self.params['workload']['seed']
+        hit_ratios = []
+        for replication, state in ((0, 1), (0, 2), (1, 1)):
+            random.seed(state)
+            _, results, _ = orchestration.run_scenario(self.settings,
+                                                       self.params, 1, 1,
+                                                       replication)
+            self.assertEqual(replication,
+                             results[orchestration.RUNTIME_KEY]['REPLICATION'])
+            hit_ratios.append(results['CACHE_HIT_RATIO']['MEAN'])
+        self.assertEqual(hit_ratios[0], hit_ratios[1])
+
+    def test_checkpoint_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.params['checkpoint'] = {'directory': directory}
+            paths = []
+            for alpha, replication in ((0.8, 0), (0.8, 0), (0.8, 1), (1.0, 0)):
+                self.params['workload']['alpha'] = alpha
+                _, results, _ = orchestration.run_scenario(self.settings,
+                                                           self.params, 1, 1,
+                                                           replication)
+                path = results[orchestration.RUNTIME_KEY]['CHECKPOINT']
+                self.assertEqual(directory, os.path.dirname(path))
+                self.assertTrue(os.path.isfile(path))
+                paths.append(path)
+            self.assertEqual(paths[0], paths[1])
+            self.assertEqual(3, len(set(paths)))
+            self.assertEqual({'directory': directory},
+                             self.params['checkpoint'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_partition(self):
+        self.params['partition'] = {'n_processes': 1}
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        self.assertNotIn('PARTITIONS', results[orchestration.RUNTIME_KEY])
+        self.params['strategy'] = {'name': 'HR_SYMM'}
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        self.assertEqual(1, results[orchestration.RUNTIME_KEY]['PARTITIONS'])
+        self.assertEqual(150, results[orchestration.RUNTIME_KEY]['EVENTS'])
+
+    def test_hybrid(self):
+        self.params['hybrid'] = True
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        self.assertEqual(150, results[orchestration.RUNTIME_KEY]['EVENTS'])
+        self.params['workload']['name'] = 'STATIONARY_PACKET_LEVEL'
+        self.params['strategy'] = {'name': 'LCE_PKT_LEVEL'}
+        events = {}
+        for hybrid in (False, True):
+            self.params['hybrid'] = hybrid
+            _, results, _ = orchestration.run_scenario(self.settings,
+                                                       self.params, 1, 1)
+            events[hybrid] = results[orchestration.RUNTIME_KEY]['EVENTS']
+            self.assertIn('CACHE_HIT_RATIO', results)
+        # Each warmup request is a single event in hybrid experiments, while
+        # each flow has at least a request and a data packet on each hop
+        self.assertGreater(events[False], events[True] + 50)
+
+    def test_analytical(self):
+        self.params['analytical'] = True
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        self.assertEqual(0, results[orchestration.RUNTIME_KEY]['EVENTS'])
+        self.assertIn('CACHE_HIT_RATIO', results)
+        self.params['stopping'] = {'metrics': ['CACHE_HIT_RATIO']}
+        self.assertIsNone(orchestration.run_scenario(self.settings,
+                                                     self.params, 1, 1))
+
+    def test_sequential_stopping(self):
+        self.params['workload']['n_measured'] = 100000
+        self.params['stopping'] = {'metrics': ['CACHE_HIT_RATIO'],
+                                   'precision': 0.05, 'batch_size': 100,
+                                   'min_requests': 0}
+        _, results, _ = orchestration.run_scenario(self.settings,
+                                                   self.params, 1, 1)
+        stopping = results['STOPPING']
+        self.assertTrue(stopping['CONVERGED'])
+        self.assertLess(stopping['N_REQUESTS'], 100000)
+        self.assertEqual(50 + stopping['N_REQUESTS'],
+                         results[orchestration.RUNTIME_KEY]['EVENTS'])
+
+
+class TestOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = Settings()
+        self.settings.DATA_COLLECTORS = ['CACHE_HIT_RATIO']
+        self.settings.N_REPLICATIONS = 1
+        self.settings.PARALLEL_EXECUTION = True
+        self.settings.N_PROCESSES = 2
+        self.params = Tree()
+        self.params['topology'] = {'name': 'PATH', 'n': 4}
+        self.params['workload'] = {'name': 'STATIONARY', 'n_contents': 20,
+                                   'n_warmup': 50, 'n_measured': 100,
+                                   'alpha': 0.8, 'rate': 1.0, 'seed': 1}
+        self.params['cache_placement'] = {'name': 'UNIFORM', 'network_cache': 0.5}
+        self.params['content_placement'] = {'name': 'UNIFORM'}
+        self.params['cache_policy'] = {'name': 'LRU'}
+        self.params['strategy'] = {'name': 'HR_SYMM'}
+        self.params['netconf'] = {}
+
+    @unittest.skipIf('fork' not in mp.get_all_start_methods(),
+                     'Requires forking processes')
+    def test_partition_parallel(self):
+        partitioned = Tree(self.params)
+        partitioned['partition'] = {'n_processes': 2}
+        self.settings.EXPERIMENT_QUEUE = [self.params, partitioned]
+        orch = orchestration.Orchestrator(self.settings)
+        orch.run()
+        self.assertEqual(2, orch.n_success)
+        partitions = [results[orchestration.RUNTIME_KEY]['PARTITIONS']
+                      for params, results in orch.results
+                      if 'partition' in params]
+        self.assertEqual([2], partitions)
+
+    @unittest.skipIf('fork' not in mp.get_all_start_methods(),
+                     'Requires forking processes')
+    def test_pdes_parallel(self):
+        self.params['workload']['name'] = 'STATIONARY_PACKET_LEVEL'
+        self.params['strategy'] = {'name': 'LCE_PKT_LEVEL'}
+        self.params['pdes'] = {'n_processes': 2}
+        self.settings.EXPERIMENT_QUEUE = [self.params]
+        orch = orchestration.Orchestrator(self.settings)
+        orch.run()
+        self.assertEqual(1, orch.n_success)
+        for _, results in orch.results:
+            self.assertEqual(2, results[orchestration.RUNTIME_KEY]['PARTITIONS'])
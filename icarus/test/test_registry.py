@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from icarus.registry import Registry, register_decorator
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.module = 'icarus_test_registry_module'
+        with open(os.path.join(self.dir, self.module + '.py'), 'w') as f:
+            f.write("from %s import register_test\n" % __name__ +
+                    "@register_test('A')\n"
+                    "def a():\n"
+                    "    return 'a'\n")
+        sys.path.insert(0, self.dir)
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        sys.modules.pop(self.module, None)
+        shutil.rmtree(self.dir)
+
+    def test_lazy_load(self):
+        TEST_REGISTRY.clear()
+        TEST_REGISTRY.modules = [self.module]
+        TEST_REGISTRY._loaded.clear()
+        self.assertNotIn(self.module, sys.modules)
+        self.assertEqual('a', TEST_REGISTRY['A']())
+        self.assertIn(self.module, sys.modules)
+        self.assertEqual('A', TEST_REGISTRY['A'].name)
+
+    def test_contains_and_iter(self):
+        TEST_REGISTRY.clear()
+        TEST_REGISTRY.modules = [self.module]
+        TEST_REGISTRY._loaded.clear()
+        self.assertNotIn('B', TEST_REGISTRY)
+        self.assertIn('A', TEST_REGISTRY)
+        self.assertEqual(['A'], list(TEST_REGISTRY))
+        self.assertEqual(1, len(TEST_REGISTRY))
+
+    def test_no_load_if_registered(self):
+        registry = Registry('icarus_nonexistent_module')
+        registry['X'] = 1
+        self.assertEqual(1, registry['X'])
+        self.assertRaises(ImportError, registry.__getitem__, 'Y')
+
+
+TEST_REGISTRY = Registry()
+register_test = register_decorator(TEST_REGISTRY)
@@ -1,3 +1,4 @@
+import collections
 import unittest
 
 from io import BytesIO
@@ -245,3 +246,40 @@ class TestTree(unittest.TestCase):
     def test_match_empty_tree(self):
         tree = Tree()
         self.assertFalse(tree.match({'a': 1}))
+
+    def test_grid(self):
+        base = Tree({'a': {'b': 1}, 'c': 2})
+        grid = base.grid([(('a', 'b'), [1, 2]), ('d', ['x', 'y', 'z'])])
+        self.assertEqual(6, len(grid))
+        trees = list(grid)
+        self.assertEqual(6, len(trees))
+        self.assertEqual({'a': {'b': 1}, 'c': 2, 'd': 'x'}, trees[0].dict())
+        self.assertEqual({'a': {'b': 2}, 'c': 2, 'd': 'z'}, trees[-1].dict())
+        self.assertEqual([t.dict() for t in trees], [t.dict() for t in grid])
+
+    def test_grid_copies(self):
+        base = Tree({'a': {'b': 1}})
+        grid = base.grid({('a', 'c'): [[1], [2]]})
+        trees = list(grid)
+        trees[0]['a']['b'] = 3
+        trees[0]['a']['c'].append(4)
+        self.assertEqual({'a': {'b': 1}}, base.dict())
+        self.assertEqual({'a': {'b': 1, 'c': [1]}}, next(iter(grid)).dict())
+
+    def test_grid_subtrees(self):
+        base = Tree({'a': {'b': 1, 'c': 1}, 'd': 1})
+        grid = base.grid([(('a', 'b'), [1, 2]), ('d', [1, 2, 3]),
+                          ('a', [{'b': 1, 'c': 2}, {'b': 1, 'c': 3}])])
+        subtrees = grid.subtrees(('a',))
+        self.assertEqual(len(grid), sum(n for _, n in subtrees))
+        self.assertEqual([({'b': 1, 'c': 2}, 6), ({'b': 1, 'c': 3}, 6)],
+                         [(t.dict(), n) for t, n in subtrees])
+        expected = collections.Counter(repr(t['a'].dict()) for t in grid)
+        self.assertEqual(expected, collections.Counter(
+            {repr(t.dict()): n for t, n in subtrees}))
+        grid = base.grid({('a', 'b'): [2, 1], 'd': [1, 2, 3]})
+        self.assertEqual([(2, 3), (1, 3)], grid.subtrees(('a', 'b')))
+
+    def test_grid_desc(self):
+        grid = Tree().grid({'a': [1, 2]}, desc=lambda t: 'a=%d' % t['a'])
+        self.assertEqual(['a=1', 'a=2'], [t['desc'] for t in grid])
@@ -1,3 +1,6 @@
+import multiprocessing as mp
+import os
+import tempfile
 import unittest
 
 try:
@@ -50,6 +53,24 @@ class TestUtil(unittest.TestCase):
         tree = util.multicast_tree(sp, 1, [2, 3])
         self.assertSetEqual(set(tree), set([(1, 2), (1, 3)]))
 
+    def test_n_fork_processes(self):
+        self.assertEqual(1, util.n_fork_processes(4, 1))
+        self.assertEqual(1, util.n_fork_processes(0, 5))
+        self.assertLessEqual(util.n_fork_processes(None, 2), 2)
+        if util.can_fork():
+            self.assertEqual(3, util.n_fork_processes(3, 5))
+
+    @unittest.skipUnless(util.can_fork(), 'Processes cannot be forked')
+    def test_n_fork_processes_daemonic(self):
+        pool = mp.get_context('fork').Pool(1)
+        try:
+            self.assertFalse(pool.apply(util.can_fork))
+            self.assertEqual(1, pool.apply(util.n_fork_processes, (3, 5)))
+            self.assertEqual(1, pool.apply(util.n_fork_processes, (None, 5)))
+        finally:
+            pool.terminate()
+            pool.join()
+
     def test_apportionment(self):
         self.assertEqual(util.apportionment(10, [0.53, 0.47]), [5, 5])
         self.assertEqual(util.apportionment(100, [0.4, 0.21, 0.39]), [40, 21, 39])
@@ -74,3 +95,53 @@ class TestSettings(unittest.TestCase):
         res = pickle.dumps(s)
         t = pickle.loads(res)
         self.assertEqual(s["key_a"], t["key_a"])
+
+    def test_iter(self):
+        s = util.Settings()
+        s["key_a"] = "val_a"
+        s["key_b"] = "val_b"
+        self.assertEqual({"key_a", "key_b"}, set(s))
+
+    def test_read_from(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write("n = 3\n"
+                    "def gen():\n"
+                    "    for i in range(n):\n"
+                    "        yield i\n"
+                    "QUEUE = gen()\n")
+        try:
+            s = util.Settings()
+            s.read_from(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual({"QUEUE"}, set(s))
+        self.assertEqual([0, 1, 2], list(s.QUEUE))
+
+
+class TestLabeledArray(unittest.TestCase):
+
+    def test_mapping(self):
+        a = util.LabeledArray([3, 1, 2], [0.3, 0.1, 0.2])
+        self.assertEqual(3, len(a))
+        self.assertEqual([3, 1, 2], list(a))
+        self.assertEqual(0.1, a[1])
+        self.assertRaises(KeyError, a.__getitem__, 4)
+        self.assertEqual({3: 0.3, 1: 0.1, 2: 0.2}, a)
+        self.assertEqual({'3': 0.3, '1': 0.1, '2': 0.2}, a.dict(str_keys=True))
+
+    def test_tuple_keys(self):
+        a = util.LabeledArray([(1, 2), (2, 1)], [0.5, 1.5])
+        self.assertEqual([(1, 2), (2, 1)], list(a))
+        self.assertEqual(1.5, a[(2, 1)])
+        self.assertEqual({'(1, 2)': 0.5, '(2, 1)': 1.5}, a.dict(str_keys=True))
+        tree = util.Tree({'PER_LINK': a})
+        self.assertEqual(0.5, tree.getval(['PER_LINK', (1, 2)]))
+
+    def test_pickle(self):
+        a = util.LabeledArray(['a', 'b'], [1, 2])
+        self.assertEqual(a, pickle.loads(pickle.dumps(a)))
+
+    def test_tree_leaf(self):
+        tree = util.Tree({'m': {'PER_CONTENT': util.LabeledArray([1], [0.5])}})
+        self.assertIsInstance(tree['m']['PER_CONTENT'], util.LabeledArray)
+        self.assertEqual({'m': {'PER_CONTENT': {'1': 0.5}}}, tree.dict(str_keys=True))
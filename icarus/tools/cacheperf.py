@@ -3,16 +3,22 @@ replacement policies.
 """
 from __future__ import division
 
+import collections
+import copy
+import heapq
+import itertools
 import math
+import multiprocessing as mp
+import numbers
+import zlib
 
 from icarus.tools import DiscreteDist, TruncatedZipfDist
 
 import numpy as np
 
-from scipy.optimize import fsolve
 import networkx as nx
 
-from icarus.util import path_links
+from icarus.util import path_links, n_fork_processes
 from icarus.tools import TruncatedZipfDist, DiscreteDist
 
 
@@ -29,6 +35,8 @@ __all__ = [
        'che_characteristic_time_generalized',
        'che_per_content_cache_hit_ratio_generalized',
        'che_cache_hit_ratio_generalized',
+       'che_characteristic_time_batch',
+       'che_cache_hit_ratio_batch',
        'laoutaris_characteristic_time',
        'laoutaris_per_content_cache_hit_ratio',
        'laoutaris_cache_hit_ratio',
@@ -37,12 +45,24 @@ __all__ = [
        'numeric_cache_hit_ratio',
        'numeric_cache_hit_ratio_2_layers',
        'trace_driven_cache_hit_ratio',
+       'synthetic_trace',
+       'StackDistanceCounter',
+       'stack_distances',
+       'lru_miss_ratio_curve',
+       'sampled_lru_miss_ratio_curve',
        'hashrouting_model',
        'hashrouting_model_ring',
        'hashrouting_model_mesh',
           ]
 
 
+# Range of the hashes of contents sampled by SHARDS
+_SHARDS_MODULUS = 1 << 24
+
+# Number of requests whose hashes are computed at once by SHARDS
+_SHARDS_CHUNK = 1 << 16
+
+
 def fagin_characteristic_time(pdf, cache_size):
     """Return the characteristic time of an LRU cache under a given IRM
     workload, as defined by Fagin.
@@ -59,7 +79,9 @@ def fagin_characteristic_time(pdf, cache_size):
     r : float
         The characteristic time.
     """
+    from scipy.optimize import fsolve
     pdf = np.asarray(pdf)
+
     def func_r(r):
         return np.sum((1 - pdf)**r) - len(pdf) + cache_size
     return fsolve(func_r, x0=cache_size)[0]
@@ -88,10 +110,10 @@ def fagin_per_content_cache_hit_ratio(pdf, cache_size, target=None):
         items in the population. If a target is specified, then it returns
         the cache hit ratio of only the specified item.
     """
-    items = range(len(pdf)) if target is None else [target]
+    pdf = np.asarray(pdf)
     r = fagin_characteristic_time(pdf, cache_size)
-    hit_ratio = [1 - (1 - pdf[i])**r for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    hit_ratio = 1 - (1 - pdf)**r
+    return hit_ratio if target is None else hit_ratio[target]
 
 
 def fagin_cache_hit_ratio(pdf, cache_size):
@@ -112,13 +134,21 @@ def fagin_cache_hit_ratio(pdf, cache_size):
         The overall cache hit ratio
     """
     ch = fagin_per_content_cache_hit_ratio(pdf, cache_size)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return np.dot(pdf, ch)
 
 
 def che_characteristic_time(pdf, cache_size, target=None):
     """Return the characteristic time of an item or of all items, as defined by
     Che et al.
 
+    The characteristic time of each item is computed by correcting the common
+    characteristic time of all items, returned by
+    `che_characteristic_time_simplified`, with the Taylor expansion of the
+    characteristic equation around it, so that the corrections of all items
+    are computed at once in O(N) time. The characteristic equation of the
+    items for which the expansion is not accurate enough, if any, is then
+    solved exactly.
+
     Parameters
     ----------
     pdf : array-like
@@ -137,11 +167,62 @@ def che_characteristic_time(pdf, cache_size, target=None):
         all items in the population. If a target is specified, then it returns
         the characteristic time of only the specified item.
     """
-    def func_r(r, i):
-        return sum(math.exp(-pdf[j] * r) for j in range(len(pdf)) if j != i) \
-               - len(pdf) + 1 + cache_size
-    items = range(len(pdf)) if target is None else [target - 1]
-    r = [fsolve(func_r, x0=cache_size, args=(i)) for i in items]
+    pdf = np.asarray(pdf, dtype=float)
+    p = pdf if target is None else pdf[[target - 1]]
+    funcs = _che_policy('LRU')
+    t = _characteristic_times(pdf, [cache_size], funcs)[0]
+    # Each item is excluded from the items filling the cache, so its
+    # characteristic time r solves F(r) - g(r) = cache_size, where F is the
+    # expected number of items in the cache at time r and g the probability
+    # that the item is in the cache
+    r = np.full(len(p), t)
+    if 0 < t < np.inf:
+        # F is approximated around t by its Taylor polynomial, whose
+        # coefficients are computed once for all items, and the equation of
+        # each item is solved by Newton's method on the polynomial
+        moments = []
+        w = np.exp(-pdf * t)
+        for _ in range(_CHE_TAYLOR_ORDER + 1):
+            w = w * pdf
+            moments.append(np.sum(w))
+        coeffs = [(-1)**k * m / math.factorial(k)
+                  for k, m in enumerate(moments[:-1])]
+        g, dg = funcs(p, t)
+        # First Newton step, which does not overshoot the root because F - g
+        # is increasing and concave
+        d_0 = g / (moments[0] - dg)
+        d = d_0
+        with np.errstate(all='ignore'):
+            for _ in range(_CHE_MAX_ITER):
+                # Horner's evaluation of the polynomial and of its derivative
+                f = df = 0
+                for k in reversed(range(_CHE_TAYLOR_ORDER)):
+                    f = (f + coeffs[k] / (k + 1)) * d
+                    df = df * d + coeffs[k]
+                g, dg = funcs(p, t + d)
+                step = (f - g) / (df - dg)
+                d = d - step
+                if not np.any(np.abs(step) > _CHE_RTOL * (t + d)):
+                    break
+            r = t + d
+            # Bound of the error of the roots due to the approximation of F,
+            # since all derivatives of F decrease in absolute value with time
+            err = (moments[-1] * d**(_CHE_TAYLOR_ORDER + 1) /
+                   math.factorial(_CHE_TAYLOR_ORDER + 1) / (df - dg))
+            valid = (d >= 0) & (np.abs(step) <= _CHE_RTOL * r) & \
+                    (err <= _CHE_RTOL * r)
+        active = np.flatnonzero(~valid)
+        r[active] = t + d_0[active]
+        for _ in range(_CHE_MAX_ITER):
+            if len(active) == 0:
+                break
+            f, df = _che_sums(pdf, r[active], funcs)
+            g, dg = funcs(p[active], r[active])
+            step = (cache_size - f + g) / (df - dg)
+            r[active] += step
+            active = active[np.abs(step) > _CHE_RTOL * r[active]]
+    # Items not excluded when all others fit in the cache are never evicted
+    r[np.count_nonzero(pdf) - (p > 0) <= cache_size] = np.inf
     return r if target is None else r[0]
 
 
@@ -167,10 +248,12 @@ def che_per_content_cache_hit_ratio(pdf, cache_size, target=None):
         items in the population. If a target is specified, then it returns
         the cache hit ratio of only the specified item.
     """
-    items = range(len(pdf)) if target is None else [target]
-    r = che_characteristic_time(pdf, cache_size)
-    hit_ratio = [1 - math.exp(-pdf[i] * r[i]) for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    pdf = np.asarray(pdf, dtype=float)
+    if target is None:
+        r = che_characteristic_time(pdf, cache_size)
+        return 1 - np.exp(-pdf * r)
+    r = che_characteristic_time(pdf, cache_size, target + 1)
+    return 1 - math.exp(-pdf[target] * r)
 
 
 def che_cache_hit_ratio(pdf, cache_size):
@@ -190,7 +273,7 @@ def che_cache_hit_ratio(pdf, cache_size):
         The overall cache hit ratio
     """
     ch = che_per_content_cache_hit_ratio(pdf, cache_size)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return np.dot(pdf, ch)
 
 
 def che_characteristic_time_simplified(pdf, cache_size):
@@ -212,10 +295,8 @@ def che_characteristic_time_simplified(pdf, cache_size):
     r : float
         The characteristic time.
     """
-    pdf = np.asarray(pdf)
-    def func_r(r):
-        return np.sum(np.exp(-pdf * r)) - len(pdf) + cache_size
-    return fsolve(func_r, x0=cache_size)[0]
+    pdf = np.asarray(pdf, dtype=float)
+    return _characteristic_times(pdf, [cache_size], _che_policy('LRU'))[0]
 
 
 def che_per_content_cache_hit_ratio_simplified(pdf, cache_size, target=None):
@@ -241,10 +322,10 @@ def che_per_content_cache_hit_ratio_simplified(pdf, cache_size, target=None):
         items in the population. If a target is specified, then it returns
         the cache hit ratio of only the specified item.
     """
-    items = range(len(pdf)) if target is None else [target]
+    pdf = np.asarray(pdf, dtype=float)
     r = che_characteristic_time_simplified(pdf, cache_size)
-    hit_ratio = [1 - math.exp(-pdf[i] * r) for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    hit_ratio = 1 - np.exp(-pdf * r)
+    return hit_ratio if target is None else hit_ratio[target]
 
 
 def che_cache_hit_ratio_simplified(pdf, cache_size):
@@ -265,7 +346,7 @@ def che_cache_hit_ratio_simplified(pdf, cache_size):
         The overall cache hit ratio
     """
     ch = che_per_content_cache_hit_ratio_simplified(pdf, cache_size)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return np.dot(pdf, ch)
 
 
 def che_p_in_func(pdf, policy, **policy_args):
@@ -279,18 +360,180 @@ def che_p_in_func(pdf, policy, **policy_args):
     policy : str
         The cache replacement policy ('LRU', 'q-LRU', 'FIFO', 'RANDOM')
     """
+    policy_func = _che_policy(policy, **policy_args)
+    return lambda p, t: policy_func(p, t)[0]
+
+
+def _che_policy(policy, **policy_args):
+    """Return a function computing, given the probability of a content being
+    requested and the characteristic time, the probability that the content
+    is in a cache of a policy and its derivative with respect to the
+    characteristic time"""
     if policy == 'LRU':
-        p_in = lambda p, t: 1 - np.exp(-p * t)
+        def policy_func(p, t):
+            e = np.exp(-p * t)
+            return 1 - e, p * e
     elif policy == 'q-LRU':
         if 'q' not in policy_args:
             raise ValueError('q parameter not specified')
         q = policy_args['q']
-        p_in = lambda p, t: q * (1 - np.exp(-p * t)) / (np.exp(-p * t) + q * (1 - np.exp(-p * t)))
+
+        def policy_func(p, t):
+            e = np.exp(-p * t)
+            d = e + q * (1 - e)
+            return q * (1 - e) / d, q * p * e / d**2
     elif policy in ('FIFO', 'RANDOM'):
-        p_in = lambda p, t: p * t / (1 + p * t)
+        def policy_func(p, t):
+            d = 1 + p * t
+            return p * t / d, p / d**2
     else:
         raise ValueError('policy {} not recognized'.format(policy))
-    return p_in
+    return policy_func
+
+
+# Maximum number of (content, characteristic time) pairs evaluated at once by
+# the solvers of characteristic times
+_CHE_CHUNK = 1 << 20
+
+# Relative tolerance and maximum number of iterations of the solvers of
+# characteristic times
+_CHE_RTOL = 1e-10
+_CHE_MAX_ITER = 100
+
+# Order of the Taylor expansion used to compute the characteristic times of
+# all items from their common characteristic time
+_CHE_TAYLOR_ORDER = 6
+
+
+def _che_sums(pdf, t, policy_func):
+    """Return the expected number of contents in caches with characteristic
+    times *t* and its derivative with respect to the characteristic times"""
+    f = np.zeros(len(t))
+    df = np.zeros(len(t))
+    step = max(1, _CHE_CHUNK // len(t))
+    for i in range(0, len(pdf), step):
+        p_in, dp_in = policy_func(pdf[i:i + step, np.newaxis], t)
+        f += p_in.sum(axis=0)
+        df += dp_in.sum(axis=0)
+    return f, df
+
+
+def _characteristic_times(pdf, cache_sizes, policy_func):
+    """Return the characteristic times of caches of the given sizes, each
+    solving the equation stating that the expected number of contents in the
+    cache equals its size.
+
+    All equations are solved at once by Newton's method, falling back to
+    bisection whenever a step leaves the interval known to contain the root.
+    Caches large enough to store all contents requested have infinite
+    characteristic time.
+    """
+    sizes = np.asarray(cache_sizes, dtype=float)
+    t = np.zeros(len(sizes))
+    t[sizes >= np.count_nonzero(pdf)] = np.inf
+    active = np.flatnonzero((sizes > 0) & (t == 0))
+    t[active] = sizes[active]
+    lo = np.zeros(len(sizes))
+    hi = np.full(len(sizes), np.inf)
+    for _ in range(_CHE_MAX_ITER):
+        if len(active) == 0:
+            break
+        x = t[active]
+        f, df = _che_sums(pdf, x, policy_func)
+        f -= sizes[active]
+        lo[active] = np.where(f < 0, x, lo[active])
+        hi[active] = np.where(f > 0, x, hi[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = x - f / df
+        bracketed = (x_new > lo[active]) & (x_new < hi[active])
+        x_new = np.where(bracketed, x_new,
+                         np.where(np.isinf(hi[active]), 2 * x,
+                                  (lo[active] + hi[active]) / 2))
+        t[active] = x_new
+        active = active[(np.abs(x_new - x) > _CHE_RTOL * x_new) & (f != 0)]
+    return t
+
+
+def che_characteristic_time_batch(pdf, cache_sizes, policy='LRU',
+                                  **policy_args):
+    """Return the characteristic times of caches of many sizes, under one or
+    many IRM demands, according to the extension of Che's approximation
+    proposed by Martina et al.
+
+    The characteristic times of all cache sizes are computed at once, so that
+    sweeps over many cache sizes and popularity distributions, e.g. Zipf
+    distributions with different exponents, of large content catalogs are
+    much faster than repeated calls to
+    `che_characteristic_time_generalized`, which returns the same values.
+
+    Parameters
+    ----------
+    pdf : array-like
+        The probability density function of an item being requested or a 2-D
+        array with one of them per row
+    cache_sizes : array-like
+        The sizes of the caches (in number of items)
+    policy : str, optional
+        The cache replacement policy ('LRU', 'q-LRU', 'FIFO', 'RANDOM')
+
+    Returns
+    -------
+    r : array of float
+        The characteristic time of each cache size or, if *pdf* is a 2-D
+        array, a 2-D array with the characteristic times of each cache size
+        (column) under each popularity distribution (row)
+    """
+    pdf = np.asarray(pdf, dtype=float)
+    policy_func = _che_policy(policy, **policy_args)
+    cache_sizes = np.atleast_1d(cache_sizes)
+    if pdf.ndim == 1:
+        return _characteristic_times(pdf, cache_sizes, policy_func)
+    return np.array([_characteristic_times(row, cache_sizes, policy_func)
+                     for row in pdf])
+
+
+def che_cache_hit_ratio_batch(pdf, cache_sizes, policy='LRU', **policy_args):
+    """Estimate the overall cache hit ratio of caches of many sizes, under one
+    or many IRM demands, according to the extension of Che's approximation
+    proposed by Martina et al.
+
+    This function returns the same values as repeated calls to
+    `che_cache_hit_ratio_generalized`, computing the characteristic times of
+    all caches at once as `che_characteristic_time_batch`.
+
+    Parameters
+    ----------
+    pdf : array-like
+        The probability density function of an item being requested or a 2-D
+        array with one of them per row
+    cache_sizes : array-like
+        The sizes of the caches (in number of items)
+    policy : str, optional
+        The cache replacement policy ('LRU', 'q-LRU', 'FIFO', 'RANDOM')
+
+    Returns
+    -------
+    cache_hit_ratio : array of float
+        The cache hit ratio of each cache size or, if *pdf* is a 2-D array, a
+        2-D array with the cache hit ratios of each cache size (column) under
+        each popularity distribution (row)
+    """
+    pdf = np.asarray(pdf, dtype=float)
+    policy_func = _che_policy(policy, **policy_args)
+    t = che_characteristic_time_batch(pdf, cache_sizes, policy, **policy_args)
+    rows = [(pdf, t)] if pdf.ndim == 1 else zip(pdf, t)
+    hit_ratio = []
+    for row_pdf, row_t in rows:
+        h = np.zeros(len(row_t))
+        step = max(1, _CHE_CHUNK // len(row_t))
+        for i in range(0, len(row_pdf), step):
+            p = row_pdf[i:i + step, np.newaxis]
+            with np.errstate(invalid='ignore'):
+                p_in = np.where(np.isinf(row_t), p > 0,
+                                policy_func(p, row_t)[0])
+            h += (p * p_in).sum(axis=0)
+        hit_ratio.append(h)
+    return hit_ratio[0] if pdf.ndim == 1 else np.array(hit_ratio)
 
 
 def che_characteristic_time_generalized(pdf, cache_size, policy, **policy_args):
@@ -319,12 +562,9 @@ def che_characteristic_time_generalized(pdf, cache_size, policy, **policy_args):
     performance analysis of caching systems," in Proceedings of the 2014
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
-    p_in = che_p_in_func(pdf, policy, **policy_args)
-
-    def func_t(t):
-        return np.sum(p_in(pdf, t)) - cache_size
-
-    return fsolve(func_t, x0=cache_size)[0]
+    pdf = np.asarray(pdf, dtype=float)
+    return _characteristic_times(pdf, [cache_size],
+                                 _che_policy(policy, **policy_args))[0]
 
 
 def che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy,
@@ -355,8 +595,11 @@ def che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy,
     performance analysis of caching systems," in Proceedings of the 2014
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
+    pdf = np.asarray(pdf, dtype=float)
     p_in = che_p_in_func(pdf, policy, **policy_args)
     t = che_characteristic_time_generalized(pdf, cache_size, policy, **policy_args)
+    if np.isinf(t):
+        return (pdf > 0).astype(float)
     return p_in(pdf, t)
 
 
@@ -385,7 +628,7 @@ def che_cache_hit_ratio_generalized(pdf, cache_size, policy='LRU', **policy_args
     IEEE Conference on Computer Communications (INFOCOM'14), April 2014
     """
     ch = che_per_content_cache_hit_ratio_generalized(pdf, cache_size, policy, **policy_args)
-    return sum(pdf[i] * ch[i] for i in range(len(pdf)))
+    return np.dot(pdf, ch)
 
 
 def laoutaris_characteristic_time(alpha, population, cache_size, order=3):
@@ -412,8 +655,10 @@ def laoutaris_characteristic_time(alpha, population, cache_size, order=3):
     ----------
     http://arxiv.org/pdf/0705.1970.pdf
     """
+    ranks = np.arange(1, population + 1, dtype=float)
+
     def H(N, alpha):
-        return sum(1.0 / l ** alpha for l in range(1, N + 1))
+        return np.sum(ranks[:N] ** -alpha)
 
     def cubrt(x):
         """Compute cubic root of a number
@@ -571,9 +816,8 @@ def laoutaris_per_content_cache_hit_ratio(alpha, population, cache_size,
     """
     pdf = TruncatedZipfDist(alpha, population).pdf
     r = laoutaris_characteristic_time(alpha, population, cache_size, order)
-    items = range(len(pdf)) if target is None else [target - 1]
-    hit_ratio = [1 - math.exp(-pdf[i] * r) for i in items]
-    return hit_ratio if target is None else hit_ratio[0]
+    hit_ratio = 1 - np.exp(-pdf * r)
+    return hit_ratio if target is None else hit_ratio[target - 1]
 
 
 def laoutaris_cache_hit_ratio(alpha, population, cache_size, order=3):
@@ -631,152 +875,258 @@ def optimal_cache_hit_ratio(pdf, cache_size):
 
 
 def numeric_per_content_cache_hit_ratio(pdf, cache, warmup=None, measure=None,
-                                        seed=None, target=None):
+                                        seed=None, target=None,
+                                        n_processes=None, confidence=0.95):
     """Numerically compute the per-content cache hit ratio of a cache under IRM
     stationary demand with a given pdf.
 
+    Multiple caches and seeds can be evaluated at once by passing lists of
+    them, in which case all combinations of caches and seeds are simulated by
+    parallel processes, each with its own copy of the cache, as by
+    `numeric_cache_hit_ratio`.
+
     Parameters
     ----------
     pdf : array-like
         The probability density function of an item being requested
-    cache : Cache
+    cache : Cache or list of Cache
         The cache object (i.e. the instance of a class subclassing
-        icarus.Cache)
+        icarus.Cache) or a list of cache objects
     warmup : int, optional
         The number of warmup requests to generate. If not specified, it is set
         to 10 times the content population
     measure : int, optional
         The number of measured requests to generate. If not specified, it is
         set to 30 times the content population
-    seed : int, optional
-        The seed used to generate random numbers
+    seed : int or list of int, optional
+        The seed used to generate random numbers or a list of seeds
     target : int, optional
         The item index [1, N] for which cache hit ratio is requested. If not
         specified, the function calculates the cache hit ratio of all the items
         in the population.
+    n_processes : int, optional
+        The number of parallel processes simulating lists of caches or seeds.
+        By default, the number of CPUs. If processes cannot be forked, e.g.
+        within daemonic processes, runs are simulated by the calling process
+        and, if several processes were requested, a warning is logged
+    confidence : float, optional
+        The confidence level of the intervals computed over lists of seeds
 
     Returns
     -------
     cache_hit_ratio : array of float or float
         If target is None, returns an array with the cache hit ratios of all
         items in the population. If a target is specified, then it returns
-        the cache hit ratio of only the specified item.
+        the cache hit ratio of only the specified item. If lists of caches or
+        seeds are given, returns the summary of the results over all seeds, or
+        a list of summaries, one per cache, as by `numeric_cache_hit_ratio`
     """
-    if warmup is None:
-        warmup = 10 * len(pdf)
-    if measure is None:
-        measure = 30 * len(pdf)
-    z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
-    cache_hits = np.zeros(len(pdf))
-    requests = np.zeros(len(pdf))
-    for _ in range(measure):
-        content = z.rv()
-        requests[content - 1] += 1
-        if cache.get(content):
-            cache_hits[content - 1] += 1
-        else:
-            cache.put(content)
-    hit_ratio = np.where(requests > 0, cache_hits / requests, requests)
-    return hit_ratio if target is None else hit_ratio[target - 1]
+    caches, batch_caches = _as_batch(cache, (list, tuple))
+    seeds, batch_seeds = _as_batch(seed, (list, tuple, range, np.ndarray))
+    return _numeric_experiments(_numeric_per_content_cache_hit_ratio, pdf,
+                                caches, batch_caches, seeds, batch_seeds,
+                                warmup, measure, n_processes, confidence,
+                                target=target)
 
 
-def numeric_cache_hit_ratio(pdf, cache, warmup=None, measure=None, seed=None):
+def numeric_cache_hit_ratio(pdf, cache, warmup=None, measure=None, seed=None,
+                            n_processes=None, confidence=0.95):
     """Numerically compute the cache hit ratio of a cache under IRM
     stationary demand with a given pdf.
 
+    Multiple caches and seeds can be evaluated at once by passing lists of
+    them, e.g. caches of different policies and sizes and the seeds of
+    independent replications. All combinations of caches and seeds are then
+    simulated by parallel processes, each with its own copy of the cache, and
+    the results of each cache are summarized over all seeds.
+
     Parameters
     ----------
     pdf : array-like
         The probability density function of an item being requested
-    cache : Cache
+    cache : Cache or list of Cache
         The cache object (i.e. the instance of a class subclassing
-        icarus.Cache)
+        icarus.Cache) or a list of cache objects
     warmup : int, optional
         The number of warmup requests to generate. If not specified, it is set
         to 10 times the content population
     measure : int, optional
         The number of measured requests to generate. If not specified, it is
         set to 30 times the content population
-    seed : int, optional
-        The seed used to generate random numbers
+    seed : int or list of int, optional
+        The seed used to generate random numbers or a list of seeds
+    n_processes : int, optional
+        The number of parallel processes simulating lists of caches or seeds.
+        By default, the number of CPUs. If processes cannot be forked, e.g.
+        within daemonic processes, runs are simulated by the calling process
+        and, if several processes were requested, a warning is logged
+    confidence : float, optional
+        The confidence level of the intervals computed over lists of seeds
 
     Returns
     -------
-    cache_hit_ratio : float
-        The cache hit ratio
+    cache_hit_ratio : float or dict or list of dict
+        The cache hit ratio, if a single cache and seed are given. Otherwise,
+        the summary of the cache hit ratios over all seeds, i.e. a dictionary
+        with keys "mean", "ci", the (lower, upper) bounds of the confidence
+        interval of the mean, and "values", the array of the results of each
+        seed. If a list of caches is given, a list with the summary of each
+        cache
     """
-    if warmup is None:
-        warmup = 10 * len(pdf)
-    if measure is None:
-        measure = 30 * len(pdf)
-    z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
-        if not cache.get(content):
-            cache.put(content)
-    cache_hits = 0
-    for _ in range(measure):
-        content = z.rv()
-        if cache.get(content):
-            cache_hits += 1
-        else:
-            cache.put(content)
-    return cache_hits / measure
+    caches, batch_caches = _as_batch(cache, (list, tuple))
+    seeds, batch_seeds = _as_batch(seed, (list, tuple, range, np.ndarray))
+    return _numeric_experiments(_numeric_cache_hit_ratio, pdf, caches,
+                                batch_caches, seeds, batch_seeds, warmup,
+                                measure, n_processes, confidence)
 
 
 def numeric_cache_hit_ratio_2_layers(pdf, l1_cache, l2_cache,
-                                     warmup=None, measure=None, seed=None):
+                                     warmup=None, measure=None, seed=None,
+                                     n_processes=None, confidence=0.95):
     """Numerically compute the cache hit ratio of a two-layer cache under IRM
     stationary demand with a given pdf.
 
     Differently from the numeric_cache_hit_ratio function, this function
     allows users to compute the hits at layer 1, layer 2 and overall.
 
+    Multiple configurations and seeds can be evaluated at once by passing
+    lists of them, as by `numeric_cache_hit_ratio`. If lists of caches are
+    given for both layers, they must have the same length and their elements
+    are paired, otherwise the single cache of a layer is paired with all
+    caches of the other layer.
+
     Parameters
     ----------
     pdf : array-like
         The probability density function of an item being requested
-    cache : Cache
-        The cache object (i.e. the instance of a class subclassing
-        icarus.Cache)
+    l1_cache : Cache or list of Cache
+        The layer 1 cache object (i.e. the instance of a class subclassing
+        icarus.Cache) or a list of cache objects
+    l2_cache : Cache or list of Cache
+        The layer 2 cache object or a list of cache objects
     warmup : int, optional
         The number of warmup requests to generate. If not specified, it is set
         to 10 times the content population
     measure : int, optional
         The number of measured requests to generate. If not specified, it is
         set to 30 times the content population
-    seed : int, optional
-        The seed used to generate random numbers
+    seed : int or list of int, optional
+        The seed used to generate random numbers or a list of seeds
+    n_processes : int, optional
+        The number of parallel processes simulating lists of caches or seeds.
+        By default, the number of CPUs. If processes cannot be forked, e.g.
+        within daemonic processes, runs are simulated by the calling process
+        and, if several processes were requested, a warning is logged
+    confidence : float, optional
+        The confidence level of the intervals computed over lists of seeds
 
     Returns
     -------
-    cache_hit_ratio : dict
-        Dictionary with keys "l1_hits", "l2_hits" and "total_hits"
+    cache_hit_ratio : dict or list of dict
+        Dictionary with keys "l1_hits", "l2_hits" and "total_hits". If lists
+        of caches or seeds are given, the value of each key is the summary of
+        its results over all seeds, as by `numeric_cache_hit_ratio`, and a
+        list of dictionaries, one per configuration, is returned if lists of
+        caches are given
     """
-    if warmup is None:
-        warmup = 10 * len(pdf)
-    if measure is None:
-        measure = 30 * len(pdf)
-    z = DiscreteDist(pdf, seed)
-    for _ in range(warmup):
-        content = z.rv()
+    l1_caches, batch_l1 = _as_batch(l1_cache, (list, tuple))
+    l2_caches, batch_l2 = _as_batch(l2_cache, (list, tuple))
+    if batch_l1 and batch_l2 and len(l1_caches) != len(l2_caches):
+        raise ValueError('The lists of layer 1 and layer 2 caches must have '
+                         'the same length')
+    if not batch_l1:
+        l1_caches = l1_caches * len(l2_caches)
+    if not batch_l2:
+        l2_caches = l2_caches * len(l1_caches)
+    seeds, batch_seeds = _as_batch(seed, (list, tuple, range, np.ndarray))
+    return _numeric_experiments(_numeric_cache_hit_ratio_2_layers, pdf,
+                                list(zip(l1_caches, l2_caches)),
+                                batch_l1 or batch_l2, seeds, batch_seeds,
+                                warmup, measure, n_processes, confidence)
+
+
+# Number of requests sampled at once by numeric_* functions
+_NUMERIC_BLOCK = 1 << 16
+
+# Arguments of the runs of numeric_* functions, set by the parent process
+# before forking the processes executing them
+_numeric_job = None
+
+
+def _as_batch(value, types):
+    """Return a value as a list and whether it was a list of values"""
+    if isinstance(value, types):
+        return list(value), True
+    return [value], False
+
+
+def _irm_requests(pdf, n_requests, seed):
+    """Generate the contents requested by a stationary IRM demand, sampling
+    them in blocks of _NUMERIC_BLOCK requests.
+
+    The global random number generator is seeded too, as used by cache
+    policies making random decisions.
+    """
+    cdf = DiscreteDist(pdf, seed).cdf
+    rng = np.random.RandomState(seed)
+    for start in range(0, n_requests, _NUMERIC_BLOCK):
+        size = min(_NUMERIC_BLOCK, n_requests - start)
+        for content in (np.searchsorted(cdf, rng.random_sample(size)) + 1).tolist():
+            yield content
+
+
+def _numeric_per_content_cache_hit_ratio(pdf, cache, warmup, measure, seed,
+                                         target=None):
+    """Simulate a run of `numeric_per_content_cache_hit_ratio`"""
+    requests = _irm_requests(pdf, warmup + measure, seed)
+    for content in itertools.islice(requests, warmup):
+        if not cache.get(content):
+            cache.put(content)
+    cache_hits = [0] * len(pdf)
+    n_requests = [0] * len(pdf)
+    for content in requests:
+        n_requests[content - 1] += 1
+        if cache.get(content):
+            cache_hits[content - 1] += 1
+        else:
+            cache.put(content)
+    cache_hits = np.asarray(cache_hits, dtype=float)
+    n_requests = np.asarray(n_requests, dtype=float)
+    hit_ratio = np.divide(cache_hits, n_requests, out=np.zeros(len(pdf)),
+                          where=n_requests > 0)
+    return hit_ratio if target is None else hit_ratio[target - 1]
+
+
+def _numeric_cache_hit_ratio(pdf, cache, warmup, measure, seed):
+    """Simulate a run of `numeric_cache_hit_ratio`"""
+    requests = _irm_requests(pdf, warmup + measure, seed)
+    for content in itertools.islice(requests, warmup):
+        if not cache.get(content):
+            cache.put(content)
+    cache_hits = 0
+    for content in requests:
+        if cache.get(content):
+            cache_hits += 1
+        else:
+            cache.put(content)
+    return cache_hits / measure
+
+
+def _numeric_cache_hit_ratio_2_layers(pdf, caches, warmup, measure, seed):
+    """Simulate a run of `numeric_cache_hit_ratio_2_layers`"""
+    l1_cache, l2_cache = caches
+    requests = _irm_requests(pdf, warmup + measure, seed)
+    for content in itertools.islice(requests, warmup):
         if not l1_cache.get(content):
             if not l2_cache.get(content):
                 l2_cache.put(content)
             l1_cache.put(content)
     l1_hits = 0
-    l1_misses = 0
     l2_hits = 0
-    for _ in range(measure):
-        content = z.rv()
+    for content in requests:
         if l1_cache.get(content):
             l1_hits += 1
         else:
-            l1_misses += 1
             if l2_cache.get(content):
                 l2_hits += 1
             else:
@@ -789,6 +1139,63 @@ def numeric_cache_hit_ratio_2_layers(pdf, l1_cache, l2_cache,
            }
 
 
+def _numeric_run(index):
+    """Execute a run of a numeric_* function on a copy of its cache"""
+    run, pdf, caches, seeds, warmup, measure, run_args = _numeric_job
+    cache = copy.deepcopy(caches[index // len(seeds)])
+    return run(pdf, cache, warmup, measure, seeds[index % len(seeds)],
+               **run_args)
+
+
+def _numeric_summary(values, confidence):
+    """Summarize the results of the runs of a cache over multiple seeds"""
+    if isinstance(values[0], dict):
+        return {k: _numeric_summary([v[k] for v in values], confidence)
+                for k in values[0]}
+    values = np.asarray(values, dtype=float)
+    mean = values.mean(axis=0)
+    from scipy.stats import norm
+    err = (norm.interval(confidence)[1] * values.std(axis=0) /
+           math.sqrt(len(values)))
+    return {'mean': mean, 'ci': (mean - err, mean + err), 'values': values}
+
+
+def _numeric_experiments(run, pdf, caches, batch_caches, seeds, batch_seeds,
+                         warmup, measure, n_processes, confidence, **run_args):
+    """Execute the runs of a numeric_* function for all combinations of
+    caches and seeds, in parallel processes if lists of them are given.
+    """
+    global _numeric_job
+    if warmup is None:
+        warmup = 10 * len(pdf)
+    if measure is None:
+        measure = 30 * len(pdf)
+    if not batch_caches and not batch_seeds:
+        # A single cache is simulated in place
+        return run(pdf, caches[0], warmup, measure, seeds[0], **run_args)
+    if confidence <= 0 or confidence >= 1:
+        raise ValueError('The confidence parameter must be greater than 0 and '
+                         'smaller than 1')
+    n_runs = len(caches) * len(seeds)
+    n_processes = n_fork_processes(n_processes, n_runs)
+    _numeric_job = (run, pdf, caches, seeds, warmup, measure, run_args)
+    try:
+        if n_processes == 1:
+            values = [_numeric_run(i) for i in range(n_runs)]
+        else:
+            pool = mp.get_context('fork').Pool(n_processes)
+            try:
+                values = pool.map(_numeric_run, range(n_runs))
+            finally:
+                pool.terminate()
+                pool.join()
+    finally:
+        _numeric_job = None
+    summaries = [_numeric_summary(values[i:i + len(seeds)], confidence)
+                 for i in range(0, n_runs, len(seeds))]
+    return summaries if batch_caches else summaries[0]
+
+
 def trace_driven_cache_hit_ratio(workload, cache, warmup_ratio=0.25):
     """Compute cache hit ratio of a cache under an arbitrary trace-driven
     workload.
@@ -825,6 +1232,377 @@ def trace_driven_cache_hit_ratio(workload, cache, warmup_ratio=0.25):
     return cache_hits / (n - n_warmup)
 
 
+def synthetic_trace(dist, n_requests, seed=None):
+    """Generate a trace of requests drawn independently from a discrete
+    distribution, e.g. a `TruncatedZipfDist`, according to the Independent
+    Reference Model.
+
+    Parameters
+    ----------
+    dist : DiscreteDist
+        The distribution of the identifiers of requested contents, from 1 to
+        the size of its support
+    n_requests : int
+        The number of requests
+    seed : int, optional
+        The seed used to generate random numbers
+
+    Returns
+    -------
+    trace : array of int
+        The identifiers of the contents requested
+    """
+    rng = np.random.RandomState(seed)
+    return np.searchsorted(dist.cdf, rng.random_sample(n_requests)) + 1
+
+
+class StackDistanceCounter(object):
+    """Counter of the LRU stack distances of a stream of requests.
+
+    The stack distance of a request is the number of distinct items requested
+    since the last request for the same item. A request is a hit in an LRU
+    cache of size *c* if and only if its stack distance is lower than *c*,
+    so the stack distances of a trace determine the cache hit ratio of LRU
+    caches of all sizes.
+
+    Stack distances are computed with Mattson's algorithm, counting the items
+    requested after an item with a Fenwick tree over the times of the last
+    request of each item. Times are compacted as soon as they exceed the size
+    of the tree, which is kept proportional to the number of distinct items
+    *M*, so that each request is processed in O(log M) time.
+    """
+
+    def __init__(self, capacity=1024):
+        """Constructor
+
+        Parameters
+        ----------
+        capacity : int, optional
+            The initial size of the Fenwick tree, which is doubled whenever
+            it is not at least twice the number of distinct items
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+        self._capacity = capacity
+        self._tree = [0] * (capacity + 1)
+        self._last = {}
+        self._time = 0
+
+    def __len__(self):
+        """Return the number of distinct items requested so far and not
+        removed"""
+        return len(self._last)
+
+    def access(self, item):
+        """Process a request for an item
+
+        Parameters
+        ----------
+        item : any hashable type
+            The item requested
+
+        Returns
+        -------
+        distance : int
+            The stack distance of the request, or -1 if the item was never
+            requested before
+        """
+        last = self._last
+        tree = self._tree
+        t = last.pop(item, None)
+        if t is None:
+            distance = -1
+        else:
+            # Items requested after the item are those whose last request is
+            # after its last request
+            i = t + 1
+            n_before = 0
+            while i > 0:
+                n_before += tree[i]
+                i &= i - 1
+            distance = len(last) + 1 - n_before
+            self._update(t, -1)
+        if self._time == self._capacity:
+            self._compact()
+        self._update(self._time, 1)
+        last[item] = self._time
+        self._time += 1
+        return distance
+
+    def remove(self, item):
+        """Remove an item, as if it was never requested
+
+        Parameters
+        ----------
+        item : any hashable type
+            The item to remove
+        """
+        self._update(self._last.pop(item), -1)
+
+    def _update(self, t, delta):
+        """Add *delta* to the number of items whose last request is at time
+        *t*"""
+        tree = self._tree
+        n = self._capacity
+        i = t + 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def _compact(self):
+        """Renumber the times of last requests from 0, in the same order, and
+        rebuild the Fenwick tree"""
+        items = sorted(self._last, key=self._last.get)
+        while 2 * len(items) > self._capacity:
+            self._capacity *= 2
+        n = self._capacity
+        tree = [0] * (n + 1)
+        for t, item in enumerate(items):
+            self._last[item] = t
+            tree[t + 1] = 1
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+        self._time = len(items)
+
+
+def stack_distances(trace):
+    """Compute the LRU stack distance of each request of a trace
+
+    Parameters
+    ----------
+    trace : iterable
+        The identifiers of the contents requested, e.g. interned integers
+
+    Returns
+    -------
+    distances : array of int
+        The stack distance of each request, -1 for the first request of each
+        content
+    """
+    access = StackDistanceCounter().access
+    return np.fromiter((access(content) for content in trace), dtype=int)
+
+
+def lru_miss_ratio_curve(trace, max_size=None, warmup_ratio=0.25):
+    """Compute the exact cache miss ratio of LRU caches of all sizes under a
+    trace-driven workload in a single pass.
+
+    The miss ratio of each size is the same as the one computed by
+    `trace_driven_cache_hit_ratio` with an LRU cache of that size.
+
+    Parameters
+    ----------
+    trace : iterable
+        The identifiers of the contents requested, e.g. interned integers or
+        a trace generated by `synthetic_trace`
+    max_size : int, optional
+        The largest cache size. If not specified, it is the smallest size
+        above which all caches have the same miss ratio
+    warmup_ratio : float, optional
+        Ratio of requests of the trace used to warm up caches (i.e. whose
+        cache hit/miss results are discarded)
+
+    Returns
+    -------
+    miss_ratio : array of float
+        The cache miss ratio of each cache size from 0 to *max_size*
+    """
+    if warmup_ratio < 0 or warmup_ratio > 1:
+        raise ValueError("warmup_ratio must be comprised between 0 and 1")
+    distances = stack_distances(trace)
+    n_warmup = int(warmup_ratio * len(distances))
+    return _miss_ratio_curve(distances[n_warmup:], None,
+                             len(distances) - n_warmup, max_size)
+
+
+def sampled_lru_miss_ratio_curve(trace, rate=0.01, max_size=None,
+                                 warmup_ratio=0.25, s_max=None, adjust=True,
+                                 seed=0):
+    """Estimate the cache miss ratio of LRU caches of all sizes under a
+    trace-driven workload from a spatially hashed sample of its contents,
+    according to the SHARDS method.
+
+    Only the requests for the contents whose hash is lower than a threshold
+    are processed, i.e. a fraction *rate* of the contents, selected
+    independently of their popularity, with all their requests. The stack
+    distances of the sampled requests are computed as by
+    `lru_miss_ratio_curve` and scaled by *1/rate*, so that memory and time
+    spent computing stack distances are reduced by a factor *rate*. Hashes
+    are computed on whole chunks of the trace at a time, so that the time
+    spent on requests not sampled is small if the trace is an array of
+    integers, e.g. a trace generated by `synthetic_trace`.
+
+    If *s_max* is specified, at most *s_max* contents are tracked, so that
+    memory is constant regardless of the number of contents of the trace.
+    Whenever a new content would exceed that number, the threshold is lowered
+    to the largest hash of the contents tracked, which are no longer sampled,
+    and the sampling rate is reduced accordingly. Each sampled request is
+    then weighted by the inverse of the sampling rate at the time it is
+    processed.
+
+    The number of sampled requests deviates from its expected value because
+    of the popularity of the contents sampled, which biases all the estimates
+    in the same direction. If *adjust* is *True*, the difference between the
+    expected and actual number of sampled requests is counted as requests
+    with stack distance 0 (SHARDS-adj), which reduces the error of the
+    estimates significantly.
+
+    Parameters
+    ----------
+    trace : sequence
+        The identifiers of the contents requested. Only its length and one
+        chunk of it at a time are needed, so it can be any sized iterable,
+        e.g. an array memory-mapped from a file
+    rate : float, optional
+        The initial sampling rate, between 0 and 1, which is kept for the
+        whole trace if *s_max* is not specified
+    max_size : int, optional
+        The largest cache size. If not specified, it is the smallest size
+        above which all caches have the same estimated miss ratio
+    warmup_ratio : float, optional
+        Ratio of requests of the trace used to warm up caches (i.e. whose
+        cache hit/miss results are discarded)
+    s_max : int, optional
+        The maximum number of contents tracked
+    adjust : bool, optional
+        Whether the estimates are adjusted for the number of sampled requests
+    seed : int, optional
+        The seed of the hash function, which selects the contents sampled
+
+    Returns
+    -------
+    miss_ratio : array of float
+        The estimated cache miss ratio of each cache size from 0 to
+        *max_size*
+
+    References
+    ----------
+    C. A. Waldspurger, N. Park, A. Garthwaite, I. Ahmad, Efficient MRC
+    construction with SHARDS, Proc. of USENIX FAST'15
+    """
+    if rate <= 0 or rate > 1:
+        raise ValueError("rate must be comprised between 0 and 1")
+    if warmup_ratio < 0 or warmup_ratio > 1:
+        raise ValueError("warmup_ratio must be comprised between 0 and 1")
+    if s_max is not None and s_max < 1:
+        raise ValueError("s_max must be positive")
+    n_requests = len(trace)
+    n_warmup = int(warmup_ratio * n_requests)
+    threshold = max(1, int(rate * _SHARDS_MODULUS))
+    counter = StackDistanceCounter()
+    access = counter.access
+    # Max-heap of the hashes of the contents tracked in fixed-size mode
+    tracked = []
+    hist = collections.defaultdict(float)
+    weight = _SHARDS_MODULUS / threshold
+    total_weight = 0.0
+    i = 0
+    for chunk in _chunks(trace, _SHARDS_CHUNK):
+        hashes = _shards_hash(chunk, seed)
+        selected = np.flatnonzero(hashes < threshold)
+        for j, h, content in zip(selected.tolist(),
+                                 hashes[selected].tolist(),
+                                 chunk[selected].tolist()):
+            if h >= threshold:
+                # The threshold was lowered after the chunk was filtered
+                continue
+            distance = access(content)
+            if s_max is not None and distance < 0:
+                heapq.heappush(tracked, (-h, content))
+                if len(counter) > s_max:
+                    threshold = -tracked[0][0]
+                    while tracked and -tracked[0][0] >= threshold:
+                        counter.remove(heapq.heappop(tracked)[1])
+                    weight = _SHARDS_MODULUS / threshold
+                    if h >= threshold:
+                        continue
+            if i + j >= n_warmup:
+                total_weight += weight
+                if distance >= 0:
+                    hist[int(distance * weight)] += weight
+        i += len(chunk)
+    n_measured = n_requests - n_warmup
+    if adjust:
+        hist[0] += n_measured - total_weight
+        total_weight = n_measured
+    buckets = np.fromiter(hist.keys(), dtype=int, count=len(hist))
+    weights = np.fromiter(hist.values(), dtype=float, count=len(hist))
+    if max_size is None:
+        nonzero = weights != 0
+        max_size = int(buckets[nonzero].max()) + 1 if nonzero.any() else 0
+    if total_weight <= 0:
+        return np.ones(max_size + 1)
+    miss_ratio = np.clip(_miss_ratio_curve(buckets, weights, total_weight,
+                                           max_size), 0, 1)
+    miss_ratio[0] = 1
+    return miss_ratio
+
+
+def _chunks(trace, size):
+    """Iterate over a trace in arrays of *size* requests"""
+    if isinstance(trace, np.ndarray):
+        for i in range(0, len(trace), size):
+            yield trace[i:i + size]
+        return
+    trace = iter(trace)
+    while True:
+        chunk = list(itertools.islice(trace, size))
+        if not chunk:
+            return
+        chunk_array = np.empty(len(chunk), dtype=object)
+        chunk_array[:] = chunk
+        yield chunk_array
+
+
+def _content_key(content):
+    """Return an unsigned 64-bit integer identifying a content of a trace: its
+    value if an integer, or else the CRC-32 of its bytes, string or repr"""
+    if isinstance(content, numbers.Integral):
+        return int(content) & 0xFFFFFFFFFFFFFFFF
+    if not isinstance(content, bytes):
+        if not isinstance(content, type(u'')):
+            content = repr(content)
+        content = content.encode('utf-8')
+    return zlib.crc32(content) & 0xFFFFFFFF
+
+
+def _shards_hash(chunk, seed):
+    """Return the hashes, uniformly distributed in [0, _SHARDS_MODULUS), of
+    the contents of an array, mixing their CRC-32 (or their value, if
+    integers) with the finalizer of SplitMix64. Unlike Python hashes of
+    strings, which are salted, they are the same in every process."""
+    if chunk.dtype.kind in 'iu':
+        z = chunk.astype(np.uint64)
+    else:
+        z = np.fromiter((_content_key(c) for c in chunk.tolist()),
+                        dtype=np.uint64, count=len(chunk))
+    with np.errstate(over='ignore'):
+        z = z + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & 0xFFFFFFFFFFFFFFFF)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z % np.uint64(_SHARDS_MODULUS)).astype(np.int64)
+
+
+def _miss_ratio_curve(distances, weights, n_requests, max_size):
+    """Return the miss ratio curve of an LRU cache from the (possibly scaled
+    and weighted) stack distances of the hits of *n_requests* requests"""
+    hits = distances >= 0
+    distances = distances[hits]
+    if weights is not None:
+        weights = weights[hits]
+    if max_size is None:
+        max_size = int(distances.max()) + 1 if len(distances) > 0 else 0
+    # A request with distance d is a hit in caches of size greater than d
+    hist = np.bincount(np.minimum(distances, max_size).astype(int),
+                       weights=weights, minlength=max_size + 1)
+    hit_count = np.concatenate(([0], np.cumsum(hist[:max_size])))
+    return 1 - hit_count / n_requests if n_requests > 0 else np.ones(max_size + 1)
+
+
 def hashrouting_model(topology, routing, hit_ratio, source_content_ratio,
                       req_rates, paths=None):
     """Compute overall latency of hashrouting over an arbitrary topology
@@ -879,33 +1657,33 @@ def hashrouting_model(topology, routing, hit_ratio, source_content_ratio,
 
     # This is the latency component between receivers and caches
     if routing == 'SYMM':
-        latency = (1 / len(caches)) * \
-                  sum(rate * (latencies[recv][cache] + latencies[cache][recv])
-                      for recv, rate in req_ratios.items() for cache in caches)
+        latency = (1 / len(caches)) * sum(
+            rate * (latencies[recv][cache] + latencies[cache][recv])
+            for recv, rate in req_ratios.items() for cache in caches)
         # This is the latency component between caches and sources
-        latency += ((1 - hit_ratio) / len(caches)) * \
-                   sum(ratio * (latencies[cache][source] + latencies[source][cache])
-                       for cache in caches
-                       for source, ratio in source_content_ratio.items())
+        latency += ((1 - hit_ratio) / len(caches)) * sum(
+            ratio * (latencies[cache][source] + latencies[source][cache])
+            for cache in caches
+            for source, ratio in source_content_ratio.items())
     elif routing == 'MULTICAST':
         # Latency leg receiver-cache
-        latency = (1 / len(caches)) * \
-          sum(rate * (latencies[recv][cache])
-              for recv, rate in req_ratios.items() for cache in caches)
+        latency = (1 / len(caches)) * sum(
+            rate * (latencies[recv][cache])
+            for recv, rate in req_ratios.items() for cache in caches)
         # Latency leg cache-receiver (hit case)
-        latency += (hit_ratio / len(caches)) * \
-          sum(rate * (latencies[cache][recv])
-              for recv, rate in req_ratios.items() for cache in caches)
+        latency += (hit_ratio / len(caches)) * sum(
+            rate * (latencies[cache][recv])
+            for recv, rate in req_ratios.items() for cache in caches)
         # Latency leg caches-sources (miss case)
-        latency += ((1 - hit_ratio) / len(caches)) * \
-                    sum(ratio * (latencies[cache][source])
-                        for cache in caches
-                        for source, ratio in source_content_ratio.items())
+        latency += ((1 - hit_ratio) / len(caches)) * sum(
+            ratio * (latencies[cache][source])
+            for cache in caches
+            for source, ratio in source_content_ratio.items())
         # Latency leg sources-receivers (miss case)
-        latency += (1 - hit_ratio) * \
-                    sum(source_ratio * req_ratio * (latencies[source][receiver])
-                        for receiver, req_ratio in req_ratios.items()
-                        for source, source_ratio in source_content_ratio.items())
+        latency += (1 - hit_ratio) * sum(
+            source_ratio * req_ratio * (latencies[source][receiver])
+            for receiver, req_ratio in req_ratios.items()
+            for source, source_ratio in source_content_ratio.items())
     else:
         # Should never reach this block anyway
         raise ValueError("Routing {} not supported".format(routing))
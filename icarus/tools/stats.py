@@ -7,13 +7,13 @@ import random
 import collections
 
 import numpy as np
-import scipy.stats as ss
 
 
 __all__ = [
        'DiscreteDist',
        'TruncatedZipfDist',
        'means_confidence_interval',
+       'means_confidence_intervals',
        'proportions_confidence_interval',
        'cdf',
        'pdf',
@@ -81,10 +81,21 @@ class DiscreteDist(object):
         """
         return self._cdf
 
-    def rv(self):
+    def rv(self, rng=random):
         """Get rand value from the distribution
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            The random number generator used. If not specified, the global
+            generator of the random module is used
+
+        Returns
+        -------
+        rv : int
+            The random value
         """
-        rv = random.random()
+        rv = rng.random()
         # This operation performs binary search over the CDF to return the
         # random value. Worst case time complexity is O(log2(n))
         return int(np.searchsorted(self._cdf, rv) + 1)
@@ -157,10 +168,49 @@ def means_confidence_interval(data, confidence=0.95):
     n = len(data)
     w = np.mean(data)
     s = np.std(data)
-    err = ss.norm.interval(confidence)[1]
+    from scipy.stats import norm
+    err = norm.interval(confidence)[1]
     return w, err * s / math.sqrt(n)
 
 
+def means_confidence_intervals(data, groups, confidence=0.95):
+    """Computes the confidence intervals of several groups of samples at once.
+
+    The result is the same as calling *means_confidence_interval* for each
+    group, but all groups are processed with a single vectorized operation.
+
+    Parameters
+    ----------
+    data : array-like
+        All samples, as an array of size *n*
+    groups : array-like of bool
+        Array of size *k x n*, where element *(i, j)* is True if the sample
+        *j* belongs to the group *i*
+    confidence : float, optional
+        The confidence level. It must be a value in the interval (0, 1)
+
+    Returns
+    -------
+    means : array
+        The mean of each group, NaN for empty groups
+    errs : array
+        The standard error of each group, NaN for empty groups
+    """
+    if confidence <= 0 or confidence >= 1:
+        raise ValueError('The confidence parameter must be greater than 0 and '
+                         'smaller than 1')
+    data = np.asarray(data, dtype=float)
+    groups = np.asarray(groups, dtype=bool).reshape(-1, len(data))
+    n = groups.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(groups, data, 0).sum(axis=1) / n
+        dev = np.where(groups, data - means[:, np.newaxis], 0)
+        s = np.sqrt((dev ** 2).sum(axis=1) / n)
+        from scipy.stats import norm
+        err = norm.interval(confidence)[1]
+        return means, err * s / np.sqrt(n)
+
+
 def proportions_confidence_interval(data, confidence):
     """Computes the confidence interval of a proportion.
 
@@ -184,7 +234,8 @@ def proportions_confidence_interval(data, confidence):
     n = float(len(data))
     m = len((i for i in data if i is True))
     p = m / n
-    err = ss.norm.interval(confidence)[1]
+    from scipy.stats import norm
+    err = norm.interval(confidence)[1]
     return p, err * math.sqrt(p * (1 - p) / n)
 
 
@@ -1,5 +1,8 @@
 from __future__ import division
 
+import os
+import subprocess
+import sys
 import unittest
 
 import numpy as np
@@ -47,6 +50,40 @@ class TestNumericCacheHitRatio(unittest.TestCase):
         h = cacheperf.numeric_cache_hit_ratio(self.pdf, cache.RandEvictionCache(r * self.n))
         self.assertLess(np.abs(h - r), 0.01)
 
+    def test_multiple_caches_and_seeds(self):
+        r = 0.1
+        caches = [cache.LruCache(r * self.n), cache.FifoCache(r * self.n)]
+        summaries = cacheperf.numeric_cache_hit_ratio(self.pdf, caches,
+                                                      seed=[1, 2, 3],
+                                                      n_processes=2)
+        self.assertEqual(2, len(summaries))
+        for s in summaries:
+            self.assertEqual(3, len(s['values']))
+            self.assertLess(np.abs(s['mean'] - r), 0.01)
+            self.assertLessEqual(s['ci'][0], s['mean'])
+            self.assertGreaterEqual(s['ci'][1], s['mean'])
+        # Caches are copied and results do not depend on the processes
+        self.assertEqual(0, len(caches[0]))
+        serial = cacheperf.numeric_cache_hit_ratio(self.pdf, caches[0],
+                                                   seed=[1, 2, 3],
+                                                   n_processes=1)
+        np.testing.assert_array_equal(summaries[0]['values'], serial['values'])
+        self.assertEqual(serial['values'][1],
+                         cacheperf.numeric_cache_hit_ratio(self.pdf,
+                                                           cache.LruCache(r * self.n),
+                                                           seed=2))
+
+    def test_2_layers_multiple_seeds(self):
+        r = 0.1
+        summary = cacheperf.numeric_cache_hit_ratio_2_layers(
+            self.pdf, cache.LruCache(r * self.n), cache.LruCache(r * self.n),
+            seed=[1, 2])
+        for s in summary.values():
+            self.assertEqual(2, len(s['values']))
+        self.assertAlmostEqual(summary['total_hits']['mean'],
+                               summary['l1_hits']['mean'] +
+                               summary['l2_hits']['mean'])
+
 
 class TestLaoutarisPerContentCacheHitRatio(unittest.TestCase):
 
@@ -111,7 +148,7 @@ class TestCheApproximation(unittest.TestCase):
 
     def test_che_characteristic_time(self):
         T = cacheperf.che_characteristic_time(self.pdf, self.cache_size)
-        prev_t = np.infty
+        prev_t = np.inf
         for t in T:
             self.assertGreaterEqual(t, self.cache_size)
             self.assertLessEqual(t, prev_t)
@@ -171,6 +208,46 @@ class TestCheApproximation(unittest.TestCase):
             self.assertLessEqual(h, prev_h)
             prev_h = h
 
+    def test_che_characteristic_time_exact(self):
+        from scipy.optimize import brentq
+        for alpha, cache_size in ((0.8, 40), (1.2, 40), (0.8, 98)):
+            pdf = stats.TruncatedZipfDist(alpha=alpha, n=100).pdf
+            T = cacheperf.che_characteristic_time(pdf, cache_size)
+            for i in (0, 1, 50, 99):
+                def func_r(r):
+                    return np.sum(np.exp(-np.delete(pdf, i) * r)) \
+                           - len(pdf) + 1 + cache_size
+                t = brentq(func_r, cache_size, 1e9, rtol=1e-14)
+                self.assertAlmostEqual(1, T[i] / t)
+                self.assertAlmostEqual(1, cacheperf.che_characteristic_time(
+                                           pdf, cache_size, i + 1) / t)
+
+    def test_che_batch(self):
+        pdf = np.array([stats.TruncatedZipfDist(alpha=alpha, n=100).pdf
+                        for alpha in (0.6, 0.8, 1.0)])
+        cache_sizes = [0, 1, 10, 40, 99, 100, 200]
+        for policy, policy_args in (('LRU', {}), ('q-LRU', {'q': 0.1}),
+                                    ('FIFO', {})):
+            T = cacheperf.che_characteristic_time_batch(pdf, cache_sizes,
+                                                        policy, **policy_args)
+            H = cacheperf.che_cache_hit_ratio_batch(pdf, cache_sizes, policy,
+                                                    **policy_args)
+            self.assertEqual((3, len(cache_sizes)), T.shape)
+            self.assertEqual((3, len(cache_sizes)), H.shape)
+            np.testing.assert_allclose(H[1], cacheperf.che_cache_hit_ratio_batch(
+                pdf[1], cache_sizes, policy, **policy_args))
+            for i in range(len(pdf)):
+                self.assertEqual(0, T[i, 0])
+                self.assertEqual(0, H[i, 0])
+                self.assertEqual(np.inf, T[i, -1])
+                self.assertAlmostEqual(1, H[i, -1])
+                for j, cache_size in enumerate(cache_sizes[1:-2], 1):
+                    t = cacheperf.che_characteristic_time_generalized(
+                        pdf[i], cache_size, policy, **policy_args)
+                    self.assertAlmostEqual(1, T[i, j] / t)
+                    self.assertAlmostEqual(H[i, j], cacheperf.che_cache_hit_ratio_generalized(
+                        pdf[i], cache_size, policy, **policy_args))
+
 
 class TestLaoutarisCacheHitRatio(unittest.TestCase):
 
@@ -189,6 +266,114 @@ class TestOptimalCacheHitRatio(unittest.TestCase):
         h = cacheperf.optimal_cache_hit_ratio([0.1, 0.5, 0.4], 2)
         self.assertAlmostEqual(0.9, h)
 
+
+class TestStackDistances(unittest.TestCase):
+
+    def test_stack_distances(self):
+        trace = [1, 2, 3, 1, 1, 4, 5, 2, 6, 7, 8, 3, 1]
+        expected = [-1, -1, -1, 2, 0, -1, -1, 4, -1, -1, -1, 7, 7]
+        self.assertEqual(expected, list(cacheperf.stack_distances(trace)))
+
+    def test_compaction(self):
+        trace = [1, 2, 3, 1, 1, 4, 5, 2, 6, 7, 8, 3, 1]
+        expected = [-1, -1, -1, 2, 0, -1, -1, 4, -1, -1, -1, 7, 7]
+        counter = cacheperf.StackDistanceCounter(capacity=4)
+        self.assertEqual(expected, [counter.access(x) for x in trace])
+
+    def test_remove(self):
+        counter = cacheperf.StackDistanceCounter()
+        for x in (1, 2, 3):
+            counter.access(x)
+        counter.remove(2)
+        self.assertEqual(1, counter.access(1))
+        self.assertEqual(-1, counter.access(2))
+
+
+class TestLruMissRatioCurve(unittest.TestCase):
+
+    def test_synthetic_trace(self):
+        dist = stats.TruncatedZipfDist(0.8, 100, seed=1)
+        trace = cacheperf.synthetic_trace(dist, 1000, seed=1)
+        self.assertEqual(1000, len(trace))
+        self.assertGreaterEqual(min(trace), 1)
+        self.assertLessEqual(max(trace), 100)
+
+    def test_same_as_trace_driven(self):
+        dist = stats.TruncatedZipfDist(0.8, 200, seed=1)
+        trace = cacheperf.synthetic_trace(dist, 5000, seed=1)
+        mrc = cacheperf.lru_miss_ratio_curve(trace)
+        self.assertAlmostEqual(1.0, mrc[0])
+        for size in (1, 10, 50, 150):
+            hit_ratio = cacheperf.trace_driven_cache_hit_ratio(
+                            trace, cache.LruCache(size))
+            self.assertAlmostEqual(1 - hit_ratio, mrc[size])
+        self.assertTrue(np.all(np.diff(mrc) <= 1e-12))
+
+    def test_max_size(self):
+        trace = [1, 2, 3, 1, 2, 3] * 10
+        mrc = cacheperf.lru_miss_ratio_curve(trace, max_size=5, warmup_ratio=0)
+        self.assertEqual(6, len(mrc))
+        self.assertAlmostEqual(1.0, mrc[2])
+        self.assertAlmostEqual(0.05, mrc[3])
+
+
+class TestSampledLruMissRatioCurve(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        dist = stats.TruncatedZipfDist(0.8, 10000, seed=1)
+        cls.trace = cacheperf.synthetic_trace(dist, 100000, seed=1)
+        cls.exact = cacheperf.lru_miss_ratio_curve(cls.trace)
+        cls.max_size = len(cls.exact) - 1
+
+    def test_no_sampling(self):
+        mrc = cacheperf.sampled_lru_miss_ratio_curve(self.trace, rate=1)
+        np.testing.assert_allclose(self.exact, mrc)
+
+    def test_fixed_rate(self):
+        mrc = cacheperf.sampled_lru_miss_ratio_curve(self.trace, rate=0.1,
+                                                     max_size=self.max_size)
+        self.assertEqual(len(self.exact), len(mrc))
+        self.assertLess(np.abs(mrc - self.exact).mean(), 0.03)
+
+    def test_fixed_size(self):
+        mrc = cacheperf.sampled_lru_miss_ratio_curve(self.trace, rate=1,
+                                                     s_max=1000,
+                                                     max_size=self.max_size)
+        self.assertLess(np.abs(mrc - self.exact).mean(), 0.03)
+
+    def test_contents_types(self):
+        trace = self.trace[:10000]
+        mrc = cacheperf.sampled_lru_miss_ratio_curve(trace, rate=0.2)
+        np.testing.assert_array_equal(
+            mrc, cacheperf.sampled_lru_miss_ratio_curve(list(trace), rate=0.2))
+        mrc = cacheperf.sampled_lru_miss_ratio_curve(
+                ['c%d' % c for c in trace], rate=1)
+        np.testing.assert_allclose(cacheperf.lru_miss_ratio_curve(trace), mrc)
+
+    def test_deterministic_str_contents(self):
+        script = ('import icarus.tools.cacheperf as cacheperf\n'
+                  'trace = ["c%d" % (i * i % 997) for i in range(20000)]\n'
+                  'mrc = cacheperf.sampled_lru_miss_ratio_curve(trace, rate=0.1)\n'
+                  'print(list(mrc))\n')
+        outputs = set()
+        for hash_seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+            outputs.add(subprocess.check_output([sys.executable, '-c', script],
+                                                env=env))
+        self.assertEqual(1, len(outputs))
+        trace = ['c%d' % (i * i % 997) for i in range(20000)]
+        np.testing.assert_array_equal(
+            cacheperf.sampled_lru_miss_ratio_curve(trace, rate=0.1),
+            cacheperf.sampled_lru_miss_ratio_curve(np.array(trace), rate=0.1))
+
+    def test_invalid_params(self):
+        self.assertRaises(ValueError, cacheperf.sampled_lru_miss_ratio_curve,
+                          self.trace, rate=0)
+        self.assertRaises(ValueError, cacheperf.sampled_lru_miss_ratio_curve,
+                          self.trace, s_max=0)
+
+
 class TestHashrouting(unittest.TestCase):
 
     def test_arbitrary(self):
@@ -222,17 +407,18 @@ class TestHashrouting(unittest.TestCase):
             req_rates = {v: 1/len(receivers) for v in receivers}
             source_content_ratio = {v: 1/len(sources) for v in sources}
             # Run experiment and validate results
-            latency = cacheperf.hashrouting_model(topo, 'SYMM', hit_ratio, source_content_ratio, req_rates)
+            latency = cacheperf.hashrouting_model(topo, 'SYMM', hit_ratio,
+                                                  source_content_ratio, req_rates)
             self.assertAlmostEqual(results[asn], latency)
 
     def test_mesh(self):
-        l = cacheperf.hashrouting_model_mesh(10, 5, 0.1, 1, 1.5)
-        self.assertAlmostEqual(5.4, l)
+        latency = cacheperf.hashrouting_model_mesh(10, 5, 0.1, 1, 1.5)
+        self.assertAlmostEqual(5.4, latency)
 
     def test_ring(self):
-        l = cacheperf.hashrouting_model_ring(2, 0.1, 2, 3)
-        self.assertAlmostEqual(9.2, l)
-        l = cacheperf.hashrouting_model_ring(5, 0.1, 2, 3)
-        self.assertAlmostEqual(14.52, l)
-        l = cacheperf.hashrouting_model_ring(8, 0.1, 2, 3)
-        self.assertAlmostEqual(20.6, l)
+        latency = cacheperf.hashrouting_model_ring(2, 0.1, 2, 3)
+        self.assertAlmostEqual(9.2, latency)
+        latency = cacheperf.hashrouting_model_ring(5, 0.1, 2, 3)
+        self.assertAlmostEqual(14.52, latency)
+        latency = cacheperf.hashrouting_model_ring(8, 0.1, 2, 3)
+        self.assertAlmostEqual(20.6, latency)
@@ -14,6 +14,25 @@ class TestMeansConfidenceInterval(unittest.TestCase):
         self.assertEqual(0, err)
 
 
+class TestMeansConfidenceIntervals(unittest.TestCase):
+
+    def test_equal_to_single_group(self):
+        data = np.array([1.0, 4.0, 2.5, 7.0, 3.0])
+        groups = [[True, True, False, True, False],
+                  [False, True, True, True, True],
+                  [True, False, False, False, False]]
+        means, errs = stats.means_confidence_intervals(data, groups, 0.9)
+        for i, group in enumerate(groups):
+            mean, err = stats.means_confidence_interval(data[np.array(group)], 0.9)
+            self.assertAlmostEqual(mean, means[i])
+            self.assertAlmostEqual(err, errs[i])
+
+    def test_empty_group(self):
+        means, errs = stats.means_confidence_intervals([1, 2], [[False, False]])
+        self.assertTrue(np.isnan(means[0]))
+        self.assertTrue(np.isnan(errs[0]))
+
+
 class TestDiscreteDist(unittest.TestCase):
 
     def test_pdf_incorrect_sum(self):
@@ -12,8 +12,6 @@ from icarus.tools import TruncatedZipfDist
 
 import numpy as np
 
-from scipy.stats import chisquare
-
 
 __all__ = [
        'frequencies',
@@ -129,6 +127,7 @@ def zipf_fit(obs_freqs, need_sorting=False):
     This function uses the method described in
     http://stats.stackexchange.com/questions/6780/how-to-calculate-zipfs-law-coefficient-from-a-set-of-top-frequencies
     """
+    from scipy.stats import chisquare
     try:
         from scipy.optimize import minimize_scalar
     except ImportError:
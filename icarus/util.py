@@ -4,8 +4,11 @@ from __future__ import division
 import time
 import logging
 import collections
+import collections.abc
 import copy
 import heapq
+import itertools
+import multiprocessing as mp
 
 import numpy as np
 import networkx as nx
@@ -20,7 +23,11 @@ __all__ = [
         'iround',
         'step_cdf',
         'Tree',
+        'TreeGrid',
+        'LabeledArray',
         'can_import',
+        'can_fork',
+        'n_fork_processes',
         'overlay_betweenness_centrality',
         'path_links',
         'multicast_tree',
@@ -28,6 +35,9 @@ __all__ = [
            ]
 
 
+logger = logging.getLogger('util')
+
+
 class Tree(collections.defaultdict):
     """Tree data structure
 
@@ -142,7 +152,7 @@ class Tree(collections.defaultdict):
         """
         tree = self
         for i in path:
-            if isinstance(tree, Tree) and i in tree:
+            if isinstance(tree, (Tree, LabeledArray)) and i in tree:
                 tree = tree[i]
             else:
                 return None
@@ -182,7 +192,10 @@ class Tree(collections.defaultdict):
         d = {}
         for k, v in self.items():
             k = str(k) if str_keys else k
-            v = v.dict() if isinstance(v, Tree) else v
+            if isinstance(v, Tree):
+                v = v.dict(str_keys)
+            elif isinstance(v, LabeledArray):
+                v = v.dict(str_keys)
             d[k] = v
         return d
 
@@ -212,6 +225,236 @@ class Tree(collections.defaultdict):
         condition = Tree(condition)
         return all(self.getval(path) == val for path, val in condition.paths().items())
 
+    def grid(self, axes, desc=None):
+        """Return all trees obtained by setting values of this tree to all
+        combinations of given values.
+
+        Trees are generated lazily, so that the grid can be iterated over
+        without storing all trees in memory at the same time. This makes it
+        suitable to define an `EXPERIMENT_QUEUE` with a large number of
+        experiments.
+
+        Parameters
+        ----------
+        axes : dict or list of (path, values) tuples
+            Values to combine, keyed by the path where they are set. A path is
+            either a tuple of keys or a single key. Combinations are generated
+            in lexicographic order, with the last axis varying fastest.
+        desc : callable, optional
+            If provided, it is called with each generated tree and the value it
+            returns is stored in the tree under the key *desc*
+
+        Returns
+        -------
+        grid : TreeGrid
+            The grid of trees
+
+        Examples
+        --------
+        >>> default = Tree({'workload': {'name': 'STATIONARY'}})
+        >>> grid = default.grid([(('workload', 'alpha'), [0.6, 0.8]),
+        ...                      (('strategy', 'name'), ['LCE', 'LCD'])])
+        >>> len(grid)
+        4
+        """
+        return TreeGrid(self, axes, desc)
+
+
+class TreeGrid(object):
+    """Lazy sequence of trees obtained by combining values of a base tree.
+
+    Each iteration over the grid generates new copies of the base tree, so
+    modifying a generated tree does not affect the base tree or other trees.
+
+    This object is normally created by calling `Tree.grid`.
+    """
+
+    def __init__(self, base, axes, desc=None):
+        """Constructor
+
+        Parameters
+        ----------
+        base : Tree
+            The base tree
+        axes : dict or list of (path, values) tuples
+            Values to combine, keyed by the path where they are set
+        desc : callable, optional
+            Function returning the description of a generated tree
+        """
+        if isinstance(axes, dict):
+            axes = axes.items()
+        self.base = Tree(base)
+        self.paths = []
+        self.values = []
+        for path, values in axes:
+            self.paths.append(path if isinstance(path, tuple) else (path,))
+            self.values.append(list(values))
+        self.desc = desc
+
+    def __len__(self):
+        n = 1
+        for values in self.values:
+            n *= len(values)
+        return n
+
+    def __iter__(self):
+        for combination in itertools.product(*self.values):
+            tree = copy.deepcopy(self.base)
+            for path, val in zip(self.paths, combination):
+                tree.setval(path, copy.deepcopy(val))
+            if self.desc is not None:
+                tree['desc'] = self.desc(tree)
+            yield tree
+
+    def subtrees(self, path):
+        """Return the distinct values taken at a path by the generated trees,
+        e.g. the topology specifications of a grid of experiments, with the
+        number of trees taking each of them.
+
+        Only the combinations of the values of the axes setting values at or
+        above the path are generated, so that this is much faster than
+        iterating over the grid if other axes have many values.
+
+        Parameters
+        ----------
+        path : tuple
+            The path
+
+        Returns
+        -------
+        subtrees : list of (value, count) tuples
+            The distinct values at the path and the number of trees taking
+            each of them
+        """
+        path = tuple(path)
+        relevant = [i for i, p in enumerate(self.paths)
+                    if p[:len(path)] == path or path[:len(p)] == p]
+        # Number of trees generated by each combination of relevant values
+        n_others = 1
+        for i, values in enumerate(self.values):
+            if i not in relevant:
+                n_others *= len(values)
+        subtrees = []
+        for combination in itertools.product(*[self.values[i] for i in relevant]):
+            tree = copy.deepcopy(self.base)
+            for i, val in zip(relevant, combination):
+                tree.setval(self.paths[i], copy.deepcopy(val))
+            value = tree.getval(path)
+            for j, (v, count) in enumerate(subtrees):
+                if v == value:
+                    subtrees[j] = (v, count + n_others)
+                    break
+            else:
+                subtrees.append((value, n_others))
+        return subtrees
+
+
+class LabeledArray(collections.abc.Mapping):
+    """Read-only mapping whose keys and values are stored in two arrays.
+
+    This object is used to store large results, e.g. per-content metrics, in
+    place of dictionaries. It behaves as a dictionary but it is pickled as two
+    arrays, which is much faster than pickling a dictionary item by item.
+    Keys which are tuples, e.g. links, are stored as the rows of a 2-d array
+    of labels.
+    """
+
+    def __init__(self, labels, data):
+        """Constructor
+
+        Parameters
+        ----------
+        labels : array-like
+            The keys, which must be unique
+        data : array-like
+            The values, with the same length as labels
+        """
+        self.labels = np.asarray(labels)
+        self.data = np.asarray(data)
+        if len(self.labels) != len(self.data):
+            raise ValueError('labels and data must have the same length')
+        self._index = None
+
+    @classmethod
+    def from_dict(cls, d):
+        """Return a labeled array with the items of a dictionary
+
+        Keys are stored in an array of their type if they are all integers or
+        all strings, or tuples of them, and in an array of objects otherwise,
+        so that they are not converted to another type.
+
+        Parameters
+        ----------
+        d : dict
+            The dictionary
+
+        Returns
+        -------
+        array : LabeledArray
+            The labeled array
+        """
+        keys = list(d.keys())
+        labels = np.array(keys)
+        scalars = [v for k in keys for v in (k if isinstance(k, tuple) else (k,))]
+        if not ((labels.dtype.kind in 'iu' and
+                 not any(isinstance(v, bool) for v in scalars)) or
+                (labels.dtype.kind == 'U' and
+                 all(isinstance(v, str) for v in scalars))):
+            labels = np.empty(len(keys), dtype=object)
+            for i, k in enumerate(keys):
+                labels[i] = k
+        return cls(labels, [d[k] for k in keys])
+
+    def _keys(self):
+        """Return the list of keys"""
+        labels = self.labels.tolist()
+        if self.labels.ndim > 1:
+            return [tuple(label) for label in labels]
+        return labels
+
+    def __getitem__(self, k):
+        if self._index is None:
+            self._index = {label: i for i, label in enumerate(self._keys())}
+        return self.data[self._index[k]]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __eq__(self, other):
+        if isinstance(other, collections.abc.Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return {'labels': self.labels, 'data': self.data, '_index': None}
+
+    def __repr__(self):
+        return "LabeledArray({})".format(self.dict())
+
+    def dict(self, str_keys=False):
+        """Convert the mapping to a dictionary
+
+        Parameters
+        ----------
+        str_key : bool, optional
+            Convert keys to string
+
+        Returns
+        -------
+        d : dict
+            A dictionary with the same items, with keys and values converted
+            to Python scalars
+        """
+        labels = self._keys()
+        if str_keys:
+            labels = [str(k) for k in labels]
+        return dict(zip(labels, self.data.tolist()))
+
 
 class Settings(object):
     """Object storing all settings"""
@@ -234,6 +477,16 @@ class Settings(object):
         """
         return len(self.__conf)
 
+    def __iter__(self):
+        """Return an iterator over the names of the settings
+
+        Returns
+        -------
+        iter : iterator
+            Iterator over setting names
+        """
+        return iter(list(self.__conf))
+
     def __getitem__(self, name):
         """Return value of settings with given name
 
@@ -356,10 +609,14 @@ class Settings(object):
         """
         if self.__frozen:
             raise ValueError('Settings are frozen and cannot be modified')
-        exec(open(path).read(), self.__conf)
-        for k in list(self.__conf):
-            if k != k.upper():
-                del self.__conf[k]
+        # The file is executed in its own namespace so that functions and
+        # generators defined in it, e.g. to build the experiment queue, can
+        # still access all its global names after settings are extracted
+        namespace = {}
+        exec(open(path).read(), namespace)
+        for k, v in namespace.items():
+            if k == k.upper():
+                self.__conf[k] = v
         if freeze:
             self.freeze()
 
@@ -643,8 +900,57 @@ def can_import(statement):
         return False
 
 
+def can_fork():
+    """Return True if this process can fork child processes
+
+    Processes cannot be forked on platforms not supporting the fork start
+    method, e.g. Windows, and by daemonic processes, e.g. the worker processes
+    of a multiprocessing pool.
+
+    Returns
+    -------
+    can_fork : bool
+        True if can fork, False otherwise
+    """
+    return 'fork' in mp.get_all_start_methods() and \
+           not mp.current_process().daemon
+
+
+def n_fork_processes(n_processes, n_jobs):
+    """Return the number of processes to fork to execute jobs in parallel
+
+    If processes cannot be forked (see `can_fork`), jobs are executed by this
+    process and, if several processes were explicitly requested, a warning is
+    logged.
+
+    Parameters
+    ----------
+    n_processes : int
+        The number of processes requested. If None, the number of CPUs, or 1
+        without any warning if processes cannot be forked
+    n_jobs : int
+        The number of jobs to execute
+
+    Returns
+    -------
+    n_processes : int
+        The number of processes, at least 1 and at most *n_jobs*. If 1, jobs
+        must be executed by this process
+    """
+    requested = n_processes is not None
+    if not requested:
+        n_processes = mp.cpu_count()
+    n_processes = max(1, min(n_processes, n_jobs))
+    if n_processes > 1 and not can_fork():
+        if requested:
+            logger.warning('Processes cannot be forked, executing %d jobs in '
+                           'this process', n_jobs)
+        n_processes = 1
+    return n_processes
+
+
 def overlay_betweenness_centrality(topology, origins=None, destinations=None,
-                                  normalized=True, endpoints=False):
+                                   normalized=True, endpoints=False):
     """Calculate the betweenness centrality of a graph but only regarding the
     paths from a set of origins nodes to a set of destinations node.
 